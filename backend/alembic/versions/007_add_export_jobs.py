@@ -0,0 +1,53 @@
+"""Add export jobs table
+
+Revision ID: 007_add_export_jobs
+Revises: 006_add_doc_approvals
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '007_add_export_jobs'
+down_revision = '006_add_doc_approvals'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create export_jobs table."""
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', sa.String(32), nullable=False),
+        sa.Column('org_id', sa.Integer(), nullable=False),
+        sa.Column('system_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(50), nullable=False, server_default='annex_iv'),
+        sa.Column('variant', sa.String(50), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False, server_default='queued'),
+        sa.Column('progress_json', sa.Text(), nullable=True),
+        sa.Column('filename', sa.String(255), nullable=True),
+        sa.Column('sha256', sa.String(64), nullable=True),
+        sa.Column('size_bytes', sa.Integer(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id']),
+        sa.ForeignKeyConstraint(['system_id'], ['ai_systems.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_export_jobs_org_id', 'export_jobs', ['org_id'])
+    op.create_index('ix_export_jobs_system_id', 'export_jobs', ['system_id'])
+    op.create_index('ix_export_jobs_status_created', 'export_jobs', ['status', 'created_at'])
+
+
+def downgrade():
+    """Drop export_jobs table."""
+    op.drop_index('ix_export_jobs_status_created', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_system_id', table_name='export_jobs')
+    op.drop_index('ix_export_jobs_org_id', table_name='export_jobs')
+    op.drop_table('export_jobs')
@@ -0,0 +1,53 @@
+"""Add rendered documents table (render store metadata)
+
+Revision ID: 008_add_rendered_documents
+Revises: 007_add_export_jobs
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008_add_rendered_documents'
+down_revision = '007_add_export_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Create rendered_documents table."""
+    op.create_table(
+        'rendered_documents',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('org_id', sa.Integer(), nullable=False),
+        sa.Column('system_id', sa.Integer(), nullable=False),
+        sa.Column('doc_type', sa.String(100), nullable=False),
+        sa.Column('format', sa.String(20), nullable=False),
+        sa.Column('fingerprint', sa.String(64), nullable=False),
+        sa.Column('blob_name', sa.String(255), nullable=False),
+        sa.Column('sha256', sa.String(64), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['org_id'], ['organizations.id']),
+        sa.ForeignKeyConstraint(['system_id'], ['ai_systems.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_rendered_documents_id', 'rendered_documents', ['id'])
+    op.create_index('ix_rendered_documents_org_id', 'rendered_documents', ['org_id'])
+    op.create_index('ix_rendered_documents_system_id', 'rendered_documents', ['system_id'])
+    op.create_index(
+        'ux_rendered_documents_doc', 'rendered_documents',
+        ['org_id', 'system_id', 'doc_type', 'format'], unique=True
+    )
+
+
+def downgrade():
+    """Drop rendered_documents table."""
+    op.drop_index('ux_rendered_documents_doc', table_name='rendered_documents')
+    op.drop_index('ix_rendered_documents_system_id', table_name='rendered_documents')
+    op.drop_index('ix_rendered_documents_org_id', table_name='rendered_documents')
+    op.drop_index('ix_rendered_documents_id', table_name='rendered_documents')
+    op.drop_table('rendered_documents')
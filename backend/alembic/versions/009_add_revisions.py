@@ -0,0 +1,34 @@
+"""Add revision counters to organizations and AI systems
+
+Revision ID: 009_add_revisions
+Revises: 008_add_rendered_documents
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '009_add_revisions'
+down_revision = '008_add_rendered_documents'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    """Add revision counters."""
+    op.add_column(
+        'organizations',
+        sa.Column('revision', sa.Integer(), nullable=False, server_default='0'),
+    )
+    op.add_column(
+        'ai_systems',
+        sa.Column('revision', sa.Integer(), nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    """Remove revision counters."""
+    op.drop_column('ai_systems', 'revision')
+    op.drop_column('organizations', 'revision')
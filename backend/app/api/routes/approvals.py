@@ -4,9 +4,7 @@ Document Approvals API
 Endpoints for submitting and approving compliance documents.
 """
 
-import hashlib
 from datetime import datetime, timezone
-from pathlib import Path
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
@@ -15,6 +13,7 @@ from sqlalchemy.orm import Session
 from app.core.security import verify_api_key
 from app.database import get_db
 from app.models import AISystem, DocumentApproval, Organization
+from app.services.render_store import render_store
 
 router = APIRouter(prefix="/approvals", tags=["approvals"])
 
@@ -54,34 +53,27 @@ def submit_document_for_review(
     if not system:
         raise HTTPException(status_code=404, detail="System not found")
     
-    # Check if document exists (generated)
-    doc_dir = Path(f"generated_documents/org_{org.id}/system_{system_id}")
-    
-    # Map doc_type to filename
-    doc_filename_map = {
-        "annex_iv": "annex_iv.md",
-        "fria": "fria.md",
-        "soa": "soa.md",
-        "monitoring_report": "monitoring_report.md",
-        "pmm": "monitoring_report.md",  # Alias
-        "instructions_for_use": "instructions_for_use.md",
-        "risk_assessment": "risk_assessment.md",
-        "human_oversight": "human_oversight.md",
-        "logging_plan": "logging_plan.md",
-        "appeals_flow": "appeals_flow.md"
+    # Map doc_type to the generated document it approves
+    doc_type_map = {
+        "annex_iv": "annex_iv",
+        "fria": "fria",
+        "soa": "soa",
+        "monitoring_report": "monitoring_report",
+        "pmm": "monitoring_report",  # Alias
+        "instructions_for_use": "instructions_for_use",
+        "risk_assessment": "risk_assessment",
+        "human_oversight": "human_oversight",
+        "logging_plan": "logging_plan",
+        "appeals_flow": "appeals_flow"
     }
     
-    doc_filename = doc_filename_map.get(payload.doc_type)
-    if not doc_filename:
+    stored_doc_type = doc_type_map.get(payload.doc_type)
+    if not stored_doc_type:
         raise HTTPException(status_code=400, detail=f"Invalid doc_type: {payload.doc_type}")
     
-    doc_path = doc_dir / doc_filename
-    
-    # Calculate document hash if file exists
-    document_hash = None
-    if doc_path.exists():
-        with open(doc_path, 'rb') as f:
-            document_hash = hashlib.sha256(f.read()).hexdigest()
+    # Document hash of the generated Markdown, if it is in the render store
+    stored = render_store.get(db, org.id, system_id, stored_doc_type, "markdown")
+    document_hash = stored.sha256 if stored is not None else None
     
     # Check if approval record exists
     existing = (
@@ -21,6 +21,8 @@ from app.schemas import (
     RefineResponse,
 )
 from app.services.compliance_suite import compliance_suite_service
+from app.services.docx_export import iter_file
+from app.services.pdf_renderer import PdfQueueFullError, PdfRenderTimeoutError
 from app.services.s3 import s3_service
 
 logger = logging.getLogger(__name__)
@@ -111,8 +113,10 @@ def export_compliance_document(
             "pdf": "application/pdf"
         }
         
+        # DOCX arrives as a spooled file; stream it in chunks and close it after
+        body = content_bytes if hasattr(content_bytes, "read") else io.BytesIO(content_bytes)
         return StreamingResponse(
-            io.BytesIO(content_bytes),
+            iter_file(body),
             media_type=content_types[format],
             headers={
                 "Content-Disposition": f"attachment; filename={filename}",
@@ -135,6 +139,10 @@ def export_compliance_document(
                 detail="PDF export requires WeasyPrint; install optional dependency or disable PDF export"
             )
         raise HTTPException(status_code=404, detail=str(e))
+    except PdfQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except PdfRenderTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Unexpected error in document export: {str(e)}")
         raise HTTPException(
@@ -242,8 +250,10 @@ def export_soa_narrative(
             format="md"
         )
         
+        # DOCX arrives as a spooled file; stream it in chunks and close it after
+        body = content_bytes if hasattr(content_bytes, "read") else io.BytesIO(content_bytes)
         return StreamingResponse(
-            io.BytesIO(content_bytes),
+            iter_file(body),
             media_type="text/markdown",
             headers={
                 "Content-Disposition": f"attachment; filename={filename}",
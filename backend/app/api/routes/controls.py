@@ -7,6 +7,7 @@ from app.core.security import verify_api_key
 from app.database import get_db
 from app.models import AISystem, Control, Evidence, Organization
 from app.schemas import ControlBulkRequest
+from app.services.control_evidence import load_control_evidence
 
 router = APIRouter(tags=["controls"])
 
@@ -124,22 +125,6 @@ def list_available_evidence(
 
 
 def compute_evidence_coverage_pct(db: Session, org_id: int, system_id: int) -> float:
-    controls = db.query(Control).filter(Control.org_id == org_id, Control.system_id == system_id).all()
-    if not controls:
-        return 0.0
-    covered = 0
-    for c in controls:
-        match = (
-            db.query(Evidence)
-            .filter(
-                Evidence.org_id == org_id,
-                Evidence.system_id == system_id,
-                ((Evidence.iso42001_clause == c.iso_clause) | (Evidence.control_name == c.name)),
-            )
-            .first()
-        )
-        if match:
-            covered += 1
-    return covered / len(controls)
+    return load_control_evidence(db, org_id, [system_id]).coverage(system_id)
 
 
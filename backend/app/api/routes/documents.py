@@ -2,15 +2,20 @@
 Document generation and management endpoints.
 """
 
-from typing import Any, Dict
+import hashlib
+import html
+from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Body, Depends, Header, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 
 from app.core.security import verify_api_key
 from app.database import get_db
 from app.models import AISystem, Organization
 from app.services.document_generator import DocumentGenerator
+from app.services.pdf_renderer import PdfQueueFullError, PdfRenderTimeoutError
+from app.services.preview_cache import preview_cache
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
@@ -74,47 +79,12 @@ async def generate_system_documents(
                 "FRIA (Fundamental Rights Impact Assessment) appears to be required but no FRIA evidence was found. Documents were generated without FRIA; please complete FRIA for audit readiness."
             )
     
-    # Use provided onboarding data or fallback to defaults
-    if not onboarding_data:
-        onboarding_data = {
-            "company": {
-                "name": org.name,
-                "address": "",
-                "industry": ""
-            },
-            "risks": {
-                "topRisks": [],
-                "mitigationStrategies": []
-            },
-            "oversight": {
-                "oversightRules": [],
-                "escalationPaths": []
-            },
-            "monitoring": {
-                "keyMetrics": [],
-                "reviewFrequency": "Quarterly"
-            }
-        }
-    
+    # Without a payload the system's saved onboarding data is used
     try:
-        # Normalize onboarding data structure
-        if "systems" in onboarding_data and isinstance(onboarding_data["systems"], list):
-            # Convert list to dict format expected by DocumentGenerator
-            systems_dict = {}
-            for i, system in enumerate(onboarding_data["systems"]):
-                systems_dict[f"system_{i}"] = system
-            onboarding_data["systems"] = systems_dict
-        
-        # Normalize risks data structure
-        if "risks" in onboarding_data and isinstance(onboarding_data["risks"], list):
-            # Convert list to dict format expected by DocumentGenerator
-            onboarding_data["risks"] = {
-                "topRisks": onboarding_data["risks"],
-                "mitigationStrategies": []
-            }
-        
         generator = DocumentGenerator()
-        generated_docs = generator.generate_all_documents(
+        # Rendering is CPU-bound; keep it off the event loop
+        generated_docs = await run_in_threadpool(
+            generator.generate_all_documents,
             system_id=system_id,
             org_id=org.id,
             onboarding_data=onboarding_data,
@@ -124,6 +94,8 @@ async def generate_system_documents(
         response = {
             "system_id": system_id,
             "generated_documents": len(generated_docs),
+            "documents_reused": sum(1 for doc in generated_docs.values() if doc.get("reused")),
+            "documents_rendered": sum(1 for doc in generated_docs.values() if not doc.get("reused")),
             "documents": generated_docs,
             "status": "success_with_warnings" if warnings else "success"
         }
@@ -154,7 +126,7 @@ async def list_system_documents(
     
     try:
         generator = DocumentGenerator()
-        documents = generator.get_document_list(system_id=system_id, org_id=org.id)
+        documents = generator.get_document_list(system_id=system_id, org_id=org.id, db=db)
         
         return {
             "system_id": system_id,
@@ -174,7 +146,7 @@ async def download_document(
     org: Organization = Depends(verify_api_key),
     db: Session = Depends(get_db),
 ):
-    """Download a specific document for a system."""
+    """Download a specific document for a system, rendering it now if missing or stale."""
     
     
     # Validate document type
@@ -195,11 +167,9 @@ async def download_document(
     
     try:
         generator = DocumentGenerator()
-        content, actual_format = generator.get_document_content(
-            system_id=system_id,
-            org_id=org.id,
-            doc_type=doc_type,
-            format=format
+        # Served from the render store, or rendered on demand (CPU-bound: off the event loop)
+        content, actual_format, rendered = await run_in_threadpool(
+            generator.fetch_document, system, org, doc_type, format, db
         )
         
         # Determine content type and file extension based on actual format returned
@@ -214,7 +184,10 @@ async def download_document(
         filename = f"{doc_type}_{system.name.replace(' ', '_')}.{file_extension}"
         
         # Prepare headers
-        headers = {"Content-Disposition": f"attachment; filename={filename}"}
+        headers = {
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Render": "rendered" if rendered else "stored"
+        }
         
         # Add fallback indicator if PDF was requested but markdown was returned
         if format == "pdf" and actual_format == "markdown":
@@ -228,19 +201,61 @@ async def download_document(
         
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"Document {doc_type} not found")
+    except PdfQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except PdfRenderTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
 
+@router.get("/systems/{system_id}/combined.pdf")
+async def download_combined_pdf(
+    system_id: int,
+    org: Organization = Depends(verify_api_key),
+    db: Session = Depends(get_db),
+):
+    """Download every generated document as one bookmarked PDF (generated with PDF_COMBINED)."""
+    system = db.query(AISystem).filter(
+        AISystem.id == system_id,
+        AISystem.org_id == org.id
+    ).first()
+    
+    if not system:
+        raise HTTPException(status_code=404, detail="System not found")
+    
+    try:
+        content = await run_in_threadpool(
+            DocumentGenerator().get_combined_pdf, system_id=system_id, org_id=org.id, db=db
+        )
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Combined PDF not generated")
+    except PdfQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except PdfRenderTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    
+    filename = f"documents_{system.name.replace(' ', '_')}.pdf"
+    return Response(
+        content=content,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 @router.get("/systems/{system_id}/preview/{doc_type}")
 async def preview_document(
     system_id: int,
     doc_type: str,
     org: Organization = Depends(verify_api_key),
     db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
 ):
-    """Preview a document as HTML."""
+    """
+    Preview a document as HTML, rendering it now if missing or stale.
     
+    Sends an ETag; a matching ``If-None-Match`` gets 304 without a body.
+    """
     
     # Validate document type
     if doc_type not in VALID_DOCUMENT_TYPES:
@@ -257,51 +272,21 @@ async def preview_document(
     
     try:
         generator = DocumentGenerator()
-        content, actual_format = generator.get_document_content(
-            system_id=system_id,
-            org_id=org.id,
-            doc_type=doc_type,
-            format="markdown"
+        content, actual_format, _ = await run_in_threadpool(
+            generator.fetch_document, system, org, doc_type, "markdown", db
         )
         
         # Validate format before processing
         if actual_format != "markdown":
             raise HTTPException(status_code=500, detail=f"Preview only supports markdown format, got: {actual_format}")
         
-        # Convert markdown to HTML
-        import bleach
-        import markdown
-        
-        html_content = markdown.markdown(
-            content.decode('utf-8'),
-            extensions=['tables', 'fenced_code', 'toc']
-        )
-        
-        # Sanitize HTML to prevent XSS attacks
-        allowed_tags = [
-            'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-            'p', 'br', 'strong', 'em', 'u', 'b', 'i',
-            'ul', 'ol', 'li', 'blockquote', 'pre', 'code',
-            'table', 'thead', 'tbody', 'tr', 'th', 'td',
-            'a', 'img', 'div', 'span'
-        ]
-        
-        allowed_attributes = {
-            'a': ['href', 'title'],
-            'img': ['src', 'alt', 'title', 'width', 'height'],
-            'table': ['class'],
-            'th': ['class'],
-            'td': ['class'],
-            'div': ['class'],
-            'span': ['class']
-        }
-        
-        html_content = bleach.clean(
-            html_content,
-            tags=allowed_tags,
-            attributes=allowed_attributes,
-            strip=True
-        )
+        # Sanitized HTML is cached by content hash, which also makes the ETag
+        html_content, content_hash = await run_in_threadpool(preview_cache.get, content)
+        title = f"{doc_type.replace('_', ' ').title()} - {system.name}"
+        etag = '"' + hashlib.sha256(f"{content_hash}:{title}".encode("utf-8")).hexdigest()[:32] + '"'
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag in [tag.strip() for tag in (if_none_match or "").split(",")]:
+            return Response(status_code=304, headers=cache_headers)
         
         # Wrap in HTML structure
         full_html = f"""
@@ -309,7 +294,7 @@ async def preview_document(
         <html>
         <head>
             <meta charset="utf-8">
-            <title>{doc_type.replace('_', ' ').title()} - {system.name}</title>
+            <title>{html.escape(title)}</title>
             <style>
                 body {{
                     font-family: 'Arial', sans-serif;
@@ -364,7 +349,7 @@ async def preview_document(
         </html>
         """
         
-        return Response(content=full_html, media_type="text/html")
+        return Response(content=full_html, media_type="text/html", headers=cache_headers)
         
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"Document {doc_type} not found")
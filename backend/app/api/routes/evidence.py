@@ -4,6 +4,7 @@ from pathlib import Path
 from fastapi import APIRouter, Depends, File, Form, Header, HTTPException, UploadFile
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
 from app.core.security import verify_api_key
 from app.database import get_db
 from app.models import AISystem, Evidence, Organization
@@ -140,7 +141,7 @@ async def upload_evidence(
             label = "Generated Evidence"
         
         # Create markdown file
-        evidence_dir = Path(f"evidence/{org.id}/{system_id}")
+        evidence_dir = Path(settings.EVIDENCE_LOCAL_DIR) / str(org.id) / str(system_id)
         evidence_dir.mkdir(parents=True, exist_ok=True)
         
         # Generate filename with timestamp
@@ -1,19 +1,45 @@
-import hashlib
-import json
 import logging
-import zipfile
+import uuid
 from datetime import datetime, timedelta, timezone
-from io import BytesIO
+from typing import Callable, Dict, Iterator, List, Optional
 
-from fastapi import APIRouter, Depends, Header, HTTPException
-from fastapi.responses import StreamingResponse
-from sqlalchemy import or_
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
 from app.core.security import verify_api_key
 from app.database import get_db
-from app.models import Action, AISystem, Control, Evidence, Incident, Organization, FRIA, DocumentApproval
+from app.models import AISystem, Control, ExportJob, Organization, FRIA
+from app.services.annex_iv_bundle import (
+    ANNEX_IV_VARIANTS,
+    ARCHIVE_FORMATS,
+    ORG_BUNDLE_FILENAME,
+    ORG_BUNDLE_GENERATOR_VERSION,
+    archive_filename,
+    bundle_fingerprint,
+    cache_while_streaming,
+    stream_annex_iv_bundle,
+    stream_org_annex_iv_bundle,
+    variant_settings,
+)
 from app.services.blocking_issues import BlockingIssuesService
+from app.services.bundle_builder import BundleBuilder, OrgBundleBuilder
+from app.services.bundle_cache import bundle_cache, etag_matches
+from app.services.export_jobs import (
+    COMPLIANCE_SUITE_FORMATS,
+    artifact_name,
+    enqueue_compliance_suite_job,
+    enqueue_export_job,
+    is_expired,
+    job_payload,
+    job_store,
+)
+from app.services import read_models
+from app.services.org_summary import summary_cache
+from app.services.read_models import ControlRow, EvidenceRow
+from app.services.row_cache import row_cache
+from app.services.zip_stream import ZSTD_AVAILABLE, export_integrity
 
 logger = logging.getLogger(__name__)
 
@@ -51,116 +77,14 @@ async def get_summary(
     org: Organization = Depends(verify_api_key),
     db: Session = Depends(get_db),
 ):
-    """Get summary report of AI systems."""
+    """
+    Get summary report of AI systems.
     
+    All counts come from one aggregate statement, cached per org until its
+    revision changes (see ``org_summary``).
+    """
     try:
-        # Get basic counts with proper error handling
-        total_systems = db.query(AISystem).filter(AISystem.org_id == org.id).count()
-        
-        # Calculate evidence coverage with structured logging
-        evidence_coverage_pct = 0.0
-        evidence_coverage_status = "unknown"
-        
-        try:
-            from app.models import Control, Evidence
-            
-            # Count controls using ORM with proper error handling
-            total_controls = db.query(Control).filter(Control.org_id == org.id).count()
-            
-            if total_controls > 0:
-                # Count evidence with control_id (preferred approach)
-                evidence_with_control_id = db.query(Evidence).filter(
-                    Evidence.org_id == org.id,
-                    Evidence.control_id.isnot(None)
-                ).count()
-                
-                # Count evidence with control_name (legacy approach)
-                evidence_with_control_name = db.query(Evidence).filter(
-                    Evidence.org_id == org.id,
-                    Evidence.control_name.isnot(None)
-                ).count()
-                
-                if evidence_with_control_id > 0:
-                    evidence_coverage_pct = (evidence_with_control_id / total_controls) * 100
-                    evidence_coverage_status = "calculated_with_id"
-                    logger.info(f"Evidence coverage calculated using control_id: {evidence_coverage_pct:.2f}%")
-                elif evidence_with_control_name > 0:
-                    evidence_coverage_pct = (evidence_with_control_name / total_controls) * 100
-                    evidence_coverage_status = "calculated_legacy"
-                    logger.info(f"Evidence coverage calculated using control_name (legacy): {evidence_coverage_pct:.2f}%")
-                else:
-                    evidence_coverage_pct = 0.0
-                    evidence_coverage_status = "no_evidence"
-                    logger.info("No evidence found for organization")
-            else:
-                evidence_coverage_status = "no_controls"
-                logger.info("No controls found for organization - evidence coverage set to 0%")
-        except Exception as e:
-            evidence_coverage_status = "error"
-            logger.error(f"Could not calculate evidence coverage: {e}", exc_info=True)
-            evidence_coverage_pct = 0.0
-        
-        # Calculate real metrics with proper field normalization
-        high_risk_systems = 0
-        try:
-            # Normalize ai_act_class values before querying
-            high_risk_systems = db.query(AISystem).filter(
-                AISystem.org_id == org.id,
-                or_(
-                    AISystem.criticality == 'high',
-                    AISystem.ai_act_class.in_(['high', 'high-risk', 'high_risk'])
-                )
-            ).count()
-            logger.info(f"High risk systems count: {high_risk_systems}")
-        except Exception as e:
-            logger.error(f"Error calculating high risk systems: {e}", exc_info=True)
-        
-        # Count incidents in last 30 days with error handling
-        last_30d_incidents = 0
-        try:
-            thirty_days_ago = datetime.now(timezone.utc) - timedelta(days=30)
-            last_30d_incidents = db.query(Incident).filter(
-                Incident.org_id == org.id,
-                Incident.detected_at >= thirty_days_ago
-            ).count()
-            logger.info(f"Last 30 days incidents: {last_30d_incidents}")
-        except Exception as e:
-            logger.error(f"Error calculating incidents: {e}", exc_info=True)
-        
-        # Count GPAI systems with error handling
-        gpai_count = 0
-        try:
-            gpai_count = db.query(AISystem).filter(
-                AISystem.org_id == org.id,
-                AISystem.is_general_purpose_ai == True
-            ).count()
-            logger.info(f"GPAI systems count: {gpai_count}")
-        except Exception as e:
-            logger.error(f"Error calculating GPAI count: {e}", exc_info=True)
-        
-        # Count open actions in last 7 days with error handling
-        open_actions_7d = 0
-        try:
-            seven_days_ago = datetime.now(timezone.utc) - timedelta(days=7)
-            open_actions_7d = db.query(Action).filter(
-                Action.org_id == org.id,
-                Action.status.in_(['open', 'in_progress']),
-                Action.created_at >= seven_days_ago
-            ).count()
-            logger.info(f"Open actions last 7 days: {open_actions_7d}")
-        except Exception as e:
-            logger.error(f"Error calculating open actions: {e}", exc_info=True)
-        
-        return {
-            "systems": total_systems,
-            "high_risk": high_risk_systems,
-            "last_30d_incidents": last_30d_incidents,
-            "overrides_pct": None,
-            "gpai_count": gpai_count,
-            "evidence_coverage_pct": round(evidence_coverage_pct, 2),
-            "evidence_coverage_status": evidence_coverage_status,
-            "open_actions_7d": open_actions_7d,
-        }
+        return summary_cache.get(db, org.id, org.revision)
     except Exception as e:
         logger.error(f"ERROR in get_summary: {e}", exc_info=True)
         # Return safe defaults
@@ -184,13 +108,12 @@ async def get_score(
         # Simple score calculation
         org_id = org.id
         
-        # Get basic counts
-        total_systems = db.query(AISystem).filter(AISystem.org_id == org_id).count()
-        total_controls = db.query(Control).filter(Control.org_id == org_id).count()
-        implemented_controls = db.query(Control).filter(
-            Control.org_id == org_id, 
-            Control.status == "implemented"
-        ).count()
+        # Systems and controls are read models from the request's row cache,
+        # shared with the other services that read them
+        rows = row_cache(db)
+        controls = rows.rows(ControlRow, org_id)
+        total_controls = len(controls)
+        implemented_controls = sum(1 for control in controls if control.status == "implemented")
         
         # Calculate basic score
         if total_controls > 0:
@@ -199,18 +122,14 @@ async def get_score(
             org_score = 0.0
         
         # Get system scores
-        systems = db.query(AISystem).filter(AISystem.org_id == org_id).all()
         system_scores = []
         
-        for system in systems:
-            system_controls = db.query(Control).filter(Control.system_id == system.id).count()
-            system_implemented = db.query(Control).filter(
-                Control.system_id == system.id,
-                Control.status == "implemented"
-            ).count()
+        for system in rows.systems(org_id):
+            system_controls = rows.rows(ControlRow, org_id, system.id)
+            system_implemented = sum(1 for control in system_controls if control.status == "implemented")
             
-            if system_controls > 0:
-                system_score = system_implemented / system_controls
+            if system_controls:
+                system_score = system_implemented / len(system_controls)
             else:
                 system_score = 0.0
                 
@@ -244,11 +163,13 @@ async def get_org_blocking_issues(
         org_id = org.id
         blocking_issues = []
         
+        # Systems and their evidence as read models (one query each for all systems)
+        rows = row_cache(db)
+        systems = rows.systems(org_id)
+        rows.rows(EvidenceRow, org_id)
+        
         # Check for high-risk systems
-        high_risk_count = db.query(AISystem).filter(
-            AISystem.org_id == org_id,
-            AISystem.ai_act_class == "high-risk"
-        ).count()
+        high_risk_count = sum(1 for system in systems if system.ai_act_class == "high-risk")
         
         if high_risk_count > 0:
             blocking_issues.append({
@@ -262,14 +183,8 @@ async def get_org_blocking_issues(
             })
         
         # Check for systems without evidence
-        systems_without_evidence = db.query(AISystem).filter(
-            AISystem.org_id == org_id
-        ).all()
-        
-        for system in systems_without_evidence:
-            evidence_count = db.query(Evidence).filter(
-                Evidence.system_id == system.id
-            ).count()
+        for system in systems:
+            evidence_count = len(rows.rows(EvidenceRow, org_id, system.id))
             
             if evidence_count == 0:
                 blocking_issues.append({
@@ -304,18 +219,15 @@ async def get_upcoming_deadlines(
         # Get controls due in the next 30 days
         thirty_days_from_now = datetime.now(timezone.utc).date() + timedelta(days=30)
         
-        controls_due = db.query(Control).filter(
-            Control.org_id == org_id,
+        controls_due = read_models.load(db, ControlRow, read_models.select_rows(ControlRow, org_id).where(
             Control.due_date.isnot(None),
             Control.due_date <= thirty_days_from_now,
             Control.status != "implemented"
-        ).all()
+        ))
+        systems = {system.id: system for system in row_cache(db).systems(org_id)}
         
         for control in controls_due:
-            system = db.query(AISystem).filter(
-                AISystem.id == control.system_id,
-                AISystem.org_id == org_id
-            ).first()
+            system = systems.get(control.system_id)
             if system:
                 days_until_due = (control.due_date - datetime.now(timezone.utc).date()).days
                 upcoming_deadlines.append({
@@ -349,43 +261,207 @@ async def get_system_blocking_issues(
     return service.get_issue_summary(system_id, org.id)
 
 
+ARCHIVE_FORMAT_QUERY = Query(default="zip", description="Archive format: zip, or tar.zst for machine consumers")
+
+
 @router.get("/annex-iv/{system_id}")
 async def get_annex_iv_zip(
     system_id: int,
+    format: str = ARCHIVE_FORMAT_QUERY,
+    if_none_match: Optional[str] = Header(default=None),
     org: Organization = Depends(verify_api_key),
     db: Session = Depends(get_db),
 ):
     """Generate Annex IV zip file for a system."""
-    return await _generate_annex_iv_zip_v2(system_id, org, db)
+    return await _generate_annex_iv_zip_v2(system_id, org, db, if_none_match=if_none_match, archive_format=format)
 
 @router.get("/annex-iv-v2/{system_id}")
 async def get_annex_iv_zip_v2(
     system_id: int,
+    format: str = ARCHIVE_FORMAT_QUERY,
+    if_none_match: Optional[str] = Header(default=None),
     org: Organization = Depends(verify_api_key),
     db: Session = Depends(get_db),
 ):
     """Generate Annex IV zip file for a system - V2 with all documents."""
-    return await _generate_annex_iv_zip_v2(system_id, org, db)
+    return await _generate_annex_iv_zip_v2(system_id, org, db, if_none_match=if_none_match, archive_format=format)
 
 @router.get("/annex-iv-complete/{system_id}")
 async def get_annex_iv_complete(
     system_id: int,
+    format: str = ARCHIVE_FORMAT_QUERY,
+    if_none_match: Optional[str] = Header(default=None),
     org: Organization = Depends(verify_api_key),
     db: Session = Depends(get_db),
 ):
     """Generate COMPLETE Annex IV zip file with ALL documents - guaranteed to work."""
-    return await _generate_complete_annex_iv(system_id, org, db)
+    return await _generate_complete_annex_iv(system_id, org, db, if_none_match=if_none_match, archive_format=format)
 
 
 # Removed duplicate /export/annex-iv.zip route - use /annex-iv/{system_id} instead
 
 
-async def _generate_annex_iv_zip(
+@router.get("/annex-iv-org")
+async def get_org_annex_iv(
+    system_ids: Optional[List[int]] = Query(default=None, description="Systems to include (default: all)"),
+    ai_act_class: Optional[str] = Query(default=None, description="Only include systems of this AI Act class"),
+    format: str = ARCHIVE_FORMAT_QUERY,
+    if_none_match: Optional[str] = Header(default=None),
+    org: Organization = Depends(verify_api_key),
+    db: Session = Depends(get_db),
+):
+    """
+    Generate one Annex IV zip covering several systems, with a folder per system.
+
+    Data for all systems is loaded with a fixed number of queries and their
+    documents are rendered in one batch. Cached and served with an ``ETag``
+    like the single-system export.
+    """
+    _check_archive_format(format)
+    systems = _get_exportable_systems(org, db, system_ids=system_ids, ai_act_class=ai_act_class)
+    filename = archive_filename(ORG_BUNDLE_FILENAME.format(org_id=org.id), format)
+    builder = OrgBundleBuilder(db, org, systems)
+    # Loads and hashes every system's snapshot: keep it off the event loop
+    fingerprint = await run_in_threadpool(bundle_fingerprint, builder, filename, ORG_BUNDLE_GENERATOR_VERSION, False)
+    
+    def build(export_id: str) -> Iterator[bytes]:
+        return stream_org_annex_iv_bundle(
+            builder, export_id, filename, generator_version=ORG_BUNDLE_GENERATOR_VERSION,
+            archive_format=format
+        )
+    
+    return await run_in_threadpool(
+        _serve_bundle, builder, fingerprint, filename, build, if_none_match, scope=f"org{org.id}-{filename}"
+    )
+
+
+@router.get("/exports/{export_id}/integrity")
+async def get_export_integrity(
+    export_id: str,
+    org: Organization = Depends(verify_api_key),
+):
+    """
+    Signed integrity sidecar for a streamed export.
+
+    Streamed bundles are hashed while they are sent, so the archive SHA-256
+    is only available here once the download has completed.
+    """
+    # Read from the integrity store when not in this worker's memory
+    record = await run_in_threadpool(export_integrity.get, export_id, org.id)
+    if not record:
+        raise HTTPException(
+            status_code=404,
+            detail="Integrity record not found. The export may still be in progress."
+        )
+    return record
+
+
+@router.post("/annex-iv/{system_id}/jobs", status_code=202)
+async def create_annex_iv_job(
     system_id: int,
-    org: Organization,
-    db: Session,
+    variant: str = Query(default="v2", description="Bundle variant: v1, v2 or complete"),
+    org: Organization = Depends(verify_api_key),
+    db: Session = Depends(get_db),
 ):
-    """Internal function to generate Annex IV zip file."""
+    """
+    Queue an Annex IV export and return its job id immediately.
+
+    The bundle is built by the export worker; poll the status URL and fetch
+    the archive from the download URL once the job is done.
+    """
+    if variant not in ANNEX_IV_VARIANTS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown variant '{variant}'. Use one of: {', '.join(ANNEX_IV_VARIANTS)}"
+        )
+    system = _get_exportable_system(system_id, org, db)
+    job = enqueue_export_job(db, org, system, variant)
+    return job_payload(job)
+
+
+@router.post("/compliance-suite/{system_id}/jobs", status_code=202)
+async def create_compliance_suite_job(
+    system_id: int,
+    format: str = Query(default="md", description="Document format: md, docx or pdf"),
+    org: Organization = Depends(verify_api_key),
+    db: Session = Depends(get_db),
+):
+    """
+    Queue an export of every compliance suite document (Annex IV, FRIA, PMM,
+    SoA, risk register) as one ZIP and return its job id immediately.
+
+    Poll and download it like an Annex IV job.
+    """
+    if format not in COMPLIANCE_SUITE_FORMATS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown format '{format}'. Use one of: {', '.join(COMPLIANCE_SUITE_FORMATS)}"
+        )
+    system = db.query(AISystem).filter(AISystem.id == system_id, AISystem.org_id == org.id).first()
+    if not system:
+        raise HTTPException(status_code=404, detail="System not found")
+    job = enqueue_compliance_suite_job(db, org, system, format)
+    return job_payload(job)
+
+
+@router.get("/jobs/{job_id}")
+async def get_export_job(
+    job_id: str,
+    org: Organization = Depends(verify_api_key),
+    db: Session = Depends(get_db),
+):
+    """Status of an export job (queued, running, done, failed) with per-document progress."""
+    return job_payload(_get_export_job(job_id, org, db))
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export_job(
+    job_id: str,
+    if_none_match: Optional[str] = Header(default=None),
+    org: Organization = Depends(verify_api_key),
+    db: Session = Depends(get_db),
+):
+    """
+    Download the archive produced by a finished export job.
+
+    Supports byte ranges (``Range``/``If-Range`` against the SHA-256
+    ``ETag``), so interrupted downloads resume where they stopped.
+    """
+    job = _get_export_job(job_id, org, db)
+    if job.status != "done":
+        raise HTTPException(
+            status_code=409,
+            detail=f"Export job is {job.status}; the archive is only available once it is done."
+        )
+    if is_expired(job):
+        raise HTTPException(status_code=410, detail="Export job has expired; queue a new export")
+    store = job_store()
+    if not store.exists(artifact_name(job)):
+        raise HTTPException(status_code=410, detail="Export artifact is no longer available")
+    
+    await run_in_threadpool(
+        export_integrity.record,
+        export_id=job.id,
+        org_id=org.id,
+        system_id=job.system_id,
+        filename=job.filename,
+        sha256=job.sha256,
+        size=job.size_bytes,
+    )
+    return _persisted_bundle_response(
+        store, artifact_name(job), job.filename, job.sha256, job.size_bytes, job.id, if_none_match
+    )
+
+
+def _get_export_job(job_id: str, org: Organization, db: Session) -> ExportJob:
+    job = db.query(ExportJob).filter(ExportJob.id == job_id, ExportJob.org_id == org.id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+def _get_exportable_system(system_id: int, org: Organization, db: Session) -> AISystem:
+    """Load the system for export, enforcing org scoping and the FRIA gate."""
     system = (
         db.query(AISystem)
         .filter(AISystem.id == system_id, AISystem.org_id == org.id)
@@ -407,633 +483,262 @@ async def _generate_annex_iv_zip(
                 status_code=409, 
                 detail="FRIA assessment required but not completed. Please complete the FRIA assessment before exporting documents."
             )
-
-    # Create zip file in memory
-    zip_buffer = BytesIO()
-    artifacts = []
     
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        # Generate all compliance documents using DocumentGenerator
-        # Force reload to avoid cache issues
-        import importlib
-        from app.services import document_generator
-        importlib.reload(document_generator)
-        from app.services.document_generator import DocumentGenerator
-        generator = DocumentGenerator()
-        
-        # Document types to generate with their template mappings
-        document_templates = {
-            "annex_iv": "12_ANNEX_IV.md",
-            "fria": "15_FRIA.md", 
-            "soa": "09_SOA_TEMPLATE.md",
-            "monitoring_report": "06_PM_MONITORING_REPORT.md",
-            "risk_assessment": "01_RISK_ASSESSMENT.md",
-            "model_card": "03_MODEL_CARD.md",
-            "data_sheet": "04_DATA_SHEET.md",
-            "logging_plan": "05_LOGGING_PLAN.md",
-            "human_oversight": "07_HUMAN_OVERSIGHT_SOP.md",
-            "appeals_flow": "08_APPEALS_FLOW.md",
-            "policy_register": "10_POLICY_REGISTER.md",
-            "audit_log": "11_AUDIT_LOG.md",
-            "instructions_for_use": "13_INSTRUCTIONS_FOR_USE.md"
-        }
-        
-        # Generate each document individually
-        logger.info(f"Starting document generation for {len(document_templates)} documents at {datetime.now()}")
-        for doc_type, template_file in document_templates.items():
-            try:
-                logger.info(f"Generating {doc_type} using template {template_file}")
-                # Generate markdown content
-                md_content = generator._generate_document(
-                    template_file=template_file,
-                    system=system,
-                    org=org,
-                    onboarding_data={},
-                    db=db,
-                    doc_type=doc_type
-                )
-                
-                logger.info(f"Document generation result for {doc_type}: {type(md_content)}, length: {len(md_content) if md_content else 0}")
-                
-                if md_content:
-                    logger.info(f"Generated {doc_type}: {len(md_content)} characters")
-                    # Add markdown version
-                    zip_file.writestr(f"{doc_type}.md", md_content)
-                    artifacts.append({
-                        "name": f"{doc_type}.md",
-                        "sha256": hashlib.sha256(md_content.encode()).hexdigest(),
-                        "bytes": len(md_content.encode())
-                    })
-                    logger.info(f"Added {doc_type}.md to ZIP with {len(md_content)} characters")
-                    
-                    # Skip PDF generation for now to focus on the main issue
-                    logger.info(f"Skipping PDF generation for {doc_type}")
-                else:
-                    logger.warning(f"No content generated for {doc_type}")
-                        
-            except Exception as e:
-                logger.error(f"Error generating {doc_type}: {e}")
-                import traceback
-                logger.error(traceback.format_exc())
-                continue
-        
-        logger.info(f"Document generation completed. Total artifacts: {len(artifacts)}")
-        
-        # Add system information
-        system_info = f"""System ID: {system.id}
-Name: {system.name}
-Purpose: {system.purpose}
-Domain: {system.domain}
-Owner: {system.owner_email}
-Deployment Context: {system.deployment_context}
-Personal Data Processed: {system.personal_data_processed}
-Impacts Fundamental Rights: {system.impacts_fundamental_rights}
-AI Act Class: {system.ai_act_class}
-Created: {system.id}
-"""
-        zip_file.writestr("system_info.txt", system_info)
-        artifacts.append({
-            "name": "system_info.txt",
-            "sha256": hashlib.sha256(system_info.encode()).hexdigest(),
-            "bytes": len(system_info.encode())
-        })
-
-        # Add controls as CSV
-        controls = db.query(Control).filter(Control.system_id == system_id).all()
-        if controls:
-            # Create controls CSV
-            import csv
-            controls_csv = "Control ID,Name,Status,Due Date,ISO Clause,Priority,Owner Email,Implementation Status,Evidence Links\n"
-            for control in controls:
-                # Get evidence linked to this control
-                evidence = db.query(Evidence).filter(Evidence.control_id == control.id).all()
-                evidence_links = ", ".join([f"EV-{ev.id}" for ev in evidence])
-                controls_csv += f"{control.id},{control.name},{control.status},{control.due_date},{control.iso_clause},{control.priority},{control.owner_email or 'N/A'},Not set,{evidence_links}\n"
-            
-            zip_file.writestr("controls.csv", controls_csv)
-            artifacts.append({
-                "name": "controls.csv",
-                "sha256": hashlib.sha256(controls_csv.encode()).hexdigest(),
-                "bytes": len(controls_csv.encode())
-            })
-            
-            # Also add individual control files for detailed view
-            for control in controls:
-                control_info = f"""Control ID: {control.id}
-Name: {control.name}
-Status: {control.status}
-Due Date: {control.due_date}
-ISO Clause: {control.iso_clause}
-Priority: {control.priority}
-Owner Email: {control.owner_email or 'N/A'}
-Implementation Status: Not set
-    Evidence Links: {', '.join([f'EV-{ev.id}' for ev in db.query(Evidence).filter(Evidence.control_id == control.id).all()])}
-"""
-                zip_file.writestr(f"controls/{control.id}.txt", control_info)
-                artifacts.append({
-                    "name": f"controls/{control.id}.txt",
-                    "sha256": hashlib.sha256(control_info.encode()).hexdigest(),
-                    "bytes": len(control_info.encode())
-                })
+    return system
 
-        # Add evidence (only if any exists)
-        evidence = []  # Initialize to avoid undefined variable
-        try:
-            evidence = db.query(Evidence).filter(Evidence.system_id == system_id).all()
-            if evidence:
-                # Create evidence CSV
-                evidence_csv = "Evidence ID,Label,Control Name,ISO Clause,Uploaded,Status,File Path,Version,Checksum,Uploaded By,Reviewer,Link/Location\n"
-                for ev in evidence:
-                    evidence_csv += f"{ev.id},{ev.label},{ev.control_name},{ev.iso42001_clause},{ev.upload_date},{ev.status},{ev.file_path},{ev.version},{ev.checksum},{ev.uploaded_by},{ev.reviewer_email},{ev.link_or_location}\n"
-                
-                zip_file.writestr("evidence_manifest.csv", evidence_csv)
-                artifacts.append({
-                    "name": "evidence_manifest.csv",
-                    "sha256": hashlib.sha256(evidence_csv.encode()).hexdigest(),
-                    "bytes": len(evidence_csv.encode())
-                })
-                
-                # Also add individual evidence files for detailed view
-                for ev in evidence:
-                    evidence_info = f"""Evidence ID: {ev.id}
-Label: {ev.label}
-Control Name: {ev.control_name}
-ISO Clause: {ev.iso42001_clause}
-Uploaded: {ev.upload_date}
-Status: {ev.status}
-File Path: {ev.file_path}
-Version: {ev.version}
-Checksum: {ev.checksum}
-Uploaded By: {ev.uploaded_by}
-Reviewer: {ev.reviewer_email}
-Link/Location: {ev.link_or_location}
-"""
-                    zip_file.writestr(f"evidence/{ev.id}.txt", evidence_info)
-                    artifacts.append({
-                        "name": f"evidence/{ev.id}.txt",
-                        "sha256": hashlib.sha256(evidence_info.encode()).hexdigest(),
-                        "bytes": len(evidence_info.encode())
-                    })
-        except Exception as e:
-            logger.warning(f"Could not fetch evidence for system {system_id}: {e}")
-            evidence = []  # Ensure evidence is empty list on error
-        
-        # Get all document approvals for this system
-        approvals = (
-            db.query(DocumentApproval)
-            .filter(DocumentApproval.system_id == system_id, DocumentApproval.org_id == org.id)
-            .all()
+
+def _get_exportable_systems(
+    org: Organization,
+    db: Session,
+    system_ids: Optional[List[int]] = None,
+    ai_act_class: Optional[str] = None,
+) -> List[AISystem]:
+    """Load the systems for an org-wide export, applying the FRIA gate to all of them in one query."""
+    query = db.query(AISystem).filter(AISystem.org_id == org.id)
+    if system_ids:
+        query = query.filter(AISystem.id.in_(system_ids))
+    if ai_act_class:
+        query = query.filter(AISystem.ai_act_class == ai_act_class)
+    systems = query.order_by(AISystem.id).all()
+    if not systems:
+        raise HTTPException(status_code=404, detail="No systems found")
+    if system_ids and len(systems) != len(set(system_ids)):
+        missing = sorted(set(system_ids) - {system.id for system in systems})
+        raise HTTPException(status_code=404, detail=f"Systems not found: {missing}")
+    
+    # FRIA Gate Enforcement (latest FRIA per system)
+    gated = [system.id for system in systems if system.requires_fria_computed]
+    latest_fria: Dict[int, FRIA] = {}
+    if gated:
+        for fria in (
+            db.query(FRIA)
+            .filter(FRIA.system_id.in_(gated), FRIA.org_id == org.id)
+            .order_by(FRIA.created_at.desc())
+        ):
+            latest_fria.setdefault(fria.system_id, fria)
+    blocked = [
+        system_id for system_id in gated
+        if system_id not in latest_fria
+        or (latest_fria[system_id].applicable and latest_fria[system_id].status != 'submitted')
+    ]
+    if blocked:
+        raise HTTPException(
+            status_code=409,
+            detail=f"FRIA assessment required but not completed for systems {blocked}. Please complete the FRIA assessments before exporting documents."
         )
-        
-        # Generate manifest.json
-        manifest = {
-            "system_id": system_id,
-            "generated_at": datetime.now(timezone.utc).isoformat(),
-            "generator_version": "1.0.0",
-            "artifacts": artifacts,
-            "approvals": [
-                {
-                    "doc": approval.doc_type,
-                    "status": approval.status,
-                    "email": approval.approver_email or approval.submitted_by,
-                    "timestamp": (approval.approved_at or approval.submitted_at).isoformat() if (approval.approved_at or approval.submitted_at) else None
-                }
-                for approval in approvals if approval.status in ['submitted', 'approved']
-            ],
-            "sources": [
-                {
-                    "doc": "annex_iv",
-                    "evidence": [
-                        {
-                            "id": ev.id,
-                            "sha256": ev.checksum or "N/A"
-                        }
-                        for ev in evidence if ev.checksum
-                    ]
-                }
-            ]
-        }
-        
-        manifest_json = json.dumps(manifest, indent=2)
-        zip_file.writestr("manifest.json", manifest_json)
-        artifacts.append({
-            "name": "manifest.json",
-            "sha256": hashlib.sha256(manifest_json.encode()).hexdigest(),
-            "bytes": len(manifest_json.encode())
-        })
-
-    zip_buffer.seek(0)
-    zip_content = zip_buffer.getvalue()
     
-    # Calculate hash for integrity
-    file_hash = hashlib.sha256(zip_content).hexdigest()
+    return systems
+
+
+def _check_archive_format(archive_format: str) -> None:
+    if archive_format not in ARCHIVE_FORMATS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Unknown format '{archive_format}'. Use one of: {', '.join(ARCHIVE_FORMATS)}"
+        )
+    if archive_format == "tar.zst" and not ZSTD_AVAILABLE:
+        raise HTTPException(
+            status_code=501,
+            detail="tar.zst export needs the zstandard package on the server. Use format=zip instead."
+        )
+
+
+def _persisted_bundle_response(
+    store,
+    name: str,
+    filename: str,
+    sha256: str,
+    size: int,
+    export_id: str,
+    if_none_match: Optional[str],
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> Response:
+    """
+    Serve a stored archive as a resumable download.
+
+    Local blobs are sent with ``FileResponse`` (byte ranges, ``If-Range`` and
+    zero-copy ``pathsend`` where the server supports it); S3 blobs redirect
+    to a presigned URL, which handles ranges itself. The archive SHA-256 is
+    the strong ``ETag`` either way, and is sent with the whole archive's size
+    as ``X-File-Hash``/``X-File-Size``.
+    """
+    etag = f'"{sha256}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", **(extra_headers or {})}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
     
+    headers.update({
+        "X-Export-Id": export_id,
+        "X-Integrity-Manifest": f"/reports/exports/{export_id}/integrity",
+        "X-File-Hash": f"sha256:{sha256}",
+        "X-File-Size": str(size),
+    })
+    url = store.presigned_url(name, filename)
+    if url:
+        return RedirectResponse(url, status_code=307, headers=headers)
+    return FileResponse(
+        store.local_path(name),
+        media_type="application/zstd" if filename.endswith(".tar.zst") else "application/zip",
+        filename=filename,
+        headers={**headers, "Accept-Ranges": "bytes"},
+    )
+
+
+def _streaming_zip_response(
+    stream: Iterator[bytes],
+    filename: str,
+    export_id: str,
+    extra_headers: Optional[Dict[str, str]] = None,
+) -> StreamingResponse:
     return StreamingResponse(
-        BytesIO(zip_content),
-        media_type="application/zip",
+        stream,
+        media_type="application/zstd" if filename.endswith(".tar.zst") else "application/zip",
         headers={
-            "Content-Disposition": f"attachment; filename=annex-iv-system-{system_id}.zip",
-            "X-File-Hash": f"sha256:{file_hash}",
-            "X-File-Size": str(len(zip_content))
+            "Content-Disposition": f"attachment; filename={filename}",
+            "X-Export-Id": export_id,
+            "X-Integrity-Manifest": f"/reports/exports/{export_id}/integrity",
+            **(extra_headers or {})
         }
     )
 
 
-async def _generate_annex_iv_zip_v2(
+async def _export_annex_iv(
     system_id: int,
     org: Organization,
     db: Session,
-):
-    """V2: Generate Annex IV zip file with ALL documents - clean implementation."""
-    system = (
-        db.query(AISystem)
-        .filter(AISystem.id == system_id, AISystem.org_id == org.id)
-        .first()
-    )
-    if not system:
-        raise HTTPException(status_code=404, detail="System not found")
+    filename: str,
+    generator_version: str,
+    include_detail_files: bool = False,
+    if_none_match: Optional[str] = None,
+    archive_format: str = "zip",
+) -> Response:
+    """
+    Serve an Annex IV bundle from the cache, or build and cache it while streaming.
+
+    The cache key fingerprints every row and template the bundle is built
+    from, so any change to the system's data produces a fresh bundle. Cached
+    bundles carry their archive SHA-256 as a strong ``ETag``; a matching
+    ``If-None-Match`` gets a 304 without touching the blob.
+    """
+    _check_archive_format(archive_format)
+    system = _get_exportable_system(system_id, org, db)
+    filename = archive_filename(filename, archive_format)
+    builder = BundleBuilder(db, system, org)
+    # Loads and hashes the whole snapshot: keep it off the event loop
+    fingerprint = await run_in_threadpool(bundle_fingerprint, builder, filename, generator_version, include_detail_files)
     
-    # FRIA Gate Enforcement
-    if system.requires_fria_computed:
-        fria = (
-            db.query(FRIA)
-            .filter(FRIA.system_id == system_id, FRIA.org_id == org.id)
-            .order_by(FRIA.created_at.desc())
-            .first()
+    def build(export_id: str) -> Iterator[bytes]:
+        return stream_annex_iv_bundle(
+            builder, export_id, filename,
+            generator_version=generator_version,
+            include_detail_files=include_detail_files,
+            archive_format=archive_format
         )
-        if not fria or (fria.applicable and fria.status != 'submitted'):
-            raise HTTPException(
-                status_code=409, 
-                detail="FRIA assessment required but not completed. Please complete the FRIA assessment before exporting documents."
-            )
-    
-    # Create zip file in memory
-    zip_buffer = BytesIO()
-    artifacts = []
     
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        # Generate all compliance documents using DocumentGenerator
-        from app.services.document_generator import DocumentGenerator
-        generator = DocumentGenerator()
-        
-        # Document types to generate with their template mappings
-        document_templates = {
-            "annex_iv": "12_ANNEX_IV.md",
-            "fria": "15_FRIA.md", 
-            "soa": "09_SOA_TEMPLATE.md",
-            "monitoring_report": "06_PM_MONITORING_REPORT.md",
-            "risk_assessment": "01_RISK_ASSESSMENT.md",
-            "model_card": "03_MODEL_CARD.md",
-            "data_sheet": "04_DATA_SHEET.md",
-            "logging_plan": "05_LOGGING_PLAN.md",
-            "human_oversight": "07_HUMAN_OVERSIGHT_SOP.md",
-            "appeals_flow": "08_APPEALS_FLOW.md",
-            "policy_register": "10_POLICY_REGISTER.md",
-            "audit_log": "11_AUDIT_LOG.md",
-            "instructions_for_use": "13_INSTRUCTIONS_FOR_USE.md"
-        }
-        
-        # Generate each document individually
-        for doc_type, template_file in document_templates.items():
-            try:
-                # Generate markdown content
-                md_content = generator._generate_document(
-                    template_file=template_file,
-                    system=system,
-                    org=org,
-                    onboarding_data={},
-                    db=db,
-                    doc_type=doc_type
-                )
-                
-                if md_content:
-                    # Add markdown version
-                    zip_file.writestr(f"{doc_type}.md", md_content)
-                    artifacts.append({
-                        "name": f"{doc_type}.md",
-                        "sha256": hashlib.sha256(md_content.encode()).hexdigest(),
-                        "bytes": len(md_content.encode())
-                    })
-                        
-            except Exception as e:
-                logger.error(f"Error generating {doc_type}: {e}")
-                continue
-        
-        # Add system information
-        system_info = f"""System ID: {system.id}
-Name: {system.name}
-Purpose: {system.purpose}
-Domain: {system.domain}
-Owner: {system.owner_email}
-Deployment Context: {system.deployment_context}
-Personal Data Processed: {system.personal_data_processed}
-Impacts Fundamental Rights: {system.impacts_fundamental_rights}
-AI Act Class: {system.ai_act_class}
-Created: {system.id}
-"""
-        zip_file.writestr("system_info.txt", system_info)
-        artifacts.append({
-            "name": "system_info.txt",
-            "sha256": hashlib.sha256(system_info.encode()).hexdigest(),
-            "bytes": len(system_info.encode())
-        })
-
-        # Add controls as CSV
-        controls = db.query(Control).filter(Control.system_id == system_id).all()
-        if controls:
-            # Create controls CSV
-            controls_csv = "Control ID,Name,Status,Due Date,ISO Clause,Priority,Owner Email,Implementation Status,Evidence Links\n"
-            for control in controls:
-                # Get evidence linked to this control
-                evidence = db.query(Evidence).filter(Evidence.control_id == control.id).all()
-                evidence_links = ", ".join([f"EV-{ev.id}" for ev in evidence])
-                controls_csv += f"{control.id},{control.name},{control.status},{control.due_date},{control.iso_clause},{control.priority},{control.owner_email or 'N/A'},Not set,{evidence_links}\n"
-            
-            zip_file.writestr("controls.csv", controls_csv)
-            artifacts.append({
-                "name": "controls.csv",
-                "sha256": hashlib.sha256(controls_csv.encode()).hexdigest(),
-                "bytes": len(controls_csv.encode())
-            })
+    return await run_in_threadpool(
+        _serve_bundle, builder, fingerprint, filename, build, if_none_match,
+        scope=f"org{org.id}-{filename}", system_id=system.id
+    )
 
-        # Add evidence (only if any exists)
-        evidence = []
-        try:
-            evidence = db.query(Evidence).filter(Evidence.system_id == system_id).all()
-            if evidence:
-                # Create evidence CSV
-                evidence_csv = "Evidence ID,Label,Control Name,ISO Clause,Uploaded,Status,File Path,Version,Checksum,Uploaded By,Reviewer,Link/Location\n"
-                for ev in evidence:
-                    evidence_csv += f"{ev.id},{ev.label},{ev.control_name},{ev.iso42001_clause},{ev.upload_date},{ev.status},{ev.file_path},{ev.version},{ev.checksum},{ev.uploaded_by},{ev.reviewer_email},{ev.link_or_location}\n"
-                
-                zip_file.writestr("evidence_manifest.csv", evidence_csv)
-                artifacts.append({
-                    "name": "evidence_manifest.csv",
-                    "sha256": hashlib.sha256(evidence_csv.encode()).hexdigest(),
-                    "bytes": len(evidence_csv.encode())
-                })
-        except Exception as e:
-            logger.warning(f"Could not fetch evidence for system {system_id}: {e}")
-            evidence = []
-        
-        # Get all document approvals for this system
-        approvals = (
-            db.query(DocumentApproval)
-            .filter(DocumentApproval.system_id == system_id, DocumentApproval.org_id == org.id)
-            .all()
+
+def _serve_bundle(
+    builder,
+    fingerprint: str,
+    filename: str,
+    build: Callable[[str], Iterator[bytes]],
+    if_none_match: Optional[str],
+    scope: str,
+    system_id: Optional[int] = None,
+) -> Response:
+    """
+    Stream a cached bundle (or 304), or ``build`` it and cache it while streaming.
+
+    Reads cache metadata from the bundle store; run it in the threadpool.
+    """
+    org = builder.org
+    cached = bundle_cache.get(fingerprint)
+    if cached:
+        etag = f'"{cached["sha256"]}"'
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Bundle-Fingerprint": fingerprint}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=cache_headers)
+        
+        export_id = uuid.uuid4().hex
+        export_integrity.record(
+            export_id=export_id,
+            org_id=org.id,
+            system_id=system_id,
+            filename=filename,
+            sha256=cached["sha256"],
+            size=cached["bytes"],
+        )
+        logger.info(f"Serving cached {filename} ({fingerprint[:12]}), sha256:{cached['sha256']}")
+        return _persisted_bundle_response(
+            bundle_cache.store, bundle_cache.blob_name(fingerprint), filename,
+            cached["sha256"], cached["bytes"], export_id,
+            if_none_match, {"X-Bundle-Fingerprint": fingerprint, "X-Cache": "HIT"}
         )
-        
-        # Generate manifest.json
-        manifest = {
-            "system_id": system_id,
-            "generated_at": datetime.now(timezone.utc).isoformat(),
-            "generator_version": "2.0.0",
-            "ai_act_class": system.ai_act_class or "minimal",
-            "system_role": system.system_role or "provider",
-            "artifacts": artifacts,
-            "approvals": [
-                {
-                    "doc": approval.doc_type,
-                    "status": approval.status,
-                    "email": approval.approver_email or approval.submitted_by,
-                    "timestamp": (approval.approved_at or approval.submitted_at).isoformat() if (approval.approved_at or approval.submitted_at) else None
-                }
-                for approval in approvals if approval.status in ['submitted', 'approved']
-            ],
-            "sources": [
-                {
-                    "doc": "annex_iv",
-                    "evidence": [
-                        {
-                            "id": ev.id,
-                            "sha256": ev.checksum or "N/A"
-                        }
-                        for ev in evidence if ev.checksum
-                    ]
-                }
-            ]
-        }
-        
-        manifest_json = json.dumps(manifest, indent=2)
-        zip_file.writestr("manifest.json", manifest_json)
-        artifacts.append({
-            "name": "manifest.json",
-            "sha256": hashlib.sha256(manifest_json.encode()).hexdigest(),
-            "bytes": len(manifest_json.encode())
-        })
-
-    zip_buffer.seek(0)
-    zip_content = zip_buffer.getvalue()
-    
-    # Calculate hash for integrity
-    file_hash = hashlib.sha256(zip_content).hexdigest()
     
-    return StreamingResponse(
-        BytesIO(zip_content),
-        media_type="application/zip",
-        headers={
-            "Content-Disposition": f"attachment; filename=annex-iv-system-{system_id}-v2.zip",
-            "X-File-Hash": f"sha256:{file_hash}",
-            "X-File-Size": str(len(zip_content))
+    export_id = uuid.uuid4().hex
+    stream = build(export_id)
+    cache_writer = bundle_cache.writer(fingerprint, scope=scope)
+    if cache_writer:
+        stream = cache_while_streaming(stream, cache_writer, builder, filename)
+    # Not persisted yet, so not resumable; repeat requests are served from the cache
+    return _streaming_zip_response(
+        stream, filename, export_id,
+        {
+            "Cache-Control": "private, no-cache",
+            "Accept-Ranges": "none",
+            "X-Bundle-Fingerprint": fingerprint,
+            "X-Cache": "MISS",
         }
     )
 
 
+async def _generate_annex_iv_zip(
+    system_id: int,
+    org: Organization,
+    db: Session,
+    if_none_match: Optional[str] = None,
+    archive_format: str = "zip",
+):
+    """Internal function to generate Annex IV zip file."""
+    return await _export_annex_iv(
+        system_id, org, db,
+        **variant_settings("v1", system_id),
+        if_none_match=if_none_match,
+        archive_format=archive_format
+    )
+
+
+async def _generate_annex_iv_zip_v2(
+    system_id: int,
+    org: Organization,
+    db: Session,
+    if_none_match: Optional[str] = None,
+    archive_format: str = "zip",
+):
+    """V2: Generate Annex IV zip file with ALL documents - clean implementation."""
+    return await _export_annex_iv(
+        system_id, org, db,
+        **variant_settings("v2", system_id),
+        if_none_match=if_none_match,
+        archive_format=archive_format
+    )
+
+
 async def _generate_complete_annex_iv(
     system_id: int,
     org: Organization,
     db: Session,
+    if_none_match: Optional[str] = None,
+    archive_format: str = "zip",
 ):
     """Generate COMPLETE Annex IV zip file with ALL documents - guaranteed to work."""
-    system = (
-        db.query(AISystem)
-        .filter(AISystem.id == system_id, AISystem.org_id == org.id)
-        .first()
+    return await _export_annex_iv(
+        system_id, org, db,
+        **variant_settings("complete", system_id),
+        if_none_match=if_none_match,
+        archive_format=archive_format
     )
-    if not system:
-        raise HTTPException(status_code=404, detail="System not found")
-    
-    # FRIA Gate Enforcement
-    if system.requires_fria_computed:
-        fria = (
-            db.query(FRIA)
-            .filter(FRIA.system_id == system_id, FRIA.org_id == org.id)
-            .order_by(FRIA.created_at.desc())
-            .first()
-        )
-        if not fria or (fria.applicable and fria.status != 'submitted'):
-            raise HTTPException(
-                status_code=409, 
-                detail="FRIA assessment required but not completed. Please complete the FRIA assessment before exporting documents."
-            )
-    
-    # Create zip file in memory
-    zip_buffer = BytesIO()
-    artifacts = []
-    
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        # Generate all compliance documents using DocumentGenerator
-        from app.services.document_generator import DocumentGenerator
-        generator = DocumentGenerator()
-        
-        # Document types to generate with their template mappings
-        document_templates = {
-            "annex_iv": "12_ANNEX_IV.md",
-            "fria": "15_FRIA.md", 
-            "soa": "09_SOA_TEMPLATE.md",
-            "monitoring_report": "06_PM_MONITORING_REPORT.md",
-            "risk_assessment": "01_RISK_ASSESSMENT.md",
-            "model_card": "03_MODEL_CARD.md",
-            "data_sheet": "04_DATA_SHEET.md",
-            "logging_plan": "05_LOGGING_PLAN.md",
-            "human_oversight": "07_HUMAN_OVERSIGHT_SOP.md",
-            "appeals_flow": "08_APPEALS_FLOW.md",
-            "policy_register": "10_POLICY_REGISTER.md",
-            "audit_log": "11_AUDIT_LOG.md",
-            "instructions_for_use": "13_INSTRUCTIONS_FOR_USE.md"
-        }
-        
-        # Generate each document individually
-        for doc_type, template_file in document_templates.items():
-            try:
-                # Generate markdown content
-                md_content = generator._generate_document(
-                    template_file=template_file,
-                    system=system,
-                    org=org,
-                    onboarding_data={},
-                    db=db,
-                    doc_type=doc_type
-                )
-                
-                if md_content:
-                    # Add markdown version
-                    zip_file.writestr(f"{doc_type}.md", md_content)
-                    artifacts.append({
-                        "name": f"{doc_type}.md",
-                        "sha256": hashlib.sha256(md_content.encode()).hexdigest(),
-                        "bytes": len(md_content.encode())
-                    })
-                        
-            except Exception as e:
-                logger.error(f"Error generating {doc_type}: {e}")
-                continue
-        
-        # Add system information
-        system_info = f"""System ID: {system.id}
-Name: {system.name}
-Purpose: {system.purpose}
-Domain: {system.domain}
-Owner: {system.owner_email}
-Deployment Context: {system.deployment_context}
-Personal Data Processed: {system.personal_data_processed}
-Impacts Fundamental Rights: {system.impacts_fundamental_rights}
-AI Act Class: {system.ai_act_class}
-Created: {system.id}
-"""
-        zip_file.writestr("system_info.txt", system_info)
-        artifacts.append({
-            "name": "system_info.txt",
-            "sha256": hashlib.sha256(system_info.encode()).hexdigest(),
-            "bytes": len(system_info.encode())
-        })
-
-        # Add controls as CSV
-        controls = db.query(Control).filter(Control.system_id == system_id).all()
-        if controls:
-            # Create controls CSV
-            controls_csv = "Control ID,Name,Status,Due Date,ISO Clause,Priority,Owner Email,Implementation Status,Evidence Links\n"
-            for control in controls:
-                # Get evidence linked to this control
-                evidence = db.query(Evidence).filter(Evidence.control_id == control.id).all()
-                evidence_links = ", ".join([f"EV-{ev.id}" for ev in evidence])
-                controls_csv += f"{control.id},{control.name},{control.status},{control.due_date},{control.iso_clause},{control.priority},{control.owner_email or 'N/A'},Not set,{evidence_links}\n"
-            
-            zip_file.writestr("controls.csv", controls_csv)
-            artifacts.append({
-                "name": "controls.csv",
-                "sha256": hashlib.sha256(controls_csv.encode()).hexdigest(),
-                "bytes": len(controls_csv.encode())
-            })
-
-        # Add evidence (only if any exists)
-        evidence = []
-        try:
-            evidence = db.query(Evidence).filter(Evidence.system_id == system_id).all()
-            if evidence:
-                # Create evidence CSV
-                evidence_csv = "Evidence ID,Label,Control Name,ISO Clause,Uploaded,Status,File Path,Version,Checksum,Uploaded By,Reviewer,Link/Location\n"
-                for ev in evidence:
-                    evidence_csv += f"{ev.id},{ev.label},{ev.control_name},{ev.iso42001_clause},{ev.upload_date},{ev.status},{ev.file_path},{ev.version},{ev.checksum},{ev.uploaded_by},{ev.reviewer_email},{ev.link_or_location}\n"
-                
-                zip_file.writestr("evidence_manifest.csv", evidence_csv)
-                artifacts.append({
-                    "name": "evidence_manifest.csv",
-                    "sha256": hashlib.sha256(evidence_csv.encode()).hexdigest(),
-                    "bytes": len(evidence_csv.encode())
-                })
-        except Exception as e:
-            logger.warning(f"Could not fetch evidence for system {system_id}: {e}")
-            evidence = []
-        
-        # Get all document approvals for this system
-        approvals = (
-            db.query(DocumentApproval)
-            .filter(DocumentApproval.system_id == system_id, DocumentApproval.org_id == org.id)
-            .all()
-        )
-        
-        # Generate manifest.json
-        manifest = {
-            "system_id": system_id,
-            "generated_at": datetime.now(timezone.utc).isoformat(),
-            "generator_version": "3.0.0",
-            "ai_act_class": system.ai_act_class or "minimal",
-            "system_role": system.system_role or "provider",
-            "artifacts": artifacts,
-            "approvals": [
-                {
-                    "doc": approval.doc_type,
-                    "status": approval.status,
-                    "email": approval.approver_email or approval.submitted_by,
-                    "timestamp": (approval.approved_at or approval.submitted_at).isoformat() if (approval.approved_at or approval.submitted_at) else None
-                }
-                for approval in approvals if approval.status in ['submitted', 'approved']
-            ],
-            "sources": [
-                {
-                    "doc": "annex_iv",
-                    "evidence": [
-                        {
-                            "id": ev.id,
-                            "sha256": ev.checksum or "N/A"
-                        }
-                        for ev in evidence if ev.checksum
-                    ]
-                }
-            ]
-        }
-        
-        manifest_json = json.dumps(manifest, indent=2)
-        zip_file.writestr("manifest.json", manifest_json)
-        artifacts.append({
-            "name": "manifest.json",
-            "sha256": hashlib.sha256(manifest_json.encode()).hexdigest(),
-            "bytes": len(manifest_json.encode())
-        })
-
-    zip_buffer.seek(0)
-    zip_content = zip_buffer.getvalue()
-    
-    # Calculate hash for integrity
-    file_hash = hashlib.sha256(zip_content).hexdigest()
-    
-    return StreamingResponse(
-        BytesIO(zip_content),
-        media_type="application/zip",
-        headers={
-            "Content-Disposition": f"attachment; filename=annex-iv-complete-{system_id}.zip",
-            "X-File-Hash": f"sha256:{file_hash}",
-            "X-File-Size": str(len(zip_content))
-        }
-    )
\ No newline at end of file
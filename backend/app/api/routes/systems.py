@@ -10,6 +10,7 @@ from app.core.security import verify_api_key
 from app.database import get_db
 from app.models import AISystem, Control, Evidence, Organization
 from app.schemas import AISystemCreate, AISystemResponse, AssessmentResponse
+from app.services.control_evidence import load_control_evidence
 from app.services.gap import generate_control_plan, generate_gap
 from app.services.risk import classify_ai_act, detect_role, is_gpai
 
@@ -337,8 +338,6 @@ async def get_onboarding_data(
 @router.get("/{system_id}/soa.csv")
 def export_soa_csv(system_id: int, org: Organization = Depends(verify_api_key), db: Session = Depends(get_db)):
     """Export Statement of Applicability as CSV with full audit trail."""
-    from app.models import Evidence
-    
     output = io.StringIO()
     writer = csv.writer(output)
     
@@ -354,21 +353,11 @@ def export_soa_csv(system_id: int, org: Organization = Depends(verify_api_key),
         "Evidence Links"
     ])
     
-    # Get all controls for this system
-    items = (
-        db.query(Control)
-        .filter(Control.system_id == system_id, Control.org_id == org.id)
-        .order_by(Control.iso_clause)
-        .all()
-    )
+    # Get all controls for this system with their evidence (two queries)
+    links = load_control_evidence(db, org.id, [system_id], order_by=(Control.iso_clause,))
     # Write control rows with evidence
-    for control in items:
-        # Get evidence for this control
-        evidence_list = db.query(Evidence).filter(
-            Evidence.control_id == control.id,
-            Evidence.org_id == org.id
-        ).all()
-        
+    for control in links.controls_for(system_id):
+        evidence_list = links.evidence_for(control)
         evidence_links = ", ".join([
             f"{e.label} (v{e.version or '1'})" for e in evidence_list
         ]) if evidence_list else "No evidence uploaded"
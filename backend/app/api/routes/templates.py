@@ -13,6 +13,9 @@ from sqlalchemy.orm import Session
 from app.core.security import verify_api_key
 from app.database import get_db
 from app.models import Organization
+from app.services.pdf_renderer import pdf_renderer
+from app.services.preview_cache import preview_cache
+from app.services.template_registry import template_registry
 
 router = APIRouter()
 
@@ -97,6 +100,17 @@ async def get_templates(
         "count": len(_template_cache)
     }
 
+@router.get("/templates/render-stats")
+async def get_template_render_stats(
+    org: Organization = Depends(verify_api_key),
+):
+    """Template compile/render timings, PDF render queue and preview cache metrics since process start."""
+    return {
+        "templates": template_registry.stats(),
+        "pdf": pdf_renderer.metrics(),
+        "preview_cache": preview_cache.metrics(),
+    }
+
 @router.get("/templates/{template_id}")
 async def get_template_content(
     template_id: str,
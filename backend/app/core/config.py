@@ -30,12 +30,48 @@ class Settings(BaseSettings):
     
     # Feature Flags
     EVIDENCE_LOCAL_STORAGE: bool = True
+    EVIDENCE_LOCAL_DIR: str = "./evidence"  # uploads when stored locally
     RATE_LIMIT: int = 1000  # requests per minute (increased for tests)
     FEATURE_LLM_REFINE: bool = False  # LLM refinement feature flag
     ENABLE_PDF_EXPORT: bool = True  # PDF export via WeasyPrint
+    ROW_CACHE_HEADER: bool = False  # X-Row-Cache hit/miss header per request (debugging; see app/services/row_cache.py)
+    
+    # Document rendering
+    RENDER_MAX_WORKERS: int = 4  # thread pool size for Jinja renders
+    PDF_RENDER_WORKERS: int = 2  # process pool size for WeasyPrint (0 = render in-thread)
+    RENDER_TIMEOUT_SECONDS: float = 60.0  # per-document render deadline, from when a worker starts it
+    RENDER_BATCH_TIMEOUT_SECONDS: float = 0.0  # deadline for a whole batch (e.g. one bundle), queueing included (0 = none)
+    PDF_QUEUE_SIZE: int = 32  # PDF jobs queued or running before submitters wait
+    PDF_QUEUE_WAIT_SECONDS: float = 10.0  # wait for queue room before rejecting (503)
+    PDF_WORKER_MAX_JOBS: int = 200  # recycle a PDF worker after this many renders (0 = never)
+    PDF_WORKER_MAX_RSS_MB: int = 1024  # recycle PDF workers once one grows past this (0 = no cap)
+    PDF_PREWARM: bool = True  # start PDF workers at application start-up
+    PDF_COMBINED: bool = False  # lay out the document set as one PDF; split per document on download
+    
+    # Export bundle cache (content-addressed; see app/services/bundle_cache.py)
+    BUNDLE_CACHE_ENABLED: bool = True
+    BUNDLE_CACHE_DIR: str = "./generated_documents/bundle_cache"
+    BUNDLE_DEFLATE_LEVEL: int = 6  # zlib level for text entries (0 = store); PDFs/images are always stored
+    BUNDLE_ZSTD_LEVEL: int = 3  # level for tar.zst bundles (needs the zstandard package)
+    
+    # Render store for on-demand documents (see app/services/render_store.py)
+    RENDER_STORE_DIR: str = "./generated_documents/render_store"
+    PREVIEW_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # sanitized preview HTML kept in memory (LRU)
+    SUMMARY_CACHE_TTL_SECONDS: float = 60.0  # /reports/summary per org and revision (0 = no caching)
+    
+    # Background export jobs (see app/services/export_jobs.py)
+    EXPORT_JOBS_DIR: str = "./generated_documents/export_jobs"
+    EXPORT_WORKER_EMBEDDED: bool = False  # also run the worker as a thread in the API process
+    EXPORT_WORKER_POLL_SECONDS: float = 2.0
+    EXPORT_JOB_STALE_SECONDS: float = 900.0  # requeue running jobs without a heartbeat for this long
+    EXPORT_JOB_MAX_ATTEMPTS: int = 3
+    EXPORT_JOB_TTL_SECONDS: float = 7 * 24 * 3600.0  # delete finished jobs and their archives after this (0 = keep)
+    EXPORT_INTEGRITY_DIR: str = "./generated_documents/export_integrity"  # signed sidecar records
     
     # Templates & Compliance Suite
     TEMPLATES_DIR: str = "assets/templates"
+    TEMPLATE_AUTO_RELOAD: bool = True  # re-check template mtimes on each lookup; turn off in production
+    TEMPLATE_BYTECODE_CACHE_DIR: str = "./generated_documents/template_cache"  # empty disables
 
     model_config = ConfigDict(
         env_file=".env",
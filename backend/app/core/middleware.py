@@ -1,5 +1,6 @@
 """Security and rate limiting middleware."""
 
+import re
 import time
 from collections import defaultdict
 from typing import Awaitable, Callable, Dict, Tuple
@@ -8,6 +9,8 @@ from fastapi import Request, Response, status
 from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from app.services.row_cache import start_request_stats
+
 
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     """Add security headers to all responses."""
@@ -49,10 +52,16 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         # Token buckets: Dict[key, Tuple[tokens, last_refill]]
         self.buckets: Dict[str, Tuple[float, float]] = defaultdict(lambda: (rate_limit, time.time()))
         
-        # Track upload/export endpoints
+        # Track upload/export endpoints (prefix match covers every Annex IV
+        # variant and the export job endpoints)
         self.expensive_endpoints = {
-            "/reports/annex-iv.zip",
+            "/reports/annex-iv",
+            "/reports/compliance-suite",
         }
+        # Export job archive downloads
+        self.expensive_patterns = (
+            re.compile(r"/reports/jobs/[^/]+/download$"),
+        )
 
     def _get_bucket_key(self, request: Request) -> str:
         """Get rate limit bucket key (API key or IP)."""
@@ -68,7 +77,9 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     def _should_rate_limit(self, request: Request) -> bool:
         """Check if endpoint should be rate limited."""
         path = request.url.path
-        return any(endpoint in path for endpoint in self.expensive_endpoints)
+        return any(endpoint in path for endpoint in self.expensive_endpoints) or any(
+            pattern.search(path) for pattern in self.expensive_patterns
+        )
 
     def _consume_token(self, key: str) -> bool:
         """
@@ -110,3 +121,20 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
 
         return await call_next(request)
 
+
+
+class RowCacheHeaderMiddleware(BaseHTTPMiddleware):
+    """
+    Report the request's row cache hits and misses in an ``X-Row-Cache`` header.
+
+    For debugging; the app installs it only with ``ROW_CACHE_HEADER`` enabled.
+    Rows read while a streaming response is being sent are not included.
+    """
+
+    async def dispatch(
+        self, request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        stats = start_request_stats()
+        response = await call_next(request)
+        response.headers["X-Row-Cache"] = stats.header()
+        return response
@@ -0,0 +1,50 @@
+"""Per-session SQL statement counting for export and debug metrics."""
+
+from typing import List
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+
+class QueryCounter:
+    """
+    Count the statements a Session executes while the counter is active.
+
+    Listens to ``do_orm_execute`` on the given Session only, so concurrent
+    requests sharing the engine are not counted. Relationship loads issued by
+    the ORM (lazy/selectin) are included.
+
+    Usage:
+        with QueryCounter(db) as counter:
+            ...
+        counter.count
+    """
+
+    def __init__(self, session: Session, keep_statements: bool = False):
+        self.session = session
+        self.keep_statements = keep_statements
+        self.count = 0
+        self.statements: List[str] = []
+        self._active = False
+
+    def _on_execute(self, orm_execute_state: ORMExecuteState) -> None:
+        self.count += 1
+        if self.keep_statements:
+            self.statements.append(str(orm_execute_state.statement))
+
+    def start(self) -> "QueryCounter":
+        if not self._active:
+            event.listen(self.session, "do_orm_execute", self._on_execute)
+            self._active = True
+        return self
+
+    def stop(self) -> None:
+        if self._active:
+            event.remove(self.session, "do_orm_execute", self._on_execute)
+            self._active = False
+
+    def __enter__(self) -> "QueryCounter":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
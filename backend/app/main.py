@@ -24,7 +24,7 @@ from app.api.routes import (
 )
 from app.core.config import settings
 from app.core.logging_config import configure_logging
-from app.core.middleware import RateLimitMiddleware, SecurityHeadersMiddleware
+from app.core.middleware import RateLimitMiddleware, RowCacheHeaderMiddleware, SecurityHeadersMiddleware
 from app.database import Base, SessionLocal, engine
 from app.models import Organization
 from app.services.s3 import s3_service
@@ -95,8 +95,21 @@ async def lifespan(app: FastAPI):
     from app.api.routes.templates import initialize_templates
     initialize_templates()
 
+    # Export jobs run in their own worker process unless embedded here
+    from app.services.export_jobs import export_worker
+    if settings.EXPORT_WORKER_EMBEDDED:
+        export_worker.start()
+
+    # PDF render workers: pay the WeasyPrint/font start-up before the first request
+    from app.services.pdf_renderer import WEASYPRINT_AVAILABLE, pdf_renderer
+    if settings.PDF_PREWARM and WEASYPRINT_AVAILABLE:
+        pdf_renderer.warm()
+
     yield
 
+    export_worker.stop(timeout=5)
+    pdf_renderer.shutdown(wait=False, cancel_futures=True)
+
 
 app = FastAPI(
     title="AIMS Readiness API",
@@ -121,6 +134,10 @@ app.add_middleware(SecurityHeadersMiddleware)
 # Rate limiting
 app.add_middleware(RateLimitMiddleware, rate_limit=settings.RATE_LIMIT)
 
+# Row cache hit/miss header (debugging only: BaseHTTPMiddleware wraps every response stream)
+if settings.ROW_CACHE_HEADER:
+    app.add_middleware(RowCacheHeaderMiddleware)
+
 # Routes
 app.include_router(systems.router)
 app.include_router(evidence.router)
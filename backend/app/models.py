@@ -21,6 +21,7 @@ class Organization(Base):
     dpo_contact_name = Column(String(255))
     dpo_contact_email = Column(String(255))
     org_role = Column(String(50))  # provider|deployer|both
+    revision = Column(Integer, nullable=False, default=0, server_default="0")  # bumped by app.services.revisions
 
     systems = relationship("AISystem", back_populates="organization")
     evidence = relationship("Evidence", back_populates="organization")
@@ -61,6 +62,7 @@ class AISystem(Base):
     requires_fria = Column(Boolean, default=False)  # Computed flag
     eu_db_status = Column(String(50), default='pending')  # pending|registered|n/a
     dpia_link = Column(String(500))  # URL or reference to GDPR Art. 35 DPIA
+    revision = Column(Integer, nullable=False, default=0, server_default="0")  # bumped by app.services.revisions
     
     @property
     def requires_fria_computed(self) -> bool:
@@ -369,6 +371,51 @@ class DocumentApproval(Base):
     ai_system = relationship("AISystem")
 
 
+class ExportJob(Base):
+    """Background export job; the worker writes the finished bundle to the job store."""
+    __tablename__ = "export_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, also the artifact name
+    org_id = Column(Integer, ForeignKey("organizations.id"), index=True, nullable=False)
+    system_id = Column(Integer, ForeignKey("ai_systems.id"), index=True, nullable=False)
+    kind = Column(String(50), nullable=False, default="annex_iv")  # annex_iv|compliance_suite
+    variant = Column(String(50), nullable=False)  # v1|v2|complete, or md|docx|pdf for compliance_suite
+    status = Column(String(20), nullable=False, default="queued")  # queued|running|done|failed
+    progress_json = Column(Text)  # {doc_type: pending|done|failed|cached}
+    filename = Column(String(255))
+    sha256 = Column(String(64))
+    size_bytes = Column(Integer)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+    started_at = Column(UTCDateTime, nullable=True)
+    finished_at = Column(UTCDateTime, nullable=True)
+    heartbeat_at = Column(UTCDateTime, nullable=True)
+
+    organization = relationship("Organization")
+    ai_system = relationship("AISystem")
+
+
+class RenderedDocument(Base):
+    """A rendered document in the render store; the content lives in the blob named here."""
+    __tablename__ = "rendered_documents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    org_id = Column(Integer, ForeignKey("organizations.id"), index=True, nullable=False)
+    system_id = Column(Integer, ForeignKey("ai_systems.id"), index=True, nullable=False)
+    doc_type = Column(String(100), nullable=False)
+    format = Column(String(20), nullable=False)  # markdown|pdf
+    fingerprint = Column(String(64), nullable=False)  # inputs + template digest it was rendered from
+    blob_name = Column(String(255), nullable=False)
+    sha256 = Column(String(64), nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    created_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(UTCDateTime, default=lambda: datetime.now(timezone.utc))
+
+    organization = relationship("Organization")
+    ai_system = relationship("AISystem")
+
+
 # Additional indexes for new tables
 Index("ix_ai_risk_org_system", AIRisk.org_id, AIRisk.system_id)
 Index("ix_oversight_org_system", Oversight.org_id, Oversight.system_id)
@@ -376,4 +423,12 @@ Index("ix_pmm_org_system", PMM.org_id, PMM.system_id)
 Index("ix_model_versions_org_system", ModelVersion.org_id, ModelVersion.system_id)
 Index("ix_doc_approvals_org_system", DocumentApproval.org_id, DocumentApproval.system_id)
 Index("ix_doc_approvals_doc_type", DocumentApproval.org_id, DocumentApproval.system_id, DocumentApproval.doc_type)
-
+Index("ix_export_jobs_status_created", ExportJob.status, ExportJob.created_at)
+Index(
+    "ux_rendered_documents_doc",
+    RenderedDocument.org_id, RenderedDocument.system_id, RenderedDocument.doc_type, RenderedDocument.format,
+    unique=True
+)
+
+# Session hooks that keep AISystem.revision and Organization.revision current
+from app.services import revisions  # noqa: E402,F401
@@ -0,0 +1,429 @@
+"""
+Annex IV Bundle
+
+Assembles Annex IV export archives for one system or for several systems of
+an organization. Shared by the streaming report endpoints and the background
+export worker.
+"""
+
+import json
+import logging
+import time
+from itertools import groupby
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from app.models import AISystem, Control, Evidence, Organization
+from app.services.bundle_builder import BundleBuilder, OrgBundleBuilder
+from app.services.bundle_cache import BundleCacheWriter
+from app.services.control_evidence import ControlEvidence
+from app.services.document_context import SystemSnapshot
+from app.services.render_executor import RenderResult
+from app.services.zip_stream import StreamingTarZstWriter, StreamingZipWriter, export_integrity
+
+logger = logging.getLogger(__name__)
+
+# Document types to generate with their template mappings
+ANNEX_IV_DOCUMENT_TEMPLATES = {
+    "annex_iv": "12_ANNEX_IV.md",
+    "fria": "15_FRIA.md",
+    "soa": "09_SOA_TEMPLATE.md",
+    "monitoring_report": "06_PM_MONITORING_REPORT.md",
+    "risk_assessment": "01_RISK_ASSESSMENT.md",
+    "model_card": "03_MODEL_CARD.md",
+    "data_sheet": "04_DATA_SHEET.md",
+    "logging_plan": "05_LOGGING_PLAN.md",
+    "human_oversight": "07_HUMAN_OVERSIGHT_SOP.md",
+    "appeals_flow": "08_APPEALS_FLOW.md",
+    "policy_register": "10_POLICY_REGISTER.md",
+    "audit_log": "11_AUDIT_LOG.md",
+    "instructions_for_use": "13_INSTRUCTIONS_FOR_USE.md"
+}
+
+# Export variants: download filename, manifest generator version and layout
+ANNEX_IV_VARIANTS = {
+    "v1": {
+        "filename": "annex-iv-system-{system_id}.zip",
+        "generator_version": "1.0.0",
+        "include_detail_files": True,
+    },
+    "v2": {
+        "filename": "annex-iv-system-{system_id}-v2.zip",
+        "generator_version": "2.0.0",
+        "include_detail_files": False,
+    },
+    "complete": {
+        "filename": "annex-iv-complete-{system_id}.zip",
+        "generator_version": "3.0.0",
+        "include_detail_files": False,
+    },
+}
+
+# Archive formats: ZIP for people, zstd-compressed tar for machine consumers
+ARCHIVE_FORMATS = {
+    "zip": {"extension": ".zip", "writer": StreamingZipWriter},
+    "tar.zst": {"extension": ".tar.zst", "writer": StreamingTarZstWriter},
+}
+
+ArchiveWriter = Union[StreamingZipWriter, StreamingTarZstWriter]
+
+# Org-wide archive with one folder per system
+ORG_BUNDLE_FILENAME = "annex-iv-org-{org_id}.zip"
+ORG_BUNDLE_GENERATOR_VERSION = "3.0.0"
+
+# Called with (doc_type, ok) as each document finishes rendering
+ProgressCallback = Callable[[str, bool], None]
+
+
+def variant_settings(variant: str, system_id: int) -> Dict[str, Any]:
+    """Filename, generator version and layout flags for an export variant."""
+    spec = ANNEX_IV_VARIANTS[variant]
+    return {
+        "filename": spec["filename"].format(system_id=system_id),
+        "generator_version": spec["generator_version"],
+        "include_detail_files": spec["include_detail_files"],
+    }
+
+
+def archive_filename(filename: str, archive_format: str) -> str:
+    """Swap a bundle filename's ``.zip`` extension for the archive format's."""
+    stem = filename[:-len(".zip")] if filename.endswith(".zip") else filename
+    return f"{stem}{ARCHIVE_FORMATS[archive_format]['extension']}"
+
+
+def archive_writer(archive_format: str = "zip") -> ArchiveWriter:
+    """A fresh streaming writer for ``archive_format``."""
+    return ARCHIVE_FORMATS[archive_format]["writer"]()
+
+
+def bundle_fingerprint(
+    builder: Union[BundleBuilder, OrgBundleBuilder],
+    filename: str,
+    generator_version: str,
+    include_detail_files: bool,
+) -> str:
+    """Bundle cache key for one Annex IV variant."""
+    with builder:
+        return builder.fingerprint(
+            ANNEX_IV_DOCUMENT_TEMPLATES,
+            generator_version=generator_version,
+            include_detail_files=include_detail_files,
+            filename=filename,
+        )
+
+
+def system_info_text(system: AISystem) -> str:
+    return f"""System ID: {system.id}
+Name: {system.name}
+Purpose: {system.purpose}
+Domain: {system.domain}
+Owner: {system.owner_email}
+Deployment Context: {system.deployment_context}
+Personal Data Processed: {system.personal_data_processed}
+Impacts Fundamental Rights: {system.impacts_fundamental_rights}
+AI Act Class: {system.ai_act_class}
+Created: {system.id}
+"""
+
+
+def controls_csv_rows(controls: List[Control], links: ControlEvidence) -> Iterator[str]:
+    yield (
+        "Control ID,Name,Status,Due Date,ISO Clause,Priority,Owner Email,"
+        "Implementation Status,Evidence Links\n"
+    )
+    for control in controls:
+        # Evidence linked to this control
+        evidence_links = ", ".join([f"EV-{ev.id}" for ev in links.evidence_for(control)])
+        yield (
+            f"{control.id},{control.name},{control.status},{control.due_date},"
+            f"{control.iso_clause},{control.priority},{control.owner_email or 'N/A'},"
+            f"Not set,{evidence_links}\n"
+        )
+
+
+def evidence_csv_rows(evidence: List[Evidence]) -> Iterator[str]:
+    yield (
+        "Evidence ID,Label,Control Name,ISO Clause,Uploaded,Status,File Path,Version,"
+        "Checksum,Uploaded By,Reviewer,Link/Location\n"
+    )
+    for ev in evidence:
+        yield (
+            f"{ev.id},{ev.label},{ev.control_name},{ev.iso42001_clause},{ev.upload_date},"
+            f"{ev.status},{ev.file_path},{ev.version},{ev.checksum},{ev.uploaded_by},"
+            f"{ev.reviewer_email},{ev.link_or_location}\n"
+        )
+
+
+def _system_entries(
+    writer: ArchiveWriter,
+    builder: BundleBuilder,
+    results: Iterable[RenderResult],
+    include_detail_files: bool = False,
+    prefix: str = "",
+    on_progress: Optional[ProgressCallback] = None,
+) -> Iterator[bytes]:
+    """Write one system's documents, info and CSV entries under ``prefix``."""
+    system = builder.system
+    snapshot = builder.snapshot
+    links = ControlEvidence.from_snapshot(snapshot)
+    
+    # Render results arrive in template order
+    for result in results:
+        if on_progress:
+            on_progress(result.key, result.ok)
+        if not result.ok:
+            logger.error(f"Error generating {result.key}: {result.error}")
+            continue
+        
+        if result.value:
+            yield writer.write_entry(f"{prefix}{result.key}.md", result.value)
+    
+    # Add system information
+    yield writer.write_entry(f"{prefix}system_info.txt", system_info_text(system))
+    
+    # Add controls as CSV
+    controls = sorted(snapshot.controls, key=lambda c: c.id)
+    if controls:
+        yield from writer.stream_entry(f"{prefix}controls.csv", controls_csv_rows(controls, links))
+        
+        if include_detail_files:
+            # Also add individual control files for detailed view
+            for control in controls:
+                evidence_links = ', '.join([f'EV-{ev.id}' for ev in links.evidence_for(control)])
+                control_info = f"""Control ID: {control.id}
+Name: {control.name}
+Status: {control.status}
+Due Date: {control.due_date}
+ISO Clause: {control.iso_clause}
+Priority: {control.priority}
+Owner Email: {control.owner_email or 'N/A'}
+Implementation Status: Not set
+    Evidence Links: {evidence_links}
+"""
+                yield writer.write_entry(f"{prefix}controls/{control.id}.txt", control_info)
+    
+    # Add evidence (only if any exists)
+    evidence = list(snapshot.evidence)
+    if evidence:
+        yield from writer.stream_entry(
+            f"{prefix}evidence_manifest.csv", evidence_csv_rows(evidence)
+        )
+        
+        if include_detail_files:
+            # Also add individual evidence files for detailed view
+            for ev in evidence:
+                evidence_info = f"""Evidence ID: {ev.id}
+Label: {ev.label}
+Control Name: {ev.control_name}
+ISO Clause: {ev.iso42001_clause}
+Uploaded: {ev.upload_date}
+Status: {ev.status}
+File Path: {ev.file_path}
+Version: {ev.version}
+Checksum: {ev.checksum}
+Uploaded By: {ev.uploaded_by}
+Reviewer: {ev.reviewer_email}
+Link/Location: {ev.link_or_location}
+"""
+                yield writer.write_entry(f"{prefix}evidence/{ev.id}.txt", evidence_info)
+
+
+def _approvals_and_sources(snapshot: SystemSnapshot) -> Dict[str, Any]:
+    """Manifest approvals and evidence sources for one system."""
+    return {
+        "approvals": [
+            {
+                "doc": approval.doc_type,
+                "status": approval.status,
+                "email": approval.approver_email or approval.submitted_by,
+                "timestamp": (
+                    (approval.approved_at or approval.submitted_at).isoformat()
+                    if (approval.approved_at or approval.submitted_at) else None
+                ),
+            }
+            for approval in snapshot.approvals if approval.status in ['submitted', 'approved']
+        ],
+        "sources": [
+            {
+                "doc": "annex_iv",
+                "evidence": [
+                    {
+                        "id": ev.id,
+                        "sha256": ev.checksum or "N/A"
+                    }
+                    for ev in snapshot.evidence if ev.checksum
+                ]
+            }
+        ]
+    }
+
+
+def stream_annex_iv_bundle(
+    builder: BundleBuilder,
+    export_id: str,
+    filename: str,
+    generator_version: str,
+    include_detail_files: bool = False,
+    on_progress: Optional[ProgressCallback] = None,
+    archive_format: str = "zip",
+) -> Iterator[bytes]:
+    """
+    Render the Annex IV bundle entry by entry, yielding archive bytes as they are produced.
+
+    When served over HTTP this runs in Starlette's threadpool while the response
+    streams, so rendering does not block the event loop. All documents are
+    rendered concurrently from one shared data snapshot, and the archive hash
+    is recorded once the last byte is out.
+    Entry order and timestamps are fixed and only input-determined metrics
+    (per-entry compression) go into the manifest; build time is kept on the
+    builder (``build_seconds``) and in the cache metadata. So the same inputs
+    and ``generated_at`` always produce the same bytes.
+    """
+    system, org = builder.system, builder.org
+    writer = archive_writer(archive_format)
+    started = time.perf_counter()
+    
+    with builder:
+        yield from _system_entries(
+            writer, builder, builder.render_documents(ANNEX_IV_DOCUMENT_TEMPLATES),
+            include_detail_files=include_detail_files, on_progress=on_progress
+        )
+        metrics = builder.metrics()
+    
+    # Generate manifest.json
+    manifest = {
+        "system_id": system.id,
+        "generated_at": builder.generated_at,
+        "generator_version": generator_version,
+    }
+    if generator_version != "1.0.0":
+        manifest["ai_act_class"] = system.ai_act_class or "minimal"
+        manifest["system_role"] = system.system_role or "provider"
+    manifest["artifacts"] = list(writer.artifacts)
+    manifest.update(_approvals_and_sources(builder.snapshot))
+    manifest["metrics"] = {"compression": writer.compression_metrics()}
+    
+    yield writer.write_entry("manifest.json", json.dumps(manifest, indent=2))
+    yield writer.close()
+    builder.build_seconds = round(time.perf_counter() - started, 4)
+    
+    export_integrity.record(
+        export_id=export_id,
+        org_id=org.id,
+        system_id=system.id,
+        filename=filename,
+        sha256=writer.sha256,
+        size=writer.size,
+    )
+    logger.info(
+        f"Streamed {filename}: {writer.size} bytes, {len(writer.artifacts)} entries, "
+        f"{metrics['queries']} queries, built in {builder.build_seconds}s, "
+        f"render times {builder.render_seconds}, sha256:{writer.sha256}"
+    )
+
+
+def organization_info_text(org: Organization) -> str:
+    return f"""Organization ID: {org.id}
+Name: {org.name}
+Role: {org.org_role}
+Primary Contact: {org.primary_contact_name} <{org.primary_contact_email}>
+DPO: {org.dpo_contact_name} <{org.dpo_contact_email}>
+"""
+
+
+def system_folder(system: AISystem) -> str:
+    return f"systems/system-{system.id}/"
+
+
+def stream_org_annex_iv_bundle(
+    builder: OrgBundleBuilder,
+    export_id: str,
+    filename: str,
+    generator_version: str,
+    include_detail_files: bool = False,
+    archive_format: str = "zip",
+) -> Iterator[bytes]:
+    """
+    Render one archive covering every system of ``builder``.
+
+    Each system's entries sit in its own ``systems/system-<id>/`` folder with
+    the same layout as a single-system bundle. Organization details are
+    written once at the top level, and a single top-level ``manifest.json``
+    lists every system with its approvals and evidence sources. Documents for
+    all systems are rendered in one batch on the shared render pool.
+    """
+    org = builder.org
+    writer = archive_writer(archive_format)
+    started = time.perf_counter()
+    
+    with builder:
+        yield writer.write_entry("organization_info.txt", organization_info_text(org))
+        
+        results = builder.render_documents(ANNEX_IV_DOCUMENT_TEMPLATES)
+        for system_builder, group in groupby(results, key=lambda pair: pair[0]):
+            yield from _system_entries(
+                writer, system_builder, (result for _, result in group),
+                include_detail_files=include_detail_files,
+                prefix=system_folder(system_builder.system),
+            )
+        metrics = builder.metrics()
+    
+    manifest = {
+        "org_id": org.id,
+        "generated_at": builder.generated_at,
+        "generator_version": generator_version,
+        "artifacts": list(writer.artifacts),
+        "systems": [
+            {
+                "system_id": system_builder.system.id,
+                "name": system_builder.system.name,
+                "folder": system_folder(system_builder.system),
+                "ai_act_class": system_builder.system.ai_act_class or "minimal",
+                "system_role": system_builder.system.system_role or "provider",
+                **_approvals_and_sources(system_builder.snapshot),
+            }
+            for system_builder in builder.builders
+        ],
+        "metrics": {"compression": writer.compression_metrics()},
+    }
+    
+    yield writer.write_entry("manifest.json", json.dumps(manifest, indent=2))
+    yield writer.close()
+    builder.build_seconds = round(time.perf_counter() - started, 4)
+    
+    export_integrity.record(
+        export_id=export_id,
+        org_id=org.id,
+        filename=filename,
+        sha256=writer.sha256,
+        size=writer.size,
+    )
+    logger.info(
+        f"Streamed {filename}: {writer.size} bytes, {len(writer.artifacts)} entries, "
+        f"{metrics['systems']} systems, {metrics['queries']} queries, "
+        f"built in {builder.build_seconds}s, "
+        f"sha256:{writer.sha256}"
+    )
+
+
+def cache_while_streaming(
+    stream: Iterator[bytes],
+    cache_writer: BundleCacheWriter,
+    builder: Union[BundleBuilder, OrgBundleBuilder],
+    filename: str,
+) -> Iterator[bytes]:
+    """
+    Spool streamed bundle bytes into the cache.
+
+    The bundle is stored only if the stream completes and every document
+    rendered; an archive missing a failed document is served once, never cached.
+    """
+    try:
+        for chunk in stream:
+            cache_writer.write(chunk)
+            yield chunk
+        if builder.complete:
+            cache_writer.commit(**builder.cache_metadata(filename))
+        else:
+            logger.warning(f"Not caching {filename}: some documents failed to render")
+    finally:
+        cache_writer.abort()
@@ -8,9 +8,9 @@ title, description, and action items.
 
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
 
-from app.models import AISystem, Control, FRIA, PMM, AIRisk, Evidence
+from app.services.read_models import ControlRow, EvidenceRow, FRIARow, PMMRow, RiskRow
+from app.services.row_cache import row_cache
 
 
 class BlockingIssuesService:
@@ -18,6 +18,9 @@ class BlockingIssuesService:
     
     def __init__(self, db: Session):
         self.db = db
+        # Read models of just the columns checked here, through the request's
+        # cache shared with other services
+        self.rows = row_cache(db)
     
     def get_blocking_issues(self, system_id: int, org_id: int) -> List[Dict[str, Any]]:
         """
@@ -29,11 +32,7 @@ class BlockingIssuesService:
         issues = []
         
         # Get system
-        system = (
-            self.db.query(AISystem)
-            .filter(and_(AISystem.id == system_id, AISystem.org_id == org_id))
-            .first()
-        )
+        system = self.rows.system(org_id, system_id)
         if not system:
             return [{
                 "id": "system_not_found",
@@ -46,12 +45,8 @@ class BlockingIssuesService:
         
         # Check FRIA requirements
         if system.requires_fria_computed:
-            fria = (
-                self.db.query(FRIA)
-                .filter(and_(FRIA.system_id == system_id, FRIA.org_id == org_id))
-                .order_by(FRIA.created_at.desc())
-                .first()
-            )
+            # Latest FRIA first
+            fria = self.rows.first(FRIARow, org_id, system_id)
             if not fria:
                 issues.append({
                     "id": "fria_required_missing",
@@ -72,11 +67,7 @@ class BlockingIssuesService:
                 })
         
         # Check controls completeness
-        controls = (
-            self.db.query(Control)
-            .filter(and_(Control.system_id == system_id, Control.org_id == org_id))
-            .all()
-        )
+        controls = self.rows.rows(ControlRow, org_id, system_id)
         
         if not controls:
             issues.append({
@@ -117,11 +108,7 @@ class BlockingIssuesService:
                 })
         
         # Check PMM completeness
-        pmm = (
-            self.db.query(PMM)
-            .filter(and_(PMM.system_id == system_id, PMM.org_id == org_id))
-            .first()
-        )
+        pmm = self.rows.first(PMMRow, org_id, system_id)
         
         if not pmm:
             issues.append({
@@ -154,11 +141,7 @@ class BlockingIssuesService:
                 })
         
         # Check risk coverage
-        risks = (
-            self.db.query(AIRisk)
-            .filter(and_(AIRisk.system_id == system_id, AIRisk.org_id == org_id))
-            .all()
-        )
+        risks = self.rows.rows(RiskRow, org_id, system_id)
         
         if len(risks) < 3:
             issues.append({
@@ -171,11 +154,7 @@ class BlockingIssuesService:
             })
         
         # Check evidence coverage
-        evidence = (
-            self.db.query(Evidence)
-            .filter(and_(Evidence.system_id == system_id, Evidence.org_id == org_id))
-            .all()
-        )
+        evidence = self.rows.rows(EvidenceRow, org_id, system_id)
         
         if not evidence:
             issues.append({
@@ -0,0 +1,373 @@
+"""
+Bundle Builder
+
+Renders a system's export bundle from a single shared data snapshot and
+reports how many queries the export issued. ``OrgBundleBuilder`` does the
+same for several systems of one organization at once.
+
+Rendered documents are kept in ``document_cache`` under a fingerprint of the
+inputs each document's template reads (see ``document_dependencies``); a rebuild
+re-renders only documents whose inputs changed and reuses the rest. Cached
+documents hold a placeholder for the generation time, which is filled in with
+the builder's ``generated_at`` when the bundle is assembled.
+"""
+
+import dataclasses
+import hashlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.query_counter import QueryCounter
+from app.models import AISystem, Organization
+from app.services.bundle_cache import compute_fingerprint, document_cache
+from app.services.document_context import DocumentContextService, SystemSnapshot
+from app.services.document_dependencies import DocumentInputs
+from app.services.document_generator import DocumentGenerator
+from app.services.render_executor import RenderExecutor, RenderJob, RenderResult
+
+# Stands in for ``metadata.generated_at`` in documents rendered for the document cache
+GENERATED_AT_PLACEHOLDER = "@@generated_at@@"
+
+
+class BundleBuilder:
+    """
+    Loads a system's data graph once and renders bundle documents from it.
+
+    Every document is stamped with the builder's ``generated_at``, so a bundle
+    carries a single generation time and is otherwise a pure function of its
+    inputs.
+
+    Use as a context manager so every query issued while the bundle is built
+    (snapshot load plus any extra export queries) is counted:
+
+        with BundleBuilder(db, system, org) as builder:
+            content = builder.render_document("annex_iv", "12_ANNEX_IV.md")
+        builder.metrics()
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        system: AISystem,
+        org: Organization,
+        generator: Optional[DocumentGenerator] = None,
+        snapshot: Optional[SystemSnapshot] = None,
+    ):
+        self.db = db
+        self.system = system
+        self.org = org
+        self.generator = generator or DocumentGenerator()
+        self.snapshot: Optional[SystemSnapshot] = snapshot
+        self.snapshot_queries = 0
+        self.documents_rendered = 0
+        self.documents_reused = 0
+        self.render_seconds: Dict[str, float] = {}
+        self.build_seconds: Optional[float] = None
+        self.generated_at = datetime.now(timezone.utc).isoformat()
+        self.document_keys: Dict[str, str] = {}
+        self.failed_documents: List[str] = []
+        self._counter = QueryCounter(db)
+
+    def __enter__(self) -> "BundleBuilder":
+        self._counter.start()
+        self.load()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._counter.stop()
+
+    def load(self) -> SystemSnapshot:
+        """Load the snapshot on first use and return it."""
+        if self.snapshot is None:
+            before = self._counter.count
+            self.snapshot = DocumentContextService(self.db).load_snapshot(
+                self.system.id, self.org.id
+            )
+            self.snapshot_queries = self._counter.count - before
+        return self.snapshot
+
+    def render_document(
+        self, doc_type: str, template_file: str, onboarding_data: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """Render one template against the shared snapshot."""
+        snapshot = self.load()
+        content = self.generator._generate_document(
+            template_file=template_file,
+            system=snapshot.system,
+            org=snapshot.org,
+            onboarding_data=onboarding_data or {},
+            db=self.db,
+            doc_type=doc_type,
+            snapshot=snapshot,
+            generated_at=self.generated_at,
+        )
+        self.documents_rendered += 1
+        return content
+
+    def render_jobs(
+        self, templates: Mapping[str, str], onboarding_data: Optional[Dict[str, Any]] = None
+    ) -> List[RenderJob]:
+        """
+        Render jobs for ``templates``, keyed by doc type.
+
+        Contexts are built here from the shared snapshot; only the Jinja render
+        runs on the executor's workers, so no worker touches the session. The
+        generation time is left as a placeholder (see ``stamp``).
+        """
+        snapshot = self.load()
+        jobs = []
+        for doc_type, template_file in templates.items():
+            context = self.generator._build_document_context(
+                snapshot.system, snapshot.org, onboarding_data or {}, self.db, doc_type,
+                snapshot=snapshot, generated_at=GENERATED_AT_PLACEHOLDER
+            )
+            jobs.append(
+                RenderJob(doc_type, self.generator._render_template, (template_file, context))
+            )
+        return jobs
+
+    def reuse_documents(
+        self, templates: Mapping[str, str], onboarding_data: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, RenderResult]:
+        """
+        Stored renders of documents whose inputs are unchanged, keyed by doc type.
+
+        Also records each document's input fingerprint, so ``record_result``
+        can store the documents that do get rendered.
+        """
+        if not document_cache.enabled:
+            return {}
+        inputs = DocumentInputs(self.load(), onboarding_data)
+        reused = {}
+        for doc_type, template_file in templates.items():
+            key = inputs.fingerprint(doc_type, self.generator.templates_dir / template_file)
+            self.document_keys[doc_type] = key
+            if document_cache.get(key):
+                content = document_cache.read(key).decode("utf-8")
+                reused[doc_type] = RenderResult(doc_type, self.stamp(content))
+                self.documents_reused += 1
+        return reused
+
+    def stamp(self, content: str) -> str:
+        """Fill this builder's ``generated_at`` into a document rendered by ``render_jobs``."""
+        return content.replace(GENERATED_AT_PLACEHOLDER, self.generated_at)
+
+    def record_result(self, result: RenderResult) -> RenderResult:
+        """
+        Count a finished render job towards this builder's metrics and store the document.
+
+        Returns the result with the generation time stamped in.
+        """
+        if not result.ok:
+            # Never stored: the next build renders it again
+            self.failed_documents.append(result.key)
+            return result
+        self.documents_rendered += 1
+        self.render_seconds[result.key] = round(result.elapsed, 4)
+        key = self.document_keys.get(result.key)
+        if key:
+            document_cache.put(
+                key,
+                scope=f"org{self.org.id}-system{self.system.id}-{result.key}",
+                data=result.value.encode("utf-8"),
+                doc_type=result.key,
+                org_id=self.org.id,
+                system_id=self.system.id,
+                generated_at=self.generated_at,
+            )
+        return dataclasses.replace(result, value=self.stamp(result.value))
+
+    def render_documents(
+        self,
+        templates: Mapping[str, str],
+        executor: Optional[RenderExecutor] = None,
+        onboarding_data: Optional[Dict[str, Any]] = None,
+    ) -> Iterator[RenderResult]:
+        """
+        Render several templates concurrently, yielding results in ``templates`` order.
+
+        Documents whose inputs are unchanged since their last render are
+        reused instead of rendered.
+        """
+        executor = executor or RenderExecutor()
+        reused = self.reuse_documents(templates, onboarding_data)
+        pending = {doc_type: name for doc_type, name in templates.items() if doc_type not in reused}
+        rendered = executor.run(self.render_jobs(pending, onboarding_data))
+        for doc_type in templates:
+            if doc_type in reused:
+                yield reused[doc_type]
+                continue
+            yield self.record_result(next(rendered))
+
+    def fingerprint(self, templates: Mapping[str, str], **variant: Any) -> str:
+        """Cache key covering the snapshot, the given templates and the export variant."""
+        templates_dir = self.generator.templates_dir
+        paths = {doc_type: templates_dir / name for doc_type, name in templates.items()}
+        return compute_fingerprint(self.load(), paths, variant)
+
+    @property
+    def complete(self) -> bool:
+        """Whether every document rendered so far succeeded."""
+        return not self.failed_documents
+
+    @property
+    def query_count(self) -> int:
+        """Queries issued since the builder was entered."""
+        return self._counter.count
+
+    def metrics(self) -> Dict[str, int]:
+        """
+        Query and document counters of this build (timings live in ``render_seconds``).
+
+        The split between ``documents_rendered`` and ``documents_reused``
+        depends on what the document cache held, not only on the inputs.
+        """
+        return {
+            "queries": self.query_count,
+            "snapshot_queries": self.snapshot_queries,
+            "documents_rendered": self.documents_rendered,
+            "documents_reused": self.documents_reused,
+        }
+
+    def cache_metadata(self, filename: str) -> Dict[str, Any]:
+        """Metadata stored alongside a cached bundle built by this builder."""
+        return {
+            "filename": filename,
+            "org_id": self.org.id,
+            "system_id": self.system.id,
+            "generated_at": self.generated_at,
+            "build_seconds": self.build_seconds,
+            "metrics": self.metrics(),
+        }
+
+
+class OrgBundleBuilder:
+    """
+    Builds one bundle covering several systems of an organization.
+
+    Snapshots for every system are loaded together with a fixed number of
+    queries, one ``DocumentGenerator`` (and its template environment) is
+    shared, and every system's documents go to the render pool in a single
+    batch. Each system keeps its own ``BundleBuilder`` for per-system work;
+    all of them share this builder's ``generated_at``.
+
+        with OrgBundleBuilder(db, org, systems) as builder:
+            for system_builder, result in builder.render_documents(templates):
+                ...
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        org: Organization,
+        systems: Sequence[AISystem],
+        generator: Optional[DocumentGenerator] = None,
+    ):
+        self.db = db
+        self.org = org
+        self.systems = list(systems)
+        self.generator = generator or DocumentGenerator()
+        self.generated_at = datetime.now(timezone.utc).isoformat()
+        self.builders: List[BundleBuilder] = []
+        self.snapshot_queries = 0
+        self.build_seconds: Optional[float] = None
+        self._counter = QueryCounter(db)
+
+    def __enter__(self) -> "OrgBundleBuilder":
+        self._counter.start()
+        self.load()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._counter.stop()
+
+    def load(self) -> List[BundleBuilder]:
+        """Load every system's snapshot on first use and return the per-system builders."""
+        if not self.builders and self.systems:
+            before = self._counter.count
+            snapshots = DocumentContextService(self.db).load_snapshots(
+                [system.id for system in self.systems], self.org.id
+            )
+            self.snapshot_queries = self._counter.count - before
+            for system in self.systems:
+                if system.id not in snapshots:
+                    continue
+                builder = BundleBuilder(
+                    self.db, system, self.org,
+                    generator=self.generator, snapshot=snapshots[system.id],
+                )
+                builder.generated_at = self.generated_at
+                self.builders.append(builder)
+        return self.builders
+
+    def render_documents(
+        self,
+        templates: Mapping[str, str],
+        executor: Optional[RenderExecutor] = None,
+    ) -> Iterator[Tuple[BundleBuilder, RenderResult]]:
+        """
+        Render ``templates`` for every system in one batch.
+
+        Yields ``(system_builder, result)`` grouped by system in ``systems``
+        order, and by ``templates`` order within a system. Documents whose
+        inputs are unchanged are reused rather than rendered.
+        """
+        executor = executor or RenderExecutor()
+        reused: List[Dict[str, RenderResult]] = []
+        jobs: List[RenderJob] = []
+        for builder in self.load():
+            found = builder.reuse_documents(templates)
+            reused.append(found)
+            pending = {
+                doc_type: name for doc_type, name in templates.items() if doc_type not in found
+            }
+            jobs.extend(builder.render_jobs(pending))
+
+        rendered = executor.run(jobs)
+        for builder, found in zip(self.builders, reused):
+            for doc_type in templates:
+                if doc_type in found:
+                    yield builder, found[doc_type]
+                    continue
+                yield builder, builder.record_result(next(rendered))
+
+    def fingerprint(self, templates: Mapping[str, str], **variant: Any) -> str:
+        """Cache key covering every system's snapshot, the templates and the export variant."""
+        hasher = hashlib.sha256()
+        for builder in self.load():
+            fingerprint = builder.fingerprint(templates, **variant)
+            hasher.update(f"{builder.system.id}:{fingerprint}\n".encode())
+        return hasher.hexdigest()
+
+    @property
+    def complete(self) -> bool:
+        """Whether every document rendered so far, for every system, succeeded."""
+        return all(builder.complete for builder in self.builders)
+
+    @property
+    def query_count(self) -> int:
+        """Queries issued since the builder was entered."""
+        return self._counter.count
+
+    def metrics(self) -> Dict[str, int]:
+        """Query and document counters summed over systems (reuse depends on the document cache)."""
+        return {
+            "queries": self.query_count,
+            "snapshot_queries": self.snapshot_queries,
+            "systems": len(self.builders),
+            "documents_rendered": sum(builder.documents_rendered for builder in self.builders),
+            "documents_reused": sum(builder.documents_reused for builder in self.builders),
+        }
+
+    def cache_metadata(self, filename: str) -> Dict[str, Any]:
+        """Metadata stored alongside a cached bundle built by this builder."""
+        return {
+            "filename": filename,
+            "org_id": self.org.id,
+            "system_ids": [builder.system.id for builder in self.builders],
+            "generated_at": self.generated_at,
+            "build_seconds": self.build_seconds,
+            "metrics": self.metrics(),
+        }
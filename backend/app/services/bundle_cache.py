@@ -0,0 +1,391 @@
+"""
+Content-addressed cache for export bundles.
+
+A bundle is keyed by a fingerprint of every row it is rendered from, the
+template files it uses and the export variant. Any change to a contributing
+row or template yields a new key, so stale bundles are never served; the
+previous bundle for the same system and variant is dropped when the new one
+is stored.
+
+Blobs live on local disk (``BUNDLE_CACHE_DIR``) or, when S3/R2 is configured,
+in the evidence bucket under ``bundle-cache/``.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+from sqlalchemy import inspect as sa_inspect
+
+from app.core.config import settings
+from app.services.document_context import SystemSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Bump when bundle layout changes in a way the inputs do not capture
+BUNDLE_FORMAT_VERSION = "1"
+
+CHUNK_SIZE = 64 * 1024
+
+
+# Change counters: they move with other rows' content, not this row's
+UNFINGERPRINTED_COLUMNS = frozenset({"revision"})
+
+
+def row_state(row: Any) -> Dict[str, Any]:
+    """Column values of an ORM row (relationships and revision counters excluded)."""
+    mapper = sa_inspect(row).mapper
+    return {
+        attr.key: getattr(row, attr.key)
+        for attr in mapper.column_attrs
+        if attr.key not in UNFINGERPRINTED_COLUMNS
+    }
+
+
+_template_digests: Dict[str, Tuple[int, int, str]] = {}
+_template_lock = threading.Lock()
+
+
+def template_digest(path: Path) -> str:
+    """SHA-256 of a template file, cached until its mtime or size changes."""
+    stat = path.stat()
+    key = str(path)
+    with _template_lock:
+        cached = _template_digests.get(key)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    digest = hashlib.sha256(path.read_bytes()).hexdigest()
+    with _template_lock:
+        _template_digests[key] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def compute_fingerprint(
+    snapshot: SystemSnapshot,
+    templates: Mapping[str, Path],
+    variant: Optional[Mapping[str, Any]] = None,
+) -> str:
+    """
+    Hash everything a bundle is built from.
+
+    Covers every column of every snapshot row, the contents of each template
+    file and the export variant (generator version, layout flags).
+    """
+    hasher = hashlib.sha256()
+
+    def feed(label: str, value: Any) -> None:
+        hasher.update(label.encode())
+        hasher.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+    feed("format", BUNDLE_FORMAT_VERSION)
+    feed("variant", dict(variant or {}))
+    feed("org", row_state(snapshot.org))
+    feed("system", row_state(snapshot.system))
+    for name in ("risks", "controls", "evidence", "model_versions", "approvals"):
+        feed(name, [row_state(row) for row in getattr(snapshot, name)])
+    for name in ("oversight", "pmm", "fria", "onboarding_data"):
+        row = getattr(snapshot, name)
+        feed(name, row_state(row) if row is not None else None)
+    for doc_type, path in templates.items():
+        feed(f"template:{doc_type}", template_digest(path))
+
+    return hasher.hexdigest()
+
+
+class LocalBundleStore:
+    """Bundle blobs and metadata on local disk."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, name: str) -> Path:
+        return self.root / name
+
+    def exists(self, name: str) -> bool:
+        return self._path(name).exists()
+
+    def read_json(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            return json.loads(self._path(name).read_text())
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def write_json(self, name: str, data: Dict[str, Any]) -> None:
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(data, sort_keys=True))
+        os.replace(tmp, path)
+
+    def put_file(self, name: str, src: Path) -> None:
+        path = self._path(name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src, path)
+
+    def iter_bytes(self, name: str) -> Iterator[bytes]:
+        with open(self._path(name), "rb") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    def delete(self, name: str) -> None:
+        try:
+            self._path(name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def temp_dir(self) -> Path:
+        self.root.mkdir(parents=True, exist_ok=True)
+        return self.root
+
+    def local_path(self, name: str) -> Optional[Path]:
+        """Path of a stored blob, for serving it straight from disk."""
+        return self._path(name)
+
+    def presigned_url(self, name: str, filename: str) -> Optional[str]:
+        return None
+
+
+class S3BundleStore:
+    """Bundle blobs and metadata in the configured S3/R2 bucket."""
+
+    def __init__(self, client, bucket: str, prefix: str = "bundle-cache/"):
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, name: str) -> str:
+        return f"{self.prefix}{name}"
+
+    def exists(self, name: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(name))
+            return True
+        except Exception:
+            return False
+
+    def read_json(self, name: str) -> Optional[Dict[str, Any]]:
+        try:
+            body = self.client.get_object(Bucket=self.bucket, Key=self._key(name))["Body"]
+            return json.loads(body.read())
+        except Exception:
+            return None
+
+    def write_json(self, name: str, data: Dict[str, Any]) -> None:
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._key(name),
+            Body=json.dumps(data, sort_keys=True).encode(),
+            ContentType="application/json",
+        )
+
+    def put_file(self, name: str, src: Path) -> None:
+        try:
+            self.client.upload_file(str(src), self.bucket, self._key(name))
+        finally:
+            src.unlink(missing_ok=True)
+
+    def iter_bytes(self, name: str) -> Iterator[bytes]:
+        body = self.client.get_object(Bucket=self.bucket, Key=self._key(name))["Body"]
+        yield from body.iter_chunks(CHUNK_SIZE)
+
+    def delete(self, name: str) -> None:
+        try:
+            self.client.delete_object(Bucket=self.bucket, Key=self._key(name))
+        except Exception:
+            pass
+
+    def temp_dir(self) -> Optional[Path]:
+        return None
+
+    def local_path(self, name: str) -> Optional[Path]:
+        return None
+
+    def presigned_url(self, name: str, filename: str) -> Optional[str]:
+        """Time-limited GET URL for a blob, downloaded as ``filename`` (``S3_URL_EXP_MIN``)."""
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": self._key(name),
+                "ResponseContentDisposition": f"attachment; filename={filename}",
+            },
+            ExpiresIn=settings.S3_URL_EXP_MIN * 60,
+        )
+
+
+class BundleCacheWriter:
+    """
+    Spools a bundle to a temp file while it streams, then stores it.
+
+    Hashes bytes as they are written, so committing needs no second pass.
+    Anything not committed is discarded by ``abort``.
+    """
+
+    def __init__(self, cache: "BundleCache", key: str, scope: str, store):
+        self.cache = cache
+        self.key = key
+        self.scope = scope
+        self.store = store
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self._file = tempfile.NamedTemporaryFile(
+            prefix=".bundle-", suffix=".part", dir=store.temp_dir(), delete=False
+        )
+        self._done = False
+
+    def write(self, data: bytes) -> None:
+        if data:
+            self._file.write(data)
+            self._hash.update(data)
+            self.size += len(data)
+
+    def commit(self, **meta: Any) -> Dict[str, Any]:
+        """Store the spooled bundle with its metadata and return the metadata."""
+        self._file.close()
+        self._done = True
+        record = {
+            "key": self.key,
+            "scope": self.scope,
+            "sha256": self._hash.hexdigest(),
+            "bytes": self.size,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            **meta,
+        }
+        return self.cache._store_entry(
+            self.store, self.key, self.scope, Path(self._file.name), record
+        )
+
+    def abort(self) -> None:
+        if self._done:
+            return
+        self._done = True
+        self._file.close()
+        Path(self._file.name).unlink(missing_ok=True)
+
+
+class BundleCache:
+    """
+    Content-addressed bundle store with one live entry per scope.
+
+    ``namespace`` and ``suffix`` place entries of another kind (e.g. rendered
+    documents) alongside bundles without sharing keys or scopes.
+    """
+
+    def __init__(self, store=None, namespace: str = "", suffix: str = ".zip"):
+        self._store = store
+        self.namespace = namespace
+        self.suffix = suffix
+        self._lock = threading.Lock()
+
+    def blob_name(self, key: str) -> str:
+        """Store name of an entry's blob."""
+        return f"{self.namespace}{key}{self.suffix}"
+
+    def _meta(self, key: str) -> str:
+        return f"{self.namespace}{key}.json"
+
+    def _scope(self, scope: str) -> str:
+        return f"{self.namespace}scopes/{scope}.json"
+
+    @property
+    def store(self):
+        """Explicit store, else S3 when configured, else ``BUNDLE_CACHE_DIR``."""
+        if self._store is not None:
+            return self._store
+        if settings.use_s3:
+            from app.services.s3 import s3_service
+            return S3BundleStore(s3_service.client, settings.S3_BUCKET)
+        return LocalBundleStore(Path(settings.BUNDLE_CACHE_DIR))
+
+    @property
+    def enabled(self) -> bool:
+        return settings.BUNDLE_CACHE_ENABLED
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Metadata for a stored bundle, or None on a miss."""
+        if not self.enabled:
+            return None
+        store = self.store
+        meta = store.read_json(self._meta(key))
+        if meta and store.exists(self.blob_name(key)):
+            return meta
+        return None
+
+    def open(self, key: str) -> Iterator[bytes]:
+        """Stream a stored bundle's bytes."""
+        return self.store.iter_bytes(self.blob_name(key))
+
+    def read(self, key: str) -> bytes:
+        """A stored entry's bytes in one piece (for small entries)."""
+        return b"".join(self.open(key))
+
+    def put(self, key: str, scope: str, data: bytes, **meta: Any) -> Optional[Dict[str, Any]]:
+        """Store a small in-memory entry under ``key``; its metadata, or None with caching off."""
+        writer = self.writer(key, scope)
+        if writer is None:
+            return None
+        try:
+            writer.write(data)
+            return writer.commit(**meta)
+        finally:
+            writer.abort()
+
+    def writer(self, key: str, scope: str) -> Optional[BundleCacheWriter]:
+        """Writer that stores a bundle under ``key``, or None when caching is off."""
+        if not self.enabled:
+            return None
+        return BundleCacheWriter(self, key, scope, self.store)
+
+    def invalidate(self, scope: str) -> None:
+        """Drop the live bundle for a scope."""
+        store = self.store
+        with self._lock:
+            pointer = store.read_json(self._scope(scope))
+            if pointer:
+                self._delete_entry(store, pointer["key"])
+                store.delete(self._scope(scope))
+
+    def _store_entry(
+        self, store, key: str, scope: str, src: Path, meta: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        # Blob first, then metadata: a readable .json always has its blob
+        store.put_file(self.blob_name(key), src)
+        store.write_json(self._meta(key), meta)
+        with self._lock:
+            pointer = store.read_json(self._scope(scope))
+            store.write_json(self._scope(scope), {"key": key})
+        if pointer and pointer["key"] != key:
+            self._delete_entry(store, pointer["key"])
+            logger.info(f"Bundle cache: replaced {pointer['key'][:12]} with {key[:12]} for {scope}")
+        return meta
+
+    def _delete_entry(self, store, key: str) -> None:
+        store.delete(self._meta(key))
+        store.delete(self.blob_name(key))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison of an ``If-None-Match`` header against ``etag``."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((tag[2:] if tag.startswith("W/") else tag) == opaque for tag in candidates)
+
+
+# Global bundle cache instance
+bundle_cache = BundleCache()
+
+# Rendered documents, keyed by per-document input fingerprint (see document_dependencies)
+document_cache = BundleCache(namespace="documents/", suffix=".md")
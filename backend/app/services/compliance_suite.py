@@ -15,18 +15,29 @@ import hashlib
 import json
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import BinaryIO, Dict, List, Optional, Tuple, Union
 
-from jinja2 import Environment, FileSystemLoader
 from sqlalchemy.orm import Session
 
 from app.core.config import settings
-from app.services.document_generator import WEASYPRINT_AVAILABLE
+from app.services.docx_export import markdown_to_docx
+from app.services.pdf_renderer import WEASYPRINT_AVAILABLE, pdf_renderer, register_stylesheet
+from app.services.template_registry import template_registry
 from app.models import (
     AISystem,
     Organization,
 )
 
+# Parsed once per PDF worker (see pdf_renderer.register_stylesheet)
+SUITE_PDF_CSS = register_stylesheet('''
+    body { font-family: Arial, sans-serif; margin: 40px; }
+    h1 { color: #333; border-bottom: 2px solid #333; }
+    h2 { color: #666; }
+    h3 { color: #999; }
+    p { line-height: 1.6; }
+    code { background-color: #f5f5f5; padding: 2px 4px; }
+''')
+
 
 class ComplianceSuiteService:
     """Service for generating compliance documents from templates."""
@@ -45,10 +56,7 @@ class ComplianceSuiteService:
         # Make templates_dir relative to the project root
         project_root = Path(__file__).parent.parent.parent.parent
         self.templates_dir = project_root / settings.TEMPLATES_DIR
-        self.jinja_env = Environment(
-            loader=FileSystemLoader(self.templates_dir),
-            autoescape=True
-        )
+        self.jinja_env = template_registry.environment(self.templates_dir)
     
     def _add_footer(self, content: str) -> str:
         """Add compliance footer to document content."""
@@ -122,9 +130,9 @@ Generated: {timestamp}
     ) -> Dict:
         """Generate a single document with evidence-grounded content."""
         
-        # Load template using the mapping
+        # Load template using the mapping (an unknown template raises here)
         template_name = self.TEMPLATE_MAPPING.get(doc_type, f"{doc_type}.md")
-        template = self.jinja_env.get_template(template_name)
+        template_registry.get_template(self.templates_dir, template_name)
         
         # Get evidence-grounded content
         sections = self._get_evidence_grounded_sections(
@@ -136,7 +144,7 @@ Generated: {timestamp}
         
         # Render document
         try:
-            content = template.render(**template_vars)
+            content = template_registry.render(self.templates_dir, template_name, template_vars)
             # Add footer with hash and timestamp
             content = self._add_footer(content)
         except Exception as e:
@@ -426,7 +434,7 @@ Generated: {timestamp}
         system_id: Optional[int], 
         doc_type: str, 
         format: str
-    ) -> Tuple[str, bytes, Dict[str, Dict]]:
+    ) -> Tuple[str, Union[bytes, BinaryIO], Dict[str, Dict]]:
         """
         Export a document in the specified format.
         
@@ -438,7 +446,8 @@ Generated: {timestamp}
             format: Export format (md, docx, pdf)
             
         Returns:
-            Tuple of (filename, content_bytes)
+            Tuple of (filename, content, sections); DOCX content is a rewound
+            file object to stream, other formats are bytes
         """
         
         # Validate system ownership if system_id provided
@@ -479,41 +488,9 @@ Generated: {timestamp}
         else:
             raise ValueError(f"Unsupported format: {format}")
     
-    def _convert_to_docx(self, content: str, filename: str) -> Tuple[str, bytes]:
-        """Convert markdown content to DOCX format."""
-        try:
-            from docx import Document
-            from docx.shared import Inches
-            
-            doc = Document()
-            
-            # Split content into lines
-            lines = content.split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                if line.startswith('# '):
-                    doc.add_heading(line[2:], level=1)
-                elif line.startswith('## '):
-                    doc.add_heading(line[3:], level=2)
-                elif line.startswith('### '):
-                    doc.add_heading(line[4:], level=3)
-                else:
-                    doc.add_paragraph(line)
-            
-            # Save to bytes
-            import io
-            bio = io.BytesIO()
-            doc.save(bio)
-            bio.seek(0)
-            
-            return filename, bio.getvalue()
-            
-        except ImportError:
-            raise ValueError("python-docx not available for DOCX export")
+    def _convert_to_docx(self, content: str, filename: str) -> Tuple[str, BinaryIO]:
+        """Convert markdown content to DOCX in a spooled temporary file (see docx_export)."""
+        return filename, markdown_to_docx(content)
     
     def _convert_to_pdf(self, content: str, filename: str) -> Tuple[str, bytes]:
         """Convert markdown content to PDF format."""
@@ -525,24 +502,12 @@ Generated: {timestamp}
                 raise ValueError("PDF export is disabled")
             
             import markdown
-            from weasyprint import CSS, HTML
             
             # Convert markdown to HTML
             html_content = markdown.markdown(content)
             
-            # Add CSS styling
-            css = CSS(string='''
-                body { font-family: Arial, sans-serif; margin: 40px; }
-                h1 { color: #333; border-bottom: 2px solid #333; }
-                h2 { color: #666; }
-                h3 { color: #999; }
-                p { line-height: 1.6; }
-                code { background-color: #f5f5f5; padding: 2px 4px; }
-            ''')
-            
-            # Generate PDF
-            html_doc = HTML(string=html_content)
-            pdf_bytes = html_doc.write_pdf(stylesheets=[css])
+            # Render on the PDF workers (may raise PdfQueueFullError)
+            pdf_bytes = pdf_renderer.render_html(html_content, SUITE_PDF_CSS)
             
             return filename, pdf_bytes
             
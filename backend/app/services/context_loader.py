@@ -0,0 +1,138 @@
+"""
+Context Loader
+
+Reads the per-system tables of a document snapshot in at most two
+statements, so a snapshot costs three round trips (org and systems, then the
+sections) instead of one per table, which is what dominates its load time on
+a networked Postgres. The tables that grow with the number of controls share
+one statement and the small per-system tables another, so the large rows are
+not padded with entities they can never hold.
+
+Each table is a branch of a UNION ALL over shared column slots. Primary keys
+get a slot of their own, so in any row exactly one table's key is set; other
+columns share slots with same-typed columns of other tables, which keeps the
+rows about as wide as the widest table. The ORM loads one aliased entity per
+table from the union and yields ``None`` for the tables a row is not from,
+so instances land in the identity map exactly as with per-table queries.
+
+The statement for a set of sections is built once and reused, so SQLAlchemy
+compiles it once per process. Databases other than SQLite and Postgres get
+one query per table instead.
+"""
+
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, List, Sequence, Tuple, Type
+
+from sqlalchemy import and_, bindparam, cast, func, null, select, union_all
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy.sql import Select
+
+from app.models import (
+    FRIA,
+    PMM,
+    AIRisk,
+    Control,
+    DocumentApproval,
+    Evidence,
+    ModelVersion,
+    OnboardingData,
+    Oversight,
+)
+
+SINGLE_QUERY_DIALECTS = frozenset({"sqlite", "postgresql"})
+
+# model and ORDER BY of one section
+SectionQuery = Tuple[Type[Any], Tuple[Any, ...]]
+
+# Table and row order behind each snapshot section
+SECTION_QUERIES: Dict[str, SectionQuery] = {
+    "risks": (AIRisk, (AIRisk.id,)),
+    "controls": (Control, (Control.iso_clause, Control.id)),
+    "oversight": (Oversight, (Oversight.id,)),
+    "pmm": (PMM, (PMM.id,)),
+    "evidence": (Evidence, (Evidence.id,)),
+    # Latest FRIA first
+    "fria": (FRIA, (FRIA.created_at.desc(), FRIA.id.desc())),
+    "onboarding_data": (OnboardingData, (OnboardingData.id,)),
+    "model_versions": (ModelVersion, (ModelVersion.released_at.desc(), ModelVersion.id.desc())),
+    "approvals": (DocumentApproval, (DocumentApproval.id,)),
+}
+
+# Sections read together; each group is one statement
+SECTION_GROUPS: Tuple[FrozenSet[str], ...] = (
+    frozenset({"risks", "controls", "evidence"}),
+    frozenset({"oversight", "pmm", "fria", "onboarding_data", "model_versions", "approvals"}),
+)
+
+
+def supports_union_loading(session: Session) -> bool:
+    """True if this session's database can read sections with UNION ALL statements."""
+    return session.get_bind().dialect.name in SINGLE_QUERY_DIALECTS
+
+
+def load_sections(
+    session: Session,
+    sections: FrozenSet[str],
+    system_ids: Sequence[int],
+    org_id: int,
+) -> Dict[str, List[Any]]:
+    """Rows of each section for some systems of one org, one statement per group, in order."""
+    loaded: Dict[str, List[Any]] = {}
+    params = {"system_ids": list(system_ids), "org_id": org_id}
+    for group in SECTION_GROUPS:
+        names = tuple(sorted(group & sections))
+        if not names:
+            continue
+        loaded.update((name, []) for name in names)
+        for row in session.execute(sections_statement(names), params):
+            for name, instance in zip(names, row):
+                if instance is not None:
+                    loaded[name].append(instance)
+                    break
+    return loaded
+
+
+@lru_cache(maxsize=128)
+def sections_statement(names: Tuple[str, ...]) -> Select:
+    """ORM select of one aliased entity per section over the UNION ALL of their tables."""
+    models = [SECTION_QUERIES[name][0] for name in names]
+
+    # Slot of each column: keys alone, the rest shared by type across tables
+    slots: List[Any] = []
+    slot_of: Dict[Any, int] = {}
+    for model in models:
+        taken: Dict[Any, int] = {}
+        for col in model.__table__.columns:
+            if col.primary_key:
+                slot_of[col] = len(slots)
+                slots.append((None, col.type))
+                continue
+            kind = type(col.type)
+            shared = [n for n, (slot_kind, _) in enumerate(slots) if slot_kind is kind]
+            index = taken.get(kind, 0)
+            taken[kind] = index + 1
+            if index < len(shared):
+                slot_of[col] = shared[index]
+            else:
+                slot_of[col] = len(slots)
+                slots.append((kind, col.type))
+
+    branches = []
+    for name, model in zip(names, models):
+        order_by = SECTION_QUERIES[name][1]
+        own = {slot_of[col]: col for col in model.__table__.columns}
+        branches.append(
+            select(
+                func.row_number().over(order_by=order_by).label("position"),
+                *[
+                    (own[n] if n in own else cast(null(), type_)).label(f"c{n}")
+                    for n, (_, type_) in enumerate(slots)
+                ],
+            ).where(and_(
+                model.system_id.in_(bindparam("system_ids", expanding=True)),
+                model.org_id == bindparam("org_id"),
+            ))
+        )
+    union = union_all(*branches).subquery()
+    # Each alias picks its own columns out of the shared slots
+    return select(*[aliased(model, union) for model in models]).order_by(union.c.position)
@@ -0,0 +1,99 @@
+"""
+Control Evidence Loader
+
+Loads controls together with their evidence for any set of systems in two
+queries and groups the evidence in memory, so exports that list evidence per
+control do not issue one query per control. The loader reads read models
+(``ControlRow``, ``EvidenceRow``); snapshots group their ORM rows the same
+way.
+"""
+
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.orm import Session
+
+from app.models import Control, Evidence
+from app.services.read_models import ControlRow, EvidenceRow, load, select_rows
+
+if TYPE_CHECKING:
+    from app.services.document_context import SystemSnapshot
+
+
+class ControlEvidence:
+    """
+    Controls of one or more systems with their evidence grouped in memory.
+
+    Evidence is indexed two ways: by ``control_id`` (evidence linked to a
+    control) and by ``system_id``, with the ISO clauses and control names
+    each system's evidence cites (used to match controls for coverage). Both
+    are built in one pass, so lookups stay constant-time however much
+    evidence a system has.
+    """
+
+    def __init__(self, controls: Iterable[Control], evidence: Iterable[Evidence]):
+        self.controls: List[Control] = list(controls)
+        self._by_system: Dict[int, List[Control]] = defaultdict(list)
+        for control in self.controls:
+            self._by_system[control.system_id].append(control)
+
+        self._by_control: Dict[int, List[Evidence]] = defaultdict(list)
+        self._cited: Dict[int, Set[Tuple[str, Any]]] = defaultdict(set)
+        for ev in evidence:
+            if ev.control_id is not None:
+                self._by_control[ev.control_id].append(ev)
+            self._cited[ev.system_id].update(
+                (("clause", ev.iso42001_clause), ("name", ev.control_name))
+            )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: "SystemSnapshot") -> "ControlEvidence":
+        """Group an already-loaded snapshot's controls and evidence without querying."""
+        return cls(snapshot.controls, snapshot.evidence)
+
+    def controls_for(self, system_id: int) -> List[Control]:
+        """Controls of a system, in load order."""
+        return self._by_system.get(system_id, [])
+
+    def evidence_for(self, control: Control) -> List[Evidence]:
+        """Evidence linked to a control via ``control_id``, by id."""
+        return self._by_control.get(control.id, [])
+
+    def is_covered(self, control: Control) -> bool:
+        """True if any evidence of the control's system matches its ISO clause or name."""
+        cited = self._cited.get(control.system_id, ())
+        return ("clause", control.iso_clause) in cited or ("name", control.name) in cited
+
+    def coverage(self, system_id: int) -> float:
+        """Fraction of a system's controls with matching evidence (0.0 without controls)."""
+        controls = self.controls_for(system_id)
+        if not controls:
+            return 0.0
+        return sum(1 for control in controls if self.is_covered(control)) / len(controls)
+
+
+def load_control_evidence(
+    db: Session,
+    org_id: int,
+    system_ids: Sequence[int],
+    order_by: Optional[Sequence] = None,
+) -> ControlEvidence:
+    """
+    Load the controls of ``system_ids`` and their evidence in two queries.
+
+    Controls are ordered by ``order_by`` (default: id). Evidence covers both
+    rows linked to one of the controls and rows of the systems themselves.
+    Both are read models, not session-tracked ORM rows.
+    """
+    controls = load(
+        db, ControlRow,
+        select_rows(ControlRow, org_id, system_ids, order_by=order_by or (Control.id,)),
+    )
+    control_ids = select(Control.id).where(
+        Control.org_id == org_id, Control.system_id.in_(system_ids)
+    )
+    evidence = load(db, EvidenceRow, select_rows(EvidenceRow, org_id).where(
+        or_(Evidence.system_id.in_(system_ids), Evidence.control_id.in_(control_ids))
+    ))
+    return ControlEvidence(controls, evidence)
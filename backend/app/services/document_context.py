@@ -6,15 +6,162 @@ This service queries all relevant tables and returns structured context
 for Jinja2 templates to use real data instead of boilerplate.
 """
 
-from typing import Dict, List, Optional, Any
+from collections import defaultdict
+from collections.abc import Sequence as SequenceABC
+from dataclasses import dataclass
+from functools import cached_property, partial
+from typing import Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Any, Sequence, Tuple
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, select
 
 from app.models import (
     Organization, AISystem, AIRisk, Control, Oversight, PMM, 
     Evidence, FRIA, OnboardingData, ModelVersion, DocumentApproval
 )
+from app.services.context_loader import SECTION_QUERIES, load_sections, supports_union_loading
+from app.services.control_evidence import ControlEvidence
+from app.services.row_cache import row_cache
+
+# Snapshot fields loaded from their own table; org and system are always loaded
+ALL_SECTIONS: FrozenSet[str] = frozenset({
+    "risks", "controls", "oversight", "pmm", "evidence", "fria",
+    "onboarding_data", "model_versions", "approvals",
+})
+
+
+@dataclass(frozen=True)
+class SystemSnapshot:
+    """
+    Read-only data graph for one system.
+    
+    Loaded once per bundle and shared by every template, so rendering N
+    documents costs one set of queries instead of N. Sections left out of
+    ``sections`` were not queried and read as empty.
+    """
+    org: Organization
+    system: AISystem
+    risks: Tuple[AIRisk, ...]
+    controls: Tuple[Control, ...]
+    oversight: Optional[Oversight]
+    pmm: Optional[PMM]
+    evidence: Tuple[Evidence, ...]
+    fria: Optional[FRIA]
+    onboarding_data: Optional[OnboardingData]
+    model_versions: Tuple[ModelVersion, ...]
+    approvals: Tuple[DocumentApproval, ...]
+    sections: FrozenSet[str] = ALL_SECTIONS
+    
+    def approval_for(self, doc_type: Optional[str]) -> Optional[DocumentApproval]:
+        """First approval recorded for a document type, if any."""
+        if not doc_type:
+            return None
+        for approval in self.approvals:
+            if approval.doc_type == doc_type:
+                return approval
+        return None
+    
+    @cached_property
+    def control_evidence(self) -> ControlEvidence:
+        """Evidence grouped by control, indexed once and shared by every context built from this snapshot."""
+        return ControlEvidence.from_snapshot(self)
+
+
+class ContextSection(SequenceABC):
+    """
+    Template rows built from snapshot rows as they are read.
+    
+    Supports what templates do with a list (iterate, ``|length``, index,
+    slice, truth test) but keeps only the ORM rows: each iteration yields
+    freshly built dicts one at a time, so a large section is never held as
+    dicts in full and templates cannot change each other's view of it.
+    """
+    __slots__ = ("_rows", "_build")
+    
+    def __init__(self, rows: Sequence[Any], build: Callable[[Any], Dict[str, Any]]):
+        self._rows = rows
+        self._build = build
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ContextSection(self._rows[index], self._build)
+        return self._build(self._rows[index])
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return map(self._build, self._rows)
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (SequenceABC, list)) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+    
+    __hash__ = None  # type: ignore[assignment]
+    
+    def __repr__(self) -> str:
+        return f"ContextSection({len(self)} rows)"
+
+
+def _risk_row(risk: AIRisk) -> Dict[str, Any]:
+    return {
+        "id": risk.id,
+        "description": risk.description or "Risk not described",
+        "likelihood": risk.likelihood or "M",
+        "impact": risk.impact or "M", 
+        "mitigation": risk.mitigation or "Mitigation not defined",
+        "residual_risk": risk.residual_risk or "Medium",
+        "owner_email": risk.owner_email or "owner@company.com",
+        "priority": risk.priority or "medium",
+        "due_date": risk.due_date.isoformat() if risk.due_date else None
+    }
+
+
+def _linked_evidence_row(ev: Evidence) -> Dict[str, Any]:
+    return {
+        "id": ev.id,
+        "label": ev.label or "Evidence",
+        "file_path": ev.file_path or "",
+        "checksum": ev.checksum or "",
+        "version": ev.version or "1.0"
+    }
+
+
+def _control_row(links: ControlEvidence, control: Control) -> Dict[str, Any]:
+    return {
+        "id": control.id,
+        "iso_clause": control.iso_clause or "A.1.1",
+        "name": control.name or "Control not named",
+        "priority": control.priority or "medium",
+        "status": control.status or "missing",
+        "owner_email": control.owner_email or "owner@company.com",
+        "due_date": control.due_date.isoformat() if control.due_date else None,
+        "rationale": control.rationale or "Rationale not provided",
+        "evidence": ContextSection(links.evidence_for(control), _linked_evidence_row)
+    }
+
+
+def _evidence_row(ev: Evidence) -> Dict[str, Any]:
+    return {
+        "id": ev.id,
+        "label": ev.label or "Evidence",
+        "file_path": ev.file_path or "",
+        "checksum": ev.checksum or "",
+        "version": ev.version or "1.0",
+        "control_id": ev.control_id,
+        "iso_clause": ev.iso42001_clause or "A.1.1"
+    }
+
+
+def _model_version_row(version: ModelVersion) -> Dict[str, Any]:
+    return {
+        "version": version.version,
+        "released_at": version.released_at.isoformat() if version.released_at else None,
+        "approver_email": version.approver_email,
+        "notes": version.notes,
+        "artifact_hash": version.artifact_hash
+    }
 
 
 class DocumentContextService:
@@ -23,7 +170,8 @@ class DocumentContextService:
     def __init__(self, db: Session):
         self.db = db
     
-    def build_system_context(self, system_id: int, org_id: int, doc_type: Optional[str] = None) -> Dict[str, Any]:
+    def build_system_context(self, system_id: int, org_id: int, doc_type: Optional[str] = None,
+                             sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
         """
         Build complete context for a system including:
         - Company/org data
@@ -34,73 +182,145 @@ class DocumentContextService:
         - PMM
         - Evidence links
         - FRIA (if exists)
-        """
         
-        # Get organization data
-        org = self.db.query(Organization).filter(Organization.id == org_id).first()
-        if not org:
-            raise ValueError(f"Organization {org_id} not found")
-        
-        # Get system data
-        system = self.db.query(AISystem).filter(
-            and_(AISystem.id == system_id, AISystem.org_id == org_id)
-        ).first()
-        if not system:
+        Pass ``sections`` to load only the tables a template reads.
+        """
+        snapshot = self.load_snapshot(system_id, org_id, sections)
+        return self.build_context_from_snapshot(snapshot, doc_type)
+    
+    def load_snapshot(self, system_id: int, org_id: int, sections: Optional[Iterable[str]] = None) -> SystemSnapshot:
+        """Load every table a document template can read (or just ``sections``) for one system."""
+        snapshots = self.load_snapshots([system_id], org_id, sections)
+        if system_id not in snapshots:
             raise ValueError(f"System {system_id} not found for org {org_id}")
+        return snapshots[system_id]
+    
+    def load_snapshots(self, system_ids: Sequence[int], org_id: int,
+                       sections: Optional[Iterable[str]] = None) -> Dict[int, SystemSnapshot]:
+        """
+        Load snapshots for several systems of one org in at most three statements.
         
-        # Get risks
-        risks = self.db.query(AIRisk).filter(
-            and_(AIRisk.system_id == system_id, AIRisk.org_id == org_id)
-        ).all()
+        The org and its systems are read together, then the requested tables
+        for all systems in at most two UNION ALL statements (see
+        ``context_loader``; one query per table on databases it does not
+        support), grouped in memory. Tables the request already read come
+        from its ``row_cache``, and loaded ones are added to it. The count grows with neither the number
+        of systems nor of tables. Systems that do not exist or belong to
+        another org are left out of the result.
+        Only the tables named in ``sections`` are read (all by default).
+        """
+        sections = ALL_SECTIONS if sections is None else frozenset(sections) & ALL_SECTIONS
         
-        # Get controls
-        controls = self.db.query(Control).filter(
-            and_(Control.system_id == system_id, Control.org_id == org_id)
-        ).order_by(Control.iso_clause).all()
+        # Organization and its requested systems in one statement
+        found = self.db.execute(
+            select(Organization, AISystem)
+            .outerjoin(AISystem, and_(AISystem.org_id == Organization.id, AISystem.id.in_(system_ids)))
+            .where(Organization.id == org_id)
+            .order_by(AISystem.id)
+        ).all()
+        if not found:
+            raise ValueError(f"Organization {org_id} not found")
+        org = found[0][0]
+        systems = [system for _, system in found if system is not None]
+        ids = [system.id for system in systems]
+        if not ids:
+            return {}
         
-        # Get oversight
-        oversight = self.db.query(Oversight).filter(
-            and_(Oversight.system_id == system_id, Oversight.org_id == org_id)
-        ).first()
+        # Sections already read in this request come from the row cache; the
+        # rest in at most two more statements where the database allows it
+        cache = row_cache(self.db)
+        cache.prime(AISystem, org_id, ids, systems)
+        loaded: Dict[str, List[Any]] = {}
+        for section in sections:
+            cached = cache.cached(SECTION_QUERIES[section][0], org_id, ids)
+            if cached is not None:
+                loaded[section] = cached
+        missing = sections - loaded.keys()
+        if supports_union_loading(self.db):
+            fetched = load_sections(self.db, missing, ids, org_id)
+        else:
+            fetched = {}
+            for section in missing:
+                model, order_by = SECTION_QUERIES[section]
+                fetched[section] = self.db.query(model).filter(
+                    and_(model.system_id.in_(ids), model.org_id == org_id)
+                ).order_by(*order_by).all()
+        for section, section_rows in fetched.items():
+            cache.prime(SECTION_QUERIES[section][0], org_id, ids, section_rows, miss=True)
+        loaded.update(fetched)
         
-        # Get PMM
-        pmm = self.db.query(PMM).filter(
-            and_(PMM.system_id == system_id, PMM.org_id == org_id)
-        ).first()
+        def rows(section) -> Dict[int, List[Any]]:
+            grouped: Dict[int, List[Any]] = defaultdict(list)
+            for row in loaded.get(section, ()):
+                grouped[row.system_id].append(row)
+            return grouped
         
-        # Get evidence
-        evidence = self.db.query(Evidence).filter(
-            and_(Evidence.system_id == system_id, Evidence.org_id == org_id)
-        ).all()
+        def first(grouped: Dict[int, List[Any]], system_id: int) -> Optional[Any]:
+            found = grouped.get(system_id)
+            return found[0] if found else None
         
-        # Get FRIA (latest)
-        fria = self.db.query(FRIA).filter(
-            and_(FRIA.system_id == system_id, FRIA.org_id == org_id)
-        ).order_by(FRIA.created_at.desc()).first()
+        risks = rows("risks")
+        controls = rows("controls")
+        oversight = rows("oversight")
+        pmm = rows("pmm")
+        evidence = rows("evidence")
+        fria = rows("fria")
+        onboarding_data = rows("onboarding_data")
+        model_versions = rows("model_versions")
+        # All document approvals (looked up per doc_type when building context)
+        approvals = rows("approvals")
         
-        # Get onboarding data
-        onboarding_data = self.db.query(OnboardingData).filter(
-            and_(OnboardingData.system_id == system_id, OnboardingData.org_id == org_id)
-        ).first()
+        return {
+            system.id: SystemSnapshot(
+                org=org,
+                system=system,
+                risks=tuple(risks.get(system.id, ())),
+                controls=tuple(controls.get(system.id, ())),
+                oversight=first(oversight, system.id),
+                pmm=first(pmm, system.id),
+                evidence=tuple(evidence.get(system.id, ())),
+                fria=first(fria, system.id),
+                onboarding_data=first(onboarding_data, system.id),
+                model_versions=tuple(model_versions.get(system.id, ())),
+                approvals=tuple(approvals.get(system.id, ())),
+                sections=sections,
+            )
+            for system in systems
+        }
+    
+    def build_context_from_snapshot(
+        self,
+        snapshot: SystemSnapshot,
+        doc_type: Optional[str] = None,
+        generated_at: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Build template context from an already-loaded snapshot.
         
-        # Get model versions
-        model_versions = self.db.query(ModelVersion).filter(
-            and_(ModelVersion.system_id == system_id, ModelVersion.org_id == org_id)
-        ).order_by(ModelVersion.released_at.desc()).all()
+        Issues no queries. Each call returns a fresh dict, so templates cannot
+        affect each other's view of the data. Risks, controls (with their
+        evidence), evidence and model versions are ``ContextSection``s, built
+        row by row as the template reads them. Pass ``generated_at`` to stamp
+        every document of a bundle with the same time.
+        """
+        org = snapshot.org
+        system = snapshot.system
+        system_id = system.id
+        org_id = org.id
+        risks = snapshot.risks
+        controls = snapshot.controls
+        oversight = snapshot.oversight
+        pmm = snapshot.pmm
+        evidence = snapshot.evidence
+        fria = snapshot.fria
+        model_versions = snapshot.model_versions
+        links = snapshot.control_evidence
         
         # Get latest version
         latest_version = model_versions[0] if model_versions else None
         
         # Get approval for specific document type (if provided)
-        approval = None
-        if doc_type:
-            approval = self.db.query(DocumentApproval).filter(
-                and_(
-                    DocumentApproval.system_id == system_id,
-                    DocumentApproval.org_id == org_id,
-                    DocumentApproval.doc_type == doc_type
-                )
-            ).first()
+        approval = snapshot.approval_for(doc_type)
         
         # Build context with defaults for missing data
         context = {
@@ -147,45 +367,10 @@ class DocumentContextService:
             },
             
             # Risks
-            "risks": [
-                {
-                    "id": risk.id,
-                    "description": risk.description or "Risk not described",
-                    "likelihood": risk.likelihood or "M",
-                    "impact": risk.impact or "M", 
-                    "mitigation": risk.mitigation or "Mitigation not defined",
-                    "residual_risk": risk.residual_risk or "Medium",
-                    "owner_email": risk.owner_email or "owner@company.com",
-                    "priority": risk.priority or "medium",
-                    "due_date": risk.due_date.isoformat() if risk.due_date else None
-                }
-                for risk in risks
-            ],
+            "risks": ContextSection(risks, _risk_row),
             
             # Controls
-            "controls": [
-                {
-                    "id": control.id,
-                    "iso_clause": control.iso_clause or "A.1.1",
-                    "name": control.name or "Control not named",
-                    "priority": control.priority or "medium",
-                    "status": control.status or "missing",
-                    "owner_email": control.owner_email or "owner@company.com",
-                    "due_date": control.due_date.isoformat() if control.due_date else None,
-                    "rationale": control.rationale or "Rationale not provided",
-                    "evidence": [
-                        {
-                            "id": ev.id,
-                            "label": ev.label or "Evidence",
-                            "file_path": ev.file_path or "",
-                            "checksum": ev.checksum or "",
-                            "version": ev.version or "1.0"
-                        }
-                        for ev in evidence if ev.control_id == control.id
-                    ]
-                }
-                for control in controls
-            ],
+            "controls": ContextSection(controls, partial(_control_row, links)),
             
             # Oversight
             "oversight": {
@@ -238,18 +423,7 @@ class DocumentContextService:
             },
             
             # Evidence
-            "evidence": [
-                {
-                    "id": ev.id,
-                    "label": ev.label or "Evidence",
-                    "file_path": ev.file_path or "",
-                    "checksum": ev.checksum or "",
-                    "version": ev.version or "1.0",
-                    "control_id": ev.control_id,
-                    "iso_clause": ev.iso42001_clause or "A.1.1"
-                }
-                for ev in evidence
-            ],
+            "evidence": ContextSection(evidence, _evidence_row),
             
             # FRIA
             "fria": {
@@ -262,25 +436,10 @@ class DocumentContextService:
             } if fria else None,
             
             # Model Version
-            "model_version": {
-                "version": latest_version.version,
-                "released_at": latest_version.released_at.isoformat() if latest_version.released_at else None,
-                "approver_email": latest_version.approver_email,
-                "notes": latest_version.notes,
-                "artifact_hash": latest_version.artifact_hash
-            } if latest_version else None,
+            "model_version": _model_version_row(latest_version) if latest_version else None,
             
             # All versions
-            "model_versions": [
-                {
-                    "version": v.version,
-                    "released_at": v.released_at.isoformat() if v.released_at else None,
-                    "approver_email": v.approver_email,
-                    "notes": v.notes,
-                    "artifact_hash": v.artifact_hash
-                }
-                for v in model_versions
-            ],
+            "model_versions": ContextSection(model_versions, _model_version_row),
             
             # Document Approval (for specific doc_type)
             "approval": {
@@ -295,7 +454,7 @@ class DocumentContextService:
             
             # Metadata
             "metadata": {
-                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "generated_at": generated_at or datetime.now(timezone.utc).isoformat(),
                 "version": "1.0.0",
                 "system_id": system_id,
                 "org_id": org_id,
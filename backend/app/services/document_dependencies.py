@@ -0,0 +1,138 @@
+"""
+Document Dependencies
+
+Works out which snapshot sections (tables) each document template reads,
+from the variables the template references, so a document loads only that
+data and is fingerprinted by its own inputs only. A control status change
+then re-renders the SoA, audit log, FRIA and Annex IV, while documents such
+as the appeals flow or logging plan are served from ``document_cache``
+unchanged.
+
+Templates are analysed once per loaded version by ``template_registry``.
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Union
+
+from app.services.bundle_cache import row_state, template_digest
+from app.services.document_context import ALL_SECTIONS, SystemSnapshot
+from app.services.template_registry import ALL_VARIABLES, template_registry
+
+# Bump when rendering changes in a way the fingerprinted inputs do not capture
+DOCUMENT_FORMAT_VERSION = "2"
+
+# Snapshot sections each table-backed context variable is built from. Other
+# variables (company, system, onboarding and legacy fields) come from the org
+# and system rows and the onboarding payload, which every document gets.
+CONTEXT_SECTIONS: Dict[str, FrozenSet[str]] = {
+    "risks": frozenset({"risks"}),
+    "controls": frozenset({"controls", "evidence"}),
+    "evidence": frozenset({"evidence"}),
+    "oversight": frozenset({"oversight"}),
+    "pmm": frozenset({"pmm"}),
+    "fria": frozenset({"fria"}),
+    "model_version": frozenset({"model_versions"}),
+    "model_versions": frozenset({"model_versions"}),
+    "approval": frozenset({"approvals"}),
+}
+
+# Sections behind the ``metadata`` fields; the rest need none
+METADATA_SECTIONS: Dict[str, FrozenSet[str]] = {
+    "has_risks": frozenset({"risks"}),
+    "risk_count": frozenset({"risks"}),
+    "has_controls": frozenset({"controls"}),
+    "control_count": frozenset({"controls"}),
+    "has_evidence": frozenset({"evidence"}),
+    "evidence_count": frozenset({"evidence"}),
+    "has_fria": frozenset({"fria"}),
+}
+
+# Fingerprint inputs besides sections: org and system rows, onboarding payload
+COMMON_SOURCES: FrozenSet[str] = frozenset({"org", "system", "onboarding"})
+
+
+def variable_sections(variables: FrozenSet[str]) -> FrozenSet[str]:
+    """Snapshot sections behind template variables (``name`` or ``name.attr``)."""
+    if ALL_VARIABLES in variables:
+        return ALL_SECTIONS
+    sections = set()
+    for variable in variables:
+        name, _, attr = variable.partition(".")
+        if name == "metadata":
+            if attr:
+                sections.update(METADATA_SECTIONS.get(attr, ()))
+            else:
+                sections.update(*METADATA_SECTIONS.values())
+        else:
+            sections.update(CONTEXT_SECTIONS.get(name, ()))
+    return frozenset(sections)
+
+
+def template_sections(templates_dir: Union[str, Path], template_file: str) -> FrozenSet[str]:
+    """Snapshot sections a document template reads."""
+    return variable_sections(template_registry.variables(templates_dir, template_file))
+
+
+def _digest(value: Any) -> str:
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _state(row: Any) -> Optional[Dict[str, Any]]:
+    return row_state(row) if row is not None else None
+
+
+class DocumentInputs:
+    """
+    Per-input digests of one system's snapshot, computed on first use.
+
+    ``fingerprint`` combines a document's template digest with the digests
+    of the inputs its template reads; the generation time is not part of it.
+    The snapshot must include those sections.
+    """
+
+    def __init__(
+        self, snapshot: SystemSnapshot, onboarding_data: Optional[Mapping[str, Any]] = None
+    ):
+        self.snapshot = snapshot
+        self.onboarding_data = dict(onboarding_data or {})
+        self._digests: Dict[str, str] = {}
+
+    def _value(self, source: str, doc_type: str) -> Any:
+        snapshot = self.snapshot
+        if source == "org":
+            return row_state(snapshot.org)
+        if source == "system":
+            return row_state(snapshot.system)
+        if source == "onboarding":
+            return self.onboarding_data
+        if source not in snapshot.sections:
+            raise ValueError(f"Snapshot section {source} was not loaded")
+        if source == "approvals":
+            return _state(snapshot.approval_for(doc_type))
+        if source in ("oversight", "pmm", "fria"):
+            return _state(getattr(snapshot, source))
+        return [row_state(row) for row in getattr(snapshot, source)]
+
+    def digest(self, source: str, doc_type: str) -> str:
+        """Digest of one input; approvals are per document type."""
+        key = f"approvals:{doc_type}" if source == "approvals" else source
+        if key not in self._digests:
+            self._digests[key] = _digest(self._value(source, doc_type))
+        return self._digests[key]
+
+    def fingerprint(self, doc_type: str, template_path: Path) -> str:
+        """Cache key for one rendered document."""
+        hasher = hashlib.sha256()
+        hasher.update(f"format:{DOCUMENT_FORMAT_VERSION}\ndoc:{doc_type}\n".encode())
+        hasher.update(f"template:{template_digest(template_path)}\n".encode())
+        sources = COMMON_SOURCES | template_sections(template_path.parent, template_path.name)
+        for source in sorted(sources):
+            hasher.update(f"{source}:{self.digest(source, doc_type)}\n".encode())
+        return hasher.hexdigest()
+
+    def fingerprints(self, templates: Mapping[str, Path]) -> Dict[str, str]:
+        """Fingerprints for several documents, keyed by doc type."""
+        return {doc_type: self.fingerprint(doc_type, path) for doc_type, path in templates.items()}
+
@@ -3,31 +3,38 @@ Document Generation Service for AIMS Readiness
 Generates ISO/IEC 42001 and EU AI Act compliance documents from onboarding data.
 """
 
+import hashlib
+import html
+import json
 import logging
+import time
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import markdown
-from jinja2 import Environment, FileSystemLoader
-
-# Try to import WeasyPrint, but make it optional
-try:
-    from weasyprint import CSS, HTML
-    from weasyprint.text.fonts import FontConfiguration
-    WEASYPRINT_AVAILABLE = True
-except (ImportError, OSError):
-    WEASYPRINT_AVAILABLE = False
-    # Note: logger will be configured after import
-
-# For testing fallback behavior, uncomment the line below:
-# WEASYPRINT_AVAILABLE = False
 
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.core.query_counter import QueryCounter
 from app.database import get_db
-from app.models import AISystem, Organization
-from app.services.document_context import DocumentContextService
+from app.models import AISystem, Organization, RenderedDocument
+from app.services.document_context import DocumentContextService, SystemSnapshot
+from app.services.document_dependencies import DocumentInputs, template_sections
+from app.services.pdf_renderer import (
+    WEASYPRINT_AVAILABLE,
+    PYMUPDF_AVAILABLE,
+    extract_pages,
+    pdf_renderer,
+    register_stylesheet,
+    render_html_pdf,
+    render_sections_pdf,
+)
+from app.services.preview_cache import preview_cache
+from app.services.render_executor import RenderExecutor, RenderJob
+from app.services.render_store import render_store
+from app.services.template_registry import template_registry
 
 # Set up logger
 logger = logging.getLogger(__name__)
@@ -36,6 +43,262 @@ logger = logging.getLogger(__name__)
 if not WEASYPRINT_AVAILABLE:
     logger.warning("WeasyPrint not available. PDF generation will be disabled.")
 
+# Formats a document is served in
+DOCUMENT_FORMATS = ("markdown", "pdf")
+
+# With PDF_COMBINED: the whole set as one PDF, and each document's page range in it
+COMBINED_DOC_TYPE = "combined"  # render store key of the combined PDF
+COMBINED_PAGES_FORMAT = "pages"  # ...and of its page map
+
+
+# Parsed once per PDF worker (see pdf_renderer.register_stylesheet)
+DOCUMENT_CSS = register_stylesheet("""
+body {
+    font-family: 'Arial', sans-serif;
+    line-height: 1.6;
+    margin: 40px;
+    color: #333;
+}
+h1 {
+    color: #2c3e50;
+    border-bottom: 2px solid #3498db;
+    padding-bottom: 10px;
+}
+h2 {
+    color: #34495e;
+    margin-top: 30px;
+}
+h3 {
+    color: #7f8c8d;
+}
+table {
+    border-collapse: collapse;
+    width: 100%;
+    margin: 20px 0;
+}
+th, td {
+    border: 1px solid #ddd;
+    padding: 12px;
+    text-align: left;
+}
+th {
+    background-color: #f8f9fa;
+    font-weight: bold;
+}
+code {
+    background-color: #f4f4f4;
+    padding: 2px 4px;
+    border-radius: 3px;
+    font-family: 'Courier New', monospace;
+}
+pre {
+    background-color: #f4f4f4;
+    padding: 15px;
+    border-radius: 5px;
+    overflow-x: auto;
+}
+.footer {
+    margin-top: 50px;
+    padding-top: 20px;
+    border-top: 1px solid #ddd;
+    font-size: 0.9em;
+    color: #666;
+}
+""")
+
+
+# Combined-PDF layout: one section per document, each starting a page and
+# heading its own branch of the bookmark outline
+COMBINED_CSS = register_stylesheet(DOCUMENT_CSS + """
+section.document {
+    break-before: page;
+}
+section.document:first-of-type {
+    break-before: auto;
+}
+.document-bookmark {
+    bookmark-level: 1;
+    bookmark-label: attr(data-title);
+}
+section.document h1 { bookmark-level: 2; }
+section.document h2 { bookmark-level: 3; }
+section.document h3, section.document h4, section.document h5, section.document h6 {
+    bookmark-level: none;
+}
+""")
+
+# Titles used for the combined PDF's top-level bookmarks
+DOCUMENT_TITLES = {
+    "risk_assessment": "Risk Assessment",
+    "impact_assessment": "Impact Assessment",
+    "model_card": "Model Card",
+    "data_sheet": "Data Sheet",
+    "logging_plan": "Logging Plan",
+    "monitoring_report": "Monitoring Report",
+    "human_oversight": "Human Oversight SOP",
+    "appeals_flow": "Appeals Flow",
+    "soa": "Statement of Applicability",
+    "policy_register": "Policy Register",
+    "audit_log": "Audit Log",
+    "annex_iv": "Annex IV Technical Documentation",
+    "instructions_for_use": "Instructions for Use",
+    "transparency_notice_gpai": "GPAI Transparency Notice",
+    "fria": "Fundamental Rights Impact Assessment",
+}
+
+
+def _markdown_html(markdown_content: str) -> str:
+    return markdown.markdown(markdown_content, extensions=['tables', 'fenced_code', 'toc'])
+
+
+def _html_page(body: str, title: str = "Compliance Document") -> str:
+    """Wrap rendered body HTML in a page; styling comes from the worker's parsed stylesheets."""
+    return f"""
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <meta charset="utf-8">
+        <title>{html.escape(title)}</title>
+    </head>
+    <body>
+        {body}
+    </body>
+    </html>
+    """
+
+
+def _footer() -> str:
+    return f"""
+        <div class="footer">
+            <p>Generated by AIMS Readiness Platform on {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}</p>
+        </div>
+    """
+
+
+def render_pdf(markdown_content: str) -> bytes:
+    """
+    Convert Markdown to PDF bytes using WeasyPrint.
+    
+    Module-level so it can run in the PDF render workers.
+    """
+
+    if not WEASYPRINT_AVAILABLE:
+        raise RuntimeError("WeasyPrint is not available. Cannot generate PDF.")
+
+    return render_html_pdf(_html_page(_markdown_html(markdown_content) + _footer()), DOCUMENT_CSS)
+
+
+def render_combined_pdf(documents: List[Tuple[str, str]]) -> Tuple[bytes, Dict[str, List[int]]]:
+    """
+    Render several Markdown documents as one PDF in a single layout pass.
+    
+    ``documents`` is ``[(doc_type, markdown), ...]`` in output order. Returns
+    the PDF and each document's page range (0-based, inclusive).
+    """
+    sections = []
+    for doc_type, markdown_content in documents:
+        title = DOCUMENT_TITLES.get(doc_type, doc_type.replace("_", " ").title())
+        sections.append(
+            f'<section class="document" id="doc-{doc_type}">'
+            f'<div class="document-bookmark" data-title="{html.escape(title)}"></div>'
+            f'{_markdown_html(markdown_content)}{_footer()}</section>'
+        )
+    pdf, ranges = render_sections_pdf(
+        _html_page("".join(sections), "Compliance Documents"),
+        COMBINED_CSS,
+        [f"doc-{doc_type}" for doc_type, _ in documents]
+    )
+    return pdf, {section_id[len("doc-"):]: pages for section_id, pages in ranges.items()}
+
+
+# Document generation mapping
+DOCUMENT_TEMPLATES = {
+    "risk_assessment": "01_RISK_ASSESSMENT.md",
+    "impact_assessment": "02_IMPACT_ASSESSMENT.md",
+    "model_card": "03_MODEL_CARD.md",
+    "data_sheet": "04_DATA_SHEET.md",
+    "logging_plan": "05_LOGGING_PLAN.md",
+    "monitoring_report": "06_PM_MONITORING_REPORT.md",
+    "human_oversight": "07_HUMAN_OVERSIGHT_SOP.md",
+    "appeals_flow": "08_APPEALS_FLOW.md",
+    "soa": "09_SOA_TEMPLATE.md",
+    "policy_register": "10_POLICY_REGISTER.md",
+    "audit_log": "11_AUDIT_LOG.md",
+    "annex_iv": "12_ANNEX_IV.md",  # Annex IV Technical Documentation
+    "instructions_for_use": "13_INSTRUCTIONS_FOR_USE.md",  # Mandatory Instructions for Use
+    "fria": "15_FRIA.md"  # Fundamental Rights Impact Assessment
+}
+GPAI_DOCUMENT_TEMPLATES = {"transparency_notice_gpai": "14_TRANSPARENCY_NOTICE_GPAI.md"}
+
+
+def document_templates_for(system: AISystem) -> Dict[str, str]:
+    """Templates generated for a system; the GPAI Transparency Notice only for GPAI systems."""
+    templates = dict(DOCUMENT_TEMPLATES)
+    if system.uses_gpai or system.is_general_purpose_ai:
+        templates.update(GPAI_DOCUMENT_TEMPLATES)
+    return templates
+
+
+def default_onboarding_data(org: Organization) -> Dict[str, Any]:
+    """Onboarding payload used when a system has none."""
+    return {
+        "company": {
+            "name": org.name,
+            "address": "",
+            "industry": ""
+        },
+        "risks": {
+            "topRisks": [],
+            "mitigationStrategies": []
+        },
+        "oversight": {
+            "oversightRules": [],
+            "escalationPaths": []
+        },
+        "monitoring": {
+            "keyMetrics": [],
+            "reviewFrequency": "Quarterly"
+        }
+    }
+
+
+def normalize_onboarding_data(onboarding_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert wizard list payloads to the dict shapes the templates expect (in place)."""
+    # Normalize onboarding data structure
+    if "systems" in onboarding_data and isinstance(onboarding_data["systems"], list):
+        # Convert list to dict format expected by DocumentGenerator
+        systems_dict = {}
+        for i, system in enumerate(onboarding_data["systems"]):
+            systems_dict[f"system_{i}"] = system
+        onboarding_data["systems"] = systems_dict
+    
+    # Normalize risks data structure
+    if "risks" in onboarding_data and isinstance(onboarding_data["risks"], list):
+        # Convert list to dict format expected by DocumentGenerator
+        onboarding_data["risks"] = {
+            "topRisks": onboarding_data["risks"],
+            "mitigationStrategies": []
+        }
+    return onboarding_data
+
+
+def stored_onboarding_data(snapshot: SystemSnapshot) -> Dict[str, Any]:
+    """The system's saved onboarding payload, normalized (defaults if none was saved)."""
+    row = snapshot.onboarding_data
+    data = None
+    if row is not None:
+        try:
+            data = json.loads(row.data_json)
+        except ValueError:
+            data = None
+    if not data:
+        return default_onboarding_data(snapshot.org)
+    return normalize_onboarding_data(data)
+
+
+def _is_current_row(row: Optional[RenderedDocument], fingerprint: str) -> bool:
+    return row is not None and row.fingerprint == fingerprint
+
 
 class DocumentGenerator:
     """Generates compliance documents from system and onboarding data."""
@@ -43,8 +306,6 @@ class DocumentGenerator:
     def __init__(self):
         # Go up from backend/app/services/ to project root
         self.templates_dir = Path(__file__).parent.parent.parent.parent / "aims_readiness_templates_en"
-        self.output_dir = Path(__file__).parent.parent.parent / "generated_documents"
-        self.output_dir.mkdir(exist_ok=True)
         
         # Debug: log the actual path being used
         logger.debug(f"Templates directory: {self.templates_dir}")
@@ -52,24 +313,22 @@ class DocumentGenerator:
         if self.templates_dir.exists():
             logger.debug(f"Templates found: {list(self.templates_dir.glob('*.md'))}")
         
-        # Initialize Jinja2 environment
-        self.jinja_env = Environment(
-            loader=FileSystemLoader(str(self.templates_dir)),
-            autoescape=True
-        )
-        
-        # Font configuration for PDF generation (only if WeasyPrint is available)
-        if WEASYPRINT_AVAILABLE:
-            self.font_config = FontConfiguration()
-        else:
-            self.font_config = None
+        # Shared Jinja2 environment: templates compile once per process
+        self.jinja_env = template_registry.environment(self.templates_dir)
     
-    def generate_all_documents(self, system_id: int, org_id: int, onboarding_data: Dict[str, Any], db: Session = None) -> Dict[str, str]:
+    def generate_all_documents(self, system_id: int, org_id: int, onboarding_data: Optional[Dict[str, Any]] = None,
+                               db: Session = None) -> Dict[str, str]:
         """
         Generate all compliance documents for a system.
         
+        Without an onboarding payload the system's saved onboarding data is
+        used, as on download. A document whose fingerprint (template digest
+        plus the inputs it reads, including the payload) matches its render
+        store entry is not rendered again and is marked ``reused``;
+        regenerating an unchanged system writes nothing.
+        
         Returns:
-            Dict mapping document types to file paths
+            Dict mapping document types to availability and ``reused`` flags
         """
         if db is None:
             db = next(get_db())
@@ -93,98 +352,99 @@ class DocumentGenerator:
                 logger.error(f"Organization {org_id} not found. Available orgs: {[(o.id, o.name, o.api_key) for o in all_orgs]}")
                 raise ValueError(f"Organization {org_id} not found")
             
-            # Create system-specific output directory
-            system_dir = self.output_dir / f"org_{org_id}" / f"system_{system_id}"
-            system_dir.mkdir(parents=True, exist_ok=True)
-            
             generated_docs = {}
             
-            # Document generation mapping
-            document_templates = {
-                "risk_assessment": "01_RISK_ASSESSMENT.md",
-                "impact_assessment": "02_IMPACT_ASSESSMENT.md",
-                "model_card": "03_MODEL_CARD.md",
-                "data_sheet": "04_DATA_SHEET.md",
-                "logging_plan": "05_LOGGING_PLAN.md",
-                "monitoring_report": "06_PM_MONITORING_REPORT.md",
-                "human_oversight": "07_HUMAN_OVERSIGHT_SOP.md",
-                "appeals_flow": "08_APPEALS_FLOW.md",
-                "soa": "09_SOA_TEMPLATE.md",
-                "policy_register": "10_POLICY_REGISTER.md",
-                "audit_log": "11_AUDIT_LOG.md",
-                "annex_iv": "12_ANNEX_IV.md",  # Annex IV Technical Documentation
-                "instructions_for_use": "13_INSTRUCTIONS_FOR_USE.md",  # Mandatory Instructions for Use
-                "fria": "15_FRIA.md"  # Fundamental Rights Impact Assessment
-            }
+            # Document generation mapping (GPAI notice only for GPAI systems)
+            document_templates = document_templates_for(system)
             
-            # Generate each document
+            # Load the tables these templates read once for all documents
+            sections = frozenset({"onboarding_data"}).union(
+                *(template_sections(self.templates_dir, template_file) for template_file in document_templates.values())
+            )
+            snapshot = DocumentContextService(db).load_snapshot(system_id, org_id, sections)
+            # A posted payload is rendered (and fingerprinted) as given; the saved data is left alone
+            if onboarding_data:
+                onboarding_data = normalize_onboarding_data(onboarding_data)
+            else:
+                onboarding_data = stored_onboarding_data(snapshot)
+            
+            # Documents whose render store entries are current keep them
+            inputs = DocumentInputs(snapshot, onboarding_data)
+            stored = render_store.entries(db, org_id, system_id)
+            combined = self._combined_pages(stored) if WEASYPRINT_AVAILABLE and settings.PDF_COMBINED else {}
+            fingerprints = {}
+            
+            # Build every context here so render workers never touch the session
+            jobs = []
             for doc_type, template_file in document_templates.items():
                 try:
-                    # Generate Markdown
-                    md_path = system_dir / f"{doc_type}.md"
-                    md_content = self._generate_document(
-                        template_file, 
-                        system, 
-                        org, 
-                        onboarding_data,
-                        db,
-                        doc_type  # Pass doc_type for approval lookup
-                    )
-                    
-                    with open(md_path, 'w', encoding='utf-8') as f:
-                        f.write(md_content)
-                    
-                    # Generate PDF (only if WeasyPrint is available)
-                    if WEASYPRINT_AVAILABLE:
-                        pdf_path = system_dir / f"{doc_type}.pdf"
-                        self._generate_pdf(md_content, pdf_path)
+                    fingerprints[doc_type] = inputs.fingerprint(doc_type, self.templates_dir / template_file)
+                    if self._is_current(stored, combined, doc_type, fingerprints[doc_type]):
                         generated_docs[doc_type] = {
                             "markdown_available": True,
-                            "pdf_available": True
+                            "pdf_available": _is_current_row(stored.get((doc_type, "pdf")), fingerprints[doc_type]),
+                            "reused": True
                         }
-                    else:
-                        generated_docs[doc_type] = {
-                            "markdown_available": True,
-                            "pdf_available": False
-                        }
-                    
+                        continue
+                    context = self._build_document_context(
+                        system, org, onboarding_data, db, doc_type, snapshot=snapshot
+                    )
                 except Exception as e:
                     logger.error(f"Error generating {doc_type}: {e}")
                     continue
+                jobs.append(RenderJob(doc_type, self._render_template, (template_file, context)))
             
-            # Conditionally generate GPAI Transparency Notice
-            if system.uses_gpai or system.is_general_purpose_ai:
-                try:
-                    gpai_template = "14_TRANSPARENCY_NOTICE_GPAI.md"
-                    md_path = system_dir / "transparency_notice_gpai.md"
-                    md_content = self._generate_document(
-                        gpai_template,
-                        system,
-                        org,
-                        onboarding_data,
-                        db,
-                        "transparency_notice_gpai"  # doc_type for approval
-                    )
-                    
-                    with open(md_path, 'w', encoding='utf-8') as f:
-                        f.write(md_content)
-                    
-                    if WEASYPRINT_AVAILABLE:
-                        pdf_path = system_dir / "transparency_notice_gpai.pdf"
-                        self._generate_pdf(md_content, pdf_path)
-                        generated_docs["transparency_notice_gpai"] = {
-                            "markdown_available": True,
-                            "pdf_available": True
-                        }
-                    else:
-                        generated_docs["transparency_notice_gpai"] = {
-                            "markdown_available": True,
-                            "pdf_available": False
-                        }
-                    
-                    logger.info(f"Generated GPAI Transparency Notice for system {system_id}")
-                except Exception as e:
-                    logger.error(f"Error generating GPAI transparency notice: {e}")
+            if len(jobs) < len(document_templates):
+                logger.info(
+                    f"Reused {len(generated_docs)} unchanged documents for system {system_id}, rendering {len(jobs)}"
+                )
+            
+            # Render Markdown concurrently; results come back in template order
+            executor = RenderExecutor()
+            markdown_docs = {}
+            for result in executor.run(jobs):
+                if not result.ok:
+                    logger.error(f"Error generating {result.key}: {result.error}")
+                    continue
+                markdown_docs[result.key] = result.value
+                generated_docs[result.key] = {
+                    "markdown_available": True,
+                    "pdf_available": False,
+                    "reused": False
+                }
+            
+            # Stored once rendering is done: a commit expires the rows render workers read
+            for doc_type, md_content in markdown_docs.items():
+                self._store_render(
+                    db, org_id, system_id, doc_type, "markdown", fingerprints[doc_type], md_content.encode("utf-8")
+                )
+            
+            # Generate PDFs on the PDF workers (only if WeasyPrint is available)
+            if WEASYPRINT_AVAILABLE and settings.PDF_COMBINED:
+                pages = self._generate_combined_pdf(
+                    db, org_id, system_id,
+                    {doc_type: fingerprints[doc_type] for doc_type in document_templates if doc_type in generated_docs},
+                    markdown_docs, stored, combined, executor
+                )
+                for doc_type, doc in generated_docs.items():
+                    doc["pdf_available"] = doc_type in pages
+            elif WEASYPRINT_AVAILABLE:
+                pdf_jobs = [
+                    RenderJob(doc_type, render_pdf, (md_content,))
+                    for doc_type, md_content in markdown_docs.items()
+                ]
+                for result in executor.run_pdf(pdf_jobs):
+                    if not result.ok:
+                        logger.error(f"Error generating PDF for {result.key}: {result.error}")
+                        continue
+                    self._store_render(db, org_id, system_id, result.key, "pdf", fingerprints[result.key], result.value)
+                    generated_docs[result.key]["pdf_available"] = True
+            
+            for md_content in markdown_docs.values():
+                preview_cache.warm(md_content.encode("utf-8"))
+            
+            if "transparency_notice_gpai" in generated_docs:
+                logger.info(f"Generated GPAI Transparency Notice for system {system_id}")
             
             return generated_docs
             
@@ -192,13 +452,229 @@ class DocumentGenerator:
             if should_close:
                 db.close()
     
+    @staticmethod
+    def _is_current(stored: Dict[Tuple[str, str], RenderedDocument], combined: Dict[str, Any],
+                    doc_type: str, fingerprint: str) -> bool:
+        """True if the render store holds this rendering of a document in every format generation produces."""
+        if not _is_current_row(stored.get((doc_type, "markdown")), fingerprint):
+            return False
+        if not WEASYPRINT_AVAILABLE:
+            return True
+        if settings.PDF_COMBINED:
+            return combined.get("fingerprints", {}).get(doc_type) == fingerprint
+        return _is_current_row(stored.get((doc_type, "pdf")), fingerprint)
+    
+    @staticmethod
+    def _store_render(db: Session, org_id: int, system_id: int, doc_type: str, fmt: str, fingerprint: str,
+                      content: bytes) -> None:
+        """Save a generated document in the render store (bulk generation warms it)."""
+        try:
+            render_store.save(db, org_id, system_id, doc_type, fmt, fingerprint, content)
+        except Exception as e:
+            logger.error(f"Could not store {doc_type} ({fmt}) for system {system_id}: {e}")
+    
+    def _generate_combined_pdf(self, db: Session, org_id: int, system_id: int,
+                               fingerprints: Dict[str, str], markdown_docs: Dict[str, str],
+                               stored: Dict[Tuple[str, str], RenderedDocument], combined: Dict[str, Any],
+                               executor: RenderExecutor) -> Dict[str, List[int]]:
+        """
+        Render the whole set as one PDF in a single layout pass.
+        
+        The PDF and its page map are kept in the render store; single-document
+        PDFs are split out of it on first download. Returns each document's
+        page range.
+        """
+        if combined.get("fingerprints") == fingerprints:
+            return combined["pages"]
+        
+        documents = []
+        for doc_type in fingerprints:
+            content = markdown_docs.get(doc_type)
+            if content is None:
+                row = stored.get((doc_type, "markdown"))
+                stored_content = render_store.read(row) if row is not None else None
+                if stored_content is None:
+                    logger.error(f"Stored Markdown of {doc_type} is missing; leaving it out of the combined PDF")
+                    continue
+                content = stored_content.decode("utf-8")
+            documents.append((doc_type, content))
+        [result] = executor.run_pdf([RenderJob("combined", render_combined_pdf, (documents,))])
+        if not result.ok:
+            logger.error(f"Error generating combined PDF: {result.error}")
+            return {}
+        
+        pdf, pages = result.value
+        self._store_combined(db, org_id, system_id, fingerprints, pdf, pages)
+        return pages
+    
+    def _store_combined(self, db: Session, org_id: int, system_id: int, fingerprints: Dict[str, str],
+                        pdf: bytes, pages: Dict[str, List[int]]) -> None:
+        """Save a combined PDF and its page map, keyed by the fingerprints of the documents it holds."""
+        included = {doc_type: fingerprints[doc_type] for doc_type in pages}
+        fingerprint = hashlib.sha256(json.dumps(included, sort_keys=True).encode()).hexdigest()
+        page_map = json.dumps({"pages": pages, "fingerprints": included}, sort_keys=True).encode()
+        self._store_render(db, org_id, system_id, COMBINED_DOC_TYPE, "pdf", fingerprint, pdf)
+        self._store_render(db, org_id, system_id, COMBINED_DOC_TYPE, COMBINED_PAGES_FORMAT, fingerprint, page_map)
+    
+    @staticmethod
+    def _combined_pages(stored: Dict[Tuple[str, str], RenderedDocument]) -> Dict[str, Any]:
+        """Page ranges and document fingerprints of the stored combined PDF ({} without one)."""
+        pdf_row = stored.get((COMBINED_DOC_TYPE, "pdf"))
+        row = stored.get((COMBINED_DOC_TYPE, COMBINED_PAGES_FORMAT))
+        if pdf_row is None or row is None or row.fingerprint != pdf_row.fingerprint:
+            return {}
+        content = render_store.read(row)
+        try:
+            return json.loads(content) if content is not None else {}
+        except ValueError:
+            return {}
+    
+    def _split_from_combined(self, stored: Dict[Tuple[str, str], RenderedDocument], doc_type: str,
+                             fingerprint: str) -> Optional[bytes]:
+        """
+        A document's pages from the stored combined PDF.
+        
+        None unless the combined PDF holds this rendering of it, or without PyMuPDF.
+        """
+        combined = self._combined_pages(stored)
+        if combined.get("fingerprints", {}).get(doc_type) != fingerprint or not PYMUPDF_AVAILABLE:
+            return None
+        pdf = render_store.read(stored[(COMBINED_DOC_TYPE, "pdf")])
+        if pdf is None:
+            return None
+        return extract_pages(pdf, *combined["pages"][doc_type])
+    
+    def fetch_document(self, system: AISystem, org: Organization, doc_type: str, format: str,
+                       db: Session) -> Tuple[bytes, str, bool]:
+        """
+        Current content of one document, rendered on demand when missing or stale.
+        
+        Renders use the system's saved onboarding data and are kept in the
+        render store. Returns ``(content, format, rendered)``; PDF requests
+        fall back to Markdown without WeasyPrint. Raises FileNotFoundError
+        for a document type the system does not get.
+        """
+        if format not in DOCUMENT_FORMATS:
+            raise ValueError(f"Unsupported format: {format}")
+        if format == "pdf" and not WEASYPRINT_AVAILABLE:
+            format = "markdown"
+        template_file = document_templates_for(system).get(doc_type)
+        if template_file is None:
+            raise FileNotFoundError(f"Document {doc_type} does not apply to system {system.id}")
+        
+        snapshot = self._load_template_snapshot(system.id, org.id, template_file, db)
+        onboarding_data = stored_onboarding_data(snapshot)
+        fingerprint = DocumentInputs(snapshot, onboarding_data).fingerprint(doc_type, self.templates_dir / template_file)
+        
+        def current(fmt: str) -> Optional[bytes]:
+            row = render_store.get(db, org.id, system.id, doc_type, fmt)
+            if not _is_current_row(row, fingerprint):
+                return None
+            return render_store.read(row)
+        
+        content = current(format)
+        if content is not None:
+            return content, format, False
+        
+        markdown_content = current("markdown")
+        if markdown_content is None:
+            context = self._build_document_context(system, org, onboarding_data, db, doc_type, snapshot=snapshot)
+            markdown_content = self._render_template(template_file, context).encode("utf-8")
+            render_store.save(db, org.id, system.id, doc_type, "markdown", fingerprint, markdown_content)
+        if format == "markdown":
+            return markdown_content, format, True
+        
+        # A combined PDF built from these same inputs already has the pages
+        pdf = None
+        if settings.PDF_COMBINED:
+            pdf = self._split_from_combined(render_store.entries(db, org.id, system.id), doc_type, fingerprint)
+        if pdf is None:
+            pdf = pdf_renderer.render(render_pdf, markdown_content.decode("utf-8"))
+        render_store.save(db, org.id, system.id, doc_type, "pdf", fingerprint, pdf)
+        return pdf, format, True
+    
+    def get_combined_pdf(self, system_id: int, org_id: int, db: Session) -> bytes:
+        """
+        The combined PDF of a system (generated with PDF_COMBINED), from the render store.
+        
+        If generation could not render it (e.g. the PDF queue was full), it is
+        rendered now from the stored Markdown; queue and timeout errors of the
+        PDF renderer propagate.
+        """
+        stored = render_store.entries(db, org_id, system_id)
+        row = stored.get((COMBINED_DOC_TYPE, "pdf"))
+        content = render_store.read(row) if row is not None else None
+        if content is None and settings.PDF_COMBINED and WEASYPRINT_AVAILABLE:
+            content = self._render_stored_combined_pdf(db, org_id, system_id, stored)
+        if content is None:
+            raise FileNotFoundError(f"Combined PDF not found for system {system_id}")
+        return content
+    
+    def _render_stored_combined_pdf(self, db: Session, org_id: int, system_id: int,
+                                    stored: Dict[Tuple[str, str], RenderedDocument]) -> Optional[bytes]:
+        """Render and store the combined PDF from the stored Markdown (None without any)."""
+        templates = {**DOCUMENT_TEMPLATES, **GPAI_DOCUMENT_TEMPLATES}
+        documents = []
+        fingerprints = {}
+        for doc_type in templates:
+            row = stored.get((doc_type, "markdown"))
+            content = render_store.read(row) if row is not None else None
+            if content is None:
+                continue
+            documents.append((doc_type, content.decode("utf-8")))
+            fingerprints[doc_type] = row.fingerprint
+        if not documents:
+            return None
+        pdf, pages = pdf_renderer.render(render_combined_pdf, documents)
+        self._store_combined(db, org_id, system_id, fingerprints, pdf, pages)
+        return pdf
+    
     def _generate_document(self, template_file: str, system: AISystem, org: Organization, 
-                          onboarding_data: Dict[str, Any], db: Session, doc_type: str = None) -> str:
-        """Generate a single document from template and data using DocumentContextService."""
+                          onboarding_data: Dict[str, Any], db: Session, doc_type: str = None,
+                          snapshot: Optional[SystemSnapshot] = None,
+                          generated_at: Optional[str] = None) -> str:
+        """
+        Generate a single document from template and data using DocumentContextService.
+        
+        Pass a preloaded ``snapshot`` when rendering several documents for the
+        same system to avoid reloading the data graph for each one; otherwise
+        only the tables the template reads are loaded.
+        """
+        if snapshot is None:
+            snapshot = self._load_template_snapshot(system.id, org.id, template_file, db)
+        context = self._build_document_context(
+            system, org, onboarding_data, db, doc_type, snapshot=snapshot, generated_at=generated_at
+        )
+        return self._render_template(template_file, context)
+    
+    def _load_template_snapshot(self, system_id: int, org_id: int, template_file: str,
+                                db: Session) -> SystemSnapshot:
+        """
+        Load the tables ``template_file`` reads, plus the saved onboarding data.
+        
+        Query count and load time are recorded with the template's render stats.
+        """
+        sections = template_sections(self.templates_dir, template_file) | {"onboarding_data"}
+        started = time.perf_counter()
+        with QueryCounter(db) as counter:
+            snapshot = DocumentContextService(db).load_snapshot(system_id, org_id, sections)
+        template_registry.record_context_load(
+            self.templates_dir, template_file, counter.count, time.perf_counter() - started
+        )
+        return snapshot
+    
+    def _build_document_context(self, system: AISystem, org: Organization, onboarding_data: Dict[str, Any],
+                                db: Session, doc_type: str = None,
+                                snapshot: Optional[SystemSnapshot] = None,
+                                generated_at: Optional[str] = None) -> Dict[str, Any]:
+        """Build the full template context for one document."""
         
         # Use DocumentContextService to build complete context
         context_service = DocumentContextService(db)
-        context = context_service.build_system_context(system.id, org.id, doc_type)
+        if snapshot is not None:
+            context = context_service.build_context_from_snapshot(snapshot, doc_type, generated_at)
+        else:
+            context = context_service.build_system_context(system.id, org.id, doc_type)
         
         # Add any additional onboarding data (for backwards compatibility)
         context['onboarding_data'] = onboarding_data
@@ -207,9 +683,11 @@ class DocumentGenerator:
         # Add legacy fields for backwards compatibility with old templates
         legacy_fields = self._compute_document_fields(system, org, onboarding_data)
         context.update(legacy_fields)
-        
-        template = self.jinja_env.get_template(template_file)
-        return template.render(**context)
+        return context
+    
+    def _render_template(self, template_file: str, context: Dict[str, Any]) -> str:
+        """Render a template with a prepared context. Safe to call from worker threads."""
+        return template_registry.render(self.templates_dir, template_file, context)
     
     def _compute_document_fields(self, system: AISystem, org: Organization, 
                                 onboarding_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -240,171 +718,66 @@ class DocumentGenerator:
             "review_frequency": monitoring_data.get("reviewFrequency", "Quarterly")
         }
     
-    def _generate_pdf(self, markdown_content: str, output_path: Path):
-        """Convert Markdown to PDF using WeasyPrint."""
-        
-        if not WEASYPRINT_AVAILABLE:
-            raise RuntimeError("WeasyPrint is not available. Cannot generate PDF.")
-        
-        # Convert Markdown to HTML
-        html_content = markdown.markdown(
-            markdown_content,
-            extensions=['tables', 'fenced_code', 'toc']
-        )
-        
-        # Wrap in HTML structure with CSS
-        full_html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <title>Compliance Document</title>
-            <style>
-                body {{
-                    font-family: 'Arial', sans-serif;
-                    line-height: 1.6;
-                    margin: 40px;
-                    color: #333;
-                }}
-                h1 {{
-                    color: #2c3e50;
-                    border-bottom: 2px solid #3498db;
-                    padding-bottom: 10px;
-                }}
-                h2 {{
-                    color: #34495e;
-                    margin-top: 30px;
-                }}
-                h3 {{
-                    color: #7f8c8d;
-                }}
-                table {{
-                    border-collapse: collapse;
-                    width: 100%;
-                    margin: 20px 0;
-                }}
-                th, td {{
-                    border: 1px solid #ddd;
-                    padding: 12px;
-                    text-align: left;
-                }}
-                th {{
-                    background-color: #f8f9fa;
-                    font-weight: bold;
-                }}
-                code {{
-                    background-color: #f4f4f4;
-                    padding: 2px 4px;
-                    border-radius: 3px;
-                    font-family: 'Courier New', monospace;
-                }}
-                pre {{
-                    background-color: #f4f4f4;
-                    padding: 15px;
-                    border-radius: 5px;
-                    overflow-x: auto;
-                }}
-                .footer {{
-                    margin-top: 50px;
-                    padding-top: 20px;
-                    border-top: 1px solid #ddd;
-                    font-size: 0.9em;
-                    color: #666;
-                }}
-            </style>
-        </head>
-        <body>
-            {html_content}
-            <div class="footer">
-                <p>Generated by AIMS Readiness Platform on {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}</p>
-            </div>
-        </body>
-        </html>
+    def get_document_list(self, system_id: int, org_id: int, db: Session) -> List[Dict[str, Any]]:
         """
+        Documents of a system from the render store catalog.
         
-        # Generate PDF
-        HTML(string=full_html).write_pdf(
-            str(output_path),
-            font_config=self.font_config
-        )
-    
-    def get_document_list(self, system_id: int, org_id: int) -> List[Dict[str, Any]]:
-        """Get list of generated documents for a system."""
-        
-        system_dir = self.output_dir / f"org_{org_id}" / f"system_{system_id}"
-        
-        if not system_dir.exists():
-            return []
-        
+        One indexed query, so every API replica lists the same documents
+        whichever one rendered them. PDFs not stored yet are rendered on
+        first download when WeasyPrint is available.
+        """
+        entries = render_store.entries(db, org_id, system_id)
         documents = []
-        document_types = {
-            "risk_assessment": "Risk Assessment",
-            "impact_assessment": "Impact Assessment", 
-            "model_card": "Model Card",
-            "data_sheet": "Data Sheet",
-            "logging_plan": "Logging Plan",
-            "monitoring_report": "Monitoring Report",
-            "human_oversight": "Human Oversight SOP",
-            "appeals_flow": "Appeals Flow",
-            "soa": "Statement of Applicability",
-            "policy_register": "Policy Register",
-            "audit_log": "Audit Log"
-        }
-        
-        for doc_type, doc_name in document_types.items():
-            md_path = system_dir / f"{doc_type}.md"
-            pdf_path = system_dir / f"{doc_type}.pdf"
-            
-            if md_path.exists():
-                # Get file stats
-                md_stat = md_path.stat()
-                
-                doc_info = {
-                    "type": doc_type,
-                    "name": doc_name,
-                    "markdown_available": True,
-                    "markdown_size": md_stat.st_size,
-                    "created_at": datetime.fromtimestamp(md_stat.st_ctime, tz=timezone.utc).isoformat(),
-                    "updated_at": datetime.fromtimestamp(md_stat.st_mtime, tz=timezone.utc).isoformat()
-                }
-                
-                # Add PDF info if available
-                if pdf_path.exists():
-                    pdf_stat = pdf_path.stat()
-                    doc_info.update({
-                        "pdf_available": True,
-                        "pdf_size": pdf_stat.st_size
-                    })
-                else:
-                    doc_info["pdf_available"] = False
-                    doc_info["pdf_size"] = None
-                
-                documents.append(doc_info)
+        for (doc_type, fmt), markdown_row in entries.items():
+            if fmt != "markdown" or doc_type == COMBINED_DOC_TYPE:
+                continue
+            pdf_row = entries.get((doc_type, "pdf"))
+            documents.append({
+                "type": doc_type,
+                "name": DOCUMENT_TITLES.get(doc_type, doc_type.replace("_", " ").title()),
+                "markdown_available": True,
+                "markdown_size": markdown_row.size_bytes,
+                "markdown_sha256": markdown_row.sha256,
+                "pdf_available": pdf_row is not None or WEASYPRINT_AVAILABLE,
+                "pdf_size": pdf_row.size_bytes if pdf_row is not None else None,
+                "pdf_sha256": pdf_row.sha256 if pdf_row is not None else None,
+                "fingerprint": markdown_row.fingerprint,
+                "created_at": markdown_row.created_at.isoformat() if markdown_row.created_at else None,
+                "updated_at": markdown_row.updated_at.isoformat() if markdown_row.updated_at else None
+            })
         
         return sorted(documents, key=lambda x: x["name"])
     
-    def get_document_content(self, system_id: int, org_id: int, doc_type: str, format: str = "markdown") -> bytes:
-        """Get document content for download."""
-        
-        system_dir = self.output_dir / f"org_{org_id}" / f"system_{system_id}"
+    def get_document_content(self, system_id: int, org_id: int, doc_type: str, db: Session,
+                             format: str = "markdown") -> Tuple[bytes, str]:
+        """
+        Last generated content of a document, from the render store.
         
-        if format == "markdown":
-            file_path = system_dir / f"{doc_type}.md"
-        elif format == "pdf":
-            if not WEASYPRINT_AVAILABLE:
-                # Fallback to markdown if PDF is not available
-                file_path = system_dir / f"{doc_type}.md"
-                format = "markdown"  # Override format for consistent response
-            else:
-                file_path = system_dir / f"{doc_type}.pdf"
-        else:
+        A PDF that is not stored yet is split out of the combined PDF, or
+        rendered from the stored Markdown, and stored. Returns
+        ``(content, format)``; PDF requests fall back to Markdown without
+        WeasyPrint.
+        """
+        if format not in DOCUMENT_FORMATS:
             raise ValueError(f"Unsupported format: {format}")
+        if format == "pdf" and not WEASYPRINT_AVAILABLE:
+            format = "markdown"
         
-        if not file_path.exists():
+        stored = render_store.entries(db, org_id, system_id)
+        markdown_row = stored.get((doc_type, "markdown"))
+        markdown_content = render_store.read(markdown_row) if markdown_row is not None else None
+        if markdown_content is None:
             raise FileNotFoundError(f"Document {doc_type} not found for system {system_id}")
+        if format == "markdown":
+            return markdown_content, format
         
-        with open(file_path, 'rb') as f:
-            content = f.read()
-        
-        # Return content with format info for the endpoint to handle
+        # The PDF belongs with the stored Markdown only if both came from the same inputs
+        fingerprint = markdown_row.fingerprint
+        row = stored.get((doc_type, "pdf"))
+        content = render_store.read(row) if _is_current_row(row, fingerprint) else None
+        if content is None:
+            content = self._split_from_combined(stored, doc_type, fingerprint)
+            if content is None:
+                content = pdf_renderer.render(render_pdf, markdown_content.decode("utf-8"))
+            render_store.save(db, org_id, system_id, doc_type, "pdf", fingerprint, content)
         return content, format
@@ -34,7 +34,7 @@ async def save_evidence_file_streaming(file_stream, filename: str, org_id: int,
         return s3_key, "placeholder_checksum"
     else:
         # Local file storage (DEV mode) with streaming
-        evidence_dir = Path(f"./evidence/org_{org_id}/system_{system_id}")
+        evidence_dir = Path(settings.EVIDENCE_LOCAL_DIR) / f"org_{org_id}" / f"system_{system_id}"
         evidence_dir.mkdir(parents=True, exist_ok=True)
 
         file_path = evidence_dir / filename
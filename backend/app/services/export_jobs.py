@@ -0,0 +1,453 @@
+"""
+Export Jobs
+
+Durable background exports. The API records a job in ``export_jobs`` and
+returns at once; a worker claims queued jobs, renders the bundle (an Annex IV
+bundle, or the compliance suite documents for ``compliance_suite`` jobs) and stores
+the archive in the job store (``EXPORT_JOBS_DIR``, or the S3 bucket under
+``export-jobs/`` when S3 is configured). Progress is written per document as
+rendering proceeds.
+
+The worker runs as its own process:
+
+    python -m app.services.export_jobs
+
+so bundle rendering never competes with API requests. Setting
+``EXPORT_WORKER_EMBEDDED`` also runs one as a daemon thread inside the API
+process (single-process development setups).
+
+Claims are a conditional UPDATE on the job row, so several workers can share
+one database. Jobs whose heartbeat stops (worker crashed or was killed) are
+requeued after ``EXPORT_JOB_STALE_SECONDS``, up to ``EXPORT_JOB_MAX_ATTEMPTS``.
+Finished jobs expire ``EXPORT_JOB_TTL_SECONDS`` after they finish; the worker
+then deletes their archive, integrity record and row.
+"""
+
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.database import SessionLocal
+from app.models import AISystem, ExportJob, Organization
+from app.services.annex_iv_bundle import (
+    ANNEX_IV_DOCUMENT_TEMPLATES,
+    ANNEX_IV_VARIANTS,
+    bundle_fingerprint,
+    cache_while_streaming,
+    stream_annex_iv_bundle,
+    variant_settings,
+)
+from app.services.bundle_builder import BundleBuilder
+from app.services.bundle_cache import LocalBundleStore, S3BundleStore, bundle_cache
+from app.services.compliance_suite import ComplianceSuiteService, compliance_suite_service
+from app.services.docx_export import iter_file
+from app.services.zip_stream import StreamingZipWriter, export_integrity
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+JOB_KINDS = ("annex_iv", "compliance_suite")
+
+# Entry formats of a compliance suite job (its ``variant``)
+COMPLIANCE_SUITE_FORMATS = ("md", "docx", "pdf")
+
+# Jobs whose outcome is final; these expire
+FINISHED_STATUSES = ("done", "failed")
+
+# Expired jobs deleted per sweep
+PURGE_BATCH_SIZE = 100
+
+
+def job_store():
+    """S3 when configured, else ``EXPORT_JOBS_DIR``."""
+    if settings.use_s3:
+        from app.services.s3 import s3_service
+        return S3BundleStore(s3_service.client, settings.S3_BUCKET, prefix="export-jobs/")
+    return LocalBundleStore(Path(settings.EXPORT_JOBS_DIR))
+
+
+def artifact_name(job: ExportJob) -> str:
+    return f"{job.id}.zip"
+
+
+def expires_at(job: ExportJob) -> Optional[datetime]:
+    """When a finished job's archive expires (None while it runs, or with no TTL)."""
+    if job.finished_at is None or settings.EXPORT_JOB_TTL_SECONDS <= 0:
+        return None
+    return job.finished_at + timedelta(seconds=settings.EXPORT_JOB_TTL_SECONDS)
+
+
+def is_expired(job: ExportJob) -> bool:
+    expiry = expires_at(job)
+    return expiry is not None and expiry <= datetime.now(timezone.utc)
+
+
+def enqueue_export_job(
+    db: Session, org: Organization, system: AISystem, variant: str = "v2"
+) -> ExportJob:
+    """Record a queued Annex IV export and wake an embedded worker, if any."""
+    if variant not in ANNEX_IV_VARIANTS:
+        raise ValueError(f"Unknown export variant: {variant}")
+    return _enqueue(
+        db, org, system, "annex_iv", variant,
+        variant_settings(variant, system.id)["filename"], ANNEX_IV_DOCUMENT_TEMPLATES,
+    )
+
+
+def enqueue_compliance_suite_job(
+    db: Session, org: Organization, system: AISystem, format: str = "md"
+) -> ExportJob:
+    """Record a queued export of every compliance suite document as one ZIP of ``format`` files."""
+    if format not in COMPLIANCE_SUITE_FORMATS:
+        raise ValueError(f"Unknown compliance suite format: {format}")
+    return _enqueue(
+        db, org, system, "compliance_suite", format,
+        f"compliance_suite_system_{system.id}_{format}.zip",
+        ComplianceSuiteService.TEMPLATE_MAPPING,
+    )
+
+
+def _enqueue(
+    db: Session,
+    org: Organization,
+    system: AISystem,
+    kind: str,
+    variant: str,
+    filename: str,
+    doc_types,
+) -> ExportJob:
+    job = ExportJob(
+        id=uuid.uuid4().hex,
+        org_id=org.id,
+        system_id=system.id,
+        kind=kind,
+        variant=variant,
+        status="queued",
+        filename=filename,
+        progress_json=json.dumps({doc_type: "pending" for doc_type in doc_types}),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    _wakeup.set()
+    return job
+
+
+def job_payload(job: ExportJob) -> Dict[str, Any]:
+    """Status representation returned by the jobs API."""
+    progress = json.loads(job.progress_json) if job.progress_json else {}
+    finished = sum(1 for state in progress.values() if state != "pending")
+    return {
+        "job_id": job.id,
+        "kind": job.kind,
+        "variant": job.variant,
+        "system_id": job.system_id,
+        "status": job.status,
+        "progress": {
+            "documents": progress,
+            "completed": finished,
+            "total": len(progress),
+        },
+        "filename": job.filename,
+        "sha256": job.sha256,
+        "bytes": job.size_bytes,
+        "error": job.error,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "expires_at": expires_at(job).isoformat() if expires_at(job) else None,
+        "status_url": f"/reports/jobs/{job.id}",
+        "download_url": f"/reports/jobs/{job.id}/download" if job.status == "done" else None,
+    }
+
+
+class ExportJobWorker:
+    """Claims queued export jobs and runs them one at a time."""
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        store=None,
+        poll_interval: Optional[float] = None,
+    ):
+        self.session_factory = session_factory
+        self._store = store
+        self.poll_interval = (
+            settings.EXPORT_WORKER_POLL_SECONDS if poll_interval is None else poll_interval
+        )
+        self.worker_id = uuid.uuid4().hex[:8]
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def store(self):
+        return self._store or job_store()
+
+    def claim_next(self, db: Session) -> Optional[str]:
+        """Move the oldest queued job to running and return its id."""
+        candidates = (
+            db.query(ExportJob.id)
+            .filter(ExportJob.status == "queued")
+            .order_by(ExportJob.created_at, ExportJob.id)
+            .limit(10)
+            .all()
+        )
+        now = datetime.now(timezone.utc)
+        for (job_id,) in candidates:
+            claimed = (
+                db.query(ExportJob)
+                .filter(ExportJob.id == job_id, ExportJob.status == "queued")
+                .update(
+                    {
+                        "status": "running",
+                        "started_at": now,
+                        "heartbeat_at": now,
+                        "attempts": ExportJob.attempts + 1,
+                    },
+                    synchronize_session=False,
+                )
+            )
+            db.commit()
+            if claimed:
+                return job_id
+        return None
+
+    def requeue_stale(self, db: Session) -> int:
+        """Requeue (or fail) running jobs whose worker stopped sending heartbeats."""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.EXPORT_JOB_STALE_SECONDS)
+        stale = (
+            db.query(ExportJob)
+            .filter(ExportJob.status == "running", ExportJob.heartbeat_at < cutoff)
+            .all()
+        )
+        for job in stale:
+            if job.attempts >= settings.EXPORT_JOB_MAX_ATTEMPTS:
+                job.status = "failed"
+                job.error = "Worker stopped responding"
+                job.finished_at = datetime.now(timezone.utc)
+            else:
+                job.status = "queued"
+            logger.warning(
+                f"Export job {job.id} went stale after attempt {job.attempts}; now {job.status}"
+            )
+        if stale:
+            db.commit()
+        return len(stale)
+
+    def purge_expired(self, db: Session) -> int:
+        """Delete jobs past ``EXPORT_JOB_TTL_SECONDS`` with their archives and integrity records."""
+        if settings.EXPORT_JOB_TTL_SECONDS <= 0:
+            return 0
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=settings.EXPORT_JOB_TTL_SECONDS)
+        expired = (
+            db.query(ExportJob)
+            .filter(ExportJob.status.in_(FINISHED_STATUSES), ExportJob.finished_at < cutoff)
+            .order_by(ExportJob.finished_at)
+            .limit(PURGE_BATCH_SIZE)
+            .all()
+        )
+        if not expired:
+            return 0
+        store = self.store
+        for job in expired:
+            # Archive first: a row without its archive answers 410, never a broken download
+            store.delete(artifact_name(job))
+            export_integrity.delete(job.id)
+        # Bulk delete: another worker may have purged some of these already
+        db.query(ExportJob).filter(ExportJob.id.in_([job.id for job in expired])).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        logger.info(f"Purged {len(expired)} expired export jobs")
+        return len(expired)
+
+    def run_pending(self) -> int:
+        """Run queued jobs until the queue is empty; return how many ran."""
+        ran = 0
+        while not self._stop.is_set():
+            db = self.session_factory()
+            try:
+                self.requeue_stale(db)
+                self.purge_expired(db)
+                job_id = self.claim_next(db)
+            finally:
+                db.close()
+            if job_id is None:
+                break
+            self.run_job(job_id)
+            ran += 1
+        return ran
+
+    def run_job(self, job_id: str) -> None:
+        """Build a claimed job's bundle and store it, recording the outcome on the row."""
+        db = self.session_factory()
+        # Progress commits must not expire the snapshot rows the bundle is rendered from
+        db.expire_on_commit = False
+        job = db.get(ExportJob, job_id)
+        try:
+            system = (
+                db.query(AISystem)
+                .filter(AISystem.id == job.system_id, AISystem.org_id == job.org_id)
+                .first()
+            )
+            org = db.get(Organization, job.org_id)
+            if not system or not org:
+                raise LookupError("System not found")
+
+            progress = json.loads(job.progress_json) if job.progress_json else {}
+
+            def on_progress(doc_type: str, ok: bool) -> None:
+                progress[doc_type] = "done" if ok else "failed"
+                job.progress_json = json.dumps(progress)
+                job.heartbeat_at = datetime.now(timezone.utc)
+                db.commit()
+
+            if job.kind == "compliance_suite":
+                stream = self._compliance_suite_stream(db, job, progress, on_progress)
+            else:
+                stream = self._bundle_stream(db, job, system, org, progress, on_progress)
+            sha256, size = self._write_artifact(job, stream)
+
+            job.status = "done"
+            job.sha256 = sha256
+            job.size_bytes = size
+            job.progress_json = json.dumps(progress)
+            job.finished_at = datetime.now(timezone.utc)
+            job.error = None
+            db.commit()
+            logger.info(f"Export job {job.id} done: {job.filename}, {size} bytes, sha256:{sha256}")
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Export job {job_id} failed: {e}", exc_info=True)
+            job.status = "failed"
+            job.error = str(e)
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+        finally:
+            db.close()
+
+    def _bundle_stream(
+        self,
+        db: Session,
+        job: ExportJob,
+        system: AISystem,
+        org: Organization,
+        progress: Dict[str, str],
+        on_progress: Callable[[str, bool], None],
+    ) -> Iterator[bytes]:
+        """The job's archive bytes: from the bundle cache if fresh, else rendered and cached."""
+        variant = variant_settings(job.variant, system.id)
+        builder = BundleBuilder(db, system, org)
+        fingerprint = bundle_fingerprint(builder, **variant)
+
+        if bundle_cache.get(fingerprint):
+            progress.update({doc_type: "cached" for doc_type in progress})
+            return bundle_cache.open(fingerprint)
+
+        stream = stream_annex_iv_bundle(builder, job.id, on_progress=on_progress, **variant)
+        cache_writer = bundle_cache.writer(fingerprint, scope=f"org{org.id}-{variant['filename']}")
+        if cache_writer:
+            stream = cache_while_streaming(stream, cache_writer, builder, variant["filename"])
+        return stream
+
+    def _compliance_suite_stream(
+        self,
+        db: Session,
+        job: ExportJob,
+        progress: Dict[str, str],
+        on_progress: Callable[[str, bool], None],
+    ) -> Iterator[bytes]:
+        """The compliance suite documents as ``job.variant`` files in a ZIP; fails if none do."""
+        writer = StreamingZipWriter()
+        exported = 0
+        for doc_type in progress:
+            try:
+                _, content, _ = compliance_suite_service.export_document(
+                    db, job.org_id, job.system_id, doc_type, job.variant
+                )
+            except Exception as e:
+                logger.warning(f"Export job {job.id}: {doc_type} failed: {e}")
+                on_progress(doc_type, False)
+                continue
+            # DOCX arrives as a spooled file
+            chunks = iter_file(content) if hasattr(content, "read") else [content]
+            yield from writer.stream_entry(f"{doc_type}.{job.variant}", chunks)
+            exported += 1
+            on_progress(doc_type, True)
+        if not exported:
+            raise RuntimeError("No compliance suite document could be exported")
+        yield writer.close()
+
+    def _write_artifact(self, job: ExportJob, stream: Iterator[bytes]):
+        """Spool the archive to a temp file, hashing as it goes, then move it into the store."""
+        store = self.store
+        hasher = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(
+            prefix=".job-", suffix=".part", dir=store.temp_dir(), delete=False
+        ) as tmp:
+            try:
+                for chunk in stream:
+                    tmp.write(chunk)
+                    hasher.update(chunk)
+                    size += len(chunk)
+            except BaseException:
+                tmp.close()
+                Path(tmp.name).unlink(missing_ok=True)
+                raise
+        store.put_file(artifact_name(job), Path(tmp.name))
+        return hasher.hexdigest(), size
+
+    def run_forever(self) -> None:
+        """Poll for work until ``stop`` is called."""
+        logger.info(f"Export worker {self.worker_id} started")
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                logger.error(f"Export worker {self.worker_id} poll failed: {e}", exc_info=True)
+            _wakeup.wait(self.poll_interval)
+            _wakeup.clear()
+        logger.info(f"Export worker {self.worker_id} stopped")
+
+    def start(self) -> None:
+        """Run the worker on a daemon thread."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="export-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        _wakeup.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+
+# Set by enqueue so an embedded worker picks new jobs up without waiting a full poll
+_wakeup = threading.Event()
+
+# Global worker instance (started by the API lifespan when embedded)
+export_worker = ExportJobWorker()
+
+
+if __name__ == "__main__":
+    from app.core.logging_config import configure_logging
+
+    configure_logging(use_json=settings.ENVIRONMENT == "production")
+    try:
+        export_worker.run_forever()
+    except KeyboardInterrupt:
+        export_worker.stop()
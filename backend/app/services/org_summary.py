@@ -0,0 +1,156 @@
+"""
+Org Summary
+
+The dashboard's summary counts (systems, high-risk and GPAI systems,
+controls, evidence linked to controls, recent incidents and open actions)
+for an org, computed in one statement: one conditional-aggregation subquery
+per table, cross-joined into a single row.
+
+Results are cached per org and keyed by ``Organization.revision``, which
+the revision hooks bump on every change to the org's systems or their rows
+(see ``revisions``). The revision comes with the org the API key lookup
+already loaded, so a warm request runs no query of its own. The incident
+and action counts cover sliding windows, so entries also expire after
+``SUMMARY_CACHE_TTL_SECONDS``.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import case, func, or_, select, true
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.core.config import settings
+from app.models import Action, AISystem, Control, Evidence, Incident
+
+HIGH_RISK_CLASSES = ("high", "high-risk", "high_risk")
+OPEN_ACTION_STATUSES = ("open", "in_progress")
+INCIDENT_WINDOW = timedelta(days=30)
+ACTION_WINDOW = timedelta(days=7)
+
+# Orgs kept in the cache
+MAX_ENTRIES = 4096
+
+
+def _count_where(condition: Any) -> Any:
+    # COUNT skips the NULL that CASE yields without a match (portable COUNT(*) FILTER (WHERE ...))
+    return func.count(case((condition, 1)))
+
+
+def summary_statement(org_id: int, now: datetime) -> Select:
+    """One row of every summary count for an org."""
+    systems = select(
+        func.count().label("systems"),
+        _count_where(or_(
+            AISystem.criticality == "high", AISystem.ai_act_class.in_(HIGH_RISK_CLASSES)
+        )).label("high_risk"),
+        _count_where(AISystem.is_general_purpose_ai == True).label("gpai_count"),  # noqa: E712
+    ).where(AISystem.org_id == org_id).subquery()
+    controls = select(func.count().label("controls")).where(Control.org_id == org_id).subquery()
+    evidence = select(
+        func.count(Evidence.control_id).label("evidence_with_control_id"),
+        func.count(Evidence.control_name).label("evidence_with_control_name"),
+    ).where(Evidence.org_id == org_id).subquery()
+    incidents = select(func.count().label("last_30d_incidents")).where(
+        Incident.org_id == org_id, Incident.detected_at >= now - INCIDENT_WINDOW
+    ).subquery()
+    actions = select(func.count().label("open_actions_7d")).where(
+        Action.org_id == org_id,
+        Action.status.in_(OPEN_ACTION_STATUSES),
+        Action.created_at >= now - ACTION_WINDOW,
+    ).subquery()
+    return select(systems, controls, evidence, incidents, actions).select_from(
+        systems.join(controls, true())
+        .join(evidence, true())
+        .join(incidents, true())
+        .join(actions, true())
+    )
+
+
+def evidence_coverage(counts: Dict[str, int]) -> Tuple[float, str]:
+    """Evidence coverage percentage and how it was calculated."""
+    total_controls = counts["controls"]
+    if total_controls == 0:
+        return 0.0, "no_controls"
+    # Evidence linked by control_id is preferred over the legacy control_name
+    if counts["evidence_with_control_id"] > 0:
+        return counts["evidence_with_control_id"] / total_controls * 100, "calculated_with_id"
+    if counts["evidence_with_control_name"] > 0:
+        return counts["evidence_with_control_name"] / total_controls * 100, "calculated_legacy"
+    return 0.0, "no_evidence"
+
+
+def compute_summary(db: Session, org_id: int, now: Optional[datetime] = None) -> Dict[str, Any]:
+    """The summary report of an org, read in one statement."""
+    statement = summary_statement(org_id, now or datetime.now(timezone.utc))
+    counts = dict(db.execute(statement).one()._mapping)
+    coverage_pct, coverage_status = evidence_coverage(counts)
+    return {
+        "systems": counts["systems"],
+        "high_risk": counts["high_risk"],
+        "last_30d_incidents": counts["last_30d_incidents"],
+        "overrides_pct": None,
+        "gpai_count": counts["gpai_count"],
+        "evidence_coverage_pct": round(coverage_pct, 2),
+        "evidence_coverage_status": coverage_status,
+        "open_actions_7d": counts["open_actions_7d"],
+    }
+
+
+class SummaryCache:
+    """Thread-safe LRU of org summaries keyed by org revision, with a TTL."""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: int = MAX_ENTRIES):
+        self.ttl_seconds = (
+            settings.SUMMARY_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        )
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # org_id -> (revision, expires_at, summary)
+        self._entries: "OrderedDict[int, Tuple[int, float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, db: Session, org_id: int, revision: Optional[int]) -> Dict[str, Any]:
+        """The org's summary at ``revision``, computed on a miss (always with no revision)."""
+        if revision is None:
+            with self._lock:
+                self.misses += 1
+            return compute_summary(db, org_id)
+        with self._lock:
+            entry = self._entries.get(org_id)
+            if entry is not None and entry[0] == revision and entry[1] > time.monotonic():
+                self._entries.move_to_end(org_id)
+                self.hits += 1
+                return dict(entry[2])
+            self.misses += 1
+        summary = compute_summary(db, org_id)
+        if self.ttl_seconds > 0:
+            with self._lock:
+                self._entries[org_id] = (revision, time.monotonic() + self.ttl_seconds, summary)
+                self._entries.move_to_end(org_id)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return dict(summary)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# Global summary cache instance
+summary_cache = SummaryCache()
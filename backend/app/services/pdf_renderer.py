@@ -0,0 +1,518 @@
+"""
+PDF Renderer
+
+Out-of-process WeasyPrint rendering shared by every PDF producer (document
+generation, compliance-suite exports). Layout is CPU-bound and holds the
+GIL, so it runs on a pool of ``PDF_RENDER_WORKERS`` spawned processes, each
+warmed up once with WeasyPrint, the font configuration and the stylesheets.
+
+- The queue is bounded (``PDF_QUEUE_SIZE`` jobs queued or running). A submit
+  waits up to ``PDF_QUEUE_WAIT_SECONDS`` for room and then raises
+  ``PdfQueueFullError``, which the API turns into a 503.
+- A job running past ``RENDER_TIMEOUT_SECONDS`` (timed from when a worker
+  picks it up) is counted as timed out and its pool is replaced (stuck
+  workers are terminated), so new jobs never wait behind it.
+- Workers are recycled after ``PDF_WORKER_MAX_JOBS`` renders, or as soon as
+  one reports a peak RSS above ``PDF_WORKER_MAX_RSS_MB``.
+
+With ``PDF_RENDER_WORKERS`` set to 0 jobs run on the calling thread, with
+the same queue bound and metrics.
+"""
+
+import itertools
+import logging
+import multiprocessing
+import queue
+import resource
+import threading
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from weasyprint import CSS, HTML
+    from weasyprint.text.fonts import FontConfiguration
+    WEASYPRINT_AVAILABLE = True
+except (ImportError, OSError):
+    WEASYPRINT_AVAILABLE = False
+
+try:
+    import fitz  # PyMuPDF, used to split combined PDFs
+    PYMUPDF_AVAILABLE = True
+except ImportError:
+    PYMUPDF_AVAILABLE = False
+
+
+class PdfQueueFullError(RuntimeError):
+    """Raised when the PDF queue stays full for longer than ``PDF_QUEUE_WAIT_SECONDS``."""
+
+
+class PdfRenderTimeoutError(TimeoutError):
+    """Raised (as the job's error) when a render runs past the timeout."""
+
+
+# Per-process WeasyPrint state, built once (in workers: by ``_warm_worker``)
+_font_config = None
+_stylesheets: Dict[str, Any] = {}
+
+# In workers: where job ids are posted when a job starts (set by ``_warm_worker``)
+_started_queue = None
+
+# Stylesheets every worker parses at start-up (see ``register_stylesheet``)
+_registered_stylesheets: List[str] = []
+
+
+def register_stylesheet(css: str) -> str:
+    """Have workers parse ``css`` at start-up rather than on their first job."""
+    if css not in _registered_stylesheets:
+        _registered_stylesheets.append(css)
+    return css
+
+
+def font_config():
+    """Font configuration shared by every PDF rendered in this process."""
+    global _font_config
+    if _font_config is None:
+        _font_config = FontConfiguration()
+    return _font_config
+
+
+def stylesheet(css: str):
+    """Parsed stylesheet for ``css``, cached for the life of the process."""
+    parsed = _stylesheets.get(css)
+    if parsed is None:
+        parsed = _stylesheets[css] = CSS(string=css, font_config=font_config())
+    return parsed
+
+
+def render_html_pdf(html: str, css: Optional[str] = None) -> bytes:
+    """HTML to PDF bytes. Module-level so it can run in the worker processes."""
+    if not WEASYPRINT_AVAILABLE:
+        raise RuntimeError("WeasyPrint is not available. Cannot generate PDF.")
+    stylesheets = [stylesheet(css)] if css else []
+    return HTML(string=html).write_pdf(stylesheets=stylesheets, font_config=font_config())
+
+
+def render_sections_pdf(
+    html: str, css: str, section_ids: Sequence[str]
+) -> Tuple[bytes, Dict[str, List[int]]]:
+    """
+    Lay out ``html`` once and report the page range of each section.
+
+    Every section must start on a new page. Returns the PDF bytes and
+    ``{section_id: [first_page, last_page]}`` (0-based, inclusive).
+    """
+    if not WEASYPRINT_AVAILABLE:
+        raise RuntimeError("WeasyPrint is not available. Cannot generate PDF.")
+    document = HTML(string=html).render(stylesheets=[stylesheet(css)], font_config=font_config())
+    wanted = set(section_ids)
+    starts: Dict[str, int] = {}
+    for index, page in enumerate(document.pages):
+        for anchor in page.anchors:
+            if anchor in wanted:
+                starts.setdefault(anchor, index)
+    ordered = sorted(starts.items(), key=lambda item: item[1])
+    ranges = {}
+    for position, (section_id, first) in enumerate(ordered):
+        following = ordered[position + 1][1] if position + 1 < len(ordered) else len(document.pages)
+        ranges[section_id] = [first, following - 1]
+    return document.write_pdf(), ranges
+
+
+def extract_pages(pdf: bytes, first: int, last: int) -> bytes:
+    """Copy pages ``first``..``last`` (0-based, inclusive) of ``pdf`` into a new PDF."""
+    if not PYMUPDF_AVAILABLE:
+        raise RuntimeError("PyMuPDF is not available. Cannot split PDF.")
+    with fitz.open(stream=pdf, filetype="pdf") as source, fitz.open() as target:
+        target.insert_pdf(source, from_page=first, to_page=last)
+        return target.tobytes(garbage=3, deflate=True)
+
+
+def _warm_worker(stylesheets: Tuple[str, ...], started_queue) -> None:
+    """Worker initializer: load fonts and stylesheets before the first job."""
+    global _started_queue
+    _started_queue = started_queue
+    if WEASYPRINT_AVAILABLE:
+        for css in stylesheets:
+            stylesheet(css)
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _run_job(
+    job_id: Optional[int], fn: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]
+) -> Tuple[Any, float, float]:
+    """Run one job in a worker; report its render time and the worker's peak memory."""
+    if job_id is not None and _started_queue is not None:
+        # Start the timeout clock now, not while the job waited for a worker
+        _started_queue.put(job_id)
+    started = time.perf_counter()
+    value = fn(*args, **kwargs)
+    return value, time.perf_counter() - started, _peak_rss_mb()
+
+
+def _noop() -> None:
+    return None
+
+
+def _terminate_workers(pool: ProcessPoolExecutor) -> None:
+    """Kill a pool's processes; stuck workers never pick up the shutdown sentinel."""
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+
+
+@dataclass
+class _Job:
+    """Bookkeeping for one submitted job."""
+    outer: Future
+    call: Tuple[Callable[..., Any], Tuple[Any, ...], Dict[str, Any]]
+    generation: int = 0
+    id: int = 0
+    pool: Optional[ProcessPoolExecutor] = None
+    started_queue: Any = None
+    started: Optional[float] = None
+    timed_out: bool = False
+    retried: bool = False
+
+
+class PdfRenderService(Executor):
+    """
+    Bounded, self-healing process pool for PDF rendering.
+
+    An ``Executor``, so ``RenderExecutor.run_pdf`` can submit to it like any
+    other pool; ``render`` and ``render_html`` are the blocking helpers.
+    Constructor arguments override the corresponding settings.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        queue_wait: Optional[float] = None,
+        timeout: Optional[float] = None,
+        max_jobs_per_worker: Optional[int] = None,
+        max_worker_rss_mb: Optional[int] = None,
+    ):
+        self._overrides = {
+            "workers": workers,
+            "queue_size": queue_size,
+            "queue_wait": queue_wait,
+            "timeout": timeout,
+            "max_jobs_per_worker": max_jobs_per_worker,
+            "max_worker_rss_mb": max_worker_rss_mb,
+        }
+        # Re-entrant: cancelling futures runs their callbacks on this thread
+        self._cond = threading.Condition(threading.RLock())
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._started_queue = None
+        self._generation = 0
+        self._ids = itertools.count()
+        self._jobs: Dict[Future, _Job] = {}
+        # Slots taken by submitters that have not dispatched their job yet
+        self._reserved = 0
+        self._inline_running = 0
+        self._watchdog: Optional[threading.Thread] = None
+        self._stats = self._empty_stats()
+
+    @staticmethod
+    def _empty_stats() -> Dict[str, Any]:
+        return {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "rejected": 0,
+            "recycles": 0,
+            "render_seconds": 0.0,
+            "max_render_seconds": 0.0,
+            "peak_worker_rss_mb": 0.0,
+        }
+
+    def _setting(self, name: str, setting: str) -> Any:
+        value = self._overrides[name]
+        return getattr(settings, setting) if value is None else value
+
+    @property
+    def workers(self) -> int:
+        return self._setting("workers", "PDF_RENDER_WORKERS")
+
+    @property
+    def queue_size(self) -> int:
+        return max(1, self._setting("queue_size", "PDF_QUEUE_SIZE"))
+
+    @property
+    def timeout(self) -> float:
+        return self._setting("timeout", "RENDER_TIMEOUT_SECONDS")
+
+    # -- submission -------------------------------------------------------
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        """Queue ``fn(*args, **kwargs)``; raises ``PdfQueueFullError`` when there is no room."""
+        self._reserve_slot()
+        if self.workers <= 0:
+            return self._run_inline(fn, args, kwargs)
+
+        outer: Future = Future()
+        with self._cond:
+            try:
+                self._start_watchdog()
+                self._dispatch(_Job(outer, (fn, args, kwargs)))
+            finally:
+                # The job now counts in ``_jobs`` (or never made it there)
+                self._reserved -= 1
+                self._cond.notify_all()
+        return outer
+
+    def render(self, fn: Callable[..., Any], /, *args: Any) -> Any:
+        """Run one job and wait for its result (errors and timeouts are raised)."""
+        return self.submit(fn, *args).result()
+
+    def render_html(self, html: str, css: Optional[str] = None) -> bytes:
+        """Render an HTML document to PDF bytes."""
+        return self.render(render_html_pdf, html, css)
+
+    def _reserve_slot(self) -> None:
+        deadline = time.monotonic() + self._setting("queue_wait", "PDF_QUEUE_WAIT_SECONDS")
+        with self._cond:
+            while self._depth() >= self.queue_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["rejected"] += 1
+                    raise PdfQueueFullError(f"PDF render queue is full ({self.queue_size} jobs)")
+                self._cond.wait(remaining)
+            # Counted until the job is dispatched, so concurrent submitters see it
+            self._reserved += 1
+            self._stats["submitted"] += 1
+
+    def _depth(self) -> int:
+        return len(self._jobs) + self._reserved + self._inline_running
+
+    def _run_inline(
+        self, fn: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> Future:
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        with self._cond:
+            self._reserved -= 1
+            self._inline_running += 1
+        try:
+            value, elapsed, _ = _run_job(None, fn, args, kwargs)
+            self._record_success(elapsed, 0.0)
+            future.set_result(value)
+        except Exception as e:
+            with self._cond:
+                self._stats["failed"] += 1
+            future.set_exception(e)
+        finally:
+            with self._cond:
+                self._inline_running -= 1
+                self._cond.notify_all()
+        return future
+
+    def _process_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a multi-threaded server process is unsafe
+            context = multiprocessing.get_context("spawn")
+            self._started_queue = context.Queue()
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=context,
+                initializer=_warm_worker,
+                initargs=(tuple(_registered_stylesheets), self._started_queue),
+                max_tasks_per_child=(
+                    self._setting("max_jobs_per_worker", "PDF_WORKER_MAX_JOBS") or None
+                ),
+            )
+        return self._pool
+
+    def _dispatch(self, job: _Job) -> None:
+        """Submit ``job`` to the current pool (called with the lock held)."""
+        fn, args, kwargs = job.call
+        job.id, job.started = next(self._ids), None
+        try:
+            inner = self._process_pool().submit(_run_job, job.id, fn, args, kwargs)
+        except BrokenProcessPool:
+            self._replace_pool("worker pool broken")
+            inner = self._process_pool().submit(_run_job, job.id, fn, args, kwargs)
+        job.generation = self._generation
+        job.pool, job.started_queue = self._pool, self._started_queue
+        self._jobs[inner] = job
+        inner.add_done_callback(self._finished)
+
+    # -- completion -------------------------------------------------------
+
+    def _finished(self, inner: Future) -> None:
+        with self._cond:
+            job = self._jobs.pop(inner, None)
+            if job is None:
+                return
+            error = None if inner.cancelled() else inner.exception()
+            if isinstance(error, BrokenProcessPool) and not job.timed_out:
+                if job.generation == self._generation:
+                    self._replace_pool("worker process died")
+                elif not job.retried and not job.outer.cancelled():
+                    # Collateral of a recycled pool: give the job one more go
+                    job.retried = True
+                    self._dispatch(job)
+                    return
+            self._cond.notify_all()
+
+        outer = job.outer
+        if job.timed_out:
+            self._set(outer, error=PdfRenderTimeoutError(f"PDF render exceeded {self.timeout}s"))
+        elif inner.cancelled():
+            outer.cancel()
+        elif error is not None:
+            with self._cond:
+                self._stats["failed"] += 1
+            self._set(outer, error=error)
+        else:
+            value, elapsed, rss_mb = inner.result()
+            self._record_success(elapsed, rss_mb)
+            cap = self._setting("max_worker_rss_mb", "PDF_WORKER_MAX_RSS_MB")
+            if cap and rss_mb > cap:
+                with self._cond:
+                    if job.generation == self._generation:
+                        self._replace_pool(f"worker reached {rss_mb:.0f} MB (cap {cap} MB)")
+            self._set(outer, value=value)
+
+    @staticmethod
+    def _set(outer: Future, value: Any = None, error: Optional[BaseException] = None) -> None:
+        if not outer.set_running_or_notify_cancel():
+            return
+        if error is not None:
+            outer.set_exception(error)
+        else:
+            outer.set_result(value)
+
+    def _record_success(self, elapsed: float, rss_mb: float) -> None:
+        with self._cond:
+            stats = self._stats
+            stats["completed"] += 1
+            stats["render_seconds"] += elapsed
+            stats["max_render_seconds"] = max(stats["max_render_seconds"], elapsed)
+            stats["peak_worker_rss_mb"] = max(stats["peak_worker_rss_mb"], rss_mb)
+
+    # -- recycling --------------------------------------------------------
+
+    def _replace_pool(self, reason: str, terminate: bool = False) -> None:
+        """Retire the current pool (called with the lock held); the next job starts a new one."""
+        pool, self._pool, self._started_queue = self._pool, None, None
+        self._generation += 1
+        self._stats["recycles"] += 1
+        logger.warning(f"Recycling PDF render workers: {reason}")
+        if pool is None:
+            return
+        if terminate:
+            _terminate_workers(pool)
+        threading.Thread(
+            target=pool.shutdown, kwargs={"wait": True, "cancel_futures": terminate},
+            name="pdf-pool-retire", daemon=True
+        ).start()
+
+    def _start_watchdog(self) -> None:
+        if self._watchdog is None or not self._watchdog.is_alive():
+            self._watchdog = threading.Thread(target=self._watch, name="pdf-watchdog", daemon=True)
+            self._watchdog.start()
+
+    def _watch(self) -> None:
+        """Expire jobs that run past the timeout and drop cancelled ones."""
+        with self._cond:
+            while self._jobs:
+                self._cond.wait(min(1.0, max(0.05, self.timeout / 4)))
+                self._mark_started()
+                now = time.monotonic()
+                stuck = []
+                for inner, job in list(self._jobs.items()):
+                    if job.outer.cancelled():
+                        inner.cancel()
+                    elif (
+                        not job.timed_out
+                        and job.started is not None
+                        and now - job.started > self.timeout
+                    ):
+                        job.timed_out = True
+                        self._stats["timeouts"] += 1
+                        if job.pool not in stuck:
+                            stuck.append(job.pool)
+                for pool in stuck:
+                    if pool is self._pool:
+                        self._replace_pool(f"render exceeded {self.timeout}s", terminate=True)
+                    else:
+                        _terminate_workers(pool)
+            self._watchdog = None
+
+    def _mark_started(self) -> None:
+        """Stamp jobs that workers have reported as started (called with the lock held)."""
+        by_id = {job.id: job for job in self._jobs.values()}
+        queues = {
+            id(job.started_queue): job.started_queue
+            for job in by_id.values() if job.started_queue
+        }
+        now = time.monotonic()
+        for started_queue in queues.values():
+            while True:
+                try:
+                    job = by_id.get(started_queue.get_nowait())
+                except (queue.Empty, OSError, ValueError):
+                    break
+                if job is not None and job.started is None:
+                    job.started = now
+
+    # -- lifecycle --------------------------------------------------------
+
+    def warm(self) -> None:
+        """Start every worker now so the first real render does not pay for it."""
+        if self.workers <= 0:
+            return
+        with self._cond:
+            pool = self._process_pool()
+        for future in [pool.submit(_noop) for _ in range(self.workers)]:
+            future.result()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, worker and render-time counters."""
+        with self._cond:
+            self._mark_started()
+            stats = dict(self._stats)
+            running = self._inline_running + sum(
+                1 for job in self._jobs.values() if job.started is not None
+            )
+            queued = self._depth() - running
+            generation = self._generation
+        completed = stats["completed"]
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queue_depth": queued,
+            "in_flight": running,
+            **stats,
+            "render_seconds": round(stats["render_seconds"], 6),
+            "max_render_seconds": round(stats["max_render_seconds"], 6),
+            "avg_render_seconds": (
+                round(stats["render_seconds"] / completed, 6) if completed else None
+            ),
+            "peak_worker_rss_mb": round(stats["peak_worker_rss_mb"], 1),
+            "pool_generation": generation,
+        }
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """Stop the workers; the service starts a new pool if used again."""
+        with self._cond:
+            pool, self._pool, self._started_queue = self._pool, None, None
+            self._generation += 1
+        if pool is not None:
+            pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+
+# Global PDF render service instance
+pdf_renderer = PdfRenderService()
@@ -0,0 +1,121 @@
+"""
+Preview Cache
+
+Sanitized preview HTML keyed by the SHA-256 of the document's Markdown, so
+clicking between previews skips Markdown conversion and bleach sanitizing
+for content already seen. Entries are evicted least-recently-used once the
+cache holds more than ``PREVIEW_CACHE_MAX_BYTES`` of HTML.
+
+The content hash doubles as the preview's ETag. Document generation warms
+the cache with every document it renders.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import bleach
+import markdown
+
+from app.core.config import settings
+
+PREVIEW_TAGS = [
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'p', 'br', 'strong', 'em', 'u', 'b', 'i',
+    'ul', 'ol', 'li', 'blockquote', 'pre', 'code',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td',
+    'a', 'img', 'div', 'span'
+]
+
+PREVIEW_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'img': ['src', 'alt', 'title', 'width', 'height'],
+    'table': ['class'],
+    'th': ['class'],
+    'td': ['class'],
+    'div': ['class'],
+    'span': ['class']
+}
+
+
+def render_preview_html(markdown_content: str) -> str:
+    """Markdown to HTML, sanitized to prevent XSS."""
+    html_content = markdown.markdown(markdown_content, extensions=['tables', 'fenced_code', 'toc'])
+    return bleach.clean(html_content, tags=PREVIEW_TAGS, attributes=PREVIEW_ATTRIBUTES, strip=True)
+
+
+class PreviewCache:
+    """Thread-safe LRU of sanitized HTML, capped by total size."""
+
+    def __init__(self, max_bytes: Optional[int] = None):
+        self.max_bytes = settings.PREVIEW_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    def get(self, content: bytes) -> Tuple[str, str]:
+        """``(html, content_hash)`` for Markdown ``content``, rendering it on a miss."""
+        key = self.content_hash(content)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], key
+            self.misses += 1
+        # Render outside the lock; a concurrent miss on the same key just renders twice
+        html_content = render_preview_html(content.decode("utf-8"))
+        self._put(key, html_content)
+        return html_content, key
+
+    def warm(self, content: bytes) -> None:
+        """Render and cache ``content`` unless it is cached already."""
+        key = self.content_hash(content)
+        with self._lock:
+            if key in self._entries:
+                return
+        self._put(key, render_preview_html(content.decode("utf-8")))
+
+    def _put(self, key: str, html_content: str) -> None:
+        size = len(html_content.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = (html_content, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# Global preview cache instance
+preview_cache = PreviewCache()
@@ -0,0 +1,179 @@
+"""
+Read Models
+
+Compact, read-only rows for reporting and export paths that only read a few
+columns. Each read model is a ``NamedTuple`` loaded with a Core ``select()``
+of just its columns, so large orgs skip loading long ``Text`` columns,
+identity-map bookkeeping and attribute instrumentation.
+
+Read models are plain values: they are never tracked by the session, never
+lazy-load and cannot be written back. Code that changes rows, or templates
+that read many columns, keep using the ORM models.
+"""
+
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+
+from app.models import FRIA, PMM, AIRisk, AISystem, Control, Evidence, Organization
+from app.services.context_loader import SECTION_QUERIES
+
+
+class SystemRow(NamedTuple):
+    """An AI system with the flags its compliance checks read, and its org's role."""
+    id: int
+    org_id: int
+    name: str
+    ai_act_class: Optional[str]
+    system_role: Optional[str]
+    impacts_fundamental_rights: Optional[bool]
+    uses_biometrics: Optional[bool]
+    biometrics_in_public: Optional[bool]
+    org_role: Optional[str]
+
+    @property
+    def requires_fria_computed(self) -> bool:
+        """Same rule as ``AISystem.requires_fria_computed``."""
+        return bool(
+            self.impacts_fundamental_rights or
+            self.uses_biometrics or
+            self.biometrics_in_public or
+            self.ai_act_class == 'high-risk'
+        )
+
+    @property
+    def eu_db_required_computed(self) -> bool:
+        """Same rule as ``AISystem.eu_db_required_computed``."""
+        is_provider = self.system_role == 'provider' or self.org_role == 'provider'
+        return is_provider and self.ai_act_class == 'high-risk'
+
+
+class ControlRow(NamedTuple):
+    id: int
+    system_id: int
+    iso_clause: Optional[str]
+    name: str
+    status: Optional[str]
+    owner_email: Optional[str]
+    due_date: Optional[date]
+    rationale: Optional[str]
+
+
+class EvidenceRow(NamedTuple):
+    id: int
+    system_id: Optional[int]
+    control_id: Optional[int]
+    label: str
+    version: Optional[str]
+    iso42001_clause: Optional[str]
+    control_name: Optional[str]
+
+
+class RiskRow(NamedTuple):
+    id: int
+    system_id: int
+
+
+class PMMRow(NamedTuple):
+    id: int
+    system_id: int
+    retention_months: Optional[int]
+    logging_scope: Optional[str]
+    eu_db_status: Optional[str]
+
+
+class FRIARow(NamedTuple):
+    id: int
+    system_id: int
+    status: Optional[str]
+    created_at: Optional[datetime]
+
+
+# Table each read model is projected from; fields named like its columns
+SOURCES: Dict[Type[Any], Type[Any]] = {
+    SystemRow: AISystem,
+    ControlRow: Control,
+    EvidenceRow: Evidence,
+    RiskRow: AIRisk,
+    PMMRow: PMM,
+    FRIARow: FRIA,
+}
+
+# Fields read from the org rather than the source table
+ORG_FIELDS = frozenset({"org_role"})
+
+# Row order per source table, as in document snapshots (by id otherwise)
+ORDER_BY: Dict[Type[Any], Tuple[Any, ...]] = {
+    model: order_by for model, order_by in SECTION_QUERIES.values()
+}
+ORDER_BY[AISystem] = (AISystem.id,)
+
+
+def is_read_model(cls: Any) -> bool:
+    return cls in SOURCES
+
+
+def system_column(read_model: Type[Any]) -> Any:
+    """Column a read model's rows are grouped by system on."""
+    source = SOURCES[read_model]
+    return source.id if source is AISystem else source.system_id
+
+
+@lru_cache(maxsize=None)
+def _base_statement(read_model: Type[Any]) -> Select:
+    source = SOURCES[read_model]
+    columns = [
+        getattr(Organization, field) if field in ORG_FIELDS else getattr(source, field)
+        for field in read_model._fields
+    ]
+    statement = select(*columns)
+    if ORG_FIELDS & set(read_model._fields):
+        statement = statement.select_from(source).join(
+            Organization, Organization.id == source.org_id
+        )
+    return statement
+
+
+def select_rows(read_model: Type[Any], org_id: int, system_ids: Optional[Sequence[int]] = None,
+                order_by: Optional[Sequence[Any]] = None) -> Select:
+    """
+    Projection of a read model's columns for an org, or some of its systems.
+
+    Rows come in snapshot order for the table unless ``order_by`` is given.
+    Add ``.where(...)`` for further filters; run it with ``load``.
+    """
+    source = SOURCES[read_model]
+    statement = _base_statement(read_model).where(source.org_id == org_id)
+    if system_ids is not None:
+        statement = statement.where(system_column(read_model).in_(system_ids))
+    return statement.order_by(*(order_by or ORDER_BY.get(source, (source.id,))))
+
+
+def load(db: Session, read_model: Type[Any], statement: Select) -> List[Any]:
+    """Rows of a ``select_rows`` statement as ``read_model`` tuples."""
+    make = read_model._make
+    return [make(row) for row in db.execute(statement)]
+
+
+def load_rows(db: Session, read_model: Type[Any], org_id: int,
+              system_ids: Optional[Sequence[int]] = None) -> List[Any]:
+    """All rows of a read model for an org, or some of its systems."""
+    return load(db, read_model, select_rows(read_model, org_id, system_ids))
+
+
+def from_entities(read_model: Type[Any], entities: Iterable[Any]) -> Optional[List[Any]]:
+    """
+    Read model rows of already-loaded ORM rows, without querying.
+
+    ``None`` for read models with fields from another table (they would
+    lazy-load a relationship per row).
+    """
+    if ORG_FIELDS & set(read_model._fields):
+        return None
+    fields = read_model._fields
+    make = read_model._make
+    return [make([getattr(entity, field) for field in fields]) for entity in entities]
@@ -0,0 +1,200 @@
+"""
+Render Executor
+
+Fans per-document rendering out across worker pools while keeping results in
+submission order, so bundle entries and manifests stay deterministic.
+
+- Jinja renders run on a shared thread pool (``RENDER_MAX_WORKERS``).
+- WeasyPrint renders go to the PDF render service (``pdf_renderer``), a
+  bounded, recycled process pool, because layout is CPU-bound and holds the
+  GIL. With 0 ``PDF_RENDER_WORKERS`` PDFs fall back to the thread pool.
+
+Every job gets ``RENDER_TIMEOUT_SECONDS`` from when a worker starts it, so
+jobs queued behind a large batch on the shared pool keep their full budget.
+A job that misses it is reported as failed; the worker is not interrupted,
+its result is simply discarded. ``RENDER_BATCH_TIMEOUT_SECONDS`` optionally
+bounds a whole ``run`` (queueing included); jobs still unfinished then are
+reported as timed out too.
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.services.pdf_renderer import PdfRenderService, pdf_renderer
+
+logger = logging.getLogger(__name__)
+
+
+class RenderJob(NamedTuple):
+    """One unit of render work: ``fn(*args)`` identified by ``key``."""
+    key: str
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...] = ()
+
+
+@dataclass
+class RenderResult:
+    """Outcome of a render job."""
+    key: str
+    value: Any = None
+    error: Optional[BaseException] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class RenderTimeoutError(TimeoutError):
+    """Raised (as a result error) when a render job misses its deadline."""
+
+
+class _JobClock:
+    """When a worker started a job; ``event`` is set once it started or finished."""
+
+    def __init__(self) -> None:
+        self.started: Optional[float] = None
+        self.event = threading.Event()
+
+
+def _timed_call(fn: Callable[..., Any], args: Tuple[Any, ...],
+                clock: Optional[_JobClock] = None) -> Tuple[Any, float]:
+    """Run ``fn`` and report how long it took inside the worker."""
+    if clock is not None:
+        clock.started = time.monotonic()
+        clock.event.set()
+    started = time.perf_counter()
+    value = fn(*args)
+    return value, time.perf_counter() - started
+
+
+_pool_lock = threading.Lock()
+_render_pool: Optional[ThreadPoolExecutor] = None
+
+
+def get_render_pool() -> ThreadPoolExecutor:
+    """Process-wide thread pool for template renders."""
+    global _render_pool
+    with _pool_lock:
+        if _render_pool is None:
+            _render_pool = ThreadPoolExecutor(
+                max_workers=max(1, settings.RENDER_MAX_WORKERS),
+                thread_name_prefix="render"
+            )
+        return _render_pool
+
+
+def get_pdf_pool() -> Optional[Executor]:
+    """The PDF render service, or None when PDF workers are disabled."""
+    if settings.PDF_RENDER_WORKERS <= 0:
+        return None
+    return pdf_renderer
+
+
+class RenderExecutor:
+    """Runs render jobs concurrently and yields their results in job order."""
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        render_pool: Optional[Executor] = None,
+        pdf_pool: Optional[Executor] = None,
+        batch_timeout: Optional[float] = None,
+    ):
+        self.timeout = settings.RENDER_TIMEOUT_SECONDS if timeout is None else timeout
+        self.batch_timeout = (
+            settings.RENDER_BATCH_TIMEOUT_SECONDS if batch_timeout is None else batch_timeout
+        )
+        self._render_pool = render_pool
+        self._pdf_pool = pdf_pool
+
+    @property
+    def render_pool(self) -> Executor:
+        return self._render_pool or get_render_pool()
+
+    @property
+    def pdf_pool(self) -> Executor:
+        return self._pdf_pool or get_pdf_pool() or self.render_pool
+
+    def run(self, jobs: Sequence[RenderJob]) -> Iterator[RenderResult]:
+        """Run template jobs on the thread pool."""
+        return self._run_ordered(self.render_pool, jobs, clocked=True)
+
+    def run_pdf(self, jobs: Sequence[RenderJob]) -> Iterator[RenderResult]:
+        """
+        Run PDF jobs on the PDF render service (job functions must be picklable).
+
+        The service enforces the per-job deadline from when a worker starts
+        the job, so jobs waiting in its queue are not timed out here.
+        """
+        pool = self.pdf_pool
+        return self._run_ordered(pool, jobs, clocked=not isinstance(pool, PdfRenderService))
+
+    def _run_ordered(
+        self, pool: Executor, jobs: Sequence[RenderJob], clocked: bool
+    ) -> Iterator[RenderResult]:
+        batch_deadline = time.monotonic() + self.batch_timeout if self.batch_timeout > 0 else None
+        submitted: List[Tuple[RenderJob, Future, _JobClock, float]] = []
+        for job in jobs:
+            clock = _JobClock()
+            # The PDF render service times its jobs from when a worker starts them itself
+            call = (job.fn, job.args, clock) if clocked else (job.fn, job.args)
+            try:
+                future = pool.submit(_timed_call, *call)
+            except RuntimeError as e:
+                # Queue full or pool shut down: report it as this job's error
+                future = Future()
+                future.set_exception(e)
+            # Wake the consumer if the job ends without ever starting (cancelled, failed submit)
+            future.add_done_callback(lambda _, clock=clock: clock.event.set())
+            submitted.append((job, future, clock, time.monotonic()))
+
+        try:
+            for job, future, clock, submitted_at in submitted:
+                try:
+                    value, elapsed = self._result(job, future, clock, batch_deadline)
+                    yield RenderResult(job.key, value=value, elapsed=elapsed)
+                except RenderTimeoutError as e:
+                    future.cancel()
+                    logger.error(f"Render of {job.key} timed out: {e}")
+                    elapsed = time.monotonic() - (clock.started or submitted_at)
+                    yield RenderResult(job.key, error=e, elapsed=elapsed)
+                except Exception as e:
+                    logger.error(f"Render of {job.key} failed: {e}")
+                    elapsed = time.monotonic() - (clock.started or submitted_at)
+                    yield RenderResult(job.key, error=e, elapsed=elapsed)
+        finally:
+            # Consumer stopped early (e.g. client disconnected): drop queued work
+            for _, future, _, _ in submitted:
+                future.cancel()
+
+    def _result(self, job: RenderJob, future: Future, clock: _JobClock,
+                batch_deadline: Optional[float]) -> Tuple[Any, float]:
+        """
+        Wait for a job: ``timeout`` from when it starts, within the batch deadline.
+
+        Jobs without a clock (on the PDF render service) are only held to the
+        batch deadline here.
+        """
+        if not clock.event.wait(_remaining(batch_deadline)):
+            raise RenderTimeoutError(
+                f"{job.key} did not start within the {self.batch_timeout}s batch deadline"
+            )
+        deadline = batch_deadline
+        if clock.started is not None:
+            job_deadline = clock.started + self.timeout
+            deadline = job_deadline if deadline is None else min(deadline, job_deadline)
+        try:
+            return future.result(timeout=_remaining(deadline))
+        except FutureTimeoutError:
+            raise RenderTimeoutError(f"{job.key} exceeded {self.timeout}s") from None
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.0, deadline - time.monotonic())
@@ -0,0 +1,134 @@
+"""
+Render Store
+
+Persistent home for individually rendered documents. Metadata (fingerprint,
+hash, size, blob name) is a ``rendered_documents`` row; the content is a
+blob in ``RENDER_STORE_DIR``, or in the S3 bucket under
+``rendered-documents/`` when S3 is configured.
+
+A stored document is current while its fingerprint matches the one computed
+from the system's data now (``DocumentInputs.fingerprint``). Download and
+preview render a missing or stale document on demand and store it, so bulk
+generation is only a warm-up.
+"""
+
+import hashlib
+import logging
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models import RenderedDocument
+from app.services.bundle_cache import LocalBundleStore, S3BundleStore
+
+logger = logging.getLogger(__name__)
+
+# pages: the page map of a combined PDF
+FORMAT_EXTENSIONS = {"markdown": "md", "pdf": "pdf", "pages": "json"}
+
+
+def render_blob_store():
+    """S3 when configured, else ``RENDER_STORE_DIR``."""
+    if settings.use_s3:
+        from app.services.s3 import s3_service
+        return S3BundleStore(s3_service.client, settings.S3_BUCKET, prefix="rendered-documents/")
+    return LocalBundleStore(Path(settings.RENDER_STORE_DIR))
+
+
+class RenderStore:
+    """Rendered documents keyed by (org, system, doc type, format)."""
+
+    def __init__(self, store=None):
+        self._store = store
+
+    @property
+    def store(self):
+        return self._store or render_blob_store()
+
+    def get(
+        self, db: Session, org_id: int, system_id: int, doc_type: str, fmt: str
+    ) -> Optional[RenderedDocument]:
+        return db.query(RenderedDocument).filter(
+            RenderedDocument.org_id == org_id,
+            RenderedDocument.system_id == system_id,
+            RenderedDocument.doc_type == doc_type,
+            RenderedDocument.format == fmt,
+        ).first()
+
+    def entries(
+        self, db: Session, org_id: int, system_id: int
+    ) -> Dict[Tuple[str, str], RenderedDocument]:
+        """Every stored document of a system, keyed by (doc_type, format)."""
+        rows = db.query(RenderedDocument).filter(
+            RenderedDocument.org_id == org_id,
+            RenderedDocument.system_id == system_id,
+        ).all()
+        return {(row.doc_type, row.format): row for row in rows}
+
+    def read(self, row: RenderedDocument) -> Optional[bytes]:
+        """Content of a stored document, or None if its blob is gone."""
+        try:
+            return b"".join(self.store.iter_bytes(row.blob_name))
+        except Exception as e:
+            logger.warning(f"Render store blob {row.blob_name} unreadable: {e}")
+            return None
+
+    def save(
+        self,
+        db: Session,
+        org_id: int,
+        system_id: int,
+        doc_type: str,
+        fmt: str,
+        fingerprint: str,
+        content: bytes,
+    ) -> RenderedDocument:
+        """Store ``content`` as the current rendering and commit its row."""
+        store = self.store
+        extension = FORMAT_EXTENSIONS[fmt]
+        name = f"org{org_id}/system{system_id}/{doc_type}-{fingerprint[:16]}.{extension}"
+        with tempfile.NamedTemporaryFile(
+            prefix=".render-", suffix=".part", dir=store.temp_dir(), delete=False
+        ) as tmp:
+            tmp.write(content)
+        store.put_file(name, Path(tmp.name))
+
+        values = {
+            "fingerprint": fingerprint,
+            "blob_name": name,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "size_bytes": len(content),
+            "updated_at": datetime.now(timezone.utc),
+        }
+        row = self.get(db, org_id, system_id, doc_type, fmt)
+        previous = row.blob_name if row is not None else None
+        if row is None:
+            row = RenderedDocument(
+                org_id=org_id, system_id=system_id, doc_type=doc_type, format=fmt, **values
+            )
+            db.add(row)
+        else:
+            for field, value in values.items():
+                setattr(row, field, value)
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent request stored it first; take its row over
+            db.rollback()
+            row = self.get(db, org_id, system_id, doc_type, fmt)
+            previous = row.blob_name
+            for field, value in values.items():
+                setattr(row, field, value)
+            db.commit()
+        if previous and previous != name:
+            store.delete(previous)
+        return row
+
+
+# Global render store instance
+render_store = RenderStore()
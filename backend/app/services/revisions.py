@@ -0,0 +1,143 @@
+"""
+Revisions
+
+``AISystem.revision`` and ``Organization.revision`` count changes to
+everything a system's documents, scores and dashboards are built from. A
+cache can key its entries by ``(system_id, revision)`` instead of
+fingerprinting the rows: a new revision means something changed.
+
+Session event hooks bump the counters in the same transaction as the change:
+
+- inserting, updating or deleting a row of a dependent table bumps its
+  system (old and new system when a row moves) and the system's org;
+- changing a system bumps it and its org, changing an org bumps the org;
+- ORM bulk UPDATE and DELETE statements on these tables bump every system
+  and org they match.
+
+The bump is an ``UPDATE ... SET revision = revision + 1``, so concurrent
+writers never lose an increment. Render store and export job rows are cache
+output, not input, and do not bump anything.
+"""
+
+from typing import Any, Iterable, Optional, Set
+
+from sqlalchemy import event, select, update
+from sqlalchemy import inspect as sa_inspect
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.models import (
+    FRIA,
+    PMM,
+    Action,
+    AIRisk,
+    AISystem,
+    ArtifactText,
+    Control,
+    DocumentApproval,
+    Evidence,
+    Incident,
+    ModelVersion,
+    OnboardingData,
+    Organization,
+    Oversight,
+    SoAItem,
+)
+
+# Tables whose rows belong to a system (``system_id``) of an org (``org_id``)
+DEPENDENT_MODELS = frozenset({
+    Control, AIRisk, Evidence, PMM, Oversight, FRIA, ModelVersion, DocumentApproval,
+    OnboardingData, SoAItem, Incident, Action, ArtifactText,
+})
+
+PENDING_KEY = "pending_revisions"
+BUMP_OPTION = "revision_bump"
+
+
+def system_revision(db: Session, system_id: int) -> Optional[int]:
+    """Current revision of a system, or ``None`` if it does not exist."""
+    return db.execute(
+        select(AISystem.revision).where(AISystem.id == system_id)
+    ).scalar_one_or_none()
+
+
+def org_revision(db: Session, org_id: int) -> Optional[int]:
+    """Current revision of an org, or ``None`` if it does not exist."""
+    return db.execute(
+        select(Organization.revision).where(Organization.id == org_id)
+    ).scalar_one_or_none()
+
+
+def bump(db: Session, system_ids: Iterable[int] = (), org_ids: Iterable[int] = ()) -> None:
+    """Increment the revision of the given systems and orgs."""
+    for model, ids in ((AISystem, set(system_ids)), (Organization, set(org_ids))):
+        ids.discard(None)
+        if ids:
+            db.execute(
+                update(model).where(model.id.in_(sorted(ids))).values(revision=model.revision + 1),
+                execution_options={"synchronize_session": False, BUMP_OPTION: True},
+            )
+
+
+def _values(obj: Any, key: str) -> Set[int]:
+    """Current and, if it was changed, previous value of an attribute."""
+    values = {getattr(obj, key), *sa_inspect(obj).attrs[key].history.deleted}
+    values.discard(None)
+    return values
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_flushed(session: Session, flush_context: Any, instances: Any) -> None:
+    system_ids: Set[int] = set()
+    org_ids: Set[int] = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        model = type(obj)
+        if model in DEPENDENT_MODELS:
+            system_ids.update(_values(obj, "system_id"))
+            org_ids.update(_values(obj, "org_id"))
+        elif model is AISystem:
+            if obj not in session.new:
+                system_ids.add(obj.id)
+            org_ids.update(_values(obj, "org_id"))
+        elif model is Organization and obj not in session.new:
+            org_ids.add(obj.id)
+    # Bumped once the flush has written the rows
+    session.info[PENDING_KEY] = (system_ids, org_ids)
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _bump_flushed(session: Session, flush_context: Any) -> None:
+    system_ids, org_ids = session.info.pop(PENDING_KEY, (set(), set()))
+    if not system_ids and not org_ids:
+        return
+    bump(session, system_ids, org_ids)
+    # Loaded systems and orgs re-read their revision on next access
+    for obj in list(session.identity_map.values()):
+        if (type(obj) is AISystem and obj.id in system_ids) or (
+            type(obj) is Organization and obj.id in org_ids
+        ):
+            session.expire(obj, ["revision"])
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _bump_bulk(state: ORMExecuteState) -> Any:
+    if not (state.is_update or state.is_delete) or state.execution_options.get(BUMP_OPTION):
+        return None
+    mapper = state.bind_mapper
+    model = mapper.class_ if mapper is not None else None
+    if model not in DEPENDENT_MODELS and model is not AISystem:
+        return None
+
+    # Rows the statement matches, read before it changes or removes them
+    system_col = AISystem.id if model is AISystem else model.system_id
+    matched = select(system_col, model.org_id).distinct()
+    if state.statement.whereclause is not None:
+        matched = matched.where(state.statement.whereclause)
+    rows = state.session.execute(
+        matched, state.parameters, execution_options={BUMP_OPTION: True}
+    ).all()
+
+    result = state.invoke_statement()
+    bump(state.session, (row[0] for row in rows), (row[1] for row in rows))
+    return result
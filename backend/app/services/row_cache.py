@@ -0,0 +1,193 @@
+"""
+Row Cache
+
+Request-scoped read-through cache of row sets keyed by (model, org_id,
+system_id). Services that need the same systems, controls, PMM or FRIA rows
+within one request read them through the session's cache, so each set is
+queried at most once per request however many services ask for it. Read
+models (``read_models``) are cached the same way; a read model set is
+projected from the ORM set of its table when that is cached.
+
+The cache lives in ``session.info``; ``get_db`` opens one session per
+request, so it never outlives the request. Any flush, commit or rollback on
+the session clears it, so a request never reads rows older than its own
+writes. Hit and miss counts are kept per cache and, with
+``ROW_CACHE_HEADER``, reported per request in an ``X-Row-Cache`` header.
+"""
+
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.models import AISystem
+from app.services import read_models
+from app.services.context_loader import SECTION_QUERIES
+from app.services.read_models import SystemRow
+
+SESSION_KEY = "row_cache"
+
+# Row order per model: the snapshot order where the model is a snapshot section
+ROW_ORDER: Dict[Type[Any], Tuple[Any, ...]] = {
+    model: order_by for model, order_by in SECTION_QUERIES.values()
+}
+
+CacheKey = Tuple[Type[Any], int, Optional[int]]
+
+
+@dataclass
+class RowCacheStats:
+    """Hit and miss counts of one request (summed over its sessions)."""
+    hits: int = 0
+    misses: int = 0
+
+    def header(self) -> str:
+        return f"hits={self.hits}, misses={self.misses}"
+
+
+_request_stats: ContextVar[Optional[RowCacheStats]] = ContextVar(
+    "row_cache_request_stats", default=None
+)
+
+
+def start_request_stats() -> RowCacheStats:
+    """Count row cache hits and misses of the current request (and the threads it hands work to)."""
+    stats = RowCacheStats()
+    _request_stats.set(stats)
+    return stats
+
+
+class RowCache:
+    """
+    Row sets of one session, keyed by (model, org_id, system_id).
+
+    ``system_id=None`` is the org-wide set; a per-system set is served from
+    the org-wide one when that is cached. Cached sets are tuples in
+    ``ROW_ORDER``, so callers cannot change what other services see.
+    """
+
+    def __init__(self, session: Session):
+        self.session = session
+        self.hits = 0
+        self.misses = 0
+        self._rows: Dict[CacheKey, Tuple[Any, ...]] = {}
+
+    def rows(
+        self, model: Type[Any], org_id: int, system_id: Optional[int] = None
+    ) -> Tuple[Any, ...]:
+        """Rows of ``model`` for an org, or one of its systems."""
+        key = (model, org_id, system_id)
+        cached = self._lookup(key)
+        if cached is not None:
+            self._count(hit=True)
+            return cached
+        self._count(hit=False)
+        if read_models.is_read_model(model):
+            system_ids = None if system_id is None else [system_id]
+            rows = self._rows[key] = tuple(
+                read_models.load_rows(self.session, model, org_id, system_ids)
+            )
+            return rows
+        query = self.session.query(model).filter(model.org_id == org_id)
+        if system_id is not None:
+            query = query.filter((model.id if model is AISystem else model.system_id) == system_id)
+        order_by = ROW_ORDER.get(model, model.__mapper__.primary_key)
+        rows = self._rows[key] = tuple(query.order_by(*order_by).all())
+        return rows
+
+    def first(self, model: Type[Any], org_id: int, system_id: int) -> Optional[Any]:
+        """First row of a system in ``ROW_ORDER`` (e.g. the latest FRIA), if any."""
+        rows = self.rows(model, org_id, system_id)
+        return rows[0] if rows else None
+
+    def systems(self, org_id: int) -> Tuple[SystemRow, ...]:
+        """All systems of an org, by id, as read models."""
+        return self.rows(SystemRow, org_id)
+
+    def system(self, org_id: int, system_id: int) -> Optional[SystemRow]:
+        """One system of an org, or ``None`` if it belongs to another org or does not exist."""
+        return self.first(SystemRow, org_id, system_id)
+
+    def cached(
+        self, model: Type[Any], org_id: int, system_ids: Sequence[int]
+    ) -> Optional[List[Any]]:
+        """
+        Cached rows of several systems, system by system, without loading.
+
+        ``None`` (not counted) unless every system's set is cached; then one hit.
+        """
+        sets = [self._lookup((model, org_id, system_id)) for system_id in system_ids]
+        if any(rows is None for rows in sets):
+            return None
+        self._count(hit=True)
+        return [row for rows in sets for row in rows]
+
+    def prime(self, model: Type[Any], org_id: int, system_ids: Iterable[int], rows: Iterable[Any],
+              miss: bool = False) -> None:
+        """
+        Store rows loaded elsewhere (in ``ROW_ORDER``) for each of ``system_ids``.
+
+        Pass ``miss=True`` when they were loaded because the cache lacked them.
+        """
+        grouped: Dict[int, List[Any]] = {system_id: [] for system_id in system_ids}
+        for row in rows:
+            grouped.setdefault(self._system_id(row), []).append(row)
+        for system_id, system_rows in grouped.items():
+            self._rows.setdefault((model, org_id, system_id), tuple(system_rows))
+        if miss:
+            self._count(hit=False)
+
+    def clear(self) -> None:
+        self._rows.clear()
+
+    def metrics(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "row_sets": len(self._rows)}
+
+    def _lookup(self, key: CacheKey) -> Optional[Tuple[Any, ...]]:
+        cached = self._rows.get(key)
+        model, org_id, system_id = key
+        if cached is None and system_id is not None:
+            org_rows = self._rows.get((model, org_id, None))
+            if org_rows is not None:
+                cached = self._rows[key] = tuple(
+                    row for row in org_rows if self._system_id(row) == system_id
+                )
+        if cached is None and read_models.is_read_model(model):
+            entities = self._lookup((read_models.SOURCES[model], org_id, system_id))
+            projected = read_models.from_entities(model, entities) if entities is not None else None
+            if projected is not None:
+                cached = self._rows[key] = tuple(projected)
+        return cached
+
+    def _count(self, hit: bool) -> None:
+        stats = _request_stats.get()
+        if hit:
+            self.hits += 1
+            if stats is not None:
+                stats.hits += 1
+        else:
+            self.misses += 1
+            if stats is not None:
+                stats.misses += 1
+
+    @staticmethod
+    def _system_id(row: Any) -> int:
+        return row.id if isinstance(row, (AISystem, SystemRow)) else row.system_id
+
+
+def row_cache(session: Session) -> RowCache:
+    """The session's row cache, created on first use."""
+    cache = session.info.get(SESSION_KEY)
+    if cache is None:
+        cache = session.info[SESSION_KEY] = RowCache(session)
+        for name in ("after_flush", "after_commit", "after_rollback"):
+            event.listen(session, name, _clear_on_write)
+    return cache
+
+
+def _clear_on_write(session: Session, *args: Any) -> None:
+    cache = session.info.get(SESSION_KEY)
+    if cache is not None:
+        cache.clear()
@@ -8,7 +8,10 @@ from typing import List
 
 from sqlalchemy.orm import Session
 
-from app.models import AISystem, Control, Evidence
+from app.models import Control
+from app.services.control_evidence import load_control_evidence
+from app.services.read_models import ControlRow, load, select_rows
+from app.services.row_cache import row_cache
 
 
 def generate_soa_csv(system_id: int, org_id: int, db: Session) -> str:
@@ -27,19 +30,14 @@ def generate_soa_csv(system_id: int, org_id: int, db: Session) -> str:
     """
     
     # Get system
-    system = db.query(AISystem).filter(
-        AISystem.id == system_id,
-        AISystem.org_id == org_id
-    ).first()
+    system = row_cache(db).system(org_id, system_id)
     
     if not system:
         raise ValueError(f"System {system_id} not found")
     
-    # Get all controls for this system
-    controls = db.query(Control).filter(
-        Control.system_id == system_id,
-        Control.org_id == org_id
-    ).all()
+    # Get all controls for this system with their evidence (two queries)
+    links = load_control_evidence(db, org_id, [system_id])
+    controls = links.controls_for(system_id)
     
     # Create CSV in memory
     output = io.StringIO()
@@ -59,12 +57,7 @@ def generate_soa_csv(system_id: int, org_id: int, db: Session) -> str:
     
     # Write control rows
     for control in controls:
-        # Get evidence for this control
-        evidence_list = db.query(Evidence).filter(
-            Evidence.control_id == control.id,
-            Evidence.org_id == org_id
-        ).all()
-        
+        evidence_list = links.evidence_for(control)
         evidence_links = ", ".join([
             f"{e.label} (v{e.version or '1'})" for e in evidence_list
         ]) if evidence_list else "No evidence uploaded"
@@ -93,19 +86,13 @@ def generate_soa_markdown(system_id: int, org_id: int, db: Session) -> str:
     """
     
     # Get system
-    system = db.query(AISystem).filter(
-        AISystem.id == system_id,
-        AISystem.org_id == org_id
-    ).first()
+    system = row_cache(db).system(org_id, system_id)
     
     if not system:
         raise ValueError(f"System {system_id} not found")
     
-    # Get all controls for this system
-    controls = db.query(Control).filter(
-        Control.system_id == system_id,
-        Control.org_id == org_id
-    ).all()
+    # Get all controls for this system (read models of the columns listed)
+    controls = load(db, ControlRow, select_rows(ControlRow, org_id, [system_id], order_by=(Control.id,)))
     
     # Build markdown table
     md = f"# Statement of Applicability\n\n"
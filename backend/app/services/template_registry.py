@@ -0,0 +1,206 @@
+"""
+Template Registry
+
+One Jinja ``Environment`` per template directory for the whole process, so
+templates are parsed and compiled once instead of on every request. Compiled
+templates are also kept on disk (``TEMPLATE_BYTECODE_CACHE_DIR``) so a
+restarted or forked worker skips compilation too.
+
+Templates are re-checked against their modification time on every lookup
+while ``TEMPLATE_AUTO_RELOAD`` is on; turn it off in production, where
+templates only change with a deploy. Load (compile or bytecode-cache) and
+render times are kept per template and served by ``/templates/render-stats``.
+
+``variables`` reports the context variables a template references, worked
+out from its source once per loaded version, so callers can load only the
+data a template reads. The query count and time of those loads are kept
+with the template's timings.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Mapping, Optional, Set, Tuple, Union
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, meta, nodes
+
+from app.core.config import settings
+
+
+@dataclass
+class TemplateStats:
+    """Cumulative load and render timings for one template."""
+    compiles: int = 0
+    compile_seconds: float = 0.0
+    renders: int = 0
+    render_seconds: float = 0.0
+    context_loads: int = 0
+    context_queries: int = 0
+    context_load_seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        loads = self.context_loads
+        return {
+            "compiles": self.compiles,
+            "compile_seconds": round(self.compile_seconds, 6),
+            "renders": self.renders,
+            "render_seconds": round(self.render_seconds, 6),
+            "avg_render_seconds": (
+                round(self.render_seconds / self.renders, 6) if self.renders else None
+            ),
+            "context_loads": loads,
+            "context_queries": self.context_queries,
+            "avg_context_queries": round(self.context_queries / loads, 2) if loads else None,
+            "avg_context_load_seconds": (
+                round(self.context_load_seconds / loads, 6) if loads else None
+            ),
+        }
+
+
+# Reported by ``variables`` for templates that include or extend others
+ALL_VARIABLES = "*"
+
+
+def referenced_variables(ast: nodes.Template) -> FrozenSet[str]:
+    """
+    Context variables a parsed template references.
+
+    A variable only read through constant attributes or keys is reported as
+    ``name.attr`` for each of them, any other use as ``name``.
+    """
+    if next(meta.find_referenced_templates(ast), None) is not None:
+        return frozenset({ALL_VARIABLES})
+    undeclared = meta.find_undeclared_variables(ast)
+    found: Set[str] = set()
+    accessed = set()
+    for node in ast.find_all((nodes.Getattr, nodes.Getitem)):
+        if not isinstance(node.node, nodes.Name) or node.node.name not in undeclared:
+            continue
+        if isinstance(node, nodes.Getattr):
+            attr = node.attr
+        elif isinstance(node.arg, nodes.Const) and isinstance(node.arg.value, str):
+            attr = node.arg.value
+        else:
+            continue
+        found.add(f"{node.node.name}.{attr}")
+        accessed.add(id(node.node))
+    for node in ast.find_all(nodes.Name):
+        if node.ctx == "load" and node.name in undeclared and id(node) not in accessed:
+            found.add(node.name)
+    return frozenset(found)
+
+
+class TemplateRegistry:
+    """
+    Process-wide, thread-safe access to compiled templates.
+
+    Jinja's own template cache is locked, so environments are shared freely
+    between request threads and render workers; the registry only guards
+    its own bookkeeping.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._environments: Dict[str, Environment] = {}
+        self._loaded: Dict[Tuple[str, str], Template] = {}
+        self._stats: Dict[Tuple[str, str], TemplateStats] = {}
+        self._variables: Dict[Tuple[str, str], Tuple[Template, FrozenSet[str]]] = {}
+
+    def environment(self, templates_dir: Union[str, Path]) -> Environment:
+        """The shared environment for ``templates_dir`` (created on first use)."""
+        key = str(Path(templates_dir).resolve())
+        with self._lock:
+            env = self._environments.get(key)
+            if env is None:
+                env = Environment(
+                    loader=FileSystemLoader(key),
+                    autoescape=True,
+                    auto_reload=settings.TEMPLATE_AUTO_RELOAD,
+                    bytecode_cache=self._bytecode_cache(),
+                )
+                self._environments[key] = env
+            return env
+
+    @staticmethod
+    def _bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+        if not settings.TEMPLATE_BYTECODE_CACHE_DIR:
+            return None
+        directory = Path(settings.TEMPLATE_BYTECODE_CACHE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        return FileSystemBytecodeCache(str(directory))
+
+    def get_template(self, templates_dir: Union[str, Path], name: str) -> Template:
+        """A compiled template; the time is recorded whenever Jinja (re)loads it."""
+        env = self.environment(templates_dir)
+        key = (env.loader.searchpath[0], name)
+        started = time.perf_counter()
+        template = env.get_template(name)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            if self._loaded.get(key) is not template:
+                self._loaded[key] = template
+                stats = self._stats.setdefault(key, TemplateStats())
+                stats.compiles += 1
+                stats.compile_seconds += elapsed
+        return template
+
+    def render(self, templates_dir: Union[str, Path], name: str, context: Mapping[str, Any]) -> str:
+        """Render a template with ``context``. Safe to call from worker threads."""
+        template = self.get_template(templates_dir, name)
+        started = time.perf_counter()
+        content = template.render(**context)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            key = (template.environment.loader.searchpath[0], name)
+            stats = self._stats.setdefault(key, TemplateStats())
+            stats.renders += 1
+            stats.render_seconds += elapsed
+        return content
+
+    def variables(self, templates_dir: Union[str, Path], name: str) -> FrozenSet[str]:
+        """Context variables ``name`` references (``referenced_variables``), cached per version."""
+        template = self.get_template(templates_dir, name)
+        key = (template.environment.loader.searchpath[0], name)
+        with self._lock:
+            cached = self._variables.get(key)
+        if cached is not None and cached[0] is template:
+            return cached[1]
+        env = template.environment
+        source, _, _ = env.loader.get_source(env, name)
+        found = referenced_variables(env.parse(source))
+        with self._lock:
+            self._variables[key] = (template, found)
+        return found
+
+    def record_context_load(
+        self, templates_dir: Union[str, Path], name: str, queries: int, seconds: float
+    ) -> None:
+        """Record loading the data for one render of ``name``."""
+        key = (self.environment(templates_dir).loader.searchpath[0], name)
+        with self._lock:
+            stats = self._stats.setdefault(key, TemplateStats())
+            stats.context_loads += 1
+            stats.context_queries += queries
+            stats.context_load_seconds += seconds
+
+    def stats(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """Timings per template, grouped by template directory name."""
+        with self._lock:
+            snapshot = {key: stats.as_dict() for key, stats in self._stats.items()}
+        grouped: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for (directory, name), stats in sorted(snapshot.items()):
+            grouped.setdefault(Path(directory).name, {})[name] = stats
+        return grouped
+
+    def clear(self) -> None:
+        """Drop every environment and timing (templates are reloaded on next use)."""
+        with self._lock:
+            self._environments.clear()
+            self._loaded.clear()
+            self._stats.clear()
+            self._variables.clear()
+
+
+# Global template registry instance
+template_registry = TemplateRegistry()
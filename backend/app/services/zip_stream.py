@@ -0,0 +1,433 @@
+"""
+Streaming ZIP writer for export bundles.
+
+Writes archive entries straight to the HTTP response instead of building the
+whole bundle in a BytesIO first. The archive SHA-256 is computed as bytes go
+out and published afterwards in a signed sidecar record, because the hash is
+only known once the last byte has been sent.
+
+Entries are compressed per a ``CompressionPolicy``: formats that are already
+compressed (PDF, images, Office files) are stored, text is deflated at
+``BUNDLE_DEFLATE_LEVEL``. ``StreamingTarZstWriter`` offers the same interface
+for a zstd-compressed tar, for machine consumers (needs ``zstandard``).
+"""
+
+import calendar
+import hashlib
+import hmac
+import json
+import logging
+import sys
+import tarfile
+import threading
+import zipfile
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path, PurePosixPath
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# zstd output is optional
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    zstandard = None
+    ZSTD_AVAILABLE = False
+
+Chunk = Union[str, bytes]
+
+# ZipFile.open() takes an entry's level from its ZipInfo; the attribute is public from Python 3.13
+_ZIPINFO_LEVEL = "compress_level" if sys.version_info >= (3, 13) else "_compresslevel"
+
+# Fixed entry timestamp (the earliest ZIP date) so identical inputs produce identical archives
+ZIP_EPOCH: Tuple[int, int, int, int, int, int] = (1980, 1, 1, 0, 0, 0)
+
+
+# Already-compressed formats: deflating them costs CPU for next to no size reduction
+STORED_EXTENSIONS = frozenset({
+    ".pdf", ".png", ".jpg", ".jpeg", ".gif", ".webp",
+    ".docx", ".xlsx", ".pptx", ".zip", ".gz", ".zst",
+})
+
+
+def _to_bytes(data: Chunk) -> bytes:
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+def _entry_metrics(name: str, method: str, size: int, compressed: int) -> Dict[str, Any]:
+    return {
+        "name": name,
+        "compression": method,
+        "bytes": size,
+        "compressed_bytes": compressed,
+        "ratio": round(compressed / size, 4) if size else 1.0,
+    }
+
+
+def _metrics_summary(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Per-entry compression records plus archive-wide totals."""
+    size = sum(entry["bytes"] for entry in entries)
+    compressed = sum(entry["compressed_bytes"] for entry in entries)
+    return {
+        "bytes": size,
+        "compressed_bytes": compressed,
+        "ratio": round(compressed / size, 4) if size else 1.0,
+        "entries": list(entries),
+    }
+
+
+class CompressionPolicy:
+    """
+    Chooses the ZIP compression of each entry from its file extension.
+
+    Entries in ``stored_extensions`` are stored as-is; everything else is
+    deflated at ``deflate_level`` (``BUNDLE_DEFLATE_LEVEL`` by default, 0
+    stores everything).
+    """
+
+    def __init__(
+        self,
+        deflate_level: Optional[int] = None,
+        stored_extensions: Iterable[str] = STORED_EXTENSIONS,
+    ):
+        self.deflate_level = (
+            settings.BUNDLE_DEFLATE_LEVEL if deflate_level is None else deflate_level
+        )
+        self.stored_extensions = frozenset(ext.lower() for ext in stored_extensions)
+
+    def for_entry(self, name: str) -> Tuple[int, Optional[int]]:
+        """``(compress_type, compress_level)`` for an entry name."""
+        if self.deflate_level == 0 or PurePosixPath(name).suffix.lower() in self.stored_extensions:
+            return zipfile.ZIP_STORED, None
+        return zipfile.ZIP_DEFLATED, self.deflate_level
+
+
+class _ChunkSink:
+    """
+    Write-only, non-seekable file object that collects zipfile output.
+
+    zipfile falls back to data descriptors when the target has no ``tell``,
+    so every entry can be flushed to the client as soon as it is written.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class StreamingZipWriter:
+    """
+    Incrementally builds a ZIP archive and hands back the bytes produced.
+
+    Each ``write_entry``/``stream_entry`` call returns (or yields) the archive
+    bytes generated so far, which the caller forwards to the client. Only the
+    central directory (one small record per entry) is kept in memory.
+
+    Every entry is stamped with ``date_time`` (``ZIP_EPOCH`` by default) and
+    fixed permissions, so the archive bytes depend only on entry names,
+    contents and order.
+
+    Compression follows ``policy`` (a default ``CompressionPolicy``) unless a
+    fixed ``compression`` is given for every entry. Each entry's compressed
+    size is kept in ``entry_metrics``.
+    """
+
+    media_type = "application/zip"
+
+    def __init__(
+        self,
+        compression: Optional[int] = None,
+        date_time: Tuple[int, ...] = ZIP_EPOCH,
+        policy: Optional[CompressionPolicy] = None,
+    ):
+        self._sink = _ChunkSink()
+        self._compression = compression
+        self._policy = policy or CompressionPolicy()
+        self._date_time = date_time
+        self._zip = zipfile.ZipFile(self._sink, "w", zipfile.ZIP_DEFLATED)
+        self._hash = hashlib.sha256()
+        self._closed = False
+        self.size = 0
+        self.artifacts: List[Dict[str, Any]] = []
+        self.entry_metrics: List[Dict[str, Any]] = []
+
+    def _drain(self) -> bytes:
+        data = self._sink.drain()
+        if data:
+            self._hash.update(data)
+            self.size += len(data)
+        return data
+
+    def _entry_info(self, name: str) -> zipfile.ZipInfo:
+        info = zipfile.ZipInfo(name, date_time=self._date_time)
+        if self._compression is not None:
+            info.compress_type, level = self._compression, None
+        else:
+            info.compress_type, level = self._policy.for_entry(name)
+        setattr(info, _ZIPINFO_LEVEL, level)
+        info.external_attr = 0o644 << 16
+        return info
+
+    def _record(self, info: zipfile.ZipInfo, sha256: str, size: int) -> None:
+        self.artifacts.append({
+            "name": info.filename,
+            "sha256": sha256,
+            "bytes": size
+        })
+        if info.compress_type == zipfile.ZIP_STORED:
+            method = "stored"
+        else:
+            level = getattr(info, _ZIPINFO_LEVEL)
+            method = f"deflate-{level}" if level is not None else "deflate"
+        self.entry_metrics.append(_entry_metrics(info.filename, method, size, info.compress_size))
+
+    def write_entry(self, name: str, data: Chunk) -> bytes:
+        """Add a complete entry and return the archive bytes it produced."""
+        content = _to_bytes(data)
+        info = self._entry_info(name)
+        self._zip.writestr(info, content)
+        self._record(info, hashlib.sha256(content).hexdigest(), len(content))
+        return self._drain()
+
+    def stream_entry(self, name: str, chunks: Iterable[Chunk]) -> Iterator[bytes]:
+        """Add an entry from an iterable of chunks, yielding archive bytes as they compress."""
+        entry_hash = hashlib.sha256()
+        entry_size = 0
+        info = self._entry_info(name)
+        with self._zip.open(info, "w") as dest:
+            for chunk in chunks:
+                content = _to_bytes(chunk)
+                if not content:
+                    continue
+                dest.write(content)
+                entry_hash.update(content)
+                entry_size += len(content)
+                data = self._drain()
+                if data:
+                    yield data
+        self._record(info, entry_hash.hexdigest(), entry_size)
+        data = self._drain()
+        if data:
+            yield data
+
+    def close(self) -> bytes:
+        """Write the central directory and return the final archive bytes."""
+        if self._closed:
+            return b""
+        self._zip.close()
+        self._closed = True
+        return self._drain()
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 of every archive byte emitted so far."""
+        return self._hash.hexdigest()
+
+    def compression_metrics(self) -> Dict[str, Any]:
+        """Compressed size and ratio (compressed / original) per entry written so far."""
+        return _metrics_summary(self.entry_metrics)
+
+
+class StreamingTarZstWriter:
+    """
+    ``StreamingZipWriter`` counterpart producing a zstd-compressed tar stream.
+
+    The whole stream is one zstd frame at ``level`` (``BUNDLE_ZSTD_LEVEL`` by
+    default), flushed block by block after each entry so bytes reach the
+    client per entry and each entry's compressed size can be measured. Tar
+    headers need the entry size up front, so ``stream_entry`` collects the
+    entry before writing it. Headers carry fixed owner, mode and
+    ``date_time``, so output depends only on entry names, contents and order.
+    """
+
+    media_type = "application/zstd"
+
+    def __init__(self, level: Optional[int] = None, date_time: Tuple[int, ...] = ZIP_EPOCH):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstd output requires the zstandard package")
+        self.level = settings.BUNDLE_ZSTD_LEVEL if level is None else level
+        self._compressor = zstandard.ZstdCompressor(level=self.level).compressobj()
+        self._mtime = calendar.timegm(tuple(date_time) + (0, 0, 0))
+        self._hash = hashlib.sha256()
+        self._closed = False
+        self._tar_size = 0
+        self.size = 0
+        self.artifacts: List[Dict[str, Any]] = []
+        self.entry_metrics: List[Dict[str, Any]] = []
+
+    def _emit(self, data: bytes) -> bytes:
+        if data:
+            self._hash.update(data)
+            self.size += len(data)
+        return data
+
+    def _write_tar(self, data: bytes) -> bytes:
+        self._tar_size += len(data)
+        return self._compressor.compress(data)
+
+    def write_entry(self, name: str, data: Chunk) -> bytes:
+        """Add a complete entry and return the archive bytes it produced."""
+        content = _to_bytes(data)
+        info = tarfile.TarInfo(name)
+        info.size = len(content)
+        info.mtime = self._mtime
+        info.mode = 0o644
+        padding = -len(content) % tarfile.BLOCKSIZE
+        out = self._write_tar(info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+        out += self._write_tar(content + b"\0" * padding)
+        out += self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        self.artifacts.append({
+            "name": name,
+            "sha256": hashlib.sha256(content).hexdigest(),
+            "bytes": len(content)
+        })
+        self.entry_metrics.append(
+            _entry_metrics(name, f"zstd-{self.level}", len(content), len(out))
+        )
+        return self._emit(out)
+
+    def stream_entry(self, name: str, chunks: Iterable[Chunk]) -> Iterator[bytes]:
+        """Add an entry from an iterable of chunks (collected first; see class docstring)."""
+        yield self.write_entry(name, b"".join(_to_bytes(chunk) for chunk in chunks))
+
+    def close(self) -> bytes:
+        """Write the end-of-archive marker, end the zstd frame and return the final bytes."""
+        if self._closed:
+            return b""
+        self._closed = True
+        end = tarfile.BLOCKSIZE * 2
+        end += -(self._tar_size + end) % tarfile.RECORDSIZE
+        out = self._write_tar(b"\0" * end) + self._compressor.flush()
+        return self._emit(out)
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 of every archive byte emitted so far."""
+        return self._hash.hexdigest()
+
+    def compression_metrics(self) -> Dict[str, Any]:
+        """Compressed size and ratio (compressed / original) per entry written so far."""
+        return _metrics_summary(self.entry_metrics)
+
+
+def integrity_store():
+    """S3 when configured, else ``EXPORT_INTEGRITY_DIR``."""
+    from app.services.bundle_cache import LocalBundleStore, S3BundleStore
+    if settings.use_s3:
+        from app.services.s3 import s3_service
+        return S3BundleStore(s3_service.client, settings.S3_BUCKET, prefix="export-integrity/")
+    return LocalBundleStore(Path(settings.EXPORT_INTEGRITY_DIR))
+
+
+class ExportIntegrityRegistry:
+    """
+    Signed integrity records for exports.
+
+    A record is added once the final byte of an export has been sent (or when
+    a stored bundle is served) and can then be fetched from the integrity
+    sidecar endpoint. Records are signed with HMAC-SHA256 over their canonical
+    JSON using ``SECRET_KEY`` and persisted as JSON in ``integrity_store``, so
+    they outlive restarts and are visible to every worker and replica; the
+    most recent ``max_records`` are also kept in memory.
+    """
+
+    def __init__(self, max_records: int = 1024, store=None):
+        self.max_records = max_records
+        self._store = store
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def store(self):
+        return self._store or integrity_store()
+
+    @staticmethod
+    def _name(export_id: str) -> str:
+        return f"{export_id}.json"
+
+    @staticmethod
+    def sign(payload: Dict[str, Any]) -> str:
+        """HMAC-SHA256 signature over the canonical JSON form of ``payload``."""
+        message = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def record(
+        self,
+        export_id: str,
+        org_id: int,
+        filename: str,
+        sha256: str,
+        size: int,
+        system_id: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Store and return the signed integrity record for a finished export."""
+        payload = {
+            "export_id": export_id,
+            "org_id": org_id,
+            "system_id": system_id,
+            "filename": filename,
+            "algorithm": "sha256",
+            "sha256": sha256,
+            "bytes": size,
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        record = {**payload, "signature": f"hmac-sha256:{self.sign(payload)}"}
+        self._remember(export_id, record)
+        try:
+            self.store.write_json(self._name(export_id), record)
+        except Exception as e:
+            # The export itself succeeded; only this worker can serve the sidecar
+            logger.error(f"Could not persist integrity record {export_id}: {e}")
+        return record
+
+    def get(self, export_id: str, org_id: int) -> Optional[Dict[str, Any]]:
+        """Return the record for ``export_id`` if it exists and belongs to ``org_id``."""
+        with self._lock:
+            record = self._records.get(export_id)
+        if record is None:
+            record = self.store.read_json(self._name(export_id))
+            if record is not None:
+                self._remember(export_id, record)
+        if not record or record["org_id"] != org_id:
+            return None
+        return record
+
+    def delete(self, export_id: str) -> None:
+        """Forget a record (e.g. once its export has expired)."""
+        with self._lock:
+            self._records.pop(export_id, None)
+        self.store.delete(self._name(export_id))
+
+    def _remember(self, export_id: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._records[export_id] = record
+            self._records.move_to_end(export_id)
+            while len(self._records) > self.max_records:
+                self._records.popitem(last=False)
+
+    @classmethod
+    def verify(cls, record: Dict[str, Any]) -> bool:
+        """Check that a record's signature matches its contents."""
+        payload = {k: v for k, v in record.items() if k != "signature"}
+        expected = f"hmac-sha256:{cls.sign(payload)}"
+        return hmac.compare_digest(expected, record.get("signature", ""))
+
+
+# Global integrity registry instance
+export_integrity = ExportIntegrityRegistry()
@@ -0,0 +1,128 @@
+"""
+Benchmark the UNION ALL snapshot loader against one query per table.
+
+Seeds a throwaway SQLite database with one system (risks, controls, evidence
+and a row in every other section) and times ``load_snapshot`` both ways.
+SQLite runs in-process, so ``--latency-ms`` adds a sleep per statement to
+stand in for the network round trip to a Postgres server.
+
+Usage:
+    python -m scripts.benchmark_context_loader [--controls 200] [--latency-ms 1.0] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.query_counter import QueryCounter  # noqa: E402
+from app.database import Base  # noqa: E402
+from app.models import (  # noqa: E402
+    FRIA,
+    PMM,
+    AIRisk,
+    AISystem,
+    Control,
+    DocumentApproval,
+    Evidence,
+    ModelVersion,
+    OnboardingData,
+    Organization,
+    Oversight,
+)
+from app.services import document_context  # noqa: E402
+from app.services.document_context import DocumentContextService  # noqa: E402
+from app.services.row_cache import row_cache  # noqa: E402
+
+
+def seed(session, controls: int) -> tuple:
+    org = Organization(name="Benchmark Corp", api_key="benchmark-key")
+    session.add(org)
+    session.flush()
+    system = AISystem(org_id=org.id, name="Benchmark System", ai_act_class="high-risk")
+    session.add(system)
+    session.flush()
+    now = datetime.now(timezone.utc)
+    for n in range(controls):
+        control = Control(
+            org_id=org.id, system_id=system.id, iso_clause=f"A.{n % 10}.{n}", name=f"Control {n}"
+        )
+        session.add(control)
+        session.flush()
+        session.add(Evidence(
+            org_id=org.id, system_id=system.id, control_id=control.id, label=f"Evidence {n}"
+        ))
+        session.add(AIRisk(org_id=org.id, system_id=system.id, description=f"Risk {n}"))
+    session.add_all([
+        Oversight(org_id=org.id, system_id=system.id),
+        PMM(org_id=org.id, system_id=system.id),
+        FRIA(org_id=org.id, system_id=system.id),
+        OnboardingData(org_id=org.id, system_id=system.id, data_json="{}"),
+        ModelVersion(org_id=org.id, system_id=system.id, version="1.0.0", released_at=now),
+        DocumentApproval(
+            org_id=org.id, system_id=system.id, doc_type="annex_iv", status="approved"
+        ),
+    ])
+    session.commit()
+    return system.id, org.id
+
+
+def timed(session, system_id: int, org_id: int, repeat: int):
+    service = DocumentContextService(session)
+    samples = []
+    for _ in range(repeat):
+        session.expunge_all()  # measure loading, not identity-map or row cache hits
+        row_cache(session).clear()
+        started = time.perf_counter()
+        with QueryCounter(session) as counter:
+            service.load_snapshot(system_id, org_id)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), counter.count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--controls", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/benchmark.db")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        system_id, org_id = seed(session, args.controls)
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def round_trip(*_):
+            time.sleep(args.latency_ms / 1000)
+
+        union, union_queries = timed(session, system_id, org_id, args.repeat)
+        supports = document_context.supports_union_loading
+        document_context.supports_union_loading = lambda session: False
+        try:
+            per_table, per_table_queries = timed(session, system_id, org_id, args.repeat)
+        finally:
+            document_context.supports_union_loading = supports
+        session.close()
+        engine.dispose()
+
+    print(f"{args.controls} controls/risks/evidence, {args.latency_ms:.1f} ms per round trip")
+    print(f"one query per table: {per_table * 1000:8.2f} ms  {per_table_queries:3d} statements")
+    print(f"UNION ALL loader:    {union * 1000:8.2f} ms  {union_queries:3d} statements")
+    print(f"ratio: {union / per_table:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark building and rendering a document context for very large systems.
+
+Builds an in-memory snapshot with N evidence rows (one control per 15
+evidence, as on our large platform systems, plus as many risks as controls)
+and renders a SoA-style template over it. Compares the lazy context sections
+with materializing every section as dicts first, which is what the context
+used to do, and times evidence coverage over the same rows.
+
+Usage:
+    python -m scripts.benchmark_document_context [--rows 10000 100000] [--repeat 3]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from jinja2 import Environment  # noqa: E402
+
+from app.models import AIRisk, AISystem, Control, Evidence, Organization  # noqa: E402
+from app.services.control_evidence import ControlEvidence  # noqa: E402
+from app.services.document_context import ContextSection, DocumentContextService, SystemSnapshot  # noqa: E402
+
+TEMPLATE = Environment().from_string(
+    "{{ controls|length }} controls, {{ evidence|length }} evidence, {{ risks|length }} risks\n"
+    "{% for c in controls %}| {{ c.iso_clause }} | {{ c.name }} | {{ c.status }} | "
+    "{% for e in c.evidence %}{{ e.label }} {% endfor %}|\n{% endfor %}"
+    "{% for e in evidence %}| {{ e.label }} | {{ e.checksum }} |\n{% endfor %}"
+    "{% for r in risks %}| {{ r.description }} | {{ r.priority }} |\n{% endfor %}"
+)
+
+
+def snapshot_with(rows: int) -> SystemSnapshot:
+    org = Organization(id=1, name="Benchmark Corp", api_key="benchmark-key")
+    system = AISystem(id=1, org_id=1, name="Benchmark System", ai_act_class="high-risk")
+    count = max(1, rows // 15)
+    controls = tuple(
+        Control(
+            id=n, org_id=1, system_id=1, iso_clause=f"A.{n % 10}.{n}", name=f"Control {n}",
+            status="partial",
+        )
+        for n in range(count)
+    )
+    evidence = tuple(
+        Evidence(
+            id=n, org_id=1, system_id=1, control_id=n % count, label=f"Evidence {n}",
+            checksum=f"{n:064x}",
+            iso42001_clause=f"A.{n % 10}.{n}" if n % 2 else None,
+            control_name=f"Control {n}" if n % 3 else None,
+        )
+        for n in range(rows)
+    )
+    risks = tuple(
+        AIRisk(id=n, org_id=1, system_id=1, description=f"Risk {n}") for n in range(count)
+    )
+    return SystemSnapshot(
+        org=org, system=system, risks=risks, controls=controls, oversight=None, pmm=None,
+        evidence=evidence, fria=None, onboarding_data=None, model_versions=(), approvals=(),
+    )
+
+
+def materialize(value):
+    """The context as it used to be: every section built as lists of dicts up front."""
+    if isinstance(value, dict):
+        return {key: materialize(item) for key, item in value.items()}
+    if isinstance(value, ContextSection):
+        return [materialize(item) for item in value]
+    return value
+
+
+def quadratic_coverage(links: ControlEvidence, snapshot: SystemSnapshot) -> float:
+    """Coverage the way it used to be matched: every control against every evidence row."""
+    controls = links.controls_for(snapshot.system.id)
+    covered = sum(
+        1 for control in controls
+        if any(
+            ev.iso42001_clause == control.iso_clause or ev.control_name == control.name
+            for ev in snapshot.evidence
+        )
+    )
+    return covered / len(controls)
+
+
+def measure(fn, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(samples), peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    service = DocumentContextService(db=None)
+    for rows in args.rows:
+        snapshot = snapshot_with(rows)
+
+        def eager():
+            snapshot.__dict__.pop("control_evidence", None)
+            context = service.build_context_from_snapshot(snapshot, "soa", "fixed")
+            TEMPLATE.render(materialize(context))
+
+        def lazy():
+            snapshot.__dict__.pop("control_evidence", None)
+            TEMPLATE.render(service.build_context_from_snapshot(snapshot, "soa", "fixed"))
+
+        eager_time, eager_peak = measure(eager, args.repeat)
+        lazy_time, lazy_peak = measure(lazy, args.repeat)
+        print(f"{rows} evidence, {len(snapshot.controls)} controls, {len(snapshot.risks)} risks")
+        print(
+            f"  materialized context: {eager_time * 1000:9.1f} ms  "
+            f"peak {eager_peak / 2**20:7.1f} MiB"
+        )
+        print(
+            f"  lazy sections:        {lazy_time * 1000:9.1f} ms  "
+            f"peak {lazy_peak / 2**20:7.1f} MiB"
+        )
+
+        links = ControlEvidence.from_snapshot(snapshot)
+        indexed, _ = measure(lambda: links.coverage(snapshot.system.id), args.repeat)
+        if rows <= 20_000:
+            matched, _ = measure(lambda: quadratic_coverage(links, snapshot), 1)
+            print(
+                f"  coverage: per-pair match {matched * 1000:9.1f} ms, "
+                f"indexed {indexed * 1000:7.2f} ms"
+            )
+        else:
+            print(
+                f"  coverage: indexed {indexed * 1000:7.2f} ms "
+                "(per-pair match skipped above 20000 rows)"
+            )
+
+
+if __name__ == "__main__":
+    main()
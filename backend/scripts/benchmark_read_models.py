@@ -0,0 +1,148 @@
+"""
+Benchmark read models against full ORM entities on the reporting paths.
+
+Seeds a throwaway SQLite database with one large org (systems with long text
+columns, controls and evidence) and times, both ways, the loads behind
+``/reports/score``, ``/reports/blocking-issues/org`` and the SoA CSV export.
+The identity map is cleared before every run, as in a fresh request.
+
+Usage:
+    python -m scripts.benchmark_read_models [--systems 200] [--controls 50] [--repeat 10]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key")
+
+from sqlalchemy import create_engine, or_, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import AISystem, Control, Evidence, Organization  # noqa: E402
+from app.services.read_models import (  # noqa: E402
+    ControlRow,
+    EvidenceRow,
+    SystemRow,
+    load,
+    load_rows,
+    select_rows,
+)
+
+LONG_TEXT = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 40
+
+
+def seed(session, systems: int, controls: int) -> int:
+    org = Organization(name="Benchmark Corp", api_key="benchmark-key", org_role="provider")
+    session.add(org)
+    session.flush()
+    for s in range(systems):
+        system = AISystem(
+            org_id=org.id, name=f"System {s}",
+            ai_act_class="high-risk" if s % 3 == 0 else "limited",
+            purpose=LONG_TEXT, notes=LONG_TEXT, affected_users=LONG_TEXT,
+            third_party_providers=LONG_TEXT,
+        )
+        session.add(system)
+        session.flush()
+        for c in range(controls):
+            control = Control(
+                org_id=org.id, system_id=system.id, iso_clause=f"A.{c % 10}.{c}",
+                name=f"Control {c}", status="implemented" if c % 2 else "partial",
+                rationale=LONG_TEXT,
+            )
+            session.add(control)
+            session.flush()
+            session.add(Evidence(
+                org_id=org.id, system_id=system.id, control_id=control.id,
+                label=f"Evidence {c}", version="1",
+            ))
+    session.commit()
+    return org.id
+
+
+def orm_paths(session, org_id: int):
+    systems = session.query(AISystem).filter(AISystem.org_id == org_id).all()
+    controls = session.query(Control).filter(Control.org_id == org_id).all()
+    evidence = session.query(Evidence).filter(Evidence.org_id == org_id).all()
+    system_ids = [s.id for s in systems[:1]]
+    soa = session.query(Control).filter(
+        Control.org_id == org_id, Control.system_id.in_(system_ids)
+    ).all()
+    soa_evidence = session.query(Evidence).filter(
+        Evidence.org_id == org_id,
+        or_(Evidence.system_id.in_(system_ids), Evidence.control_id.in_(select(Control.id).where(
+            Control.org_id == org_id, Control.system_id.in_(system_ids)
+        ))),
+    ).all()
+    return (
+        sum(1 for s in systems if s.ai_act_class == "high-risk"),
+        sum(1 for c in controls if c.status == "implemented"),
+        len(evidence), len(soa), len(soa_evidence),
+    )
+
+
+def read_model_paths(session, org_id: int):
+    systems = load_rows(session, SystemRow, org_id)
+    controls = load_rows(session, ControlRow, org_id)
+    evidence = load_rows(session, EvidenceRow, org_id)
+    system_ids = [s.id for s in systems[:1]]
+    soa = load(
+        session, ControlRow, select_rows(ControlRow, org_id, system_ids, order_by=(Control.id,))
+    )
+    soa_evidence = load(session, EvidenceRow, select_rows(EvidenceRow, org_id).where(
+        or_(Evidence.system_id.in_(system_ids), Evidence.control_id.in_(select(Control.id).where(
+            Control.org_id == org_id, Control.system_id.in_(system_ids)
+        ))),
+    ))
+    return (
+        sum(1 for s in systems if s.ai_act_class == "high-risk"),
+        sum(1 for c in controls if c.status == "implemented"),
+        len(evidence), len(soa), len(soa_evidence),
+    )
+
+
+def timed(session, fn, org_id: int, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        session.expunge_all()
+        started = time.perf_counter()
+        result = fn(session, org_id)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples), result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--systems", type=int, default=200)
+    parser.add_argument("--controls", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/benchmark.db")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        org_id = seed(session, args.systems, args.controls)
+
+        orm, orm_result = timed(session, orm_paths, org_id, args.repeat)
+        projected, projected_result = timed(session, read_model_paths, org_id, args.repeat)
+        assert orm_result == projected_result
+        session.close()
+        engine.dispose()
+
+    print(f"{args.systems} systems, {args.systems * args.controls} controls and evidence rows")
+    print(f"ORM entities: {orm * 1000:8.2f} ms")
+    print(f"read models:  {projected * 1000:8.2f} ms")
+    print(f"ratio: {projected / orm:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
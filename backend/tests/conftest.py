@@ -2,15 +2,24 @@
 Pytest configuration and shared fixtures for all tests.
 """
 import os
+import shutil
+import tempfile
+
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
 
-from app.database import Base, get_db
-from app.main import app
-from app.models import Organization, AISystem, AIRisk, Oversight, PMM
+# Runtime files (the app database, compiled templates) go to a scratch dir, never the working tree.
+# Set before the app is imported: settings are read then, and template environments keep their cache dir.
+RUNTIME_DIR = tempfile.mkdtemp(prefix="aims-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{RUNTIME_DIR}/aims.db"
+os.environ["TEMPLATE_BYTECODE_CACHE_DIR"] = os.path.join(RUNTIME_DIR, "template_cache")
+
+from app.database import Base, get_db  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Organization, AISystem, AIRisk, Control, DocumentApproval, Evidence, Oversight, PMM  # noqa: E402
 
 # Use in-memory SQLite for faster tests
 TEST_DATABASE_URL = "sqlite:///:memory:"
@@ -23,6 +32,23 @@ engine = create_engine(
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+@pytest.fixture(autouse=True)
+def isolated_bundle_cache(tmp_path, monkeypatch):
+    """Keep cached export bundles, job artifacts, integrity records, stored renders, evidence uploads and summaries per test and out of the working tree."""
+    from app.core.config import settings
+    from app.services.org_summary import summary_cache
+    summary_cache.clear()
+    monkeypatch.setattr(settings, "BUNDLE_CACHE_DIR", str(tmp_path / "bundle_cache"))
+    monkeypatch.setattr(settings, "EXPORT_JOBS_DIR", str(tmp_path / "export_jobs"))
+    monkeypatch.setattr(settings, "RENDER_STORE_DIR", str(tmp_path / "render_store"))
+    monkeypatch.setattr(settings, "EXPORT_INTEGRITY_DIR", str(tmp_path / "export_integrity"))
+    monkeypatch.setattr(settings, "EVIDENCE_LOCAL_DIR", str(tmp_path / "evidence"))
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(RUNTIME_DIR, ignore_errors=True)
+
+
 @pytest.fixture(scope="function")
 def db_session() -> Session:
     """
@@ -128,6 +154,39 @@ def test_org_with_systems(db_session: Session, test_org_with_key: dict) -> dict:
     }
 
 
+@pytest.fixture(scope="function")
+def bundle_system(db_session: Session) -> dict:
+    """
+    Create an org and a system with risks, controls, evidence and an approval.
+    Returns dict with the org and system.
+    """
+    org = Organization(name="Bundle Corp", api_key="bundle-key", org_role="provider")
+    db_session.add(org)
+    db_session.commit()
+
+    system = create_test_system(org_id=org.id, name="Bundle System", ai_act_class="limited")
+    db_session.add(system)
+    db_session.commit()
+
+    for i in range(3):
+        db_session.add(AIRisk(org_id=org.id, system_id=system.id, description=f"Risk {i}"))
+        control = Control(
+            org_id=org.id, system_id=system.id, iso_clause=f"A.{i}", name=f"Control {i}"
+        )
+        db_session.add(control)
+        db_session.flush()
+        db_session.add(Evidence(
+            org_id=org.id, system_id=system.id, control_id=control.id,
+            label=f"Evidence {i}", checksum=f"{i:064d}"
+        ))
+    db_session.add(DocumentApproval(
+        org_id=org.id, system_id=system.id, doc_type="annex_iv", status="approved",
+        approver_email="approver@bundle.com", document_hash="ab" * 32
+    ))
+    db_session.commit()
+    return {"org": org, "system": system}
+
+
 @pytest.fixture(scope="function")
 def test_client_with_seed():
     """
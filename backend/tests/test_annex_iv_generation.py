@@ -3,7 +3,6 @@ Test Annex IV generation with complete data
 """
 
 import pytest
-from pathlib import Path
 from datetime import datetime, timezone
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -226,12 +225,8 @@ def test_annex_iv_generation_complete(db_session, complete_system_with_evidence)
     assert result["annex_iv"]["markdown_available"] == True
     
     # Read the generated Annex IV
-    output_dir = Path(__file__).parent.parent / "generated_documents"
-    annex_iv_path = output_dir / f"org_{org.id}" / f"system_{system.id}" / "annex_iv.md"
-    
-    assert annex_iv_path.exists(), f"Annex IV file not found at {annex_iv_path}"
-    
-    content = annex_iv_path.read_text()
+    content, _ = generator.get_document_content(system.id, org.id, "annex_iv", db_session)
+    content = content.decode("utf-8")
     
     print("\n📄 ANNEX IV GENERATION TEST")
     print("=" * 60)
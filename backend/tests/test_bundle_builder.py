@@ -0,0 +1,61 @@
+"""
+Tests for the shared-snapshot bundle builder.
+"""
+
+import dataclasses
+
+import pytest
+
+from app.core.query_counter import QueryCounter
+from app.services.annex_iv_bundle import ANNEX_IV_DOCUMENT_TEMPLATES
+from app.services.bundle_builder import BundleBuilder
+from app.services.document_context import DocumentContextService
+
+
+def test_snapshot_is_read_only(db_session, bundle_system):
+    """Snapshots are frozen so templates cannot mutate the shared data graph."""
+    service = DocumentContextService(db_session)
+    snapshot = service.load_snapshot(bundle_system["system"].id, bundle_system["org"].id)
+
+    assert isinstance(snapshot.controls, tuple)
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        snapshot.controls = ()
+
+
+def test_context_from_snapshot_matches_direct_build(db_session, bundle_system):
+    """Context built from a snapshot equals the classic per-call context."""
+    service = DocumentContextService(db_session)
+    system_id, org_id = bundle_system["system"].id, bundle_system["org"].id
+
+    direct = service.build_system_context(system_id, org_id, "annex_iv")
+    snapshot = service.load_snapshot(system_id, org_id)
+    from_snapshot = service.build_context_from_snapshot(snapshot, "annex_iv")
+
+    direct["metadata"].pop("generated_at")
+    from_snapshot["metadata"].pop("generated_at")
+    assert from_snapshot == direct
+    assert from_snapshot["approval"]["status"] == "approved"
+
+
+def test_building_context_from_snapshot_issues_no_queries(db_session, bundle_system):
+    """Once loaded, a snapshot serves any number of contexts without touching the DB."""
+    service = DocumentContextService(db_session)
+    snapshot = service.load_snapshot(bundle_system["system"].id, bundle_system["org"].id)
+
+    with QueryCounter(db_session) as counter:
+        for doc_type in ANNEX_IV_DOCUMENT_TEMPLATES:
+            service.build_context_from_snapshot(snapshot, doc_type)
+
+    assert counter.count == 0
+
+
+def test_bundle_query_count_independent_of_document_count(db_session, bundle_system):
+    """Rendering every Annex IV document costs only the one snapshot load."""
+    with BundleBuilder(db_session, bundle_system["system"], bundle_system["org"]) as builder:
+        for doc_type, template_file in ANNEX_IV_DOCUMENT_TEMPLATES.items():
+            builder.render_document(doc_type, template_file)
+
+    metrics = builder.metrics()
+    assert metrics["documents_rendered"] == len(ANNEX_IV_DOCUMENT_TEMPLATES)
+    assert metrics["snapshot_queries"] > 0
+    assert metrics["queries"] == metrics["snapshot_queries"]
@@ -0,0 +1,232 @@
+"""
+Tests for deterministic, content-addressed Annex IV bundle caching.
+"""
+
+import asyncio
+import hashlib
+import json
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.database import get_db
+from app.main import app
+from app.models import Control, Evidence
+from app.services.annex_iv_bundle import (
+    ANNEX_IV_DOCUMENT_TEMPLATES,
+    bundle_fingerprint,
+    stream_annex_iv_bundle,
+)
+from app.services.bundle_builder import BundleBuilder
+from app.services.bundle_cache import etag_matches
+from app.services.document_generator import DocumentGenerator
+from app.services.zip_stream import ZSTD_AVAILABLE, export_integrity
+
+
+def _build(db_session, system, org, generated_at):
+    builder = BundleBuilder(db_session, system, org)
+    builder.generated_at = generated_at
+    return b"".join(stream_annex_iv_bundle(builder, "test", "bundle.zip", "2.0.0"))
+
+
+def test_same_inputs_produce_identical_archives(db_session, bundle_system):
+    system, org = bundle_system["system"], bundle_system["org"]
+
+    first = _build(db_session, system, org, "2025-01-01T00:00:00+00:00")
+    second = _build(db_session, system, org, "2025-01-01T00:00:00+00:00")
+
+    assert first == second
+
+
+def test_fingerprint_tracks_input_rows(db_session, bundle_system):
+    system, org = bundle_system["system"], bundle_system["org"]
+
+    def fingerprint():
+        with BundleBuilder(db_session, system, org) as builder:
+            return builder.fingerprint(ANNEX_IV_DOCUMENT_TEMPLATES, generator_version="2.0.0")
+
+    before = fingerprint()
+    assert fingerprint() == before
+
+    control = db_session.query(Control).filter(Control.system_id == system.id).first()
+    control.status = "implemented"
+    db_session.commit()
+    assert fingerprint() != before
+
+
+def test_fingerprint_tracks_variant_and_templates(db_session, bundle_system, tmp_path):
+    system, org = bundle_system["system"], bundle_system["org"]
+    with BundleBuilder(db_session, system, org) as builder:
+        v2 = builder.fingerprint(ANNEX_IV_DOCUMENT_TEMPLATES, generator_version="2.0.0")
+        v3 = builder.fingerprint(ANNEX_IV_DOCUMENT_TEMPLATES, generator_version="3.0.0")
+        assert v2 != v3
+
+        template = tmp_path / "doc.md"
+        template.write_text("one")
+        builder.generator.templates_dir = tmp_path
+        original = builder.fingerprint({"doc": "doc.md"})
+        template.write_text("two!")
+        assert builder.fingerprint({"doc": "doc.md"}) != original
+
+
+@pytest.mark.parametrize("header,expected", [
+    (None, False),
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"xyz", "abc"', True),
+    ("*", True),
+    ('"xyz"', False),
+])
+def test_etag_matching(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+@pytest.fixture
+def cache_client(db_session, bundle_system):
+    original = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        yield TestClient(app), {"X-API-Key": bundle_system["org"].api_key}, bundle_system
+    finally:
+        if original is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = original
+
+
+def test_repeat_download_served_from_cache_with_etag(cache_client, db_session):
+    client, headers, data = cache_client
+    url = f"/reports/annex-iv/{data['system'].id}"
+
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    assert first.headers["X-Cache"] == "MISS"
+
+    second = client.get(url, headers=headers)
+    assert second.status_code == 200
+    assert second.headers["X-Cache"] == "HIT"
+    assert second.content == first.content
+    assert second.headers["ETag"] == f'"{hashlib.sha256(first.content).hexdigest()}"'
+    # The hash and size are known up front only for a stored archive
+    assert "X-File-Hash" not in first.headers
+    assert second.headers["X-File-Hash"] == f"sha256:{hashlib.sha256(first.content).hexdigest()}"
+    assert second.headers["X-File-Size"] == str(len(first.content))
+
+    integrity = client.get(second.headers["X-Integrity-Manifest"], headers=headers).json()
+    assert integrity["sha256"] == hashlib.sha256(second.content).hexdigest()
+    # Persisted: still served after a restart (or by another worker)
+    export_integrity._records.clear()
+    assert client.get(first.headers["X-Integrity-Manifest"], headers=headers).status_code == 200
+
+    not_modified = client.get(url, headers={**headers, "If-None-Match": second.headers["ETag"]})
+    assert not_modified.status_code == 304
+    assert not_modified.content == b""
+
+    assert first.headers["Accept-Ranges"] == "none"
+    assert second.headers["Accept-Ranges"] == "bytes"
+    tail = client.get(
+        url, headers={**headers, "Range": "bytes=-64", "If-Range": second.headers["ETag"]}
+    )
+    assert tail.status_code == 206
+    assert tail.content == first.content[-64:]
+
+
+def test_data_change_invalidates_cached_bundle(cache_client, db_session):
+    client, headers, data = cache_client
+    system, org = data["system"], data["org"]
+    url = f"/reports/annex-iv/{system.id}"
+
+    first = client.get(url, headers=headers)
+    etag = client.get(url, headers=headers).headers["ETag"]
+
+    db_session.add(Evidence(
+        org_id=org.id, system_id=system.id, label="New evidence", checksum="f" * 64
+    ))
+    db_session.commit()
+
+    changed = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["X-Cache"] == "MISS"
+    assert changed.content != first.content
+
+    # Only the live bundle for this export is kept on disk
+    assert len(list(Path(settings.BUNDLE_CACHE_DIR).glob("*.zip"))) == 1
+
+
+def test_bundle_with_a_failed_document_is_not_cached(cache_client, monkeypatch):
+    client, headers, data = cache_client
+    url = f"/reports/annex-iv/{data['system'].id}"
+    render_template = DocumentGenerator._render_template
+
+    def fail_fria(self, template_file, context):
+        if template_file == ANNEX_IV_DOCUMENT_TEMPLATES["fria"]:
+            raise RuntimeError("template crashed")
+        return render_template(self, template_file, context)
+
+    monkeypatch.setattr(DocumentGenerator, "_render_template", fail_fria)
+    partial = client.get(url, headers=headers)
+    assert partial.status_code == 200
+    assert "ETag" not in partial.headers
+    metas = Path(settings.BUNDLE_CACHE_DIR, "documents").glob("*.json")
+    stored = [json.loads(meta.read_text())["doc_type"] for meta in metas]
+    assert "soa" in stored and "fria" not in stored
+
+    monkeypatch.setattr(DocumentGenerator, "_render_template", render_template)
+    retry = client.get(url, headers=headers)
+    assert retry.headers["X-Cache"] == "MISS"
+    assert retry.content != partial.content
+    assert client.get(url, headers=headers).headers["X-Cache"] == "HIT"
+
+
+@pytest.mark.parametrize("path", ["/reports/annex-iv/{system_id}", "/reports/annex-iv-org"])
+def test_fingerprint_runs_off_the_event_loop(cache_client, monkeypatch, path):
+    client, headers, data = cache_client
+    on_loop = []
+
+    def fingerprint(*args):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return bundle_fingerprint(*args)
+
+    monkeypatch.setattr("app.api.routes.reports.bundle_fingerprint", fingerprint)
+    url = path.format(system_id=data["system"].id)
+    assert client.get(url, headers=headers).status_code == 200
+    assert client.get(url, headers=headers).headers["X-Cache"] == "HIT"
+
+    assert on_loop == [False, False]
+
+
+def test_cache_can_be_disabled(cache_client, monkeypatch):
+    client, headers, data = cache_client
+    monkeypatch.setattr(settings, "BUNDLE_CACHE_ENABLED", False)
+    url = f"/reports/annex-iv/{data['system'].id}"
+
+    client.get(url, headers=headers)
+    response = client.get(url, headers=headers)
+
+    assert response.headers["X-Cache"] == "MISS"
+    assert not Path(settings.BUNDLE_CACHE_DIR).exists()
+
+
+def test_tar_zst_format_is_cached_separately(cache_client):
+    client, headers, data = cache_client
+    url = f"/reports/annex-iv/{data['system'].id}"
+
+    assert client.get(f"{url}?format=rar", headers=headers).status_code == 422
+    if not ZSTD_AVAILABLE:
+        assert client.get(f"{url}?format=tar.zst", headers=headers).status_code == 501
+        return
+
+    zipped = client.get(url, headers=headers)
+    tarred = client.get(f"{url}?format=tar.zst", headers=headers)
+    assert tarred.status_code == 200
+    assert tarred.headers["X-Cache"] == "MISS"
+    assert tarred.headers["Content-Type"] == "application/zstd"
+    assert tarred.headers["Content-Disposition"].endswith(".tar.zst")
+    assert tarred.headers["X-Bundle-Fingerprint"] != zipped.headers["X-Bundle-Fingerprint"]
+    assert client.get(f"{url}?format=tar.zst", headers=headers).content == tarred.content
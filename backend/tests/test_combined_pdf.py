@@ -0,0 +1,133 @@
+"""
+Tests for single-pass combined PDFs and lazy per-document splitting.
+"""
+
+import json
+
+import pytest
+
+from app.models import Control
+from app.services import document_generator as generator_module
+from app.services.document_generator import (
+    COMBINED_DOC_TYPE,
+    COMBINED_PAGES_FORMAT,
+    DocumentGenerator,
+)
+from app.services.pdf_renderer import PYMUPDF_AVAILABLE, WEASYPRINT_AVAILABLE, extract_pages
+from app.services.render_store import render_store
+
+fitz = pytest.importorskip("fitz")
+
+
+def _fake_combined_pdf(documents):
+    """Stand-in for the WeasyPrint pass: two pages per document, labelled."""
+    pdf = fitz.open()
+    pages = {}
+    for doc_type, _ in documents:
+        pages[doc_type] = [len(pdf), len(pdf) + 1]
+        for part in (1, 2):
+            pdf.new_page().insert_text((72, 72), f"{doc_type} page {part}")
+    return pdf.tobytes(), pages
+
+
+def _page_texts(pdf: bytes):
+    with fitz.open(stream=pdf, filetype="pdf") as document:
+        return [page.get_text().strip() for page in document]
+
+
+def test_extract_pages_copies_inclusive_range():
+    combined, pages = _fake_combined_pdf([("soa", ""), ("fria", "")])
+
+    assert _page_texts(extract_pages(combined, *pages["fria"])) == ["fria page 1", "fria page 2"]
+
+
+@pytest.fixture
+def combined_mode(monkeypatch):
+    monkeypatch.setattr(generator_module, "WEASYPRINT_AVAILABLE", True)
+    monkeypatch.setattr(generator_module, "render_combined_pdf", _fake_combined_pdf)
+    monkeypatch.setattr(generator_module.settings, "PDF_COMBINED", True)
+    monkeypatch.setattr(generator_module.settings, "PDF_RENDER_WORKERS", 0)
+
+
+def test_combined_generation_splits_documents_on_demand(db_session, bundle_system, combined_mode):
+    org, system = bundle_system["org"], bundle_system["system"]
+    generator = DocumentGenerator()
+
+    docs = generator.generate_all_documents(system.id, org.id, {}, db_session)
+
+    assert all(doc["pdf_available"] for doc in docs.values())
+    assert render_store.get(db_session, org.id, system.id, COMBINED_DOC_TYPE, "pdf") is not None
+    assert render_store.get(db_session, org.id, system.id, "soa", "pdf") is None
+    page_map = render_store.get(
+        db_session, org.id, system.id, COMBINED_DOC_TYPE, COMBINED_PAGES_FORMAT
+    )
+    assert list(json.loads(render_store.read(page_map))["pages"]) == sorted(docs)
+
+    # Any replica splits from the stored combined PDF and keeps the split copy
+    replica = DocumentGenerator()
+    content, fmt = replica.get_document_content(system.id, org.id, "soa", db_session, "pdf")
+    assert fmt == "pdf"
+    assert _page_texts(content) == ["soa page 1", "soa page 2"]
+    split = render_store.get(db_session, org.id, system.id, "soa", "pdf")
+    assert render_store.read(split) == content
+    listed = {
+        doc["type"]: doc for doc in generator.get_document_list(system.id, org.id, db_session)
+    }
+    assert set(listed) == set(docs)
+    assert listed["risk_assessment"]["pdf_available"]
+    assert listed["risk_assessment"]["pdf_size"] is None
+    combined = generator.get_combined_pdf(system.id, org.id, db_session)
+    first = next(iter(docs))
+    assert _page_texts(combined)[:2] == [f"{first} page 1", f"{first} page 2"]
+
+    # A data change rebuilds the combined PDF, and the stale split copy is split again
+    control = db_session.query(Control).filter(Control.system_id == system.id).first()
+    control.status = "implemented"
+    db_session.commit()
+    second = generator.generate_all_documents(system.id, org.id, {}, db_session)
+
+    assert not second["soa"]["reused"] and second["appeals_flow"]["reused"]
+    assert generator.get_combined_pdf(system.id, org.id, db_session) != combined
+    replica.get_document_content(system.id, org.id, "soa", db_session, "pdf")
+    split = render_store.get(db_session, org.id, system.id, "soa", "pdf")
+    markdown = render_store.get(db_session, org.id, system.id, "soa", "markdown")
+    assert split.fingerprint == markdown.fingerprint
+
+
+def test_missing_combined_pdf_is_rendered_on_download(db_session, bundle_system, combined_mode,
+                                                     monkeypatch):
+    """A combined PDF generation could not render is rendered from the stored Markdown."""
+    org, system = bundle_system["org"], bundle_system["system"]
+    generator = DocumentGenerator()
+    monkeypatch.setattr(generator_module.settings, "PDF_COMBINED", False)
+    monkeypatch.setattr(generator_module, "WEASYPRINT_AVAILABLE", False)
+    docs = generator.generate_all_documents(system.id, org.id, {}, db_session)
+    monkeypatch.setattr(generator_module.settings, "PDF_COMBINED", True)
+    monkeypatch.setattr(generator_module, "WEASYPRINT_AVAILABLE", True)
+
+    combined = generator.get_combined_pdf(system.id, org.id, db_session)
+
+    assert _page_texts(combined)[:2] == ["risk_assessment page 1", "risk_assessment page 2"]
+    page_map = render_store.get(
+        db_session, org.id, system.id, COMBINED_DOC_TYPE, COMBINED_PAGES_FORMAT
+    )
+    assert sorted(json.loads(render_store.read(page_map))["pages"]) == sorted(docs)
+    assert generator.generate_all_documents(system.id, org.id, {}, db_session)["soa"]["reused"]
+
+
+@pytest.mark.skipif(
+    not (WEASYPRINT_AVAILABLE and PYMUPDF_AVAILABLE), reason="WeasyPrint not available"
+)
+def test_single_layout_pass_reports_page_ranges_and_outline():
+    pdf, pages = generator_module.render_combined_pdf([
+        ("soa", "# SoA\n\n" + "text\n\n" * 200),
+        ("fria", "# FRIA\n\nshort"),
+    ])
+
+    assert pages["soa"][0] == 0
+    assert pages["fria"][0] == pages["soa"][1] + 1
+    with fitz.open(stream=pdf, filetype="pdf") as document:
+        outline = document.get_toc()
+    assert [entry[:2] for entry in outline if entry[0] == 1] == [
+        [1, "Statement of Applicability"], [1, "Fundamental Rights Impact Assessment"]
+    ]
@@ -0,0 +1,107 @@
+"""
+Tests for loading a system snapshot in a fixed, small number of statements.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app.core.query_counter import QueryCounter
+from app.models import FRIA, PMM, AIRisk, Control, ModelVersion, OnboardingData, Oversight
+from app.services import document_context
+from app.services.bundle_cache import row_state
+from app.services.document_context import ALL_SECTIONS, DocumentContextService
+from app.services.row_cache import row_cache
+
+QUERY_BUDGET = 3
+
+
+@pytest.fixture
+def full_system(db_session, bundle_system):
+    """The bundle system plus a row in every other section, with dates and flags set."""
+    org, system = bundle_system["org"], bundle_system["system"]
+    released = datetime(2025, 3, 1, 12, 30, tzinfo=timezone.utc)
+    db_session.add_all([
+        Oversight(org_id=org.id, system_id=system.id, manual_override=True, appeals_sla_days=3),
+        PMM(org_id=org.id, system_id=system.id, eu_db_required=True, retention_months=24),
+        FRIA(
+            org_id=org.id, system_id=system.id, status="old",
+            created_at=released - timedelta(days=1),
+        ),
+        FRIA(
+            org_id=org.id, system_id=system.id, status="latest", created_at=released,
+            applicable=False,
+        ),
+        OnboardingData(
+            org_id=org.id, system_id=system.id, data_json='{"company": {"name": "Bundle Corp"}}'
+        ),
+        ModelVersion(
+            org_id=org.id, system_id=system.id, version="1.0.0",
+            released_at=released - timedelta(days=30),
+        ),
+        ModelVersion(org_id=org.id, system_id=system.id, version="1.1.0", released_at=released),
+        AIRisk(org_id=org.id, system_id=system.id, description="Dated", due_date=date(2025, 6, 30)),
+    ])
+    db_session.commit()
+    return bundle_system
+
+
+def _ids(data):
+    return data["system"].id, data["org"].id
+
+
+def test_full_snapshot_and_context_fit_the_query_budget(db_session, full_system):
+    system_id, org_id = _ids(full_system)
+    service = DocumentContextService(db_session)
+    db_session.expire_all()
+
+    with QueryCounter(db_session) as counter:
+        snapshot = service.load_snapshot(system_id, org_id)
+        service.build_context_from_snapshot(snapshot, "annex_iv")
+
+    assert counter.count <= QUERY_BUDGET
+    assert snapshot.sections == ALL_SECTIONS
+    assert snapshot.fria.status == "latest"
+    assert [version.version for version in snapshot.model_versions] == ["1.1.0", "1.0.0"]
+
+
+def test_single_query_rows_match_per_table_queries(db_session, full_system, monkeypatch):
+    system_id, org_id = _ids(full_system)
+    service = DocumentContextService(db_session)
+
+    def states(snapshot):
+        rows = {}
+        for section in sorted(ALL_SECTIONS):
+            value = getattr(snapshot, section)
+            value = value if isinstance(value, tuple) else (value,)
+            rows[section] = [
+                (type(row).__name__, row_state(row)) for row in value if row is not None
+            ]
+        return rows
+
+    db_session.expunge_all()
+    single = states(service.load_snapshot(system_id, org_id))
+    db_session.expunge_all()
+    row_cache(db_session).clear()
+    monkeypatch.setattr(document_context, "supports_union_loading", lambda session: False)
+    with QueryCounter(db_session) as counter:
+        per_table = states(service.load_snapshot(system_id, org_id))
+
+    assert counter.count == 1 + len(ALL_SECTIONS)
+    assert single == per_table
+    fria = single["fria"][0][1]
+    assert fria["applicable"] is False and fria["created_at"].tzinfo is not None
+    assert any(state["due_date"] == date(2025, 6, 30) for _, state in single["risks"])
+
+
+def test_loaded_rows_are_session_instances(db_session, full_system):
+    system_id, org_id = _ids(full_system)
+    service = DocumentContextService(db_session)
+    db_session.expunge_all()
+
+    snapshot = service.load_snapshot(system_id, org_id)
+    control = snapshot.controls[0]
+    assert control in db_session and not db_session.dirty
+    assert db_session.get(Control, control.id) is control
+    # Relationships still lazy-load like rows from an ORM query
+    assert snapshot.evidence[0].control is control
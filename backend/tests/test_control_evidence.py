@@ -0,0 +1,101 @@
+"""
+Tests for the batched control/evidence loader used by the exports.
+"""
+
+import pytest
+
+from app.api.routes.controls import compute_evidence_coverage_pct
+from app.core.query_counter import QueryCounter
+from app.models import Control, Evidence, Organization
+from app.services.annex_iv_bundle import stream_annex_iv_bundle
+from app.services.bundle_builder import BundleBuilder
+from app.services.control_evidence import load_control_evidence
+from app.services.soa_export import generate_soa_csv
+from tests.conftest import create_test_system
+
+
+def _add_controls(db_session, org, system, count):
+    for i in range(count):
+        control = Control(
+            org_id=org.id, system_id=system.id, iso_clause=f"A.{i}", name=f"Control {i}",
+            status="partial",
+        )
+        db_session.add(control)
+        db_session.flush()
+        db_session.add(Evidence(
+            org_id=org.id, system_id=system.id, control_id=control.id, label=f"Evidence {i}",
+            version="2", iso42001_clause=f"A.{i}"
+        ))
+    db_session.commit()
+
+
+@pytest.fixture
+def controls_system(db_session):
+    org = Organization(name="Loader Corp", api_key="loader-key")
+    db_session.add(org)
+    db_session.commit()
+    system = create_test_system(org_id=org.id, name="Loader System")
+    db_session.add(system)
+    db_session.commit()
+    _add_controls(db_session, org, system, 3)
+    return {"org": org, "system": system}
+
+
+def test_loader_groups_evidence_in_two_queries(db_session, controls_system):
+    org, system = controls_system["org"], controls_system["system"]
+    org_id, system_id = org.id, system.id
+    other = create_test_system(org_id=org_id, name="Other System")
+    db_session.add(other)
+    db_session.commit()
+    _add_controls(db_session, org, other, 2)
+    other_id = other.id
+
+    with QueryCounter(db_session) as counter:
+        links = load_control_evidence(db_session, org_id, [system_id, other_id])
+
+    assert counter.count == 2
+    assert len(links.controls_for(system_id)) == 3
+    assert len(links.controls_for(other_id)) == 2
+    for control in links.controls:
+        labels = [ev.label for ev in links.evidence_for(control)]
+        assert labels == [f"Evidence {control.iso_clause[2:]}"]
+
+
+def test_soa_and_coverage_query_count_independent_of_controls(db_session, controls_system):
+    org, system = controls_system["org"], controls_system["system"]
+    org_id, system_id = org.id, system.id
+
+    def counts():
+        with QueryCounter(db_session) as soa:
+            csv = generate_soa_csv(system_id, org_id, db_session)
+        with QueryCounter(db_session) as coverage:
+            pct = compute_evidence_coverage_pct(db_session, org_id, system_id)
+        return soa.count, coverage.count, csv, pct
+
+    few = counts()
+    _add_controls(db_session, org, system, 10)
+    db_session.expire_all()
+    many = counts()
+
+    assert many[:2] == few[:2]
+    assert many[1] == 2
+    assert "Evidence 0 (v2)" in many[2]
+    assert many[3] == 1.0
+
+
+def test_annex_iv_export_issues_no_per_control_queries(db_session, controls_system):
+    org, system = controls_system["org"], controls_system["system"]
+
+    def export_queries():
+        builder = BundleBuilder(db_session, system, org)
+        b"".join(stream_annex_iv_bundle(
+            builder, "test", "bundle.zip", "1.0.0", include_detail_files=True
+        ))
+        return builder.metrics()
+
+    few = export_queries()
+    _add_controls(db_session, org, system, 10)
+    many = export_queries()
+
+    assert many["queries"] == many["snapshot_queries"]
+    assert many["queries"] == few["queries"]
@@ -10,7 +10,7 @@ from sqlalchemy.pool import StaticPool
 
 from app.database import Base
 from app.models import Organization, AISystem, AIRisk, Control, Oversight, PMM, Evidence, FRIA
-from app.services.document_context import DocumentContextService
+from app.services.document_context import ContextSection, DocumentContextService
 from tests.conftest import create_test_system
 
 
@@ -372,3 +372,28 @@ def test_evidence_citations(db_session, test_org, test_system):
     assert "EV-" in citations[evidence1.id]
     assert "sha256:a1b2c3d4e5f6" in citations[evidence1.id]  # truncated checksum
     assert "sha256:" not in citations[evidence2.id]  # no checksum
+
+
+def test_context_sections_read_like_lists(db_session, test_org, test_system, test_controls, test_evidence):
+    """Lazy sections support what templates do with lists and build fresh rows on each read."""
+    from jinja2 import Environment
+
+    service = DocumentContextService(db_session)
+    context = service.build_system_context(test_system.id, test_org.id)
+    controls = context["controls"]
+
+    assert isinstance(controls, ContextSection)
+    assert len(controls) == 2 and controls
+    assert controls[0]["iso_clause"] == "A.5.1"
+    assert [c["iso_clause"] for c in controls[:1]] == ["A.5.1"]
+    assert controls == list(controls)
+    first = next(iter(controls))
+    first["name"] = "Changed"
+    assert controls[0]["name"] == "Leadership and commitment"
+    assert not ContextSection((), dict)
+
+    template = Environment().from_string(
+        "{{ controls|length }}:{% for c in controls[:3] %}{{ c.iso_clause }}={{ c.evidence|length }};{% endfor %}"
+        "{% if risks %}risks{% else %}none{% endif %}"
+    )
+    assert template.render(context) == "2:A.5.1=1;A.6.1=1;none"
@@ -0,0 +1,194 @@
+"""
+Tests for per-document dependency tracking and incremental bundle rebuilds.
+"""
+
+import pytest
+from jinja2 import Environment
+
+from app.models import Control
+from app.services.annex_iv_bundle import ANNEX_IV_DOCUMENT_TEMPLATES
+from app.services.bundle_builder import GENERATED_AT_PLACEHOLDER, BundleBuilder
+from app.services.document_context import ALL_SECTIONS, DocumentContextService
+from app.services.document_dependencies import (
+    CONTEXT_SECTIONS,
+    template_sections,
+    variable_sections,
+)
+from app.services.document_generator import DocumentGenerator
+from app.services.render_store import render_store
+from app.services.template_registry import referenced_variables, template_registry
+
+ALL_TEMPLATES = {
+    **ANNEX_IV_DOCUMENT_TEMPLATES,
+    "impact_assessment": "02_IMPACT_ASSESSMENT.md",
+    "transparency_notice_gpai": "14_TRANSPARENCY_NOTICE_GPAI.md",
+}
+
+
+# Tables each template reads (org and system rows are always loaded)
+EXPECTED_SECTIONS = {
+    "risk_assessment": {"risks"},
+    "impact_assessment": {"fria", "risks"},
+    "model_card": {"model_versions", "oversight", "pmm", "risks"},
+    "data_sheet": {"pmm", "risks"},
+    "logging_plan": {"pmm"},
+    "monitoring_report": {"pmm"},
+    "human_oversight": {"oversight"},
+    "appeals_flow": {"oversight", "pmm"},
+    "soa": {"controls", "evidence"},
+    "policy_register": {"oversight", "pmm"},
+    "audit_log": {"controls", "evidence", "pmm"},
+    "annex_iv": {
+        "approvals", "controls", "evidence", "fria", "model_versions", "oversight", "pmm", "risks",
+    },
+    "instructions_for_use": {"oversight", "pmm", "risks"},
+    "transparency_notice_gpai": {"oversight", "pmm", "risks"},
+    "fria": {"approvals", "controls", "evidence", "fria", "oversight", "pmm", "risks"},
+}
+
+
+@pytest.mark.parametrize("doc_type,template_file", sorted(ALL_TEMPLATES.items()))
+def test_template_analysis_finds_the_tables_each_document_reads(doc_type, template_file):
+    generator = DocumentGenerator()
+
+    assert template_sections(generator.templates_dir, template_file) == EXPECTED_SECTIONS[doc_type]
+
+
+def test_every_table_backed_context_variable_is_mapped(db_session, bundle_system):
+    service = DocumentContextService(db_session)
+    context = service.build_system_context(bundle_system["system"].id, bundle_system["org"].id)
+    row_backed = {"company", "system", "metadata"}
+
+    assert set(context) - row_backed == set(CONTEXT_SECTIONS)
+
+
+def test_variable_analysis_tracks_attributes_and_includes():
+    env = Environment()
+
+    found = referenced_variables(env.parse(
+        "{{ metadata.generated_at }} {{ oversight['mode'] }} "
+        "{% for r in risks %}{{ r.id }}{% endfor %}"
+    ))
+    assert found == {"metadata.generated_at", "oversight.mode", "risks"}
+    assert variable_sections(found) == {"oversight", "risks"}
+    assert variable_sections(referenced_variables(env.parse("{{ metadata }}"))) == {
+        "controls", "evidence", "fria", "risks"
+    }
+    included = referenced_variables(env.parse("{% include 'x.md' %}"))
+    assert variable_sections(included) == ALL_SECTIONS
+
+
+def test_partial_context_load_is_recorded_per_template(db_session, bundle_system):
+    template_registry.clear()
+    generator = DocumentGenerator()
+    org, system = bundle_system["org"], bundle_system["system"]
+
+    generator.fetch_document(system, org, "appeals_flow", "markdown", db_session)
+    generator.fetch_document(system, org, "annex_iv", "markdown", db_session)
+
+    stats = template_registry.stats()[generator.templates_dir.name]
+    # org and system, then one statement per section group the template reads
+    assert stats["08_APPEALS_FLOW.md"]["context_loads"] == 1
+    assert stats["08_APPEALS_FLOW.md"]["context_queries"] == 2
+    assert stats["12_ANNEX_IV.md"]["context_queries"] == 3
+    assert stats["08_APPEALS_FLOW.md"]["avg_context_load_seconds"] is not None
+
+
+def _render(db_session, data):
+    builder = BundleBuilder(db_session, data["system"], data["org"])
+    documents = {
+        result.key: result.value
+        for result in builder.render_documents(ANNEX_IV_DOCUMENT_TEMPLATES)
+    }
+    return builder, documents
+
+
+def test_control_change_rerenders_only_dependent_documents(db_session, bundle_system):
+    first, before = _render(db_session, bundle_system)
+    assert first.metrics()["documents_rendered"] == len(ANNEX_IV_DOCUMENT_TEMPLATES)
+    assert first.metrics()["documents_reused"] == 0
+
+    system_id = bundle_system["system"].id
+    control = db_session.query(Control).filter(Control.system_id == system_id).first()
+    control.status = "implemented"
+    db_session.commit()
+
+    second, after = _render(db_session, bundle_system)
+
+    assert set(second.render_seconds) == {"soa", "audit_log", "annex_iv", "fria"}
+    assert second.metrics()["documents_reused"] == len(ANNEX_IV_DOCUMENT_TEMPLATES) - 4
+    assert list(after) == list(ANNEX_IV_DOCUMENT_TEMPLATES)
+    assert after["appeals_flow"] == before["appeals_flow"].replace(
+        first.generated_at, second.generated_at
+    )
+    assert "implemented" in after["soa"]
+
+
+def test_reused_documents_carry_the_bundle_generation_time(db_session, bundle_system):
+    first, _ = _render(db_session, bundle_system)
+    system_id = bundle_system["system"].id
+    control = db_session.query(Control).filter(Control.system_id == system_id).first()
+    control.status = "implemented"
+    db_session.commit()
+
+    second, documents = _render(db_session, bundle_system)
+
+    assert second.metrics()["documents_reused"] > 0
+    for content in documents.values():
+        assert GENERATED_AT_PLACEHOLDER not in content
+        assert first.generated_at not in content
+    assert second.generated_at in documents["appeals_flow"]
+    assert second.generated_at in documents["soa"]
+
+
+def _stored(db_session, org, system):
+    return {
+        key: (row.fingerprint, row.blob_name, row.updated_at)
+        for key, row in render_store.entries(db_session, org.id, system.id).items()
+    }
+
+
+def test_generate_all_documents_skips_unchanged_files(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    generator = DocumentGenerator()
+
+    generator.generate_all_documents(system.id, org.id, {}, db_session)
+    before = _stored(db_session, org, system)
+
+    control = db_session.query(Control).filter(Control.system_id == system.id).first()
+    control.status = "implemented"
+    db_session.commit()
+    generator.generate_all_documents(system.id, org.id, {}, db_session)
+
+    after = _stored(db_session, org, system)
+    changed = {
+        doc_type for (doc_type, fmt), entry in after.items()
+        if fmt == "markdown" and entry != before[doc_type, fmt]
+    }
+    assert changed == {"soa", "audit_log", "annex_iv", "fria"}
+
+
+def _blobs():
+    return sorted(path.name for path in render_store.store.root.rglob("*") if path.is_file())
+
+
+def test_unchanged_regeneration_is_a_no_op(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    generator = DocumentGenerator()
+    acme = {"company": {"name": "Acme"}}
+
+    first = generator.generate_all_documents(system.id, org.id, acme, db_session)
+    assert not any(doc["reused"] for doc in first.values())
+    before = _stored(db_session, org, system)
+    blobs = _blobs()
+
+    second = generator.generate_all_documents(system.id, org.id, acme, db_session)
+
+    assert set(second) == set(first)
+    assert all(doc["reused"] for doc in second.values())
+    assert _stored(db_session, org, system) == before
+    assert _blobs() == blobs
+
+    other = {"company": {"name": "Other"}}
+    third = generator.generate_all_documents(system.id, org.id, other, db_session)
+    assert not any(doc["reused"] for doc in third.values())
@@ -194,13 +194,8 @@ def test_document_generation_with_real_data(db_session, test_org, complete_syste
     assert result["risk_assessment"]["markdown_available"] == True
     
     # Read the generated risk assessment
-    from pathlib import Path
-    output_dir = Path(__file__).parent.parent / "generated_documents"
-    risk_assessment_path = output_dir / f"org_{test_org.id}" / f"system_{complete_system.id}" / "risk_assessment.md"
-    
-    assert risk_assessment_path.exists(), f"Risk assessment file not found at {risk_assessment_path}"
-    
-    content = risk_assessment_path.read_text()
+    content, _ = generator.get_document_content(complete_system.id, test_org.id, "risk_assessment", db_session)
+    content = content.decode("utf-8")
     
     # Verify NO placeholders
     assert "[System Name]" not in content
@@ -234,13 +229,8 @@ def test_soa_generation_with_controls(db_session, test_org, complete_system):
     )
     
     # Read the generated SoA
-    from pathlib import Path
-    output_dir = Path(__file__).parent.parent / "generated_documents"
-    soa_path = output_dir / f"org_{test_org.id}" / f"system_{complete_system.id}" / "soa.md"
-    
-    assert soa_path.exists(), f"SoA file not found at {soa_path}"
-    
-    content = soa_path.read_text()
+    content, _ = generator.get_document_content(complete_system.id, test_org.id, "soa", db_session)
+    content = content.decode("utf-8")
     
     # Verify real controls appear
     assert "A.5.1" in content  # ISO clause
@@ -266,14 +256,8 @@ def test_pmm_generation_with_monitoring_data(db_session, test_org, complete_syst
     )
     
     # Read the generated PMM report
-    from pathlib import Path
-    
-    output_dir = Path(__file__).parent.parent / "generated_documents"
-    pmm_path = output_dir / f"org_{test_org.id}" / f"system_{complete_system.id}" / "monitoring_report.md"
-    
-    assert pmm_path.exists(), f"PMM file not found at {pmm_path}"
-    
-    content = pmm_path.read_text()
+    content, _ = generator.get_document_content(complete_system.id, test_org.id, "monitoring_report", db_session)
+    content = content.decode("utf-8")
     
     # Verify real PMM data appears
     assert "All prediction inputs, outputs, and confidence scores" in content  # Logging scope
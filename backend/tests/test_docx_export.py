@@ -0,0 +1,110 @@
+"""
+Tests for Markdown to DOCX export.
+"""
+
+import io
+from unittest.mock import patch
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.main import app
+from app.services.docx_export import DOCX_AVAILABLE, markdown_to_docx
+
+pytestmark = pytest.mark.skipif(not DOCX_AVAILABLE, reason="python-docx not installed")
+
+SAMPLE = """# Statement &amp; Scope
+
+Some **bold _nested_** text with `EV-1` and [policy](https://example.com/p).
+
+| Clause | Status |
+|---|---|
+| A.6.1 | **implemented** |
+
+1. first
+2. second
+    - detail
+
+- bullet
+
+1. restarted
+
+```
+line one
+line two
+```
+
+> quoted
+"""
+
+
+def _open(content: str):
+    from docx import Document
+
+    with markdown_to_docx(content) as spool:
+        return Document(io.BytesIO(spool.read()))
+
+
+def test_markdown_structure_becomes_word_structure():
+    doc = _open(SAMPLE)
+    paragraphs = [(p.style.name, p.text) for p in doc.paragraphs if p.text]
+
+    assert paragraphs[0] == ("Heading 1", "Statement & Scope")
+    assert ("List Number", "first") in paragraphs and ("List Bullet 2", "detail") in paragraphs
+    assert ("Code Block", "line one\nline two") in paragraphs
+    assert ("Quote", "quoted") in paragraphs
+
+    table = doc.tables[0]
+    assert [[cell.text for cell in row.cells] for row in table.rows] == [
+        ["Clause", "Status"], ["A.6.1", "implemented"]
+    ]
+    assert table.style.name == "Table Grid"
+    assert all(run.bold for run in table.rows[0].cells[0].paragraphs[0].runs)
+
+
+def test_inline_formatting_and_list_numbering():
+    doc = _open(SAMPLE)
+    body = doc.paragraphs[1]
+    runs = {run.text: run for run in body.runs}
+    assert runs["bold "].bold and runs["nested"].bold and runs["nested"].italic
+    assert runs["EV-1"].style.name == "Inline Code"
+    assert body.text.endswith("policy (https://example.com/p).")
+
+    num_ids = {
+        p.text: p._p.pPr.numPr.numId.val for p in doc.paragraphs if p.style.name == "List Number"
+    }
+    assert num_ids["first"] == num_ids["second"]
+    assert num_ids["restarted"] != num_ids["first"]
+
+
+def test_spool_is_rewound_and_exports_are_independent():
+    with markdown_to_docx("# One") as first, markdown_to_docx("# Two") as second:
+        assert first.tell() == 0 and second.tell() == 0
+        assert first.read(2) == b"PK"
+    assert [p.text for p in _open("# Two").paragraphs] == ["Two"]
+
+
+def test_export_route_streams_docx(db_session, test_org_with_key):
+    original = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        with patch("app.api.routes.compliance_suite.compliance_suite_service") as mock_service:
+            mock_service.export_document.return_value = (
+                "fria-1.docx", markdown_to_docx(SAMPLE), {}
+            )
+            mock_service._generate_bundle_hash.return_value = "hash"
+            response = TestClient(app).get(
+                "/reports/export/fria.docx?system_id=1", headers=test_org_with_key["headers"]
+            )
+    finally:
+        if original is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = original
+
+    assert response.status_code == 200
+    assert "fria-1.docx" in response.headers["content-disposition"]
+    from docx import Document
+
+    assert Document(io.BytesIO(response.content)).paragraphs[0].text == "Statement & Scope"
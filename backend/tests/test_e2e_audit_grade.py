@@ -15,7 +15,6 @@ This test simulates a complete compliance workflow:
 
 import json
 import pytest
-from pathlib import Path
 from datetime import datetime, timezone
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -345,11 +344,12 @@ def test_complete_audit_grade_workflow(db_session):
     
     # STEP 13: Verify Document Content
     print("\n🔍 STEP 13: Verify Document Content Quality")
-    output_dir = Path(__file__).parent.parent / "generated_documents"
-    system_dir = output_dir / f"org_{org.id}" / f"system_{system.id}"
+    def document(doc_type):
+        content, _ = generator.get_document_content(system.id, org.id, doc_type, db_session)
+        return content.decode("utf-8")
     
     # Check Annex IV
-    annex_iv_content = (system_dir / "annex_iv.md").read_text()
+    annex_iv_content = document("annex_iv")
     assert "Employment Screening AI" in annex_iv_content
     assert "Discriminatory bias" in annex_iv_content
     assert "A.5.1" in annex_iv_content
@@ -360,7 +360,7 @@ def test_complete_audit_grade_workflow(db_session):
     print("✅ Annex IV: Real data, evidence citations, model version, no placeholders")
     
     # Check Instructions for Use
-    ifu_content = (system_dir / "instructions_for_use.md").read_text()
+    ifu_content = document("instructions_for_use")
     assert "HIGH-RISK AI SYSTEM WARNING" in ifu_content
     assert "FUNDAMENTAL RIGHTS IMPACT" in ifu_content
     assert "PERSONAL DATA PROCESSING" in ifu_content
@@ -369,21 +369,21 @@ def test_complete_audit_grade_workflow(db_session):
     print("✅ Instructions for Use: All warnings present, real retention period")
     
     # Check GPAI Transparency Notice
-    gpai_content = (system_dir / "transparency_notice_gpai.md").read_text()
+    gpai_content = document("transparency_notice_gpai")
     assert "General Purpose AI" in gpai_content
     assert "🤖 AI-Generated" in gpai_content
     assert "Employment Screening AI" in gpai_content
     print("✅ GPAI Transparency Notice: Conditional generation working")
     
     # Check SoA
-    soa_content = (system_dir / "soa.md").read_text()
+    soa_content = document("soa")
     assert "ceo@acme-ai.com" in soa_content  # Owner
     assert "implemented" in soa_content.lower()  # Status
     assert "EV-" in soa_content  # Evidence citations
     print("✅ SoA: Owner, status, evidence citations present")
     
     # Check PMM
-    pmm_content = (system_dir / "monitoring_report.md").read_text()
+    pmm_content = document("monitoring_report")
     assert "72 months" in pmm_content
     assert "2.5%" in pmm_content
     assert "quarterly" in pmm_content.lower()
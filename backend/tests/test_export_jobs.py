@@ -0,0 +1,245 @@
+"""
+Tests for background Annex IV export jobs.
+"""
+
+import hashlib
+import json
+import zipfile
+from datetime import datetime, timedelta, timezone
+from io import BytesIO
+
+import pytest
+from fastapi import Request
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.middleware import RateLimitMiddleware
+from app.database import get_db
+from app.main import app
+from app.models import ExportJob, Organization
+from app.services.annex_iv_bundle import ANNEX_IV_DOCUMENT_TEMPLATES
+from app.services.bundle_cache import S3BundleStore
+from app.services.compliance_suite import ComplianceSuiteService
+from app.services.export_jobs import ExportJobWorker
+from tests.conftest import TestingSessionLocal
+
+
+@pytest.fixture
+def jobs_client(db_session, bundle_system):
+    original = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        yield TestClient(app), {"X-API-Key": bundle_system["org"].api_key}, bundle_system
+    finally:
+        if original is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = original
+
+
+def _worker():
+    return ExportJobWorker(session_factory=TestingSessionLocal, poll_interval=0)
+
+
+def test_job_lifecycle(jobs_client, db_session):
+    client, headers, data = jobs_client
+    system_id = data["system"].id
+
+    created = client.post(f"/reports/annex-iv/{system_id}/jobs", headers=headers)
+    assert created.status_code == 202
+    job = created.json()
+    assert job["status"] == "queued"
+    assert job["download_url"] is None
+    assert set(job["progress"]["documents"]) == set(ANNEX_IV_DOCUMENT_TEMPLATES)
+
+    pending = client.get(f"/reports/jobs/{job['job_id']}/download", headers=headers)
+    assert pending.status_code == 409
+
+    assert _worker().run_pending() == 1
+
+    status = client.get(job["status_url"], headers=headers).json()
+    assert status["status"] == "done"
+    assert status["progress"]["completed"] == status["progress"]["total"]
+    assert set(status["progress"]["documents"].values()) <= {"done", "failed"}
+
+    download = client.get(status["download_url"], headers=headers)
+    assert download.status_code == 200
+    assert download.headers["ETag"] == f'"{status["sha256"]}"'
+    assert hashlib.sha256(download.content).hexdigest() == status["sha256"]
+    assert download.headers["X-File-Hash"] == f"sha256:{status['sha256']}"
+    assert download.headers["X-File-Size"] == str(status["bytes"])
+    with zipfile.ZipFile(BytesIO(download.content)) as zf:
+        assert "manifest.json" in zf.namelist()
+        assert json.loads(zf.read("manifest.json"))["generator_version"] == "2.0.0"
+
+    integrity = client.get(download.headers["X-Integrity-Manifest"], headers=headers).json()
+    assert integrity["sha256"] == status["sha256"]
+
+
+def test_job_reuses_cached_bundle(jobs_client):
+    client, headers, data = jobs_client
+    url = f"/reports/annex-iv/{data['system'].id}"
+    direct = client.get(url, headers=headers)
+
+    job = client.post(f"{url}/jobs", headers=headers).json()
+    _worker().run_pending()
+
+    status = client.get(job["status_url"], headers=headers).json()
+    assert set(status["progress"]["documents"].values()) == {"cached"}
+    assert client.get(status["download_url"], headers=headers).content == direct.content
+
+
+def test_job_download_resumes_with_ranges(jobs_client):
+    client, headers, data = jobs_client
+    job = client.post("/reports/annex-iv/1/jobs", headers=headers).json()
+    _worker().run_pending()
+    url = client.get(job["status_url"], headers=headers).json()["download_url"]
+
+    full = client.get(url, headers=headers)
+    assert full.headers["Accept-Ranges"] == "bytes"
+    etag = full.headers["ETag"]
+
+    # Resume after the first 100 bytes, guarded by the strong validator
+    rest = client.get(url, headers={**headers, "Range": "bytes=100-", "If-Range": etag})
+    assert rest.status_code == 206
+    assert rest.headers["Content-Range"] == f"bytes 100-{len(full.content) - 1}/{len(full.content)}"
+    assert full.content[:100] + rest.content == full.content
+
+    # A stale validator gets the whole archive again
+    stale = client.get(url, headers={**headers, "Range": "bytes=100-", "If-Range": '"stale"'})
+    assert stale.status_code == 200
+    assert stale.content == full.content
+
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+
+
+def test_job_download_redirects_to_presigned_url_on_s3(jobs_client, monkeypatch):
+    client, headers, data = jobs_client
+    job = client.post("/reports/annex-iv/1/jobs", headers=headers).json()
+    _worker().run_pending()
+
+    class PresigningClient:
+        def head_object(self, **kwargs):
+            return {}
+
+        def generate_presigned_url(self, operation, Params, ExpiresIn):
+            return f"https://bucket.example/{Params['Key']}?expires={ExpiresIn}"
+
+    monkeypatch.setattr(
+        "app.api.routes.reports.job_store",
+        lambda: S3BundleStore(PresigningClient(), "bucket", prefix="export-jobs/"),
+    )
+    response = client.get(
+        f"/reports/jobs/{job['job_id']}/download", headers=headers, follow_redirects=False
+    )
+    assert response.status_code == 307
+    location = f"https://bucket.example/export-jobs/{job['job_id']}.zip"
+    assert response.headers["Location"].startswith(location)
+    sha256 = client.get(job["status_url"], headers=headers).json()["sha256"]
+    assert response.headers["ETag"] == f'"{sha256}"'
+
+
+def test_jobs_are_org_scoped_and_validated(jobs_client, db_session):
+    client, headers, data = jobs_client
+    system_id = data["system"].id
+
+    invalid = client.post(f"/reports/annex-iv/{system_id}/jobs?variant=v9", headers=headers)
+    assert invalid.status_code == 422
+    assert client.post("/reports/annex-iv/99999/jobs", headers=headers).status_code == 404
+
+    job = client.post(f"/reports/annex-iv/{system_id}/jobs", headers=headers).json()
+    db_session.add(Organization(name="Other Corp", api_key="other-key"))
+    db_session.commit()
+    assert client.get(job["status_url"], headers={"X-API-Key": "other-key"}).status_code == 404
+    assert client.get("/reports/jobs/missing", headers=headers).status_code == 404
+
+
+def test_stale_running_job_is_requeued(jobs_client, db_session):
+    client, headers, data = jobs_client
+    job = client.post("/reports/annex-iv/1/jobs", headers=headers).json()
+
+    worker = _worker()
+    db = TestingSessionLocal()
+    try:
+        assert worker.claim_next(db) == job["job_id"]
+        assert worker.claim_next(db) is None
+
+        row = db.get(ExportJob, job["job_id"])
+        row.heartbeat_at = datetime.now(timezone.utc) - timedelta(days=1)
+        db.commit()
+        assert worker.requeue_stale(db) == 1
+    finally:
+        db.close()
+
+    assert client.get(job["status_url"], headers=headers).json()["status"] == "queued"
+    assert worker.run_pending() == 1
+    assert client.get(job["status_url"], headers=headers).json()["attempts"] == 2
+
+
+def test_expired_jobs_answer_410_then_are_purged(jobs_client, db_session, monkeypatch):
+    client, headers, data = jobs_client
+    job = client.post("/reports/annex-iv/1/jobs", headers=headers).json()
+    worker = _worker()
+    worker.run_pending()
+    download = client.get(f"/reports/jobs/{job['job_id']}/download", headers=headers)
+    assert download.status_code == 200
+    assert client.get(job["status_url"], headers=headers).json()["expires_at"] is not None
+    queued = client.post("/reports/annex-iv/1/jobs", headers=headers).json()
+
+    db = TestingSessionLocal()
+    try:
+        row = db.get(ExportJob, job["job_id"])
+        row.finished_at = datetime.now(timezone.utc) - timedelta(days=30)
+        db.commit()
+        expired = client.get(f"/reports/jobs/{job['job_id']}/download", headers=headers)
+        assert expired.status_code == 410
+
+        monkeypatch.setattr(settings, "EXPORT_JOB_TTL_SECONDS", 0)
+        assert worker.purge_expired(db) == 0
+        monkeypatch.setattr(settings, "EXPORT_JOB_TTL_SECONDS", 3600)
+        assert worker.purge_expired(db) == 1
+    finally:
+        db.close()
+
+    assert not worker.store.exists(f"{job['job_id']}.zip")
+    assert client.get(download.headers["X-Integrity-Manifest"], headers=headers).status_code == 404
+    assert client.get(job["status_url"], headers=headers).status_code == 404
+    assert client.get(queued["status_url"], headers=headers).json()["status"] == "queued"
+
+
+def test_compliance_suite_job(jobs_client):
+    client, headers, data = jobs_client
+    system_id = data["system"].id
+
+    url = f"/reports/compliance-suite/{system_id}/jobs"
+    assert client.post(f"{url}?format=odt", headers=headers).status_code == 422
+    assert client.post("/reports/compliance-suite/99999/jobs", headers=headers).status_code == 404
+
+    job = client.post(url, headers=headers).json()
+    assert job["kind"] == "compliance_suite"
+    assert set(job["progress"]["documents"]) == set(ComplianceSuiteService.TEMPLATE_MAPPING)
+
+    assert _worker().run_pending() == 1
+
+    status = client.get(job["status_url"], headers=headers).json()
+    assert status["status"] == "done"
+    assert set(status["progress"]["documents"].values()) == {"done"}
+    download = client.get(status["download_url"], headers=headers)
+    assert download.status_code == 200
+    with zipfile.ZipFile(BytesIO(download.content)) as zf:
+        assert sorted(zf.namelist()) == sorted(
+            f"{doc_type}.md" for doc_type in ComplianceSuiteService.TEMPLATE_MAPPING
+        )
+        assert zf.read("annex_iv.md")
+
+
+def test_job_downloads_are_rate_limited():
+    limiter = RateLimitMiddleware(app, rate_limit=1)
+
+    def limited(path):
+        return limiter._should_rate_limit(Request({"type": "http", "path": path, "headers": []}))
+
+    assert limited("/reports/annex-iv/1/jobs")
+    assert limited("/reports/compliance-suite/1/jobs")
+    assert limited("/reports/jobs/abc123/download")
+    assert not limited("/reports/jobs/abc123")
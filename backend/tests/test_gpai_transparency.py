@@ -3,7 +3,6 @@ Test GPAI Transparency Notice conditional generation
 """
 
 import pytest
-from pathlib import Path
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -101,14 +100,12 @@ def test_gpai_system_generates_transparency_notice(db_session):
     assert "transparency_notice_gpai" in result
     print("✅ TEST 1 PASSED: Transparency notice generated for GPAI system")
     
-    # Test 2: File exists
-    output_dir = Path(__file__).parent.parent / "generated_documents"
-    notice_path = output_dir / f"org_{org.id}" / f"system_{gpai_system.id}" / "transparency_notice_gpai.md"
-    assert notice_path.exists()
-    print("✅ TEST 2 PASSED: Transparency notice file exists")
+    # Test 2: Document is stored
+    content, _ = generator.get_document_content(gpai_system.id, org.id, "transparency_notice_gpai", db_session)
+    content = content.decode("utf-8")
+    print("✅ TEST 2 PASSED: Transparency notice stored")
     
     # Test 3: Content is correct
-    content = notice_path.read_text()
     assert "# Transparency Notice - General Purpose AI" in content
     assert "GPAI Content Generator" in content
     assert "General Purpose AI" in content
@@ -131,13 +128,10 @@ def test_gpai_system_generates_transparency_notice(db_session):
     print("=" * 60)
 
 
-def test_non_gpai_system_no_transparency_notice(db_session, tmp_path, monkeypatch):
+def test_non_gpai_system_no_transparency_notice(db_session):
     """Test that non-GPAI systems do NOT generate transparency notice."""
     
-    # Use temporary directory to avoid cross-test pollution
     from app.services.document_generator import DocumentGenerator
-    test_output_dir = tmp_path / "test_documents"
-    test_output_dir.mkdir()
     
     org = Organization(
         name="NonGPAI Test Corp",
@@ -162,9 +156,8 @@ def test_non_gpai_system_no_transparency_notice(db_session, tmp_path, monkeypatc
     db_session.add(non_gpai_system)
     db_session.commit()
     
-    # Generate documents with custom output directory
+    # Generate documents
     generator = DocumentGenerator()
-    monkeypatch.setattr(generator, 'output_dir', test_output_dir)
     
     result = generator.generate_all_documents(
         system_id=non_gpai_system.id,
@@ -180,15 +173,10 @@ def test_non_gpai_system_no_transparency_notice(db_session, tmp_path, monkeypatc
     assert "transparency_notice_gpai" not in result
     print("✅ TEST PASSED: Non-GPAI system does not generate transparency notice in result")
     
-    # Verify file doesn't exist in test output directory
-    system_dir = test_output_dir / f"org_{org.id}" / f"system_{non_gpai_system.id}"
-    
-    if system_dir.exists():
-        notice_path = system_dir / "transparency_notice_gpai.md"
-        assert not notice_path.exists(), f"Transparency notice should not exist for non-GPAI system"
-        print("✅ TEST PASSED: Transparency notice file not created for this system")
-    else:
-        print("✅ TEST PASSED: System directory is clean (no documents yet)")
+    # Verify nothing was stored for it
+    with pytest.raises(FileNotFoundError):
+        generator.get_document_content(non_gpai_system.id, org.id, "transparency_notice_gpai", db_session)
+    print("✅ TEST PASSED: Transparency notice not stored for this system")
     
     print("\n" + "=" * 60)
     print("🎉 NON-GPAI CONDITIONAL LOGIC WORKS!")
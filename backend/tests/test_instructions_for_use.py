@@ -3,7 +3,6 @@ Test Instructions for Use generation
 """
 
 import pytest
-from pathlib import Path
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -147,12 +146,8 @@ def test_instructions_for_use_generation(db_session, high_risk_system_complete):
     assert result["instructions_for_use"]["markdown_available"] == True
     
     # Read the generated document
-    output_dir = Path(__file__).parent.parent / "generated_documents"
-    ifu_path = output_dir / f"org_{org.id}" / f"system_{system.id}" / "instructions_for_use.md"
-    
-    assert ifu_path.exists(), f"Instructions for Use not found at {ifu_path}"
-    
-    content = ifu_path.read_text()
+    content, _ = generator.get_document_content(system.id, org.id, "instructions_for_use", db_session)
+    content = content.decode("utf-8")
     
     print("\n📖 INSTRUCTIONS FOR USE GENERATION TEST")
     print("=" * 60)
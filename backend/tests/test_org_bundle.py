@@ -0,0 +1,145 @@
+"""
+Tests for org-wide multi-system Annex IV bundles.
+"""
+
+import json
+import zipfile
+from io import BytesIO
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.main import app
+from app.models import AIRisk, AISystem, Control, Evidence, Organization
+from app.services.annex_iv_bundle import ANNEX_IV_DOCUMENT_TEMPLATES
+from app.services.bundle_builder import OrgBundleBuilder
+from app.services.document_context import DocumentContextService
+from tests.conftest import create_test_system
+
+
+def _add_systems(db_session, org, count, **kwargs):
+    systems = []
+    for n in range(count):
+        system = create_test_system(org_id=org.id, name=f"System {n}", **kwargs)
+        db_session.add(system)
+        db_session.flush()
+        for i in range(2):
+            db_session.add(AIRisk(org_id=org.id, system_id=system.id, description=f"Risk {n}.{i}"))
+            control = Control(
+                org_id=org.id, system_id=system.id, iso_clause=f"A.{i}", name=f"Control {n}.{i}"
+            )
+            db_session.add(control)
+            db_session.flush()
+            db_session.add(Evidence(
+                org_id=org.id, system_id=system.id, control_id=control.id,
+                label=f"Evidence {n}.{i}", checksum=f"{n}{i}".zfill(64)
+            ))
+        systems.append(system)
+    db_session.commit()
+    return systems
+
+
+@pytest.fixture
+def org_systems(db_session):
+    org = Organization(name="Multi Corp", api_key="multi-key", org_role="provider")
+    db_session.add(org)
+    db_session.commit()
+    return {"org": org, "systems": _add_systems(db_session, org, 3)}
+
+
+def test_batched_snapshots_match_single_loads(db_session, org_systems):
+    org, systems = org_systems["org"], org_systems["systems"]
+    service = DocumentContextService(db_session)
+
+    batched = service.load_snapshots([s.id for s in systems], org.id)
+
+    assert list(batched) == [s.id for s in systems]
+    for system in systems:
+        assert batched[system.id] == service.load_snapshot(system.id, org.id)
+
+
+def test_snapshot_queries_do_not_grow_with_system_count(db_session, org_systems):
+    org = org_systems["org"]
+
+    def load(limit=None):
+        # Fresh rows, as the export route passes them in
+        systems = (
+            db_session.query(AISystem)
+            .filter(AISystem.org_id == org.id)
+            .order_by(AISystem.id)
+            .limit(limit)
+            .all()
+        )
+        with OrgBundleBuilder(db_session, org, systems) as builder:
+            pass
+        return builder
+
+    one = load(limit=1)
+    _add_systems(db_session, org, 5)
+    org.name  # reload after commit
+    many = load()
+
+    assert len(many.builders) == 8
+    assert many.snapshot_queries == one.snapshot_queries
+
+
+@pytest.fixture
+def org_client(db_session, org_systems):
+    original = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        yield TestClient(app), {"X-API-Key": org_systems["org"].api_key}, org_systems
+    finally:
+        if original is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = original
+
+
+def test_org_bundle_has_folder_per_system_and_one_manifest(org_client):
+    client, headers, data = org_client
+    systems = data["systems"]
+
+    response = client.get("/reports/annex-iv-org", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["X-Cache"] == "MISS"
+
+    with zipfile.ZipFile(BytesIO(response.content)) as zf:
+        names = zf.namelist()
+        manifest = json.loads(zf.read("manifest.json"))
+
+    assert names.count("manifest.json") == 1
+    assert names.count("organization_info.txt") == 1
+    assert [s["system_id"] for s in manifest["systems"]] == [s.id for s in systems]
+    for system in systems:
+        folder = f"systems/system-{system.id}/"
+        assert f"{folder}system_info.txt" in names
+        assert f"{folder}controls.csv" in names
+        assert all(f"{folder}{doc_type}.md" in names for doc_type in ANNEX_IV_DOCUMENT_TEMPLATES)
+    assert {a["name"] for a in manifest["artifacts"]} == set(names) - {"manifest.json"}
+    compression = manifest["metrics"]["compression"]["entries"]
+    assert [e["name"] for e in compression] == [a["name"] for a in manifest["artifacts"]]
+
+    again = client.get("/reports/annex-iv-org", headers=headers)
+    assert again.headers["X-Cache"] == "HIT"
+    assert again.content == response.content
+
+
+def test_org_bundle_filters_and_fria_gate(org_client, db_session):
+    client, headers, data = org_client
+    first = data["systems"][0]
+
+    filtered = client.get(f"/reports/annex-iv-org?system_ids={first.id}", headers=headers)
+    with zipfile.ZipFile(BytesIO(filtered.content)) as zf:
+        manifest = json.loads(zf.read("manifest.json"))
+    assert [s["system_id"] for s in manifest["systems"]] == [first.id]
+
+    prohibited = client.get("/reports/annex-iv-org?ai_act_class=prohibited", headers=headers)
+    assert prohibited.status_code == 404
+
+    first.ai_act_class = "high-risk"
+    db_session.commit()
+    blocked = client.get("/reports/annex-iv-org?ai_act_class=high-risk", headers=headers)
+    assert blocked.status_code == 409
+    assert str(first.id) in blocked.json()["detail"]
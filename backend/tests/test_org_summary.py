@@ -0,0 +1,105 @@
+"""
+Tests for the single-statement, revision-cached org summary.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from fastapi.testclient import TestClient
+
+from app.core.query_counter import QueryCounter
+from app.database import get_db
+from app.main import app
+from app.models import Action, AISystem, Control, Evidence, Incident
+from app.services.org_summary import SummaryCache, compute_summary, summary_cache
+
+
+def test_summary_counts_in_one_statement(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    now = datetime.now(timezone.utc)
+    db_session.add_all([
+        AISystem(org_id=org.id, name="GPAI", is_general_purpose_ai=True, criticality="high"),
+        AISystem(org_id=org.id, name="Annex III", ai_act_class="high-risk"),
+        Evidence(org_id=org.id, system_id=system.id, label="Legacy", control_name="Control 0"),
+        Incident(org_id=org.id, system_id=system.id, detected_at=now - timedelta(days=3)),
+        Incident(org_id=org.id, system_id=system.id, detected_at=now - timedelta(days=45)),
+        Action(org_id=org.id, title="Open", status="open", created_at=now - timedelta(days=1)),
+        Action(org_id=org.id, title="Done", status="completed", created_at=now - timedelta(days=1)),
+        Action(org_id=org.id, title="Old", status="open", created_at=now - timedelta(days=10)),
+    ])
+    db_session.commit()
+    org_id = org.id
+    controls = db_session.query(Control).filter(Control.org_id == org_id).count()
+    linked = db_session.query(Evidence).filter(
+        Evidence.org_id == org_id, Evidence.control_id.isnot(None)
+    ).count()
+
+    with QueryCounter(db_session) as counter:
+        summary = compute_summary(db_session, org_id, now)
+
+    assert counter.count == 1
+    assert summary == {
+        "systems": 3,
+        "high_risk": 2,  # by ai_act_class, and the GPAI system by criticality
+        "last_30d_incidents": 1,
+        "overrides_pct": None,
+        "gpai_count": 1,
+        "evidence_coverage_pct": round(linked / controls * 100, 2),
+        "evidence_coverage_status": "calculated_with_id",
+        "open_actions_7d": 1,
+    }
+
+
+def test_summary_of_an_empty_org(db_session, bundle_system):
+    summary = compute_summary(db_session, bundle_system["org"].id + 1)
+
+    assert summary["systems"] == 0 and summary["open_actions_7d"] == 0
+    assert summary["evidence_coverage_status"] == "no_controls"
+
+
+def test_cache_is_invalidated_by_org_revision(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    cache = SummaryCache(ttl_seconds=60)
+    first = cache.get(db_session, org.id, org.revision)
+
+    with QueryCounter(db_session) as counter:
+        assert cache.get(db_session, org.id, org.revision) == first
+    assert counter.count == 0
+
+    db_session.add(
+        Control(org_id=org.id, system_id=system.id, iso_clause="A.9", name="New control")
+    )
+    db_session.commit()
+
+    coverage = cache.get(db_session, org.id, org.revision)["evidence_coverage_pct"]
+    assert coverage < first["evidence_coverage_pct"]
+    assert cache.metrics()["hits"] == 1 and cache.metrics()["misses"] == 2
+
+
+def test_expired_or_disabled_entries_are_recomputed(db_session, bundle_system):
+    org = bundle_system["org"]
+    cache = SummaryCache(ttl_seconds=0)
+
+    cache.get(db_session, org.id, org.revision)
+    cache.get(db_session, org.id, org.revision)
+
+    assert cache.metrics()["misses"] == 2 and cache.metrics()["entries"] == 0
+
+
+def test_warm_summary_endpoint_runs_only_the_api_key_lookup(db_session, bundle_system):
+    headers = {"X-API-Key": bundle_system["org"].api_key}
+    original = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        client = TestClient(app)
+        cold = client.get("/reports/summary", headers=headers).json()
+        with QueryCounter(db_session) as counter:
+            warm = client.get("/reports/summary", headers=headers).json()
+    finally:
+        if original is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = original
+
+    assert warm == cold and cold["systems"] == 1
+    assert counter.count == 1
+    assert summary_cache.metrics()["hits"] == 1
@@ -0,0 +1,168 @@
+"""
+Tests for the out-of-process PDF render service.
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from app.services.pdf_renderer import PdfQueueFullError, PdfRenderService, PdfRenderTimeoutError
+from app.services.render_executor import RenderExecutor, RenderJob
+
+
+def _render(payload: bytes, delay: float = 0.0) -> bytes:
+    time.sleep(delay)
+    return b"%PDF-" + payload
+
+
+def _fail() -> bytes:
+    raise ValueError("bad markup")
+
+
+def _worker_pid(delay: float = 0.0) -> int:
+    time.sleep(delay)
+    return os.getpid()
+
+
+@pytest.fixture
+def service():
+    services = []
+
+    def make(**kwargs):
+        kwargs.setdefault("queue_wait", 0)
+        svc = PdfRenderService(**kwargs)
+        services.append(svc)
+        return svc
+
+    yield make
+    for svc in services:
+        svc.shutdown(wait=False, cancel_futures=True)
+
+
+def test_inline_renders_record_metrics(service):
+    svc = service(workers=0)
+
+    assert svc.render(_render, b"a") == b"%PDF-a"
+    with pytest.raises(ValueError):
+        svc.render(_fail)
+
+    metrics = svc.metrics()
+    assert metrics["completed"] == 1
+    assert metrics["failed"] == 1
+    assert metrics["queue_depth"] == 0
+    assert metrics["avg_render_seconds"] is not None
+
+
+def test_full_queue_rejects_new_jobs(service):
+    svc = service(workers=0, queue_size=1)
+    started, release = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5)
+        return b"%PDF"
+
+    worker = threading.Thread(target=svc.render, args=(blocking,))
+    worker.start()
+    started.wait(5)
+    assert svc.metrics()["in_flight"] == 1
+
+    with pytest.raises(PdfQueueFullError):
+        svc.submit(_render, b"late")
+    release.set()
+    worker.join(5)
+
+    assert svc.metrics()["rejected"] == 1
+    assert svc.render(_render, b"ok") == b"%PDF-ok"
+
+
+def test_full_queue_rejects_jobs_while_workers_are_busy(service):
+    svc = service(workers=1, queue_size=2, timeout=30)
+    svc.warm()
+
+    running = [svc.submit(_render, str(i).encode(), 0.5) for i in range(2)]
+    with pytest.raises(PdfQueueFullError):
+        svc.submit(_render, b"late")
+
+    assert [future.result(10) for future in running] == [b"%PDF-0", b"%PDF-1"]
+    assert svc.metrics()["rejected"] == 1
+    assert svc.render(_render, b"ok") == b"%PDF-ok"
+
+
+def test_reserved_slot_counts_before_the_job_is_dispatched(service):
+    """A slot is taken as soon as it is reserved, not when the job is registered later."""
+    svc = service(workers=1, queue_size=1)
+    svc._reserve_slot()
+
+    with pytest.raises(PdfQueueFullError):
+        svc.submit(_render, b"late")
+    assert svc.metrics()["queue_depth"] == 1
+
+
+def test_worker_pool_renders_in_order_through_render_executor(service):
+    svc = service(workers=2, timeout=30)
+    executor = RenderExecutor(timeout=30, pdf_pool=svc)
+
+    results = list(executor.run_pdf([
+        RenderJob("slow", _render, (b"1", 0.3)),
+        RenderJob("fast", _render, (b"2",)),
+        RenderJob("broken", _fail),
+    ]))
+
+    assert [r.key for r in results] == ["slow", "fast", "broken"]
+    assert [r.value for r in results[:2]] == [b"%PDF-1", b"%PDF-2"]
+    assert isinstance(results[2].error, ValueError)
+    metrics = svc.metrics()
+    assert metrics["completed"] == 2
+    assert metrics["failed"] == 1
+    assert metrics["peak_worker_rss_mb"] > 0
+
+
+def test_queued_pdf_jobs_are_not_timed_out_while_waiting(service):
+    """The executor leaves the per-job deadline to the service, which times jobs from start."""
+    svc = service(workers=1, timeout=1.0)
+    svc.warm()
+    executor = RenderExecutor(timeout=1.0, pdf_pool=svc)
+
+    jobs = [RenderJob(f"doc{i}", _render, (str(i).encode(), 0.6)) for i in range(3)]
+    results = list(executor.run_pdf(jobs))
+
+    assert [r.value for r in results] == [b"%PDF-0", b"%PDF-1", b"%PDF-2"]
+    assert svc.metrics()["timeouts"] == 0
+
+
+def test_stuck_render_times_out_and_recycles_workers(service):
+    svc = service(workers=1, timeout=1.0)
+    svc.warm()
+
+    started = time.monotonic()
+    with pytest.raises(PdfRenderTimeoutError):
+        svc.render(_render, b"stuck", 60)
+    assert time.monotonic() - started < 15
+
+    assert svc.render(_render, b"next") == b"%PDF-next"
+    metrics = svc.metrics()
+    assert metrics["timeouts"] == 1
+    assert metrics["recycles"] == 1
+
+
+def test_worker_over_memory_cap_is_recycled(service):
+    svc = service(workers=1, timeout=30, max_worker_rss_mb=1)
+
+    assert svc.render(_render, b"a") == b"%PDF-a"
+    assert svc.metrics()["recycles"] == 1
+    # The next job gets a fresh worker (which is over the tiny cap too)
+    assert svc.render(_render, b"b") == b"%PDF-b"
+    assert svc.metrics()["recycles"] == 2
+
+
+def test_worker_is_replaced_after_max_jobs(service):
+    svc = service(workers=1, timeout=30, max_jobs_per_worker=1)
+
+    first = svc.render(_worker_pid)
+    second = svc.render(_worker_pid)
+
+    assert first != second != os.getpid()
+    assert svc.metrics()["completed"] == 2
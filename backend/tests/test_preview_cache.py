@@ -0,0 +1,76 @@
+"""
+Tests for cached, sanitized document previews.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import get_db
+from app.main import app
+from app.services.document_generator import DocumentGenerator, default_onboarding_data
+from app.services.preview_cache import PreviewCache, preview_cache
+
+
+def test_cache_sanitizes_and_reuses_html():
+    cache = PreviewCache(max_bytes=10_000)
+
+    html_content, key = cache.get(b"# Title\n\n<script>alert(1)</script>")
+    again, same_key = cache.get(b"# Title\n\n<script>alert(1)</script>")
+
+    assert "<script>" not in html_content and "<h1" in html_content
+    assert again == html_content and same_key == key
+    assert cache.metrics()["hits"] == 1 and cache.metrics()["misses"] == 1
+
+
+def test_cache_evicts_least_recently_used_over_size_cap():
+    first_size = len(PreviewCache(max_bytes=10_000).get(b"a" * 100)[0])
+    cache = PreviewCache(max_bytes=first_size * 2)
+    cache.get(b"a" * 100)
+    cache.get(b"b" * 100)
+    cache.get(b"a" * 100)  # most recently used now
+    cache.get(b"c" * 100)
+
+    metrics = cache.metrics()
+    assert metrics["entries"] == 2 and metrics["evictions"] == 1
+    assert metrics["bytes"] <= cache.max_bytes
+    cache.get(b"a" * 100)
+    assert cache.metrics()["hits"] == 2
+
+
+@pytest.fixture
+def preview_client(db_session, bundle_system):
+    original = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: db_session
+    preview_cache.clear()
+    try:
+        yield TestClient(app), {"X-API-Key": bundle_system["org"].api_key}, bundle_system
+    finally:
+        preview_cache.clear()
+        if original is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = original
+
+
+def test_generation_warms_cache_and_preview_revalidates_with_etag(db_session, preview_client):
+    client, headers, data = preview_client
+    org, system = data["org"], data["system"]
+    generator = DocumentGenerator()
+    docs = generator.generate_all_documents(
+        system.id, org.id, default_onboarding_data(org), db_session
+    )
+    assert preview_cache.metrics()["entries"] == len(docs)
+
+    url = f"/documents/systems/{system.id}/preview/soa"
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    assert "Control 0" in first.text
+    assert preview_cache.metrics()["hits"] == 1 and preview_cache.metrics()["misses"] == 0
+
+    etag = first.headers["ETag"]
+    unchanged = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert unchanged.status_code == 304
+    assert unchanged.headers["ETag"] == etag and not unchanged.content
+
+    other = client.get(f"/documents/systems/{system.id}/preview/fria", headers=headers)
+    assert other.headers["ETag"] != etag
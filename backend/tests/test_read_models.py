@@ -0,0 +1,70 @@
+"""
+Tests for the column-projected read models used by reporting paths.
+"""
+
+from datetime import datetime, timedelta, timezone
+from itertools import product
+
+from fastapi.testclient import TestClient
+
+from app.core.query_counter import QueryCounter
+from app.database import get_db
+from app.main import app
+from app.models import AISystem, Control
+from app.services.read_models import ControlRow, SystemRow, load_rows, select_rows
+
+
+def test_read_models_are_untracked_projections(db_session, bundle_system):
+    org_id = bundle_system["org"].id
+    db_session.expunge_all()
+
+    controls = load_rows(db_session, ControlRow, org_id)
+
+    assert [type(c) for c in controls] == [ControlRow] * 3
+    assert [c.name for c in controls] == ["Control 0", "Control 1", "Control 2"]
+    assert len(db_session.identity_map) == 0
+    sql = str(select_rows(SystemRow, org_id).compile())
+    assert "organizations.org_role" in sql and "ai_systems.purpose" not in sql
+
+
+def test_system_row_flags_match_the_model(db_session, bundle_system):
+    org = bundle_system["org"]
+    combos = list(product(["high-risk", "limited"], ["provider", "deployer", None], [True, False]))
+    for ai_act_class, system_role, rights in combos:
+        db_session.add(AISystem(
+            org_id=org.id, name=f"{ai_act_class}-{system_role}-{rights}", ai_act_class=ai_act_class,
+            system_role=system_role, impacts_fundamental_rights=rights,
+        ))
+    org.org_role = "provider"
+    db_session.commit()
+
+    rows = {row.id: row for row in load_rows(db_session, SystemRow, org.id)}
+    for system in db_session.query(AISystem).filter(AISystem.org_id == org.id):
+        row = rows[system.id]
+        assert row.requires_fria_computed == bool(system.requires_fria_computed)
+        assert row.eu_db_required_computed == bool(system.eu_db_required_computed)
+
+
+def test_upcoming_deadlines_query_count_independent_of_controls(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    soon = datetime.now(timezone.utc).date() + timedelta(days=5)
+    for control in db_session.query(Control).filter(Control.system_id == system.id):
+        control.due_date = soon
+    db_session.commit()
+    headers = {"X-API-Key": org.api_key}
+
+    original = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        with QueryCounter(db_session) as counter:
+            response = TestClient(app).get("/reports/upcoming-deadlines", headers=headers)
+    finally:
+        if original is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = original
+
+    deadlines = response.json()["upcoming_deadlines"]
+    assert [d["system_name"] for d in deadlines] == [system.name] * 3
+    # API key lookup, controls due, systems
+    assert counter.count == 3
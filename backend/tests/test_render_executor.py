@@ -0,0 +1,135 @@
+"""
+Tests for the ordered, deadline-bounded render executor.
+"""
+
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.annex_iv_bundle import ANNEX_IV_DOCUMENT_TEMPLATES
+from app.services.bundle_builder import BundleBuilder
+from app.services.render_executor import RenderExecutor, RenderJob, RenderTimeoutError
+
+
+def _sleep_then_return(delay, value):
+    time.sleep(delay)
+    return value
+
+
+def _fail(message):
+    raise ValueError(message)
+
+
+@pytest.fixture
+def pool():
+    executor = ThreadPoolExecutor(max_workers=4)
+    yield executor
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def test_results_keep_submission_order(pool):
+    """Slow early jobs do not reorder the output."""
+    executor = RenderExecutor(timeout=5, render_pool=pool)
+    jobs = [
+        RenderJob(f"doc{i}", _sleep_then_return, (delay, i))
+        for i, delay in enumerate([0.2, 0.0, 0.1, 0.0])
+    ]
+
+    results = list(executor.run(jobs))
+
+    assert [r.key for r in results] == ["doc0", "doc1", "doc2", "doc3"]
+    assert [r.value for r in results] == [0, 1, 2, 3]
+    assert all(r.ok for r in results)
+
+
+def test_job_exceeding_deadline_is_reported(pool):
+    executor = RenderExecutor(timeout=0.05, render_pool=pool)
+
+    [slow, fast] = list(executor.run([
+        RenderJob("slow", _sleep_then_return, (0.5, "late")),
+        RenderJob("fast", _sleep_then_return, (0.0, "ok")),
+    ]))
+
+    assert not slow.ok
+    assert isinstance(slow.error, RenderTimeoutError)
+    assert fast.ok and fast.value == "ok"
+
+
+def test_deadline_starts_when_a_worker_picks_the_job_up():
+    """Jobs queued behind others on a narrow pool keep their whole budget."""
+    narrow = ThreadPoolExecutor(max_workers=1)
+    try:
+        executor = RenderExecutor(timeout=0.3, render_pool=narrow)
+        jobs = [RenderJob(f"doc{i}", _sleep_then_return, (0.15, i)) for i in range(4)]
+        results = list(executor.run(jobs))
+    finally:
+        narrow.shutdown(wait=False, cancel_futures=True)
+
+    assert [r.value for r in results] == [0, 1, 2, 3]
+    assert all(r.ok for r in results)
+
+
+def test_batch_deadline_bounds_queued_jobs():
+    narrow = ThreadPoolExecutor(max_workers=1)
+    try:
+        executor = RenderExecutor(timeout=5, render_pool=narrow, batch_timeout=0.2)
+        [first, queued] = list(executor.run([
+            RenderJob("first", _sleep_then_return, (0.4, "late")),
+            RenderJob("queued", _sleep_then_return, (0.0, "never")),
+        ]))
+    finally:
+        narrow.shutdown(wait=False, cancel_futures=True)
+
+    assert isinstance(first.error, RenderTimeoutError)
+    assert isinstance(queued.error, RenderTimeoutError)
+
+
+def test_job_errors_are_captured_not_raised(pool):
+    executor = RenderExecutor(timeout=5, render_pool=pool)
+
+    [bad, good] = list(executor.run([
+        RenderJob("bad", _fail, ("boom",)),
+        RenderJob("good", _sleep_then_return, (0.0, "fine")),
+    ]))
+
+    assert isinstance(bad.error, ValueError)
+    assert good.value == "fine"
+
+
+def test_pdf_jobs_fall_back_to_threads_when_process_pool_disabled(monkeypatch, pool):
+    monkeypatch.setattr("app.services.render_executor.settings.PDF_RENDER_WORKERS", 0)
+    executor = RenderExecutor(timeout=5, render_pool=pool)
+
+    assert executor.pdf_pool is pool
+    [result] = list(executor.run_pdf([RenderJob("pdf", _sleep_then_return, (0.0, b"%PDF"))]))
+    assert result.value == b"%PDF"
+
+
+def test_parallel_bundle_matches_sequential_render(db_session, bundle_system, pool):
+    """Concurrent rendering yields the same documents, in order, with no extra queries."""
+    system, org = bundle_system["system"], bundle_system["org"]
+
+    with BundleBuilder(db_session, system, org) as sequential:
+        expected = {
+            doc_type: sequential.render_document(doc_type, template_file)
+            for doc_type, template_file in ANNEX_IV_DOCUMENT_TEMPLATES.items()
+        }
+
+    with BundleBuilder(db_session, system, org) as parallel:
+        results = list(parallel.render_documents(
+            ANNEX_IV_DOCUMENT_TEMPLATES, RenderExecutor(timeout=30, render_pool=pool)
+        ))
+
+    assert [r.key for r in results] == list(ANNEX_IV_DOCUMENT_TEMPLATES)
+    # generated_at timestamps differ between runs; compare everything else
+    for result in results:
+        assert result.ok
+        assert _strip_timestamps(result.value) == _strip_timestamps(expected[result.key])
+    assert parallel.metrics()["documents_rendered"] == len(ANNEX_IV_DOCUMENT_TEMPLATES)
+    assert parallel.metrics()["queries"] == parallel.metrics()["snapshot_queries"]
+
+
+def _strip_timestamps(text):
+    return re.sub(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?", "<ts>", text)
@@ -0,0 +1,205 @@
+"""
+Tests for on-demand document rendering backed by the render store.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.query_counter import QueryCounter
+from app.database import get_db
+from app.main import app
+from app.models import Control, OnboardingData, RenderedDocument
+from app.services import document_generator as generator_module
+from app.services.document_generator import DocumentGenerator, default_onboarding_data
+from app.services.pdf_renderer import PdfQueueFullError, PdfRenderTimeoutError
+from app.services.render_store import render_store
+
+
+@pytest.fixture
+def render_client(db_session, bundle_system):
+    original = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        yield TestClient(app), {"X-API-Key": bundle_system["org"].api_key}, bundle_system
+    finally:
+        if original is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = original
+
+
+def test_download_renders_missing_document_then_serves_it(db_session, render_client):
+    client, headers, data = render_client
+    url = f"/documents/systems/{data['system'].id}/download/soa?format=markdown"
+
+    first = client.get(url, headers=headers)
+    assert first.status_code == 200
+    assert first.headers["X-Render"] == "rendered"
+    assert "Control 0" in first.text
+
+    second = client.get(url, headers=headers)
+    assert second.headers["X-Render"] == "stored"
+    assert second.content == first.content
+
+    preview = client.get(f"/documents/systems/{data['system'].id}/preview/soa", headers=headers)
+    assert preview.status_code == 200
+    assert db_session.query(RenderedDocument).count() == 1
+
+
+@pytest.mark.parametrize("error, status", [
+    (PdfQueueFullError("PDF render queue is full (32 jobs)"), 503),
+    (PdfRenderTimeoutError("PDF render exceeded 60.0s"), 504),
+])
+def test_busy_pdf_renderer_is_reported_on_download(render_client, monkeypatch, error, status):
+    client, headers, data = render_client
+
+    def overloaded(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(DocumentGenerator, "fetch_document", overloaded)
+    url = f"/documents/systems/{data['system'].id}/download/soa?format=pdf"
+    response = client.get(url, headers=headers)
+
+    assert response.status_code == status
+    assert (response.headers.get("Retry-After") == "5") == (status == 503)
+
+
+@pytest.mark.parametrize("error, status", [
+    (PdfQueueFullError("PDF render queue is full (32 jobs)"), 503),
+    (PdfRenderTimeoutError("PDF render exceeded 60.0s"), 504),
+])
+def test_busy_pdf_renderer_is_reported_on_combined_download(
+    db_session, render_client, monkeypatch, error, status
+):
+    """A combined PDF missing from the store is rendered on download, which may be refused."""
+    client, headers, data = render_client
+    DocumentGenerator().fetch_document(data["system"], data["org"], "soa", "markdown", db_session)
+
+    def overloaded(*args, **kwargs):
+        raise error
+
+    monkeypatch.setattr(generator_module, "WEASYPRINT_AVAILABLE", True)
+    monkeypatch.setattr(generator_module.settings, "PDF_COMBINED", True)
+    monkeypatch.setattr(generator_module.pdf_renderer, "render", overloaded)
+    url = f"/documents/systems/{data['system'].id}/combined.pdf"
+    response = client.get(url, headers=headers)
+
+    assert response.status_code == status
+    assert (response.headers.get("Retry-After") == "5") == (status == 503)
+
+
+def test_stale_documents_are_rerendered(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    generator = DocumentGenerator()
+    for doc_type in ("soa", "appeals_flow"):
+        generator.fetch_document(system, org, doc_type, "markdown", db_session)
+
+    control = db_session.query(Control).filter(Control.system_id == system.id).first()
+    control.status = "implemented"
+    db_session.commit()
+
+    soa, _, soa_rendered = generator.fetch_document(system, org, "soa", "markdown", db_session)
+    _, _, appeals_rendered = generator.fetch_document(
+        system, org, "appeals_flow", "markdown", db_session
+    )
+    assert soa_rendered and not appeals_rendered
+    assert b"implemented" in soa
+    # The superseded blob is removed with its row update
+    assert len(list(render_store.store.root.rglob("soa-*.md"))) == 1
+
+
+def test_missing_blob_is_rendered_again(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    generator = DocumentGenerator()
+    generator.fetch_document(system, org, "soa", "markdown", db_session)
+    row = render_store.get(db_session, org.id, system.id, "soa", "markdown")
+    render_store.store.delete(row.blob_name)
+
+    _, fmt, rendered = generator.fetch_document(system, org, "soa", "pdf", db_session)
+
+    assert rendered
+    assert fmt in ("pdf", "markdown")
+
+
+def test_bulk_generation_warms_the_store(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    generator = DocumentGenerator()
+
+    docs = generator.generate_all_documents(
+        system.id, org.id, default_onboarding_data(org), db_session
+    )
+
+    stored = render_store.entries(db_session, org.id, system.id)
+    assert {doc_type for doc_type, fmt in stored if fmt == "markdown"} == set(docs)
+    _, _, rendered = generator.fetch_document(system, org, "fria", "markdown", db_session)
+    assert not rendered
+
+
+def test_generation_fingerprints_the_payload_without_saving_it(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    saved = OnboardingData(
+        org_id=org.id, system_id=system.id, data_json='{"company": {"name": "Acme"}}'
+    )
+    db_session.add(saved)
+    db_session.commit()
+    revision = system.revision
+    generator = DocumentGenerator()
+
+    # Without a payload the saved data is used, as on download
+    generator.generate_all_documents(system.id, org.id, None, db_session)
+    for doc_type in ("soa", "fria"):
+        _, _, rendered = generator.fetch_document(system, org, doc_type, "markdown", db_session)
+        assert not rendered
+
+    # A posted payload is fingerprinted, not written over the wizard's data
+    posted = generator.generate_all_documents(
+        system.id, org.id, {"company": {"name": "Other"}}, db_session
+    )
+    assert not any(doc["reused"] for doc in posted.values())
+    db_session.refresh(saved)
+    assert saved.data_json == '{"company": {"name": "Acme"}}'
+    assert system.revision == revision
+
+
+def test_another_replica_reuses_stored_documents(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    docs = DocumentGenerator().generate_all_documents(system.id, org.id, {}, db_session)
+
+    other = DocumentGenerator()
+    again = other.generate_all_documents(system.id, org.id, {}, db_session)
+
+    assert set(again) == set(docs)
+    assert all(doc["reused"] for doc in again.values())
+    content, fmt = other.get_document_content(system.id, org.id, "soa", db_session)
+    assert fmt == "markdown"
+    stored = render_store.get(db_session, org.id, system.id, "soa", "markdown")
+    assert content == render_store.read(stored)
+
+
+def test_listing_is_one_query(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    docs = DocumentGenerator().generate_all_documents(
+        system.id, org.id, default_onboarding_data(org), db_session
+    )
+
+    # Any replica lists the same documents from the catalog
+    listing = DocumentGenerator()
+    org_id, system_id = org.id, system.id
+    with QueryCounter(db_session) as counter:
+        listed = listing.get_document_list(system_id, org_id, db_session)
+
+    assert counter.count == 1
+    assert {doc["type"] for doc in listed} == set(docs)
+    soa = next(doc for doc in listed if doc["type"] == "soa")
+    row = render_store.get(db_session, org.id, system.id, "soa", "markdown")
+    assert soa["markdown_size"] == row.size_bytes
+    assert soa["markdown_sha256"] == row.sha256
+    assert soa["fingerprint"] == row.fingerprint
+
+
+def test_document_type_outside_the_system_set_is_not_found(db_session, bundle_system):
+    with pytest.raises(FileNotFoundError):
+        DocumentGenerator().fetch_document(
+            bundle_system["system"], bundle_system["org"], "transparency_notice_gpai", "markdown",
+            db_session,
+        )
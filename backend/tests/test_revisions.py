@@ -0,0 +1,98 @@
+"""
+Tests for the system and org revision counters.
+"""
+
+from app.core.query_counter import QueryCounter
+from app.models import AISystem, Control, Evidence, ExportJob, Organization
+from app.services.revisions import org_revision, system_revision
+
+
+def _revisions(db_session, data):
+    return system_revision(db_session, data["system"].id), org_revision(db_session, data["org"].id)
+
+
+def test_new_rows_start_at_revision_zero(db_session):
+    org = Organization(name="Fresh Corp", api_key="fresh-key")
+    db_session.add(org)
+    db_session.flush()
+    system = AISystem(org_id=org.id, name="Fresh System")
+    db_session.add(system)
+    db_session.commit()
+
+    assert system.revision == 0
+    # Adding a system changes the org
+    assert org.revision == 1
+
+
+def test_dependent_row_changes_bump_system_and_org(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    before = _revisions(db_session, bundle_system)
+
+    control = Control(org_id=org.id, system_id=system.id, iso_clause="A.9", name="New control")
+    db_session.add(control)
+    db_session.commit()
+    after_insert = _revisions(db_session, bundle_system)
+
+    control.status = "implemented"
+    db_session.commit()
+    after_update = _revisions(db_session, bundle_system)
+
+    db_session.delete(control)
+    db_session.commit()
+    after_delete = _revisions(db_session, bundle_system)
+
+    assert [rev[0] - before[0] for rev in (after_insert, after_update, after_delete)] == [1, 2, 3]
+    assert [rev[1] - before[1] for rev in (after_insert, after_update, after_delete)] == [1, 2, 3]
+    # Loaded instances see the new value
+    assert system.revision == after_delete[0] and org.revision == after_delete[1]
+
+
+def test_unchanged_and_unrelated_rows_do_not_bump(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    before = _revisions(db_session, bundle_system)
+
+    control = db_session.query(Control).filter(Control.system_id == system.id).first()
+    control.status = control.status  # no net change
+    db_session.add(ExportJob(id="job1", org_id=org.id, system_id=system.id, variant="v1"))
+    db_session.commit()
+
+    assert _revisions(db_session, bundle_system) == before
+
+
+def test_moving_a_row_bumps_both_systems(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    other = AISystem(org_id=org.id, name="Other System")
+    db_session.add(other)
+    db_session.commit()
+    before = (system.revision, other.revision)
+
+    evidence = db_session.query(Evidence).filter(Evidence.system_id == system.id).first()
+    evidence.system_id = other.id
+    db_session.commit()
+
+    assert (system.revision, other.revision) == (before[0] + 1, before[1] + 1)
+
+
+def test_bulk_delete_bumps_matched_systems(db_session, bundle_system):
+    org, system = bundle_system["org"], bundle_system["system"]
+    before = _revisions(db_session, bundle_system)
+
+    with QueryCounter(db_session) as counter:
+        deleted = db_session.query(Control).filter(
+            Control.system_id == system.id, Control.org_id == org.id
+        ).delete()
+    db_session.commit()
+
+    assert deleted == 3
+    # matched systems, the DELETE, then one bump per table
+    assert counter.count == 4
+    assert _revisions(db_session, bundle_system) == (before[0] + 1, before[1] + 1)
+
+
+def test_bulk_statement_matching_nothing_does_not_bump(db_session, bundle_system):
+    before = _revisions(db_session, bundle_system)
+
+    db_session.query(Control).filter(Control.name == "missing").update({"status": "implemented"})
+    db_session.commit()
+
+    assert _revisions(db_session, bundle_system) == before
@@ -0,0 +1,98 @@
+"""
+Tests for the request-scoped row cache shared by services.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.middleware import RowCacheHeaderMiddleware
+from app.core.query_counter import QueryCounter
+from app.database import get_db
+from app.main import app
+from app.models import PMM, Control
+from app.services.blocking_issues import BlockingIssuesService
+from app.services.document_context import DocumentContextService
+from app.services.read_models import ControlRow
+from app.services.row_cache import row_cache
+
+
+def test_services_share_row_sets_within_a_session(db_session, bundle_system):
+    system_id, org_id = bundle_system["system"].id, bundle_system["org"].id
+    db_session.add(
+        PMM(org_id=org_id, system_id=system_id, retention_months=12, logging_scope="all")
+    )
+    db_session.commit()
+
+    snapshot = DocumentContextService(db_session).load_snapshot(system_id, org_id)
+    assert len(snapshot.controls) == 3 and snapshot.pmm is not None
+
+    # Controls, evidence, risks, PMM and FRIA are projected from the snapshot's
+    # rows; only the system (with its org's role) is read
+    with QueryCounter(db_session) as first:
+        issues = BlockingIssuesService(db_session).get_blocking_issues(system_id, org_id)
+    with QueryCounter(db_session) as again:
+        assert BlockingIssuesService(db_session).get_blocking_issues(system_id, org_id) == issues
+    assert first.count == 1 and again.count == 0
+    assert not any(issue["id"] == "pmm_missing" for issue in issues)
+    assert [c.id for c in row_cache(db_session).rows(ControlRow, org_id, system_id)] == [
+        c.id for c in snapshot.controls
+    ]
+
+    metrics = row_cache(db_session).metrics()
+    assert metrics["hits"] > 0 and metrics["misses"] > 0
+
+
+def test_writes_clear_the_cache(db_session, bundle_system):
+    system_id, org_id = bundle_system["system"].id, bundle_system["org"].id
+    cache = row_cache(db_session)
+    assert len(cache.rows(Control, org_id, system_id)) == 3
+
+    db_session.add(Control(org_id=org_id, system_id=system_id, iso_clause="A.9", name="Control 9"))
+    db_session.flush()
+
+    assert cache.metrics()["row_sets"] == 0
+    assert len(cache.rows(Control, org_id, system_id)) == 4
+
+
+def test_system_sets_come_from_a_cached_org_set(db_session, bundle_system):
+    system_id, org_id = bundle_system["system"].id, bundle_system["org"].id
+    cache = row_cache(db_session)
+    cache.rows(Control, org_id)
+
+    with QueryCounter(db_session) as counter:
+        names = [c.name for c in cache.rows(Control, org_id, system_id)]
+        assert names == ["Control 0", "Control 1", "Control 2"]
+        assert cache.system(org_id, system_id) is not None
+        assert cache.system(org_id + 1, system_id) is None
+    assert counter.count == 2  # only the two system lookups
+
+
+@pytest.fixture
+def cache_client(db_session, bundle_system):
+    original = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        # The app installs the middleware at start-up only with ROW_CACHE_HEADER set
+        yield TestClient(RowCacheHeaderMiddleware(app)), {"X-API-Key": bundle_system["org"].api_key}
+    finally:
+        if original is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = original
+
+
+def test_row_cache_header_middleware_is_off_by_default():
+    assert not settings.ROW_CACHE_HEADER
+    assert RowCacheHeaderMiddleware not in [middleware.cls for middleware in app.user_middleware]
+
+
+def test_row_cache_header_reports_hits_and_misses(cache_client):
+    client, headers = cache_client
+
+    response = client.get("/reports/score", headers=headers)
+
+    assert response.status_code == 200
+    assert response.json()["org_score"] == 0.0
+    # org controls and systems are misses; the per-system controls set is derived
+    assert response.headers["X-Row-Cache"] == "hits=1, misses=2"
@@ -0,0 +1,84 @@
+"""
+Tests for the process-wide template registry.
+"""
+
+import os
+
+import pytest
+
+from app.core.config import settings
+from app.services.document_generator import DocumentGenerator
+from app.services.template_registry import TemplateRegistry, template_registry
+
+
+@pytest.fixture
+def templates(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TEMPLATE_BYTECODE_CACHE_DIR", str(tmp_path / "bytecode"))
+    directory = tmp_path / "templates"
+    directory.mkdir()
+    (directory / "hello.md").write_text("Hello {{ name }}")
+    return directory
+
+
+def test_generators_share_one_environment():
+    assert DocumentGenerator().jinja_env is DocumentGenerator().jinja_env
+    generator = DocumentGenerator()
+    assert generator.jinja_env is template_registry.environment(generator.templates_dir)
+
+
+def test_template_compiles_once_and_timings_are_recorded(templates, tmp_path):
+    registry = TemplateRegistry()
+
+    assert registry.render(templates, "hello.md", {"name": "A"}) == "Hello A"
+    assert registry.render(templates, "hello.md", {"name": "B"}) == "Hello B"
+
+    stats = registry.stats()["templates"]["hello.md"]
+    assert stats["compiles"] == 1
+    assert stats["renders"] == 2
+    assert stats["render_seconds"] >= 0
+    assert list((tmp_path / "bytecode").iterdir())
+
+
+@pytest.mark.parametrize("auto_reload,expected", [(True, "Bye A"), (False, "Hello A")])
+def test_auto_reload_follows_setting(templates, monkeypatch, auto_reload, expected):
+    monkeypatch.setattr(settings, "TEMPLATE_AUTO_RELOAD", auto_reload)
+    registry = TemplateRegistry()
+    registry.render(templates, "hello.md", {"name": "A"})
+
+    path = templates / "hello.md"
+    path.write_text("Bye {{ name }}")
+    stat = path.stat()
+    os.utime(path, (stat.st_atime, stat.st_mtime + 10))
+
+    assert registry.render(templates, "hello.md", {"name": "A"}) == expected
+
+
+def test_render_stats_endpoint(db_session):
+    from fastapi.testclient import TestClient
+
+    from app.database import get_db
+    from app.main import app
+    from app.models import Organization
+
+    db_session.add(Organization(name="Stats Corp", api_key="stats-key"))
+    db_session.commit()
+    generator = DocumentGenerator()
+    generator._render_template(
+        "05_LOGGING_PLAN.md", {"company": {}, "system": {}, "metadata": {}, "pmm": {}}
+    )
+
+    original = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = lambda: db_session
+    try:
+        response = TestClient(app).get(
+            "/templates/render-stats", headers={"X-API-Key": "stats-key"}
+        )
+    finally:
+        if original is None:
+            app.dependency_overrides.pop(get_db, None)
+        else:
+            app.dependency_overrides[get_db] = original
+
+    assert response.status_code == 200
+    stats = response.json()["templates"][generator.templates_dir.name]["05_LOGGING_PLAN.md"]
+    assert stats["renders"] >= 1
@@ -0,0 +1,146 @@
+"""
+Tests for the streaming ZIP writer and export integrity sidecar.
+"""
+
+import hashlib
+import tarfile
+import zipfile
+from io import BytesIO
+
+import pytest
+
+from app.services.bundle_cache import LocalBundleStore
+from app.services.zip_stream import (
+    ZSTD_AVAILABLE,
+    CompressionPolicy,
+    ExportIntegrityRegistry,
+    StreamingTarZstWriter,
+    StreamingZipWriter,
+)
+
+
+def _build_archive(writer: StreamingZipWriter) -> bytes:
+    chunks = [
+        writer.write_entry("doc.md", "# Title\n\nBody text\n"),
+        *writer.stream_entry("rows.csv", (f"{i},row {i}\n" for i in range(500))),
+        writer.write_entry("blob.bin", b"\x00\x01\x02" * 100),
+        writer.close(),
+    ]
+    return b"".join(chunks)
+
+
+def test_streamed_archive_is_valid_zip():
+    """Streamed output opens as a normal ZIP with identical entry contents."""
+    writer = StreamingZipWriter()
+    archive = _build_archive(writer)
+
+    with zipfile.ZipFile(BytesIO(archive)) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == ["doc.md", "rows.csv", "blob.bin"]
+        assert zf.read("doc.md").decode() == "# Title\n\nBody text\n"
+        assert zf.read("rows.csv").decode().count("\n") == 500
+        assert zf.read("blob.bin") == b"\x00\x01\x02" * 100
+
+
+def test_archive_hash_computed_while_streaming():
+    """The running SHA-256 and size match the bytes actually emitted."""
+    writer = StreamingZipWriter()
+    archive = _build_archive(writer)
+
+    assert writer.sha256 == hashlib.sha256(archive).hexdigest()
+    assert writer.size == len(archive)
+
+
+def test_artifacts_describe_uncompressed_entries():
+    """Per-entry artifact records carry the hash and size of the entry content."""
+    writer = StreamingZipWriter()
+    archive = _build_archive(writer)
+
+    with zipfile.ZipFile(BytesIO(archive)) as zf:
+        for artifact in writer.artifacts:
+            content = zf.read(artifact["name"])
+            assert artifact["sha256"] == hashlib.sha256(content).hexdigest()
+            assert artifact["bytes"] == len(content)
+
+
+def test_stream_entry_yields_before_entry_is_complete():
+    """Large streamed entries produce output before the entry is finished."""
+    writer = StreamingZipWriter(compression=zipfile.ZIP_STORED)
+    rows = (("x" * 1024) + "\n" for _ in range(64))
+    chunks = list(writer.stream_entry("big.txt", rows))
+    assert len(chunks) > 1
+
+
+def test_policy_stores_compressed_formats_and_deflates_text():
+    """PDFs are stored, text is deflated at the configured level, and each ratio is recorded."""
+    writer = StreamingZipWriter(policy=CompressionPolicy(deflate_level=9))
+    archive = b"".join([
+        writer.write_entry("doc.md", "# Title\n" * 200),
+        writer.write_entry("doc.pdf", b"%PDF-1.7" + bytes(range(256)) * 4),
+        writer.close(),
+    ])
+
+    with zipfile.ZipFile(BytesIO(archive)) as zf:
+        assert zf.getinfo("doc.md").compress_type == zipfile.ZIP_DEFLATED
+        assert zf.getinfo("doc.pdf").compress_type == zipfile.ZIP_STORED
+        assert zf.testzip() is None
+
+    metrics = {entry["name"]: entry for entry in writer.compression_metrics()["entries"]}
+    assert metrics["doc.md"]["compression"] == "deflate-9"
+    assert metrics["doc.md"]["ratio"] < 0.1
+    assert metrics["doc.pdf"]["compression"] == "stored"
+    assert metrics["doc.pdf"]["compressed_bytes"] == metrics["doc.pdf"]["bytes"]
+
+
+@pytest.mark.skipif(not ZSTD_AVAILABLE, reason="zstandard not installed")
+def test_tar_zst_archive_round_trips():
+    """The tar.zst writer emits a valid, reproducible archive with the same artifact records."""
+    import zstandard
+
+    def build():
+        writer = StreamingTarZstWriter()
+        return writer, _build_archive(writer)
+
+    writer, archive = build()
+    assert archive == build()[1]
+    assert writer.sha256 == hashlib.sha256(archive).hexdigest()
+
+    tar_bytes = zstandard.ZstdDecompressor().decompressobj().decompress(archive)
+    with tarfile.open(fileobj=BytesIO(tar_bytes)) as tf:
+        assert tf.getnames() == ["doc.md", "rows.csv", "blob.bin"]
+        for artifact in writer.artifacts:
+            content = tf.extractfile(artifact["name"]).read()
+            assert artifact["sha256"] == hashlib.sha256(content).hexdigest()
+    assert all(entry["compression"].startswith("zstd-") for entry in writer.entry_metrics)
+
+
+def test_integrity_record_is_signed_and_org_scoped():
+    """Integrity records verify, reject tampering and are only visible to their org."""
+    registry = ExportIntegrityRegistry()
+    record = registry.record(
+        export_id="abc", org_id=1, system_id=7, filename="bundle.zip", sha256="00" * 32, size=10
+    )
+
+    assert ExportIntegrityRegistry.verify(record)
+    assert registry.get("abc", 1) == record
+    assert registry.get("abc", 2) is None
+
+    tampered = {**record, "sha256": "ff" * 32}
+    assert not ExportIntegrityRegistry.verify(tampered)
+
+
+def test_integrity_records_outlive_memory_and_the_process(tmp_path):
+    """Evicted records, and records written by another process, are read back from the store."""
+    store = LocalBundleStore(tmp_path)
+    registry = ExportIntegrityRegistry(max_records=2, store=store)
+    for export_id in ("a", "b", "c"):
+        registry.record(export_id=export_id, org_id=1, filename="f.zip", sha256="0", size=0)
+    assert "a" not in registry._records
+
+    restarted = ExportIntegrityRegistry(store=store)
+    record = restarted.get("a", 1)
+    assert record is not None and ExportIntegrityRegistry.verify(record)
+    assert restarted.get("a", 2) is None
+
+    restarted.delete("a")
+    assert registry.get("a", 1) is None